@@ -0,0 +1,267 @@
+"""
+Backup a caldo del DB con l'API di backup di SQLite (sqlite3.Connection.backup).
+
+La copia a mano di collaudi.db non è sicura in WAL (le modifiche ancora nel
+file -wal restano fuori) e bloccarlo con lock sul file ferma le postazioni.
+Qui la copia procede a passi di PAGES pagine con una pausa tra un passo e
+l'altro, così non occupa disco e rete tutta in una volta.
+In WAL la connessione di backup tiene aperta una lettura per tutta la copia:
+le scritture degli utenti vanno avanti nel file -wal e la copia resta la
+fotografia coerente dell'inizio (senza, ogni scrittura di un'altra connessione
+farebbe ripartire la copia da capo). Con journal DELETE una lettura aperta
+bloccherebbe le scritture: la lettura si prende passo per passo e, se il DB
+cambia più di MAX_RESTARTS volte durante la copia, il backup viene annullato
+(si riprova più tardi).
+
+Ogni copia viene scritta come file temporaneo, controllata con
+PRAGMA quick_check e solo allora rinominata in <nome>_AAAAMMGG_HHMMSS.db
+(<nome>_AAAAMMGG_HHMMSS_2.db, _3, ... se due copie cadono nello stesso
+secondo); si tengono le ultime KEEP copie buone.
+
+    config.ini
+        [Backup]
+        dir = \\\\server\\backup\\collaudi     (default: cartella "backup" accanto al DB)
+        keep = 7
+        pages = 256
+        sleep_ms = 20
+        interval_h = 24                      (dashboard: backup automatico, 0 = no)
+
+    python -m pt2025 backup
+    python -m pt2025 backup --dir D:/backup --keep 14
+    python -m pt2025 backup --if-due 24          (per l'Utilità di pianificazione: solo se l'ultima copia ha più di 24 h)
+"""
+import os
+import re
+import time
+import glob
+import sqlite3
+from datetime import datetime
+
+import db
+import perf_trace
+
+DEFAULT_KEEP = 7
+DEFAULT_PAGES = 256
+DEFAULT_SLEEP_MS = 20
+MAX_RESTARTS = 20
+LOCK_STALE_S = 6 * 3600
+
+_BUSY = (getattr(sqlite3, "SQLITE_BUSY", 5), getattr(sqlite3, "SQLITE_LOCKED", 6))
+# <nome> + _AAAAMMGG_HHMMSS[_n].db
+_SNAP_RE = re.compile(r"_(\d{8}_\d{6})(?:_(\d+))?\.db")
+
+
+def backup_settings() -> dict:
+    """Impostazioni da config.ini [Backup] (dir "" = cartella backup accanto al DB)."""
+    out = {"dir": "", "keep": DEFAULT_KEEP, "pages": DEFAULT_PAGES,
+           "sleep_ms": DEFAULT_SLEEP_MS, "interval_h": 0.0}
+    try:
+        from config_manager import load_config
+        cfg = load_config()
+        out["dir"] = cfg.get("Backup", "dir", fallback="").strip()
+        out["keep"] = cfg.getint("Backup", "keep", fallback=DEFAULT_KEEP)
+        out["pages"] = cfg.getint("Backup", "pages", fallback=DEFAULT_PAGES)
+        out["sleep_ms"] = cfg.getint("Backup", "sleep_ms", fallback=DEFAULT_SLEEP_MS)
+        out["interval_h"] = cfg.getfloat("Backup", "interval_h", fallback=0.0)
+    except Exception:
+        pass
+    return out
+
+
+def backup_dir(dest_dir: str = None) -> str:
+    return dest_dir or os.path.join(os.path.dirname(os.path.abspath(db.get_db_path())), "backup")
+
+
+def _stem() -> str:
+    return os.path.splitext(os.path.basename(db.get_db_path()))[0]
+
+
+def list_snapshots(dest_dir: str = None) -> list:
+    """Copie presenti per il DB corrente, dalla più vecchia alla più recente."""
+    prefix = os.path.join(backup_dir(dest_dir), _stem())
+    snaps = []
+    for path in glob.glob(f"{glob.escape(prefix)}_{'[0-9]' * 8}_{'[0-9]' * 6}*.db"):
+        m = _SNAP_RE.fullmatch(path[len(prefix):])
+        if m:
+            snaps.append(((m.group(1), int(m.group(2) or 1)), path))
+    return [path for _key, path in sorted(snaps)]
+
+
+def _snapshot_path(dest_dir: str) -> str:
+    """
+    <nome>_AAAAMMGG_HHMMSS.db; se nello stesso secondo c'è già una copia
+    (anche in corso, .partial) _2, _3, ... oltre il numero più alto, così
+    l'ordine resta quello di creazione anche dopo la rotazione.
+    """
+    prefix = os.path.join(dest_dir, _stem())
+    stamp = f"{datetime.now():%Y%m%d_%H%M%S}"
+    n = 0
+    for path in glob.glob(f"{glob.escape(prefix)}_{stamp}*.db*"):
+        name = path[len(prefix):]
+        m = _SNAP_RE.fullmatch(name[:-len(".partial")] if name.endswith(".partial") else name)
+        if m and m.group(1) == stamp:
+            n = max(n, int(m.group(2) or 1))
+    return f"{prefix}_{stamp}.db" if not n else f"{prefix}_{stamp}_{n + 1}.db"
+
+
+def quick_check(path: str) -> str:
+    """'ok' oppure i problemi trovati da PRAGMA quick_check."""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("PRAGMA quick_check").fetchall()
+    finally:
+        conn.close()
+    return "\n".join(str(r[0]) for r in rows)
+
+
+def rotate(dest_dir: str = None, keep: int = DEFAULT_KEEP) -> list:
+    """Cancella le copie più vecchie oltre le ultime keep. Ritorna i file tolti."""
+    removed = []
+    snaps = list_snapshots(dest_dir)
+    for path in snaps[:max(0, len(snaps) - max(1, keep))]:
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError:
+            pass
+    return removed
+
+
+def _result(**kw) -> dict:
+    return {"path": "", "ok": False, "check": "", "error": "", "pages": 0, "seconds": 0.0, "removed": [], **kw}
+
+
+def _makedirs(dest_dir: str) -> str:
+    """Crea la cartella delle copie; "" se va bene, altrimenti il messaggio d'errore."""
+    try:
+        os.makedirs(dest_dir, exist_ok=True)
+    except OSError as e:
+        return f"Cartella di backup non disponibile: {dest_dir} ({e})"
+    return ""
+
+
+@perf_trace.traced(cat="db")
+def run_backup(dest_dir: str = None, keep: int = None, pages: int = None,
+               sleep_ms: int = None, progress=None) -> dict:
+    """
+    Copia a caldo del DB corrente in dest_dir, controllo e rotazione.
+    progress(copiate, totali) dopo ogni passo.
+    Ritorna {"path", "ok", "check", "error", "pages", "seconds", "removed"};
+    se la copia non riesce o il controllo fallisce viene scartata e le vecchie
+    restano tutte.
+    """
+    cfg = backup_settings()
+    dest_dir = backup_dir(dest_dir or cfg["dir"])
+    keep = keep if keep is not None else cfg["keep"]
+    pages = max(1, pages if pages is not None else cfg["pages"])
+    pause = max(0, sleep_ms if sleep_ms is not None else cfg["sleep_ms"]) / 1000.0
+    res = _result(error=_makedirs(dest_dir))
+    if res["error"]:
+        return res
+
+    final = _snapshot_path(dest_dir)
+    tmp = final + ".partial"
+    stats = {"pages": 0, "done": 0, "restarts": 0}
+
+    def _step(status, remaining, total):
+        if status not in _BUSY and stats["done"] and total - remaining <= stats["done"]:
+            # il DB è cambiato durante la copia e SQLite è ripartito da capo
+            stats["restarts"] += 1
+            if stats["restarts"] > MAX_RESTARTS:
+                raise RuntimeError(f"DB modificato di continuo durante la copia ({MAX_RESTARTS} ripartenze)")
+        stats["pages"], stats["done"] = total, total - remaining
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    t0 = time.perf_counter()
+    src = dst = None
+    try:
+        src = db.connect()
+        dst = sqlite3.connect(tmp)
+        if src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            src.isolation_level = None
+            src.execute("BEGIN")
+            src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # fissa la fotografia
+        # sleep: attesa prima di ritentare un passo trovato occupato
+        src.backup(dst, pages=pages, progress=_step, sleep=max(pause, 0.05))
+        # la copia eredita WAL dal DB: un file unico è più comodo da archiviare
+        dst.execute("PRAGMA journal_mode=DELETE")
+    except (sqlite3.Error, RuntimeError) as e:
+        res["error"] = str(e)
+    finally:
+        if dst is not None:
+            dst.close()
+        if src is not None:
+            if src.in_transaction:
+                src.execute("ROLLBACK")
+            src.close()
+    res["pages"] = stats["pages"]
+    res["seconds"] = round(time.perf_counter() - t0, 2)
+    if not res["error"]:
+        try:
+            res["check"] = quick_check(tmp)
+            if res["check"] == "ok":
+                os.replace(tmp, final)
+                res["ok"] = True
+        except (sqlite3.Error, OSError) as e:
+            res["error"] = str(e)
+    if not res["ok"]:
+        _remove(tmp)
+        _remove(tmp + "-journal")
+        return res
+    res["path"] = final
+    res["removed"] = rotate(dest_dir, keep)
+    return res
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def is_due(interval_h: float, dest_dir: str = None) -> bool:
+    """True se l'ultima copia ha più di interval_h ore (o non ce ne sono)."""
+    snaps = list_snapshots(dest_dir)
+    if not snaps:
+        return True
+    try:
+        age = time.time() - os.path.getmtime(snaps[-1])
+    except OSError:
+        return True
+    return age >= interval_h * 3600.0
+
+
+def run_if_due(interval_h: float = None, dest_dir: str = None, **kwargs) -> dict:
+    """
+    Backup solo se è ora (is_due) e nessun'altra postazione lo sta facendo
+    (file backup.lock nella cartella delle copie). None se non fatto;
+    come run_backup se la cartella delle copie non è raggiungibile.
+    """
+    cfg = backup_settings()
+    interval_h = interval_h if interval_h is not None else cfg["interval_h"]
+    dest_dir = backup_dir(dest_dir or cfg["dir"])
+    if interval_h <= 0 or not is_due(interval_h, dest_dir):
+        return None
+    error = _makedirs(dest_dir)
+    if error:
+        return _result(error=error)
+    lock = os.path.join(dest_dir, "backup.lock")
+    try:
+        if time.time() - os.path.getmtime(lock) > LOCK_STALE_S:
+            _remove(lock)  # lasciato da un backup interrotto
+    except OSError:
+        pass
+    try:
+        os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        return None
+    try:
+        if not is_due(interval_h, dest_dir):
+            return None
+        return run_backup(dest_dir, **kwargs)
+    finally:
+        _remove(lock)
@@ -1,11 +1,13 @@
 # certificate_view.py
 import os
 import logging
+import threading
 import tkinter as tk
 import tkinter.font as tkfont
 from tkinter import ttk, messagebox, filedialog
-from ui_format import fmt_if_number as _fmt_if_number, normalize_headers
+from ui_format import fmt_if_number as _fmt_if_number, fmt_column as _fmt_column, normalize_headers
 from tdms_reader import read_contract_and_loop_data, read_performance_tables_dynamic, read_power_calc_type
+import perf_trace
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,18 @@ def find_missing_tdms(old_path):
         str: Nuovo percorso o None se annullato
     """
     old_filename = os.path.basename(old_path) if old_path else "file.tdms"
+
+    # Prima l'indice delle cartelle radice (relocate.py): se il file è lì, niente dialog
+    try:
+        import relocate
+        found = relocate.locate(old_path)
+    except Exception:
+        found = ""
+    if found and messagebox.askyesno(
+        "File trovato",
+        f"Il file {old_filename} è stato trovato in:\n\n{found}\n\nUsare questo percorso?"
+    ):
+        return found
     
     new_path = filedialog.askopenfilename(
         title=f"Cerca: {old_filename}",
@@ -44,20 +58,30 @@ def find_missing_tdms(old_path):
     return new_path
 
 
-def update_tdms_path(acquisizione_id, new_path):
-    """Aggiorna il path TDMS nel database."""
+def update_tdms_path(acquisizione_id, new_path, old_path=None):
+    """
+    Aggiorna il path TDMS nel database. Con old_path aggiorna tutte le righe
+    del file (un record per tipo test) e le note, altrimenti solo acquisizione_id.
+    """
     if not acquisizione_id:
         return False
     
     try:
         import db
-        with db.connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        if old_path:
+            if db.relink_filepaths([(old_path, new_path)])["conflicts"]:
+                messagebox.showwarning(
+                    "File già importato",
+                    f"Il file risulta già importato dal nuovo percorso:\n{new_path}\n\n"
+                    "Il collegamento non è stato modificato.",
+                )
+                return False
+            return True
+        with db.write_transaction() as conn:
+            conn.execute(
                 "UPDATE acquisizioni SET filepath = ? WHERE id = ?",
                 (new_path, acquisizione_id)
             )
-            conn.commit()
         return True
     except Exception as e:
         messagebox.showerror("Errore DB", f"Impossibile aggiornare il percorso:\n{e}")
@@ -100,6 +124,7 @@ def _spread_even_in_tv(tv, cols, minwidths, total_target, *, stretch=False):
 
 
 # -------------------- Finestra di dettaglio --------------------
+@perf_trace.traced(cat="ui")
 def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     win = tk.Toplevel(root)
     win.title("Test Certificate")
@@ -151,7 +176,7 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
             new_path = find_missing_tdms(tdms_path)
             if new_path:
                 # Aggiorna DB con nuovo percorso
-                if update_tdms_path(acquisizione_id, new_path):
+                if update_tdms_path(acquisizione_id, new_path, tdms_path):
                     messagebox.showinfo(
                         "Percorso aggiornato", 
                         f"Il nuovo percorso Ã¨ stato salvato:\n{new_path}\n\n"
@@ -179,15 +204,38 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     tab = tk.Frame(nb, bg="#f0f0f0"); nb.add(tab, text="Certificato")
     curva_tab = tk.Frame(nb, bg="#f0f0f0"); nb.add(curva_tab, text="Curva")
 
-    try:
-        from curve_view import render_curve_tab
-        render_curve_tab(
-            curva_tab,
-            state.get("tdms_path") or "",
-            acquisizione_id=state.get("acquisizione_id")
-        )
-    except Exception as e:
-        tk.Label(curva_tab, text=f"Curva non disponibile: {e}", bg="#f0f0f0", justify="left").pack(anchor="w", padx=12, pady=12)
+    # Dati TDMS (Metric) letti una sola volta: il cambio unità riconverte in memoria
+    tdms_cache = {}
+
+    def _tdms_data() -> dict:
+        if not tdms_cache:
+            path = state.get("tdms_path") or ""
+            try:
+                contract = read_contract_and_loop_data(path) or {}
+            except Exception:
+                logger.debug("Lettura dati contrattuali fallita: %s", path, exc_info=True)
+                contract = None
+            try:
+                perf = read_performance_tables_dynamic(path, test_index=test_index)
+            except Exception:
+                logger.debug("Lettura tabelle performance fallita: %s", path, exc_info=True)
+                perf = None
+            power_calc_type = "-"
+            if path:
+                try:
+                    power_calc_type = read_power_calc_type(path)
+                except Exception:
+                    power_calc_type = "-"
+            tdms_cache.update(contract=contract, perf=perf, power_calc_type=power_calc_type)
+        return tdms_cache
+
+    # Tab Curva: costruita solo alla prima attivazione, con i dati preparati in
+    # background all'apertura della finestra (vedi _prepare_curve / _render_curve)
+    curve_state = {
+        "set_unit_system": None,  # aggiornamento in place (impostato da render_curve_tab)
+        "rendered": False,
+        "prep": None,             # dati preparati dal thread, None finché non pronti
+    }
 
     tab.columnconfigure(0, weight=1)
     tab.rowconfigure(1, weight=1)
@@ -214,11 +262,17 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     except Exception:
         current_system = "Metric"
     
+    try:
+        import unit_converter as uc
+        unit_systems = list(uc.system_names())
+    except Exception:
+        unit_systems = ["Metric", "US"]
+
     unit_var = tk.StringVar(value=current_system)
     unit_combo = ttk.Combobox(
         unit_frame,
         textvariable=unit_var,
-        values=["Metric", "US"],
+        values=unit_systems,
         state="readonly",
         width=10,
         font=("Segoe UI", 9)
@@ -226,32 +280,23 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     unit_combo.pack(side="left")
     
     def on_unit_change(event=None):
-        """Quando cambia il sistema di unitÃ , salva nel DB e ricarica tutto."""
+        """Quando cambia il sistema di unità, salva nel DB e aggiorna i valori in place (senza rileggere il TDMS)."""
         new_system = unit_var.get()
         if acquisizione_id:
             try:
                 set_unit_system(acquisizione_id, new_system)
             except Exception:
                 logger.warning("Salvataggio unit_system fallito per acquisizione_id=%s", acquisizione_id, exc_info=True)
-        # Ricarica i blocchi con le nuove unitÃ 
+        # Riconverti blocchi e tabelle dai dati Metric già letti
         render_blocks(state.get("tdms_path") or "", new_system)
         render_tables(state.get("tdms_path") or "", new_system)
-        
-        # Ricarica anche la tab Curva
-        try:
-            # Distruggi tutti i widget nella curva_tab
-            for widget in curva_tab.winfo_children():
-                widget.destroy()
-            
-            # Ri-renderizza con il nuovo unit_system
-            from curve_view import render_curve_tab
-            render_curve_tab(
-                curva_tab,
-                state.get("tdms_path") or "",
-                acquisizione_id=acquisizione_id
-            )
-        except Exception as e:
-            tk.Label(curva_tab, text=f"Curva non disponibile: {e}", bg="#f0f0f0", justify="left").pack(anchor="w", padx=12, pady=12)
+
+        # Tab Curva: stessi artist matplotlib, nuove coordinate
+        if curve_state["set_unit_system"] is not None:
+            try:
+                curve_state["set_unit_system"](new_system)
+            except Exception:
+                logger.warning("Aggiornamento tab Curva fallito", exc_info=True)
     
     unit_combo.bind("<<ComboboxSelected>>", on_unit_change)
     
@@ -279,33 +324,41 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     tables_row.grid_rowconfigure(0, weight=1)
 
     # --- Contractual + Rated Point + Loop (usa tdms_reader) ---
-    def render_blocks(tdms_path: str, unit_system: str = "Metric"):
-        """Renderizza i blocchi Contractual/Rated/Loop con conversione unitÃ ."""
-        for w in blocks.winfo_children():
-            w.destroy()
+    # LabelFrame e righe _kv_row create al primo render, poi aggiornate in place
+    block_frames = {}
+    block_rows = {}
+
+    def _kv(parent, label, value):
+        key = (str(parent), label.split(" [", 1)[0])  # unità escluse: cambiano col sistema
+        row = block_rows.get(key)
+        if row is None:
+            block_rows[key] = _kv_row(parent, label, value)
+            return
+        lbl, val = row.winfo_children()[:2]
+        lbl.configure(text=label)
+        val.configure(text=value if value else "-")
 
+    def render_blocks(tdms_path: str, unit_system: str = "Metric"):
+        """Renderizza i blocchi Contractual/Rated/Loop con conversione unità (dati TDMS in cache)."""
         # Init
         cap = tdh = eff = abs_pow = speed = sg = temp = visc = npsh = liquid = "-"
         cust = po = end_user = specs = "-"
         item = pump = sn = imp_draw = imp_mat = imp_dia = "-"
         suction = discharge = watt_const = atmpress = knpsh = watertemp = kventuri = "-"
-        power_calc_type = "-"  # Nuovo: tipo di calcolo potenza
 
+        cached = _tdms_data()
         try:
             import unit_converter as uc
-            data = read_contract_and_loop_data(tdms_path)
-            # Converti i dati contrattuali da Metric â†’ unit_system selezionato
-            data = uc.convert_contractual_data(data, "Metric", unit_system)
+            if cached["contract"] is None:
+                raise ValueError("dati contrattuali non disponibili")
+            # Converti i dati contrattuali da Metric → unit_system selezionato
+            data = uc.convert_contractual_data(cached["contract"], "Metric", unit_system)
         except Exception:
             data = {}
             uc = None
-        
-        # Leggi Power Calc Type
-        if tdms_path:
-            try:
-                power_calc_type = read_power_calc_type(tdms_path)
-            except Exception:
-                power_calc_type = "-"
+
+        # Tipo di calcolo potenza (letto una volta con il TDMS)
+        power_calc_type = cached["power_calc_type"]
 
         # Rated point (Capacity..Liquid) - ora con etichette convertite
         cap_key = f"Capacity [{uc.get_unit_label('flow', unit_system)}]" if uc else "Capacity [m3/h]"
@@ -366,29 +419,35 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
         kventuri    = _fmt_if_number(data.get("KVenturi", ""))
 
         # --- 1) Contractual Data (FSG ORDER .. Specs)
-        contractual = tk.LabelFrame(blocks, text="Contractual Data", bg="#f0f0f0")
-        contractual.grid(row=0, column=0, sticky="nsew", padx=(0,8))
-        contractual.columnconfigure(0, weight=1)
-
-        _kv_row(contractual, "FSG ORDER", job_dash if job_dash and job_dash != "-" else "-")
-        _kv_row(contractual, "CUSTOMER", cust)
-        _kv_row(contractual, "P.O.", po)
-        _kv_row(contractual, "End User", end_user)
-        _kv_row(contractual, "Item", item)
+        contractual = block_frames.get("contractual")
+        if contractual is None:
+            contractual = tk.LabelFrame(blocks, text="Contractual Data", bg="#f0f0f0")
+            contractual.grid(row=0, column=0, sticky="nsew", padx=(0,8))
+            contractual.columnconfigure(0, weight=1)
+            block_frames["contractual"] = contractual
+
+        _kv(contractual, "FSG ORDER", job_dash if job_dash and job_dash != "-" else "-")
+        _kv(contractual, "CUSTOMER", cust)
+        _kv(contractual, "P.O.", po)
+        _kv(contractual, "End User", end_user)
+        _kv(contractual, "Item", item)
 
         pump_model = pump if pump and pump != "-" else (values[3] if len(values) > 3 else "-")
-        _kv_row(contractual, "Pump", pump_model)
+        _kv(contractual, "Pump", pump_model)
 
-        _kv_row(contractual, "S. N.", sn)
-        _kv_row(contractual, "Imp. Draw.", imp_draw)
-        _kv_row(contractual, "Imp. Mat.", imp_mat)
-        _kv_row(contractual, "Imp Dia [mm]", imp_dia)
-        _kv_row(contractual, "Specs", specs)
+        _kv(contractual, "S. N.", sn)
+        _kv(contractual, "Imp. Draw.", imp_draw)
+        _kv(contractual, "Imp. Mat.", imp_mat)
+        _kv(contractual, "Imp Dia [mm]", imp_dia)
+        _kv(contractual, "Specs", specs)
 
         # --- 2) Rated Point (Capacity .. Liquid) con unitÃ  dinamiche
-        rated = tk.LabelFrame(blocks, text="Rated Point", bg="#f0f0f0")
-        rated.grid(row=0, column=1, sticky="nsew", padx=8)
-        rated.columnconfigure(0, weight=1)
+        rated = block_frames.get("rated")
+        if rated is None:
+            rated = tk.LabelFrame(blocks, text="Rated Point", bg="#f0f0f0")
+            rated.grid(row=0, column=1, sticky="nsew", padx=8)
+            rated.columnconfigure(0, weight=1)
+            block_frames["rated"] = rated
 
         flow_unit = uc.get_unit_label('flow', unit_system) if uc else "m³/h"
         head_unit = uc.get_unit_label('head', unit_system) if uc else "m"
@@ -396,45 +455,109 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
         temp_unit = uc.get_unit_label('temp', unit_system) if uc else "°C"
         npsh_unit = uc.get_unit_label('npsh', unit_system) if uc else "m"
         
-        _kv_row(rated, f"Capacity [{flow_unit}]", cap)
-        _kv_row(rated, f"TDH [{head_unit}]", tdh)
-        _kv_row(rated, "Efficiency [%]", eff)
-        _kv_row(rated, f"ABS_Power [{power_unit}]", abs_pow)
-        _kv_row(rated, "Speed [rpm]", speed)
-        _kv_row(rated, "SG", sg)
-        _kv_row(rated, f"Temperature [{temp_unit}]", temp)
-        _kv_row(rated, "Viscosity [cP]", visc)
-        _kv_row(rated, f"NPSH [{npsh_unit}]", npsh)
-        _kv_row(rated, "Liquid", liquid)
+        _kv(rated, f"Capacity [{flow_unit}]", cap)
+        _kv(rated, f"TDH [{head_unit}]", tdh)
+        _kv(rated, "Efficiency [%]", eff)
+        _kv(rated, f"ABS_Power [{power_unit}]", abs_pow)
+        _kv(rated, "Speed [rpm]", speed)
+        _kv(rated, "SG", sg)
+        _kv(rated, f"Temperature [{temp_unit}]", temp)
+        _kv(rated, "Viscosity [cP]", visc)
+        _kv(rated, f"NPSH [{npsh_unit}]", npsh)
+        _kv(rated, "Liquid", liquid)
 
         # --- 3) Loop Details con unitÃ  dinamiche
-        loop = tk.LabelFrame(blocks, text="Loop Details", bg="#f0f0f0")
-        loop.grid(row=0, column=2, sticky="nsew", padx=(8,0))
-        # Test performed with - stesso formato di _kv_row ma con titolo inline
-        test_row = tk.Frame(loop, bg="#f0f0f0")
-        test_row.pack(fill="x", padx=8, pady=(6,2))
-        tk.Label(test_row, text="Test performed with:", width=22, anchor="w", bg="#f0f0f0",
-                 font=("Segoe UI", 10, "bold")).pack(side="left")
-        tk.Label(test_row, text=power_calc_type if power_calc_type else "-", anchor="w", bg="#f0f0f0",
-                 font=("Segoe UI", 10)).pack(side="left", fill="x", expand=True)
-        
-        _kv_row(loop, "Suction [Inch]", suction)
-        _kv_row(loop, "Discharge [Inch]", discharge)
-        _kv_row(loop, "Wattmeter Const.", watt_const)
-        _kv_row(loop, f"AtmPress [{head_unit}]", atmpress)
-        _kv_row(loop, f"KNPSH [{npsh_unit}]", knpsh)
-        _kv_row(loop, f"WaterTemp [{temp_unit}]", watertemp)
-        _kv_row(loop, "Kventuri", kventuri)
+        loop = block_frames.get("loop")
+        if loop is None:
+            loop = tk.LabelFrame(blocks, text="Loop Details", bg="#f0f0f0")
+            loop.grid(row=0, column=2, sticky="nsew", padx=(8,0))
+            # Test performed with - stesso formato di _kv_row ma con titolo inline
+            test_row = tk.Frame(loop, bg="#f0f0f0")
+            test_row.pack(fill="x", padx=8, pady=(6,2))
+            tk.Label(test_row, text="Test performed with:", width=22, anchor="w", bg="#f0f0f0",
+                     font=("Segoe UI", 10, "bold")).pack(side="left")
+            tk.Label(test_row, text=power_calc_type if power_calc_type else "-", anchor="w", bg="#f0f0f0",
+                     font=("Segoe UI", 10)).pack(side="left", fill="x", expand=True)
+            block_frames["loop"] = loop
+
+        _kv(loop, "Suction [Inch]", suction)
+        _kv(loop, "Discharge [Inch]", discharge)
+        _kv(loop, "Wattmeter Const.", watt_const)
+        _kv(loop, f"AtmPress [{head_unit}]", atmpress)
+        _kv(loop, f"KNPSH [{npsh_unit}]", knpsh)
+        _kv(loop, f"WaterTemp [{temp_unit}]", watertemp)
+        _kv(loop, "Kventuri", kventuri)
 
     # --- Tre tabelle (Recorded/Calc/Converted) ---
-    def render_tables(tdms_path: str, unit_system: str = "Metric"):
-        """Renderizza le tabelle Recorded/Calculated/Converted con conversione unitÃ ."""
-        for w in tables_row.winfo_children():
-            w.destroy()
+    def _prune_empty_columns(cols, rows):
+        """
+        Rimuove le colonne:
+        - completamente vuote
+        - con soli zeri (eventuali celle vuote incluse)
+        Ritorna (cols, rows, indici tenuti).
+        """
+        if not cols:
+            return cols, rows, None
+        if not rows:
+            return [], [], []
+
+        keep_idx = []
+        for i, _c in enumerate(cols):
+            has_value = False
+            for r in rows:
+                if i >= len(r):
+                    continue
+                v = r[i]
+                if v is None:
+                    continue
+                if isinstance(v, str):
+                    s = v.strip()
+                    if s == "":
+                        continue
+                    try:
+                        # "0", "0.0", "0,000" -> zero
+                        num = float(s.replace(",", "."))
+                        if abs(num) > 1e-12:
+                            has_value = True
+                            break
+                        continue
+                    except Exception:
+                        # Testo non numerico: consideralo valore valido
+                        has_value = True
+                        break
+                try:
+                    num = float(v)
+                    if abs(num) > 1e-12:
+                        has_value = True
+                        break
+                except Exception:
+                    has_value = True
+                    break
+            if has_value:
+                keep_idx.append(i)
+
+        if not keep_idx:
+            return [], [], []
+
+        return _take_columns(cols, rows, keep_idx) + (keep_idx,)
+
+    def _take_columns(cols, rows, keep_idx):
+        if keep_idx is None:
+            return cols, rows
+        new_cols = [cols[i] for i in keep_idx]
+        new_rows = [tuple((r[i] if i < len(r) else "") for i in keep_idx) for r in rows]
+        return new_cols, new_rows
+
+    table_keep = {}     # colonne non vuote, decise una volta sui dati Metric
+    table_widgets = {}  # Treeview create al primo render, poi aggiornate in place
 
+    def _table_data(unit_system: str):
+        """Tabelle dai dati TDMS in cache (Metric), senza colonne vuote e convertite in unit_system."""
         try:
             import unit_converter as uc
-            perf = read_performance_tables_dynamic(tdms_path, test_index=test_index)
+            perf = _tdms_data()["perf"]
+            if perf is None:
+                raise ValueError("tabelle performance non disponibili")
         except Exception:
             perf = {
                 "Recorded": {"columns": [], "rows": []},
@@ -442,79 +565,53 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
                 "Converted": {"columns": [], "rows": []},
             }
             uc = None
-            
-        rec_cols, rec_rows    = perf["Recorded"]["columns"], perf["Recorded"]["rows"]
-        calc_cols, calc_rows  = perf["Calc"]["columns"],     perf["Calc"]["rows"]
-        conv_cols, conv_rows  = perf["Converted"]["columns"], perf["Converted"]["rows"]
-
-        def _prune_empty_columns(cols, rows):
-            """
-            Rimuove le colonne:
-            - completamente vuote
-            - con soli zeri (eventuali celle vuote incluse)
-            """
-            if not cols:
-                return cols, rows
-            if not rows:
-                return [], []
-
-            keep_idx = []
-            for i, _c in enumerate(cols):
-                has_value = False
-                for r in rows:
-                    if i >= len(r):
-                        continue
-                    v = r[i]
-                    if v is None:
-                        continue
-                    if isinstance(v, str):
-                        s = v.strip()
-                        if s == "":
-                            continue
-                        try:
-                            # "0", "0.0", "0,000" -> zero
-                            num = float(s.replace(",", "."))
-                            if abs(num) > 1e-12:
-                                has_value = True
-                                break
-                            continue
-                        except Exception:
-                            # Testo non numerico: consideralo valore valido
-                            has_value = True
-                            break
-                    try:
-                        num = float(v)
-                        if abs(num) > 1e-12:
-                            has_value = True
-                            break
-                    except Exception:
-                        has_value = True
-                        break
-                if has_value:
-                    keep_idx.append(i)
 
-            if not keep_idx:
-                return [], []
+        out = {}
+        for name in ("Recorded", "Calc", "Converted"):
+            cols, rows = perf[name]["columns"] or [], perf[name]["rows"] or []
+            # Nascondi colonne completamente vuote in ciascuna tabella
+            if name not in table_keep:
+                cols, rows, table_keep[name] = _prune_empty_columns(cols, rows)
+            else:
+                cols, rows = _take_columns(cols, rows, table_keep[name])
+            out[name] = (cols, rows)
+
+        rec_cols, rec_rows = out["Recorded"]
+        calc_cols, calc_rows = out["Calc"]
+        conv_cols, conv_rows = out["Converted"]
 
-            new_cols = [cols[i] for i in keep_idx]
-            new_rows = [tuple((r[i] if i < len(r) else "") for i in keep_idx) for r in rows]
-            return new_cols, new_rows
-        
-        # Converti Calculated e Converted da Metric â†’ unit_system
+        # Converti Calculated e Converted da Metric → unit_system
         if uc:
             calc_cols, calc_rows = uc.convert_performance_table(calc_cols, calc_rows, "Metric", unit_system)
             conv_cols, conv_rows = uc.convert_performance_table(conv_cols, conv_rows, "Metric", unit_system)
 
-        # Nascondi colonne completamente vuote in ciascuna tabella
-        rec_cols, rec_rows = _prune_empty_columns(rec_cols or [], rec_rows or [])
-        calc_cols, calc_rows = _prune_empty_columns(calc_cols or [], calc_rows or [])
-        conv_cols, conv_rows = _prune_empty_columns(conv_cols or [], conv_rows or [])
-        
         # Format intestazioni colonna
-        # Recorded: mantiene i nomi originali (incluse unitÃ )
-        # calc_cols e conv_cols: normalizza con unitÃ 
+        # Recorded: mantiene i nomi originali (incluse unità)
+        # calc_cols e conv_cols: normalizza con unità
         calc_cols = normalize_headers(calc_cols or [], "Calculated Values", unit_system)
         conv_cols = normalize_headers(conv_cols or [], "Converted Values", unit_system)
+        return rec_cols, rec_rows, calc_cols, calc_rows, conv_cols, conv_rows
+
+    def _update_table(tv, col_ids, cols, rows):
+        """Aggiorna in place intestazioni e valori di una Treeview già popolata."""
+        for cid, text in zip(col_ids, cols):
+            tv.heading(cid, text=text)
+        for idx, vals in enumerate(rows, start=1):
+            iid = f"p{idx:03d}"
+            if tv.exists(iid):
+                tv.item(iid, values=_fmt_column(vals))
+
+    def render_tables(tdms_path: str, unit_system: str = "Metric"):
+        """Renderizza le tabelle Recorded/Calculated/Converted con conversione unità.
+        Se sono già state create aggiorna solo intestazioni e valori."""
+        rec_cols, rec_rows, calc_cols, calc_rows, conv_cols, conv_rows = _table_data(unit_system)
+        if table_widgets:
+            _update_table(*table_widgets["mid"], calc_cols, calc_rows)
+            _update_table(*table_widgets["right"], conv_cols, conv_rows)
+            return
+
+        for w in tables_row.winfo_children():
+            w.destroy()
 
         def _make_table(parent, title, cols, mode):
             lf = tk.LabelFrame(parent, text=title, bg="#f0f0f0")
@@ -613,13 +710,13 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
         
         # inserisci righe
         for idx, vals in enumerate(rec_rows, start=1):
-            tv_left.insert("", "end", iid=f"p{idx:03d}", values=[_fmt_if_number(v) for v in vals])
+            tv_left.insert("", "end", iid=f"p{idx:03d}", values=_fmt_column(vals))
 
         for idx, vals in enumerate(calc_rows, start=1):
-            tv_mid.insert("", "end", iid=f"p{idx:03d}", values=[_fmt_if_number(v) for v in vals])
+            tv_mid.insert("", "end", iid=f"p{idx:03d}", values=_fmt_column(vals))
 
         for idx, vals in enumerate(conv_rows, start=1):
-            tv_right.insert("", "end", iid=f"p{idx:03d}", values=[_fmt_if_number(v) for v in vals])
+            tv_right.insert("", "end", iid=f"p{idx:03d}", values=_fmt_column(vals))
 
         # ridistribuzione equa SOLO nella tabella centrale
         def _resize_center(_e=None):
@@ -749,6 +846,9 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
         vsb_mid.configure(command=lambda *args: _on_scrollbar_move(tv_mid, *args))
         vsb_right.configure(command=lambda *args: _on_scrollbar_move(tv_right, *args))
 
+        table_widgets["mid"] = (tv_mid, mid_cols)
+        table_widgets["right"] = (tv_right, right_cols)
+
         # selezione iniziale
         try:
             first_iid = next(iter(tv_left.get_children()), None)
@@ -761,5 +861,86 @@ def open_detail_window(root, columns, values, meta, tipo_test="PERFORMANCE"):
     render_blocks(state["tdms_path"], current_system)
     render_tables(state["tdms_path"], current_system)
 
+    # --- Tab Curva (lazy) ---
+    def _prepare_curve(tdms_path: str, unit_system: str, contract, perf):
+        """Thread: legge/calcola i dati della curva senza toccare Tk."""
+        prep = {"unit_system": unit_system, "contract": contract, "perf": perf, "series": None, "error": None}
+        try:
+            from curve_data import compute_curve_series
+            if contract is None:
+                prep["contract"] = read_contract_and_loop_data(tdms_path) or {}
+            if perf is None:
+                # la curva usa sempre i gruppi PERFORMANCE (test_index 0)
+                prep["perf"] = read_performance_tables_dynamic(tdms_path) if tdms_path else {}
+            prep["series"] = compute_curve_series(
+                tdms_path, unit_system, perf=prep["perf"], contract=prep["contract"]
+            )
+        except Exception as e:
+            prep["error"] = e
+        try:
+            win.after(0, lambda: _curve_ready(prep))
+        except (RuntimeError, tk.TclError):
+            pass  # finestra già chiusa
+
+    def _curve_ready(prep):
+        curve_state["prep"] = prep
+        if _curve_tab_selected():
+            _render_curve()
+
+    def _curve_tab_selected() -> bool:
+        try:
+            return nb.select() == str(curva_tab)
+        except tk.TclError:
+            return False
+
+    def _render_curve():
+        prep = curve_state["prep"]
+        if curve_state["rendered"] or prep is None:
+            return
+        curve_state["rendered"] = True
+        for w in curva_tab.winfo_children():
+            w.destroy()
+        try:
+            if prep["error"] is not None:
+                raise prep["error"]
+            from curve_view import render_curve_tab
+            unit_system = unit_var.get()
+            curve_state["set_unit_system"] = render_curve_tab(
+                curva_tab,
+                state.get("tdms_path") or "",
+                acquisizione_id=state.get("acquisizione_id"),
+                unit_system=unit_system,
+                contract=prep["contract"],
+                perf=prep["perf"],
+                # serie del thread valide solo se nel frattempo l'unità non è cambiata
+                series=prep["series"] if prep["unit_system"] == unit_system else None,
+            )
+        except Exception as e:
+            tk.Label(curva_tab, text=f"Curva non disponibile: {e}", bg="#f0f0f0", justify="left").pack(anchor="w", padx=12, pady=12)
+
+    def _on_tab_changed(_e=None):
+        if curve_state["rendered"] or not _curve_tab_selected():
+            return
+        if curve_state["prep"] is None:
+            # dati non ancora pronti: _curve_ready renderizza appena arrivano
+            if not curva_tab.winfo_children():
+                tk.Label(curva_tab, text="Caricamento curva...", bg="#f0f0f0").pack(anchor="w", padx=12, pady=12)
+            return
+        _render_curve()
+
+    nb.bind("<<NotebookTabChanged>>", _on_tab_changed)
+
+    cached = _tdms_data()
+    threading.Thread(
+        target=_prepare_curve,
+        args=(
+            state.get("tdms_path") or "",
+            current_system,
+            cached["contract"],
+            cached["perf"] if test_index == 0 else None,
+        ),
+        daemon=True,
+    ).start()
+
 
 
@@ -0,0 +1,37 @@
+"""
+Campi contrattuali (Customer, End User, Pump, FSG ORDER, Impeller Material/
+Drawing, Capacity/TDH rated) copiati dal TDMS nelle colonne di acquisizioni.
+
+La dashboard li scrive all'import del TDMS; per le righe importate prima
+(o con il file allora non raggiungibile) c'è il backfill:
+
+    python -m pt2025 backfill contract
+    python -m pt2025 --db D:/dati/collaudi.db backfill contract
+"""
+import os
+
+import db
+from tdms_reader import read_contract_and_loop_data
+
+
+def materialize(filepath: str) -> bool:
+    """Legge i campi contrattuali del TDMS e li salva nel DB. False se il file non c'è."""
+    if not (filepath and os.path.exists(filepath)):
+        return False
+    db.set_contract_fields(filepath, read_contract_and_loop_data(filepath))
+    return True
+
+
+def backfill(progress=None) -> dict:
+    """
+    Materializza i campi per tutti i file non ancora indicizzati.
+    progress(done, total, filepath, ok) viene chiamata dopo ogni file.
+    """
+    paths = db.select_filepaths_without_contract()
+    res = {"ok": [], "missing": []}
+    for i, path in enumerate(paths, start=1):
+        ok = materialize(path)
+        res["ok" if ok else "missing"].append(path)
+        if progress:
+            progress(i, len(paths), path, ok)
+    return res
@@ -0,0 +1,388 @@
+# curve_data.py
+"""
+Serie dati per i grafici curva (TDH / Efficiency / Absorbed Power).
+
+Modulo volutamente SENZA matplotlib/tkinter: le stesse serie calcolate qui
+vengono disegnate sia da curve_view (Tk + matplotlib) sia da pdf_curves
+(grafica vettoriale reportlab).
+
+Espone:
+- compute_curve_series(tdms_path, unit_system="Metric", ...) -> dict
+- compute_overlay_series(acq_ids, unit_system="Metric") -> list (storico da perf_points)
+"""
+import math
+from collections import OrderedDict
+
+from tdms_reader import read_performance_tables_dynamic, read_contract_and_loop_data
+
+
+# -------------------- numerica --------------------
+def _to_float(x, default=None):
+    try:
+        if isinstance(x, str):
+            x = x.replace(",", ".").strip()
+        f = float(x)
+        if math.isfinite(f):
+            return f
+    except Exception:
+        pass
+    return default
+
+def _dedupe_and_sort_xy(xs, ys):
+    """Ordina per x crescente e deduplica x coincidenti mediando i corrispondenti y."""
+    pairs = {}
+    for x, y in zip(xs, ys):
+        try:
+            xf = float(x); yf = float(y)
+        except Exception:
+            continue
+        if not (math.isfinite(xf) and math.isfinite(yf)):
+            continue
+        pairs.setdefault(xf, []).append(yf)
+    if not pairs:
+        return [], []
+    xs_sorted = sorted(pairs.keys())
+    ys_sorted = [sum(pairs[x]) / len(pairs[x]) for x in xs_sorted]
+    return xs_sorted, ys_sorted
+
+
+# ---------- Trendline polinomiale cubica (minimi quadrati, senza NumPy) ----------
+def _solve_linear_system_4x4(A, b):
+    """Risoluzione A x = b (A 4x4) con eliminazione gaussiana + pivoting parziale."""
+    M = [list(A[i]) + [b[i]] for i in range(4)]
+    for col in range(4):
+        pivot_row = max(range(col, 4), key=lambda r: abs(M[r][col]))
+        if abs(M[pivot_row][col]) < 1e-12:
+            return None
+        if pivot_row != col:
+            M[col], M[pivot_row] = M[pivot_row], M[col]
+        pivot = M[col][col]
+        for j in range(col, 5):
+            M[col][j] /= pivot
+        for r in range(col + 1, 4):
+            factor = M[r][col]
+            if factor == 0:
+                continue
+            for j in range(col, 5):
+                M[r][j] -= factor * M[col][j]
+    x = [0.0] * 4
+    for i in range(3, -1, -1):
+        s = M[i][4] - sum(M[i][j] * x[j] for j in range(i + 1, 4))
+        x[i] = s
+    return x
+
+def _poly3_trendline(xs, ys):
+    """y = a x^3 + b x^2 + c x + d, con R^2. Ritorna (a, b, c, d, r2) o tutti None."""
+    n = len(xs)
+    if n < 4:
+        return (None, None, None, None, None)
+    S0 = float(n)
+    S1 = sum(xs)
+    S2 = sum(x*x for x in xs)
+    S3 = sum(x*x*x for x in xs)
+    S4 = sum((x**4) for x in xs)
+    S5 = sum((x**5) for x in xs)
+    S6 = sum((x**6) for x in xs)
+
+    T0 = sum(ys)
+    T1 = sum(x*y for x, y in zip(xs, ys))
+    T2 = sum((x*x)*y for x, y in zip(xs, ys))
+    T3 = sum((x**3)*y for x, y in zip(xs, ys))
+
+    A = [
+        [S6, S5, S4, S3],
+        [S5, S4, S3, S2],
+        [S4, S3, S2, S1],
+        [S3, S2, S1, S0],
+    ]
+    bvec = [T3, T2, T1, T0]
+
+    coeffs = _solve_linear_system_4x4(A, bvec)
+    if coeffs is None:
+        return (None, None, None, None, None)
+    a, b, c, d = coeffs
+
+    y_mean = T0 / n
+    ss_tot = sum((y - y_mean) ** 2 for y in ys)
+    ss_res = sum((y - (a*x**3 + b*x**2 + c*x + d)) ** 2 for x, y in zip(xs, ys))
+    r2 = 1.0 - (ss_res / ss_tot) if ss_tot > 0 else 1.0
+    return (a, b, c, d, r2)
+
+def _trend_samples(xs, ys, x_curve=None):
+    """
+    Campiona la trendline cubica dei punti (xs, ys).
+    - x_curve: ascisse da riusare (es. quelle della curva TDH); se None
+      vengono generate tra min(x) e max(x).
+    Se il fit non è possibile ritorna i punti deduplicati/ordinati.
+    Ritorna (x_curve, y_curve, fitted).
+    """
+    xs, ys = _dedupe_and_sort_xy(xs, ys)
+    if not xs:
+        return [], [], False
+    a, b, c, d, _r2 = _poly3_trendline(xs, ys)
+    if a is None or len(xs) < 4:
+        return xs, ys, False
+    if not x_curve:
+        xmin, xmax = min(xs), max(xs)
+        num = max(50, min(400, 10 * len(xs)))
+        x_curve = [xmin + (xmax - xmin) * i / (num - 1) for i in range(num)]
+    y_curve = [a*x**3 + b*x**2 + c*x + d for x in x_curve]
+    return list(x_curve), y_curve, True
+# --------------------------------------------------------------------
+
+
+# -------------------- Colonne EXACT di Converted --------------------
+FLOW_NAME  = "FLOW"
+TDH_NAME   = "TDH"
+EFF_NAME   = "EFF"
+POWER_NAME = "POWER"
+
+def _idx_exact_or_dup(columns, base_name):
+    """
+    Ritorna l'indice della colonna con nome esatto `base_name`.
+    Accetta anche eventuali duplicati creati dal reader con suffisso '__2', '__3', ...
+    """
+    if not columns:
+        return None
+    for i, c in enumerate(columns):
+        if c == base_name:
+            return i
+    prefix = f"{base_name}__"
+    for i, c in enumerate(columns):
+        if isinstance(c, str) and c.startswith(prefix):
+            return i
+    return None
+
+def _get_converted(tdms_path: str, test_index: int = 0):
+    perf = read_performance_tables_dynamic(tdms_path, test_index=test_index) or {}
+    conv = perf.get("Converted") or {}
+    return conv.get("columns") or [], conv.get("rows") or []
+
+
+# -------------------- Contractual + Rated (stessa fonte del certificato) --------------------
+def _contractual_meta_from_raw(raw: dict) -> dict:
+    """Chiavi UI normalizzate per Rated Point + alcuni campi textual Contractual."""
+    raw = raw or {}
+
+    # Helper per cercare chiavi in modo robusto
+    def find_key(pattern):
+        """Cerca una chiave nel dict raw che contiene il pattern (case-insensitive)."""
+        pattern_lower = pattern.lower()
+        for k in raw.keys():
+            if pattern_lower in k.lower():
+                return raw[k]
+        return ""
+
+    meta = {
+        # Rated - cerca con pattern matching robusto
+        "capacity": find_key("capacity") or "—",
+        "tdh":      find_key("tdh [m") or "—",  # matcha sia "TDH [m]" che "TDH [m³/h]" ecc
+        "eff":      find_key("efficiency") or "—",
+        "abs_pow":  find_key("abs_power") or find_key("power [k") or "—",
+        "speed":    find_key("speed") or "—",
+        "sg":       find_key("sg contract") or "—",
+        "temp":     find_key("temperature") or "—",
+        "visc":     find_key("viscosity") or "—",
+        "npsh":     find_key("npsh [m") or "—",
+        "liquid":   raw.get("Liquid", "") or "—",
+        # Contractual extra
+        "fsg_order": raw.get("FSG ORDER", "") or "—",
+        "customer":  raw.get("Customer", "") or "—",
+        "po":        raw.get("Purchaser Order", "") or "—",
+        "end_user":  raw.get("End User", "") or "—",
+        "item":      raw.get("Item", "") or "—",
+        "pump":      raw.get("Pump", "") or "—",
+        "sn":        raw.get("Serial Number_Elenco", "") or "—",
+        "imp_draw":  raw.get("Impeller Drawing", "") or "—",
+        "imp_mat":   raw.get("Impeller Material", "") or "—",
+        "imp_dia":   raw.get("Diam Nominal", "") or "—",
+        "specs":     raw.get("Applic. Specs.", "") or "—",
+    }
+    return meta
+
+def _read_contractual_meta(tdms_path: str) -> dict:
+    return _contractual_meta_from_raw(read_contract_and_loop_data(tdms_path) or {})
+
+
+# Serie per i grafici (letta come fa la tabella Converted)
+def _series_xy(cols, rows, x_name: str, y_name: str):
+    if not cols or not rows:
+        return [], []
+    ix_x = _idx_exact_or_dup(cols, x_name)
+    ix_y = _idx_exact_or_dup(cols, y_name)
+    if ix_x is None or ix_y is None:
+        return [], []
+    xs, ys = [], []
+    for r in rows:
+        x = _to_float(r[ix_x], None)
+        y = _to_float(r[ix_y], None)
+        if x is None or y is None:
+            continue
+        if math.isfinite(x) and math.isfinite(y):
+            xs.append(x); ys.append(y)
+    return xs, ys
+
+def _series_q_h_from_converted(tdms_path: str, test_index: int = 0):
+    cols, rows = _get_converted(tdms_path, test_index=test_index)
+    return _series_xy(cols, rows, FLOW_NAME, TDH_NAME)
+
+def _series_q_eff_from_converted(tdms_path: str, test_index: int = 0):
+    cols, rows = _get_converted(tdms_path, test_index=test_index)
+    return _series_xy(cols, rows, FLOW_NAME, EFF_NAME)
+
+def _series_q_power_from_converted(tdms_path: str, test_index: int = 0):
+    cols, rows = _get_converted(tdms_path, test_index=test_index)
+    return _series_xy(cols, rows, FLOW_NAME, POWER_NAME)
+
+
+# -------------------- Serie complete per il rendering --------------------
+def compute_curve_series(tdms_path: str, unit_system: str = "Metric", *,
+                         test_index: int = 0, perf: dict = None, contract: dict = None) -> dict:
+    """
+    Calcola tutte le serie necessarie ai grafici curva, già convertite in unit_system.
+
+    perf / contract: dati TDMS già letti (Metric) da riusare; se None vengono
+    letti dal file (una sola volta ciascuno).
+
+    Ritorna:
+    {
+      "unit_system", "flow_unit", "head_unit", "power_unit",
+      "tdh_points": (xs, ys), "tdh_trend": (xs, ys),
+      "eff_points": (xs, ys), "eff_trend": (xs, ys),
+      "pwr_points": (xs, ys), "pwr_trend": (xs, ys),
+      "rated_tdh": (q, h) | None,   # marker Rated TDH
+      "rated_eff": (q, eta) | None, # marker Rated Efficiency
+      "bep": (q, eta) | None,       # massimo della trendline Efficiency
+    }
+    """
+    try:
+        import unit_converter as uc
+    except Exception:
+        uc = None
+        unit_system = "Metric"
+
+    if perf is None:
+        perf = read_performance_tables_dynamic(tdms_path, test_index=test_index) if tdms_path else {}
+    if contract is None:
+        contract = read_contract_and_loop_data(tdms_path) if tdms_path else {}
+
+    conv = (perf or {}).get("Converted") or {}
+    cols, rows = conv.get("columns") or [], conv.get("rows") or []
+    meta = _contractual_meta_from_raw(contract)
+
+    xs_raw, ys_raw = _series_xy(cols, rows, FLOW_NAME, TDH_NAME)
+    xs_eff, ys_eff = _series_xy(cols, rows, FLOW_NAME, EFF_NAME)
+    pxs_raw, pys_raw = _series_xy(cols, rows, FLOW_NAME, POWER_NAME)
+
+    rated_q = _to_float(meta.get("capacity", ""), None)
+    rated_tdh = _to_float(meta.get("tdh", ""), None)
+    rated_eta = _to_float(meta.get("eff", ""), None)
+
+    # Converti i dati se necessario
+    if uc and unit_system != "Metric":
+        xs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_raw]
+        ys_raw = [uc.convert_value(y, 'head', 'Metric', unit_system) for y in ys_raw]
+        xs_eff = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_eff]
+        pxs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in pxs_raw]
+        pys_raw = [uc.convert_value(y, 'power', 'Metric', unit_system) for y in pys_raw]
+        if rated_q: rated_q = uc.convert_value(rated_q, 'flow', 'Metric', unit_system)
+        if rated_tdh: rated_tdh = uc.convert_value(rated_tdh, 'head', 'Metric', unit_system)
+
+    # Trendline TDH; l'Efficiency riusa le sue ascisse se disponibili
+    tdh_x, tdh_y, tdh_fitted = _trend_samples(xs_raw, ys_raw)
+    eff_x, eff_y, eff_fitted = _trend_samples(
+        xs_eff, ys_eff, x_curve=(tdh_x if tdh_fitted else None)
+    )
+    pwr_x, pwr_y, _ = _trend_samples(pxs_raw, pys_raw)
+
+    bep = None
+    if eff_fitted and eff_x:
+        max_i = max(range(len(eff_x)), key=lambda k: eff_y[k])
+        bep = (eff_x[max_i], eff_y[max_i])
+
+    has_eff = bool(xs_eff and ys_eff)
+    return {
+        "unit_system": unit_system,
+        "flow_unit":  uc.get_unit_label('flow', unit_system) if uc else "m³/h",
+        "head_unit":  uc.get_unit_label('head', unit_system) if uc else "m",
+        "power_unit": uc.get_unit_label('power', unit_system) if uc else "kW",
+        "tdh_points": (xs_raw, ys_raw),
+        "tdh_trend":  (tdh_x, tdh_y),
+        "eff_points": (xs_eff, ys_eff),
+        "eff_trend":  (eff_x, eff_y) if has_eff else ([], []),
+        "pwr_points": (pxs_raw, pys_raw),
+        "pwr_trend":  (pwr_x, pwr_y),
+        "rated_tdh":  (rated_q, rated_tdh) if (rated_q is not None and rated_tdh is not None) else None,
+        "rated_eff":  (rated_q, rated_eta) if (has_eff and rated_q is not None and rated_eta is not None) else None,
+        "bep":        bep if has_eff else None,
+    }
+
+
+# -------------------- Storico (overlay di altre acquisizioni) --------------------
+OVERLAY_CACHE_MAX = 256
+
+# (acq_id, unit_system) -> trendline; i punti vengono da perf_points, non dai TDMS
+_overlay_cache = OrderedDict()
+
+def invalidate_overlay(acq_ids=None) -> None:
+    """Toglie dalla cache le trendline delle acquisizioni indicate (None = tutte)."""
+    if acq_ids is None:
+        _overlay_cache.clear()
+        return
+    ids = {int(i) for i in acq_ids}
+    for key in [k for k in _overlay_cache if k[0] in ids]:
+        del _overlay_cache[key]
+
+def _overlay_from_points(cols: dict, unit_system: str) -> dict:
+    """Trendline TDH / Efficiency / Power da {colonna: [(point, value)]} (Metric)."""
+    try:
+        import unit_converter as uc
+    except Exception:
+        uc = None
+        unit_system = "Metric"
+
+    flow = dict(cols.get(FLOW_NAME) or [])
+
+    def _xy(name, param_type):
+        xs, ys = [], []
+        for point, y in cols.get(name) or []:
+            x = flow.get(point)
+            if x is None or y is None:
+                continue
+            if uc and unit_system != "Metric":
+                x = uc.convert_value(x, 'flow', 'Metric', unit_system)
+                if param_type:
+                    y = uc.convert_value(y, param_type, 'Metric', unit_system)
+            xs.append(x); ys.append(y)
+        return xs, ys
+
+    tdh_x, tdh_y, tdh_fitted = _trend_samples(*_xy(TDH_NAME, 'head'))
+    eff_x, eff_y, _ = _trend_samples(*_xy(EFF_NAME, None), x_curve=(tdh_x if tdh_fitted else None))
+    pwr_x, pwr_y, _ = _trend_samples(*_xy(POWER_NAME, 'power'))
+    return {"tdh_trend": (tdh_x, tdh_y), "eff_trend": (eff_x, eff_y), "pwr_trend": (pwr_x, pwr_y)}
+
+def compute_overlay_series(acq_ids, unit_system: str = "Metric") -> list:
+    """
+    Trendline di altre acquisizioni (es. ultimi test dello stesso tipo pompa)
+    da sovrapporre alla curva corrente. Usa i punti salvati in perf_points
+    (una query per tutte le acquisizioni) e tiene le trendline in cache:
+    nessun TDMS viene aperto.
+
+    Ritorna [{"id", "tdh_trend", "eff_trend", "pwr_trend"}, ...] nell'ordine di acq_ids.
+    """
+    ids = [int(i) for i in acq_ids]
+    missing = [i for i in ids if (i, unit_system) not in _overlay_cache]
+    if missing:
+        import db
+        points = db.select_perf_points(missing, (FLOW_NAME, TDH_NAME, EFF_NAME, POWER_NAME))
+        for acq_id, cols in points.items():
+            _overlay_cache[(acq_id, unit_system)] = _overlay_from_points(cols, unit_system)
+        while len(_overlay_cache) > OVERLAY_CACHE_MAX:
+            _overlay_cache.popitem(last=False)
+    out = []
+    for i in ids:
+        trends = _overlay_cache.get((i, unit_system))
+        if trends is not None:
+            _overlay_cache.move_to_end((i, unit_system))
+            out.append({"id": i, **trends})
+    return out
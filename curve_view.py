@@ -1,5 +1,4 @@
 # curve_view.py
-import math
 import tkinter as tk
 from tkinter import ttk
 
@@ -8,13 +7,17 @@ try:
     from matplotlib.figure import Figure
     from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
     from matplotlib.lines import Line2D
+    from matplotlib.collections import LineCollection
     from matplotlib.path import Path
     MPL_OK = True
 except Exception:
     MPL_OK = False
 
 # dati dal reader
-from tdms_reader import read_performance_tables_dynamic, read_contract_and_loop_data
+from tdms_reader import read_contract_and_loop_data, read_performance_tables_dynamic
+import perf_trace
+# serie dati (comuni a UI e PDF)
+from curve_data import compute_curve_series, compute_overlay_series
 # format dei dati
 from ui_format import fmt_if_number as _fmt_if_number, fmt_num as _fmt_num
 
@@ -33,6 +36,7 @@ def _kv(parent, k, v):
              font=KEY_FONT).pack(side="left", padx=(0, INNER_GAP))
     tk.Label(row, text=(v if v else "—"), anchor="w", bg="#f0f0f0",
              font=VAL_FONT).pack(side="left", fill="x", expand=True)
+    return row
 
 
 # -------------------- Marker custom: triangolo rettangolo (angolo 90° in alto a destra) --------------------
@@ -51,339 +55,76 @@ def _marker_triangle_right_angle_top_right():
 RIGHT_ANGLE_TR_MARKER = _marker_triangle_right_angle_top_right()
 
 
-# -------------------- numerica --------------------
-def _to_float(x, default=None):
-    try:
-        if isinstance(x, str):
-            x = x.replace(",", ".").strip()
-        f = float(x)
-        if math.isfinite(f):
-            return f
-    except Exception:
-        pass
-    return default
-
-def _dedupe_and_sort_xy(xs, ys):
-    """Ordina per x crescente e deduplica x coincidenti mediando i corrispondenti y."""
-    pairs = {}
-    for x, y in zip(xs, ys):
-        try:
-            xf = float(x); yf = float(y)
-        except Exception:
-            continue
-        if not (math.isfinite(xf) and math.isfinite(yf)):
-            continue
-        pairs.setdefault(xf, []).append(yf)
-    if not pairs:
-        return [], []
-    xs_sorted = sorted(pairs.keys())
-    ys_sorted = [sum(pairs[x]) / len(pairs[x]) for x in xs_sorted]
-    return xs_sorted, ys_sorted
-
-
-# ---------- Trendline polinomiale cubica (minimi quadrati, senza NumPy) ----------
-def _solve_linear_system_4x4(A, b):
-    """Risoluzione A x = b (A 4x4) con eliminazione gaussiana + pivoting parziale."""
-    M = [list(A[i]) + [b[i]] for i in range(4)]
-    for col in range(4):
-        pivot_row = max(range(col, 4), key=lambda r: abs(M[r][col]))
-        if abs(M[pivot_row][col]) < 1e-12:
-            return None
-        if pivot_row != col:
-            M[col], M[pivot_row] = M[pivot_row], M[col]
-        pivot = M[col][col]
-        for j in range(col, 5):
-            M[col][j] /= pivot
-        for r in range(col + 1, 4):
-            factor = M[r][col]
-            if factor == 0:
-                continue
-            for j in range(col, 5):
-                M[r][j] -= factor * M[col][j]
-    x = [0.0] * 4
-    for i in range(3, -1, -1):
-        s = M[i][4] - sum(M[i][j] * x[j] for j in range(i + 1, 4))
-        x[i] = s
-    return x
-
-def _poly3_trendline(xs, ys):
-    """y = a x^3 + b x^2 + c x + d, con R^2. Ritorna (a, b, c, d, r2) o tutti None."""
-    n = len(xs)
-    if n < 4:
-        return (None, None, None, None, None)
-    S0 = float(n)
-    S1 = sum(xs)
-    S2 = sum(x*x for x in xs)
-    S3 = sum(x*x*x for x in xs)
-    S4 = sum((x**4) for x in xs)
-    S5 = sum((x**5) for x in xs)
-    S6 = sum((x**6) for x in xs)
-
-    T0 = sum(ys)
-    T1 = sum(x*y for x, y in zip(xs, ys))
-    T2 = sum((x*x)*y for x, y in zip(xs, ys))
-    T3 = sum((x**3)*y for x, y in zip(xs, ys))
-
-    A = [
-        [S6, S5, S4, S3],
-        [S5, S4, S3, S2],
-        [S4, S3, S2, S1],
-        [S3, S2, S1, S0],
-    ]
-    bvec = [T3, T2, T1, T0]
-
-    coeffs = _solve_linear_system_4x4(A, bvec)
-    if coeffs is None:
-        return (None, None, None, None, None)
-    a, b, c, d = coeffs
-
-    y_mean = T0 / n
-    ss_tot = sum((y - y_mean) ** 2 for y in ys)
-    ss_res = sum((y - (a*x**3 + b*x**2 + c*x + d)) ** 2 for x, y in zip(xs, ys))
-    r2 = 1.0 - (ss_res / ss_tot) if ss_tot > 0 else 1.0
-    return (a, b, c, d, r2)
-# --------------------------------------------------------------------
-
-
-# -------------------- Colonne EXACT di Converted --------------------
-FLOW_NAME  = "FLOW"
-TDH_NAME   = "TDH"
-EFF_NAME   = "EFF"
-POWER_NAME = "POWER"
-
-def _idx_exact_or_dup(columns, base_name):
+# -------------------- Disegno serie su assi matplotlib --------------------
+def _plot_tdh_eff(ax, series: dict, show_points: bool, eff_min: float, eff_max: float,
+                  *, with_xlabel: bool = True, artists: dict = None):
     """
-    Ritorna l'indice della colonna con nome esatto `base_name`.
-    Accetta anche eventuali duplicati creati dal reader con suffisso '__2', '__3', ...
+    Disegna TDH (asse sinistro) + Efficiency (asse destro) partendo da
+    compute_curve_series. Ritorna (tdh_scatter, eff_scatter, ax2).
+    artists: dict opzionale riempito con trendline e marker (per update_curve_figure).
     """
-    if not columns:
-        return None
-    for i, c in enumerate(columns):
-        if c == base_name:
-            return i
-    prefix = f"{base_name}__"
-    for i, c in enumerate(columns):
-        if isinstance(c, str) and c.startswith(prefix):
-            return i
-    return None
-
-def _get_converted(tdms_path: str, test_index: int = 0):
-    perf = read_performance_tables_dynamic(tdms_path, test_index=test_index) or {}
-    conv = perf.get("Converted") or {}
-    return conv.get("columns") or [], conv.get("rows") or []
-
-
-# -------------------- Contractual + Rated (stessa fonte del certificato) --------------------
-def _read_contractual_meta(tdms_path: str) -> dict:
-    """Chiavi UI normalizzate per Rated Point + alcuni campi textual Contractual."""
-    raw = read_contract_and_loop_data(tdms_path) or {}
-    
-    # Helper per cercare chiavi in modo robusto
-    def find_key(pattern):
-        """Cerca una chiave nel dict raw che contiene il pattern (case-insensitive)."""
-        pattern_lower = pattern.lower()
-        for k in raw.keys():
-            if pattern_lower in k.lower():
-                return raw[k]
-        return ""
-    
-    meta = {
-        # Rated - cerca con pattern matching robusto
-        "capacity": find_key("capacity") or "—",
-        "tdh":      find_key("tdh [m") or "—",  # matcha sia "TDH [m]" che "TDH [m³/h]" ecc
-        "eff":      find_key("efficiency") or "—",
-        "abs_pow":  find_key("abs_power") or find_key("power [k") or "—",
-        "speed":    find_key("speed") or "—",
-        "sg":       find_key("sg contract") or "—",
-        "temp":     find_key("temperature") or "—",
-        "visc":     find_key("viscosity") or "—",
-        "npsh":     find_key("npsh [m") or "—",
-        "liquid":   raw.get("Liquid", "") or "—",
-        # Contractual extra
-        "fsg_order": raw.get("FSG ORDER", "") or "—",
-        "customer":  raw.get("Customer", "") or "—",
-        "po":        raw.get("Purchaser Order", "") or "—",
-        "end_user":  raw.get("End User", "") or "—",
-        "item":      raw.get("Item", "") or "—",
-        "pump":      raw.get("Pump", "") or "—",
-        "sn":        raw.get("Serial Number_Elenco", "") or "—",
-        "imp_draw":  raw.get("Impeller Drawing", "") or "—",
-        "imp_mat":   raw.get("Impeller Material", "") or "—",
-        "imp_dia":   raw.get("Diam Nominal", "") or "—",
-        "specs":     raw.get("Applic. Specs.", "") or "—",
-    }
-    return meta
-
-
-# Serie per i grafici (letta come fa la tabella Converted)
-def _series_q_h_from_converted(tdms_path: str, test_index: int = 0):
-    cols, rows = _get_converted(tdms_path, test_index=test_index)
-    if not cols or not rows:
-        return [], []
-    ix_q = _idx_exact_or_dup(cols, FLOW_NAME)
-    ix_h = _idx_exact_or_dup(cols, TDH_NAME)
-    if ix_q is None or ix_h is None:
-        return [], []
-    xs, ys = [], []
-    for r in rows:
-        q = _to_float(r[ix_q], None)
-        h = _to_float(r[ix_h], None)
-        if q is None or h is None:
-            continue
-        if math.isfinite(q) and math.isfinite(h):
-            xs.append(q); ys.append(h)
-    return xs, ys
-
-def _series_q_eff_from_converted(tdms_path: str, test_index: int = 0):
-    cols, rows = _get_converted(tdms_path, test_index=test_index)
-    if not cols or not rows:
-        return [], []
-    ix_q   = _idx_exact_or_dup(cols, FLOW_NAME)
-    ix_eff = _idx_exact_or_dup(cols, EFF_NAME)
-    if ix_q is None or ix_eff is None:
-        return [], []
-    xs, ys = [], []
-    for r in rows:
-        q = _to_float(r[ix_q], None)
-        e = _to_float(r[ix_eff], None)
-        if q is None or e is None:
-            continue
-        if math.isfinite(q) and math.isfinite(e):
-            xs.append(q); ys.append(e)
-    return xs, ys
-
-def _series_q_power_from_converted(tdms_path: str, test_index: int = 0):
-    cols, rows = _get_converted(tdms_path, test_index=test_index)
-    if not cols or not rows:
-        return [], []
-    ix_q  = _idx_exact_or_dup(cols, FLOW_NAME)
-    ix_pw = _idx_exact_or_dup(cols, POWER_NAME)
-    if ix_q is None or ix_pw is None:
-        return [], []
-    xs, ys = [], []
-    for r in rows:
-        q = _to_float(r[ix_q], None)
-        p = _to_float(r[ix_pw], None)
-        if q is None or p is None:
-            continue
-        if math.isfinite(q) and math.isfinite(p):
-            xs.append(q); ys.append(p)
-    return xs, ys
-
-
-# -------------------- Figure matplotlib separate per PDF --------------------
-def build_tdh_eff_figure(tdms_path: str, show_points: bool = True,
-                         eff_min: float = 0.0, eff_max: float = 100.0,
-                         unit_system: str = "Metric"):
-    """Genera solo il grafico TDH + Efficiency con unità di misura specificate."""
-    if not MPL_OK:
-        return None
-
-    try:
-        import unit_converter as uc
-    except:
-        uc = None
-        unit_system = "Metric"
-
-    meta = _read_contractual_meta(tdms_path)
-    fig = Figure(figsize=(11, 7), dpi=100)
-    ax = fig.add_subplot(111)
-
-    xs_raw, ys_raw = _series_q_h_from_converted(tdms_path, test_index=0)
-    xs_eff, ys_eff = _series_q_eff_from_converted(tdms_path, test_index=0)
-
-    # Converti i dati se necessario
-    if uc and unit_system != "Metric":
-        xs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_raw]
-        ys_raw = [uc.convert_value(y, 'head', 'Metric', unit_system) for y in ys_raw]
-        xs_eff = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_eff]
-
-    has_rated_point = False
-    has_bep_point = False
-    has_rated_eff_point = False
-
-    rated_q = _to_float(meta.get("capacity", ""), None)
-    rated_tdh = _to_float(meta.get("tdh", ""), None)
-    rated_eta = _to_float(meta.get("eff", ""), None)
-    
-    # Converti rated point se necessario
-    if uc and unit_system != "Metric":
-        if rated_q: rated_q = uc.convert_value(rated_q, 'flow', 'Metric', unit_system)
-        if rated_tdh: rated_tdh = uc.convert_value(rated_tdh, 'head', 'Metric', unit_system)
+    if artists is None:
+        artists = {}
+    xs_raw, ys_raw = series["tdh_points"]
+    xs_eff, ys_eff = series["eff_points"]
 
     # TDH scatter
+    tdh_scatter = None
     if xs_raw and ys_raw:
-        sc = ax.scatter(xs_raw, ys_raw, s=30, label="_nolegend_")
-        sc.set_visible(show_points)
+        tdh_scatter = ax.scatter(xs_raw, ys_raw, s=30, label="_nolegend_")
+        tdh_scatter.set_visible(show_points)
 
     # TDH trendline
     tdhs_trend = None
-    xs, ys = _dedupe_and_sort_xy(xs_raw, ys_raw)
-    x_curve = []
-    if xs:
-        a, b, c, d, r2 = _poly3_trendline(xs, ys)
-        if a is not None and len(xs) >= 4:
-            xmin, xmax = min(xs), max(xs)
-            num = max(50, min(400, 10 * len(xs)))
-            x_curve = [xmin + (xmax - xmin) * i / (num - 1) for i in range(num)]
-            y_curve = [a*x**3 + b*x**2 + c*x + d for x in x_curve]
-            tdhs_trend = ax.plot(x_curve, y_curve, linewidth=1.8, label="TDH")[0]
-        else:
-            tdhs_trend = ax.plot(xs, ys, linewidth=1.8, label="TDH")[0]
-
-    # Rated TDH point (usa rated_q e rated_tdh già convertiti)
-    if rated_q is not None and rated_tdh is not None:
-        ax.scatter([rated_q], [rated_tdh], marker=RIGHT_ANGLE_TR_MARKER, s=140,
-                   facecolors="none", edgecolors="tab:blue",
-                   linewidths=1.6, label="_nolegend_", zorder=10)
-        has_rated_point = True
+    tx, ty = series["tdh_trend"]
+    if tx:
+        tdhs_trend = ax.plot(tx, ty, linewidth=1.8, label="TDH")[0]
+        artists["tdh_trend"] = tdhs_trend
+
+    # Rated TDH point (già convertito)
+    rated_tdh = series["rated_tdh"]
+    if rated_tdh is not None:
+        artists["rated_tdh"] = ax.scatter(
+            [rated_tdh[0]], [rated_tdh[1]], marker=RIGHT_ANGLE_TR_MARKER, s=140,
+            facecolors="none", edgecolors="tab:blue",
+            linewidths=1.6, label="_nolegend_", zorder=10)
 
     # Etichette assi con unità dinamiche
-    flow_unit = uc.get_unit_label('flow', unit_system) if uc else "m³/h"
-    head_unit = uc.get_unit_label('head', unit_system) if uc else "m"
-    
-    ax.set_ylabel(f"TDH [{head_unit}]")
+    ax.set_ylabel(f"TDH [{series['head_unit']}]")
     ax.set_ylim(bottom=0)
     ax.set_xlim(left=0)
-    ax.set_xlabel(f"Capacity [{flow_unit}]")
+    if with_xlabel:
+        ax.set_xlabel(f"Capacity [{series['flow_unit']}]")
     ax.grid(True, linestyle=":", linewidth=0.8)
 
     # Efficiency (asse destro)
     eta_line = None
     ax2 = None
+    eff_scatter = None
+    rated_eff = series["rated_eff"]
+    bep = series["bep"]
     if xs_eff and ys_eff:
         ax2 = ax.twinx()
         ax.set_zorder(2); ax2.set_zorder(1); ax.patch.set_visible(False)
         ax2.set_ylabel("Efficiency [%]")
 
-        eff_sc = ax2.scatter(xs_eff, ys_eff, s=25, marker="o", label="_nolegend_")
-        eff_sc.set_visible(show_points)
-
-        if rated_q is not None and rated_eta is not None:
-            ax2.scatter([rated_q], [rated_eta], marker=RIGHT_ANGLE_TR_MARKER, s=140,
-                        facecolors="none", edgecolors="tab:orange",
-                        linewidths=1.6, label="_nolegend_", zorder=10)
-            has_rated_eff_point = True
-
-        xe, ye = _dedupe_and_sort_xy(xs_eff, ys_eff)
-        if xe:
-            ea, eb, ec, ed, er2 = _poly3_trendline(xe, ye)
-            e_x = x_curve if x_curve else [
-                min(xe) + (max(xe) - min(xe)) * i / (max(50, min(400, 10*len(xe))) - 1)
-                for i in range(max(50, min(400, 10*len(xe))))
-            ]
-            if ea is not None and len(xe) >= 4:
-                e_y = [ea*x**3 + eb*x**2 + ec*x + ed for x in e_x]
-                eta_line = ax2.plot(e_x, e_y, linewidth=1.8, color="orange", label="Efficiency")[0]
-                try:
-                    max_i = max(range(len(e_x)), key=lambda k: e_y[k])
-                    ax2.scatter([e_x[max_i]], [e_y[max_i]], s=80, marker="D",
-                                color="red", edgecolors="red", label="_nolegend_", zorder=10)
-                    has_bep_point = True
-                except Exception:
-                    pass
-            else:
-                eta_line = ax2.plot(xe, ye, linewidth=1.8, color="orange", label="Efficiency")[0]
+        eff_scatter = ax2.scatter(xs_eff, ys_eff, s=25, marker="o", label="_nolegend_")
+        eff_scatter.set_visible(show_points)
+
+        if rated_eff is not None:
+            artists["rated_eff"] = ax2.scatter(
+                [rated_eff[0]], [rated_eff[1]], marker=RIGHT_ANGLE_TR_MARKER, s=140,
+                facecolors="none", edgecolors="tab:orange",
+                linewidths=1.6, label="_nolegend_", zorder=10)
+
+        ex, ey = series["eff_trend"]
+        if ex:
+            eta_line = ax2.plot(ex, ey, linewidth=1.8, color="orange", label="Efficiency")[0]
+            artists["eff_trend"] = eta_line
+        if bep is not None:
+            artists["bep"] = ax2.scatter(
+                [bep[0]], [bep[1]], s=80, marker="D",
+                color="red", edgecolors="red", label="_nolegend_", zorder=10)
         ax2.set_ylim(eff_min, eff_max)
 
     ax.relim(); ax.autoscale(axis="y")
@@ -392,89 +133,97 @@ def build_tdh_eff_figure(tdms_path: str, show_points: bool = True,
 
     # Legend
     handles, labels = [], []
-    if tdhs_trend: handles.append(tdhs_trend); labels.append("TDH")
-    if eta_line: handles.append(eta_line); labels.append("Efficiency")
-    if has_rated_point:
+    if tdhs_trend is not None:
+        handles.append(tdhs_trend); labels.append("TDH")
+    if eta_line is not None:
+        handles.append(eta_line);   labels.append("Efficiency")
+    if rated_tdh is not None:
         handles.append(Line2D([0],[0], marker=RIGHT_ANGLE_TR_MARKER, linestyle="None",
                                markersize=10, markerfacecolor="none",
                                markeredgecolor="tab:blue", markeredgewidth=1.6))
         labels.append("Rated TDH")
-    if has_rated_eff_point:
+    if rated_eff is not None:
         handles.append(Line2D([0],[0], marker=RIGHT_ANGLE_TR_MARKER, linestyle="None",
                                markersize=10, markerfacecolor="none",
                                markeredgecolor="tab:orange", markeredgewidth=1.6))
         labels.append("Rated Efficiency")
-    if has_bep_point:
+    if bep is not None:
         handles.append(Line2D([0],[0], marker="D", linestyle="None", markersize=7,
                                markerfacecolor="red", markeredgecolor="red"))
         labels.append("BEP point")
     if handles:
         ax.legend(handles, labels, loc="lower right")
 
+    return tdh_scatter, eff_scatter, ax2
+
+
+def _plot_power(axp, series: dict, show_points: bool, *, artists: dict = None):
+    """Disegna Absorbed Power partendo da compute_curve_series. Ritorna lo scatter (o None)."""
+    if artists is None:
+        artists = {}
+    pxs_raw, pys_raw = series["pwr_points"]
+
+    p_line = None
+    pwr_scatter = None
+    if pxs_raw and pys_raw:
+        pwr_scatter = axp.scatter(pxs_raw, pys_raw, s=28, label="_nolegend_")
+        pwr_scatter.set_visible(show_points)
+        px, py = series["pwr_trend"]
+        if px:
+            p_line = axp.plot(px, py, linewidth=1.8, color="black", label="Absorbed Power")[0]
+            artists["pwr_trend"] = p_line
+
+    axp.set_xlabel(f"Capacity [{series['flow_unit']}]")
+    axp.set_ylabel(f"Abs Power [{series['power_unit']}]")
+    axp.set_ylim(bottom=0)
+    axp.grid(True, linestyle=":", linewidth=0.8)
+    axp.relim(); axp.autoscale(axis="y")
+    pymin, pymax = axp.get_ylim()
+    axp.set_ylim(bottom=0, top=pymax * 1.10)
+    if p_line is not None:
+        axp.legend([p_line], ["Absorbed Power"], loc="lower right")
+
+    return pwr_scatter
+
+
+# -------------------- Figure matplotlib separate (TDH+Eff, Power) --------------------
+@perf_trace.traced(cat="curve")
+def build_tdh_eff_figure(tdms_path: str, show_points: bool = True,
+                         eff_min: float = 0.0, eff_max: float = 100.0,
+                         unit_system: str = "Metric"):
+    """Genera solo il grafico TDH + Efficiency con unità di misura specificate."""
+    if not MPL_OK:
+        return None
+
+    series = compute_curve_series(tdms_path, unit_system)
+    fig = Figure(figsize=(11, 7), dpi=100)
+    ax = fig.add_subplot(111)
+    _plot_tdh_eff(ax, series, show_points, eff_min, eff_max)
     fig.tight_layout()
     return fig
 
 
+@perf_trace.traced(cat="curve")
 def build_power_figure(tdms_path: str, show_points: bool = True, unit_system: str = "Metric"):
     """Genera solo il grafico Power con unità di misura specificate."""
     if not MPL_OK:
         return None
 
-    try:
-        import unit_converter as uc
-    except:
-        uc = None
-        unit_system = "Metric"
-
+    series = compute_curve_series(tdms_path, unit_system)
     fig = Figure(figsize=(11, 7), dpi=100)
     ax = fig.add_subplot(111)
-
-    pxs_raw, pys_raw = _series_q_power_from_converted(tdms_path, test_index=0)
-    
-    # Converti i dati se necessario
-    if uc and unit_system != "Metric":
-        pxs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in pxs_raw]
-        pys_raw = [uc.convert_value(y, 'power', 'Metric', unit_system) for y in pys_raw]
-    
-    p_line = None
-    if pxs_raw and pys_raw:
-        pwr_sc = ax.scatter(pxs_raw, pys_raw, s=28, label="_nolegend_")
-        pwr_sc.set_visible(show_points)
-        pxs, pys = _dedupe_and_sort_xy(pxs_raw, pys_raw)
-        if pxs:
-            pa, pb, pc, pd, pr2 = _poly3_trendline(pxs, pys)
-            if pa is not None and len(pxs) >= 4:
-                pxmin, pxmax = min(pxs), max(pxs)
-                pnum = max(50, min(400, 10 * len(pxs)))
-                px_curve = [pxmin + (pxmax - pxmin) * i / (pnum-1) for i in range(pnum)]
-                py_curve = [pa*x**3 + pb*x**2 + pc*x + pd for x in px_curve]
-                p_line = ax.plot(px_curve, py_curve, linewidth=1.8, color="black", label="Absorbed Power")[0]
-            else:
-                p_line = ax.plot(pxs, pys, linewidth=1.8, color="black", label="Absorbed Power")[0]
-
-    # Etichette assi con unità dinamiche
-    flow_unit = uc.get_unit_label('flow', unit_system) if uc else "m³/h"
-    power_unit = uc.get_unit_label('power', unit_system) if uc else "kW"
-    
-    ax.set_xlabel(f"Capacity [{flow_unit}]")
-    ax.set_ylabel(f"Abs Power [{power_unit}]")
-    ax.set_ylim(bottom=0)
-    ax.grid(True, linestyle=":", linewidth=0.8)
-    ax.relim(); ax.autoscale(axis="y")
-    pymin, pymax = ax.get_ylim()
-    ax.set_ylim(bottom=0, top=pymax * 1.10)
-    if p_line is not None:
-        ax.legend([p_line], ["Absorbed Power"], loc="lower right")
-
+    _plot_power(ax, series, show_points)
     fig.tight_layout()
     return fig
 
 
-# -------------------- Figura matplotlib (usata sia da UI che da PDF) --------------------
+# -------------------- Figura matplotlib (usata dalla UI) --------------------
+@perf_trace.traced(cat="curve")
 def build_curve_figure(tdms_path: str, show_points: bool = True,
                        eff_min: float = 0.0, eff_max: float = 100.0,
                        unit_system: str = "Metric",
-                       return_artists: bool = False):
+                       return_artists: bool = False,
+                       series: dict = None):
     """
     Genera e restituisce la Figure matplotlib con i due grafici
     (TDH+Efficiency sopra, Absorbed Power sotto).
@@ -484,222 +233,151 @@ def build_curve_figure(tdms_path: str, show_points: bool = True,
     Args:
         return_artists: se True, restituisce (fig, artists_dict, ax2) invece di solo fig
                        artists_dict contiene {'tdh': scatter, 'eff': scatter, 'pwr': scatter}
+                       più trendline, marker e assi usati da update_curve_figure
                        ax2 è l'asse Efficiency (per modificare ylim senza rigenerare)
+        series: serie già calcolate con compute_curve_series (altrimenti lette da tdms_path)
     """
     if not MPL_OK:
         return None if not return_artists else (None, {}, None)
 
-    try:
-        import unit_converter as uc
-    except:
-        uc = None
-        unit_system = "Metric"
-
-    meta = _read_contractual_meta(tdms_path)
+    if series is None:
+        series = compute_curve_series(tdms_path, unit_system)
 
     fig = Figure(figsize=(9, 11), dpi=100)
     gs  = fig.add_gridspec(2, 1, height_ratios=[3, 2], hspace=0.20)
     ax  = fig.add_subplot(gs[0])
     axp = fig.add_subplot(gs[1], sharex=ax)
 
-    xs_raw, ys_raw = _series_q_h_from_converted(tdms_path, test_index=0)
-    xs_eff, ys_eff = _series_q_eff_from_converted(tdms_path, test_index=0)
-
-    # Converti i dati se necessario
-    if uc and unit_system != "Metric":
-        xs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_raw]
-        ys_raw = [uc.convert_value(y, 'head', 'Metric', unit_system) for y in ys_raw]
-        xs_eff = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in xs_eff]
+    artists = {"ax": ax, "axp": axp}
+    tdh_sc, eff_sc, ax2 = _plot_tdh_eff(ax, series, show_points, eff_min, eff_max,
+                                        with_xlabel=False, artists=artists)
+    pwr_sc = _plot_power(axp, series, show_points, artists=artists)
+    artists["ax2"] = ax2
 
-    has_rated_point     = False
-    has_bep_point       = False
-    has_rated_eff_point = False
-
-    rated_q   = _to_float(meta.get("capacity", ""), None)
-    rated_tdh = _to_float(meta.get("tdh", ""), None)
-    rated_eta = _to_float(meta.get("eff", ""), None)
+    fig.subplots_adjust(top=0.98)
     
-    # Converti rated point se necessario
-    if uc and unit_system != "Metric":
-        if rated_q: rated_q = uc.convert_value(rated_q, 'flow', 'Metric', unit_system)
-        if rated_tdh: rated_tdh = uc.convert_value(rated_tdh, 'head', 'Metric', unit_system)
-
-    # Dizionario per gli artist (se richiesti)
-    artists = {}
+    if return_artists:
+        # Dizionario per gli artist (solo quelli effettivamente disegnati)
+        if tdh_sc is not None:
+            artists['tdh'] = tdh_sc
+        if eff_sc is not None:
+            artists['eff'] = eff_sc
+        if pwr_sc is not None:
+            artists['pwr'] = pwr_sc
+        return fig, artists, ax2
+    else:
+        return fig
 
-    # --- TDH ---
-    tdh_scatter = None
-    if xs_raw and ys_raw:
-        sc = ax.scatter(xs_raw, ys_raw, s=30, label="_nolegend_")
-        sc.set_visible(show_points)
-        tdh_scatter = sc
-        if return_artists:
-            artists['tdh'] = sc
 
-    tdhs_trend = None
-    xs, ys = _dedupe_and_sort_xy(xs_raw, ys_raw)
-    x_curve = []; y_curve = []
+@perf_trace.traced(cat="curve")
+def update_curve_figure(artists: dict, series: dict) -> None:
+    """
+    Aggiorna in place (set_offsets / set_data) una figura di build_curve_figure
+    con nuove serie (es. stesso TDMS in un altro sistema di unità): nessun
+    artist viene ricreato. Le serie devono avere gli stessi elementi di quelle
+    usate per costruire la figura.
+    """
+    def _offsets(xy):
+        return list(zip(*xy))
+
+    for name, key in (("tdh", "tdh_points"), ("eff", "eff_points"), ("pwr", "pwr_points")):
+        if name in artists and series[key][0]:
+            artists[name].set_offsets(_offsets(series[key]))
+    for name, key in (("tdh_trend", "tdh_trend"), ("eff_trend", "eff_trend"), ("pwr_trend", "pwr_trend")):
+        if name in artists:
+            artists[name].set_data(*series[key])
+    for name in ("rated_tdh", "rated_eff", "bep"):
+        if name in artists and series[name] is not None:
+            artists[name].set_offsets([series[name]])
+
+    ax, axp = artists["ax"], artists["axp"]
+    ax.set_ylabel(f"TDH [{series['head_unit']}]")
+    axp.set_xlabel(f"Capacity [{series['flow_unit']}]")
+    axp.set_ylabel(f"Abs Power [{series['power_unit']}]")
+
+    # Asse x (condiviso): da 0 al massimo dei dati + margine standard matplotlib
+    xs = list(series["tdh_points"][0]) + list(series["tdh_trend"][0]) + list(series["pwr_points"][0])
+    if series["rated_tdh"] is not None:
+        xs.append(series["rated_tdh"][0])
     if xs:
-        a, b, c, d, r2 = _poly3_trendline(xs, ys)
-        if a is not None and len(xs) >= 4:
-            xmin, xmax = min(xs), max(xs)
-            num = max(50, min(400, 10 * len(xs)))
-            x_curve = [xmin + (xmax - xmin) * i / (num - 1) for i in range(num)]
-            y_curve = [a*x**3 + b*x**2 + c*x + d for x in x_curve]
-            tdhs_trend = ax.plot(x_curve, y_curve, linewidth=1.8, label="TDH")[0]
-        else:
-            tdhs_trend = ax.plot(xs, ys, linewidth=1.8, label="TDH")[0]
+        lo, hi = min(xs), max(xs)
+        ax.set_xlim(left=0, right=hi + ax.margins()[0] * ((hi - lo) or abs(hi) or 1.0))
 
-    # Rated TDH point (usa rated_q, rated_tdh già convertiti)
-    if rated_q is not None and rated_tdh is not None:
-        ax.scatter([rated_q], [rated_tdh], marker=RIGHT_ANGLE_TR_MARKER, s=140,
-                   facecolors="none", edgecolors="tab:blue",
-                   linewidths=1.6, label="_nolegend_", zorder=10)
-        has_rated_point = True
+    # Assi y come in _plot_tdh_eff / _plot_power (l'asse Efficiency resta in %)
+    for a in (ax, axp):
+        a.relim(); a.autoscale(axis="y")
+        _ymin, ymax = a.get_ylim()
+        a.set_ylim(bottom=0, top=ymax * 1.10)
 
-    # Etichette assi con unità dinamiche
-    flow_unit = uc.get_unit_label('flow', unit_system) if uc else "m³/h"
-    head_unit = uc.get_unit_label('head', unit_system) if uc else "m"
-    
-    ax.set_ylabel(f"TDH [{head_unit}]")
-    ax.set_ylim(bottom=0)
-    ax.set_xlim(left=0)
-    ax.grid(True, linestyle=":", linewidth=0.8)
 
-    # --- Efficiency ---
-    eta_line = None
-    ax2 = None
-    eff_scatter = None
-    if xs_eff and ys_eff:
-        ax2 = ax.twinx()
-        ax.set_zorder(2); ax2.set_zorder(1); ax.patch.set_visible(False)
-        ax2.set_ylabel("Efficiency [%]")
-        ax2.set_ylim(0, 100)
+# -------------------- Storico (overlay) --------------------
+OVERLAY_COLOR = "0.55"
 
-        eff_sc = ax2.scatter(xs_eff, ys_eff, s=25, marker="o", label="_nolegend_")
-        eff_sc.set_visible(show_points)
-        eff_scatter = eff_sc
-        if return_artists:
-            artists['eff'] = eff_sc
-
-        if rated_q is not None and rated_eta is not None:
-            ax2.scatter([rated_q], [rated_eta], marker=RIGHT_ANGLE_TR_MARKER, s=140,
-                        facecolors="none", edgecolors="tab:orange",
-                        linewidths=1.6, label="_nolegend_", zorder=10)
-            has_rated_eff_point = True
-
-        xe, ye = _dedupe_and_sort_xy(xs_eff, ys_eff)
-        if xe:
-            ea, eb, ec, ed, er2 = _poly3_trendline(xe, ye)
-            e_x = x_curve if x_curve else [
-                min(xe) + (max(xe) - min(xe)) * i / (max(50, min(400, 10*len(xe))) - 1)
-                for i in range(max(50, min(400, 10*len(xe))))
-            ]
-            if ea is not None and len(xe) >= 4:
-                e_y = [ea*x**3 + eb*x**2 + ec*x + ed for x in e_x]
-                eta_line = ax2.plot(e_x, e_y, linewidth=1.8, color="orange", label="Efficiency")[0]
-                try:
-                    max_i = max(range(len(e_x)), key=lambda k: e_y[k])
-                    ax2.scatter([e_x[max_i]], [e_y[max_i]], s=80, marker="D",
-                                color="red", edgecolors="red", label="_nolegend_", zorder=10)
-                    has_bep_point = True
-                except Exception:
-                    pass
-            else:
-                eta_line = ax2.plot(xe, ye, linewidth=1.8, color="orange", label="Efficiency")[0]
-        ax2.set_ylim(eff_min, eff_max)
-
-    ax.relim(); ax.autoscale(axis="y")
-    ymin, ymax = ax.get_ylim()
-    ax.set_ylim(bottom=0, top=ymax * 1.10)
-
-    handles, labels = [], []
-    if tdhs_trend is not None:
-        handles.append(tdhs_trend); labels.append("TDH")
-    if eta_line is not None:
-        handles.append(eta_line);   labels.append("Efficiency")
-    if has_rated_point:
-        handles.append(Line2D([0],[0], marker=RIGHT_ANGLE_TR_MARKER, linestyle="None",
-                               markersize=10, markerfacecolor="none",
-                               markeredgecolor="tab:blue", markeredgewidth=1.6))
-        labels.append("Rated TDH")
-    if has_rated_eff_point:
-        handles.append(Line2D([0],[0], marker=RIGHT_ANGLE_TR_MARKER, linestyle="None",
-                               markersize=10, markerfacecolor="none",
-                               markeredgecolor="tab:orange", markeredgewidth=1.6))
-        labels.append("Rated Efficiency")
-    if has_bep_point:
-        handles.append(Line2D([0],[0], marker="D", linestyle="None", markersize=7,
-                               markerfacecolor="red", markeredgecolor="red"))
-        labels.append("BEP point")
-    if handles:
-        ax.legend(handles, labels, loc="lower right")
+def remove_overlay(artists: dict) -> None:
+    """Toglie dalla figura le trendline storiche aggiunte da draw_overlay."""
+    for key in ("overlay_tdh", "overlay_eff", "overlay_pwr"):
+        lc = artists.pop(key, None)
+        if lc is not None:
+            lc.remove()
 
-    # --- Power ---
-    pxs_raw, pys_raw = _series_q_power_from_converted(tdms_path, test_index=0)
-    
-    # Converti i dati Power se necessario
-    if uc and unit_system != "Metric":
-        pxs_raw = [uc.convert_value(x, 'flow', 'Metric', unit_system) for x in pxs_raw]
-        pys_raw = [uc.convert_value(y, 'power', 'Metric', unit_system) for y in pys_raw]
-    
-    p_line = None
-    pwr_scatter = None
-    if pxs_raw and pys_raw:
-        pwr_sc = axp.scatter(pxs_raw, pys_raw, s=28, label="_nolegend_")
-        pwr_sc.set_visible(show_points)
-        pwr_scatter = pwr_sc
-        if return_artists:
-            artists['pwr'] = pwr_sc
-        pxs, pys = _dedupe_and_sort_xy(pxs_raw, pys_raw)
-        if pxs:
-            pa, pb, pc, pd, pr2 = _poly3_trendline(pxs, pys)
-            if pa is not None and len(pxs) >= 4:
-                pxmin, pxmax = min(pxs), max(pxs)
-                pnum = max(50, min(400, 10 * len(pxs)))
-                px_curve = [pxmin + (pxmax - pxmin) * i / (pnum-1) for i in range(pnum)]
-                py_curve = [pa*x**3 + pb*x**2 + pc*x + pd for x in px_curve]
-                p_line = axp.plot(px_curve, py_curve, linewidth=1.8, color="black", label="Absorbed Power")[0]
-            else:
-                p_line = axp.plot(pxs, pys, linewidth=1.8, color="black", label="Absorbed Power")[0]
-
-    power_unit = uc.get_unit_label('power', unit_system) if uc else "kW"
-    
-    axp.set_xlabel(f"Capacity [{flow_unit}]")
-    axp.set_ylabel(f"Abs Power [{power_unit}]")
-    axp.set_ylim(bottom=0)
-    axp.grid(True, linestyle=":", linewidth=0.8)
-    axp.relim(); axp.autoscale(axis="y")
-    pymin, pymax = axp.get_ylim()
-    axp.set_ylim(bottom=0, top=pymax * 1.10)
-    if p_line is not None:
-        axp.legend([p_line], ["Absorbed Power"], loc="lower right")
-
-    fig.subplots_adjust(top=0.98)
-    
-    if return_artists:
-        return fig, artists, ax2
-    else:
-        return fig
+def draw_overlay(artists: dict, overlay: list) -> int:
+    """
+    Sovrappone le trendline di altre acquisizioni (compute_overlay_series) a una
+    figura di build_curve_figure: una sola LineCollection per asse, qualunque
+    sia il numero di test, sotto la curva corrente. Sostituisce l'overlay
+    precedente. Ritorna il numero di acquisizioni disegnate.
+    """
+    remove_overlay(artists)
+    drawn = set()
+    for key, axis_key, series_key in (("overlay_tdh", "ax", "tdh_trend"),
+                                      ("overlay_eff", "ax2", "eff_trend"),
+                                      ("overlay_pwr", "axp", "pwr_trend")):
+        axis = artists.get(axis_key)
+        if axis is None:
+            continue
+        segs = []
+        for o in overlay:
+            xs, ys = o[series_key]
+            if len(xs) > 1:
+                segs.append(list(zip(xs, ys)))
+                drawn.add(o["id"])
+        if not segs:
+            continue
+        lc = LineCollection(segs, colors=OVERLAY_COLOR, linewidths=1.0, alpha=0.6,
+                            zorder=0.5, label="_nolegend_")
+        axis.add_collection(lc, autolim=False)
+        artists[key] = lc
+    return len(drawn)
 
 
 # -------------------- Render --------------------
-def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
+@perf_trace.traced(cat="curve")
+def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None, *,
+                     unit_system: str = None, contract: dict = None, perf: dict = None,
+                     series: dict = None):
     """
     parent: frame della tab 'Curva'
     tdms_path: percorso TDMS
     acquisizione_id: ID acquisizione per leggere unit_system
+    unit_system: sistema di unità (se None letto dal DB)
+    contract / perf: dati TDMS già letti (Metric) da riusare; se None letti qui, una volta
+    series: serie già calcolate (compute_curve_series) per unit_system, se disponibili
 
     Layout:
-    - Colonna sinistra: "Contractual Data" (sopra) e "Rated Point" (sotto)
+    - Colonna sinistra: "Contractual Data" (sopra) e "Rated Point" (sotto),
+      scala efficienza, punti e "Storico" (overlay ultimi N test stesso tipo pompa)
     - Colonna destra: frame con grafico scrollabile
+
+    Ritorna set_unit_system(nuovo_sistema): riconverte Rated Point e grafico
+    in place, senza rileggere il TDMS né ricreare i widget.
     """
     # Leggi unit_system dal DB
-    try:
-        from db import get_unit_system
-        unit_system = get_unit_system(acquisizione_id) if acquisizione_id else "Metric"
-    except Exception:
-        unit_system = "Metric"
+    if unit_system is None:
+        try:
+            from db import get_unit_system
+            unit_system = get_unit_system(acquisizione_id) if acquisizione_id else "Metric"
+        except Exception:
+            unit_system = "Metric"
     
     # --- GRIGLIA PRINCIPALE: 2 colonne (sx info, dx grafico) e 1 riga ---
     parent.grid_columnconfigure(0, weight=0, minsize=380)
@@ -711,9 +389,19 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     left_col.grid(row=0, column=0, sticky="nsw", padx=(10, 6), pady=10)
     left_col.grid_columnconfigure(0, weight=1)
 
-    # Leggi dati raw
-    raw = read_contract_and_loop_data(tdms_path) or {}
-    
+    # Leggi dati raw (una sola volta: i cambi unità riconvertono da qui)
+    raw = contract if contract is not None else (read_contract_and_loop_data(tdms_path) or {})
+    if perf is None:
+        perf = read_performance_tables_dynamic(tdms_path) if tdms_path else {}
+
+    # serie per sistema di unità: tornare a un sistema già visto non ricalcola nulla
+    series_cache = {unit_system: series} if series is not None else {}
+
+    def _series(unit_system):
+        if unit_system not in series_cache:
+            series_cache[unit_system] = compute_curve_series(tdms_path, unit_system, perf=perf, contract=raw)
+        return series_cache[unit_system]
+
     # Helper per convertire valori individuali
     def get_converted_value(key_pattern: str, param_type: str, default="—"):
         """Cerca la chiave nel raw e converte il valore se necessario."""
@@ -737,16 +425,10 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
         return value
     
     meta = {
-        # Rated - converti manualmente
-        "capacity": get_converted_value("capacity", "flow"),
-        "tdh":      get_converted_value("tdh", "head"),
+        # Rated senza unità (quelli convertiti sono in _rated_items)
         "eff":      get_converted_value("efficiency", None),
-        "abs_pow":  get_converted_value("abs_power", "power") or get_converted_value("power", "power"),
-        "speed":    get_converted_value("speed", "speed"),
         "sg":       get_converted_value("sg contract", None),
-        "temp":     get_converted_value("temperature", "temp"),
         "visc":     get_converted_value("viscosity", None),
-        "npsh":     get_converted_value("npsh", "npsh"),
         "liquid":   raw.get("Liquid", "") or "—",
         # Contractual extra (non cambiano)
         "fsg_order": raw.get("FSG ORDER", "") or "—",
@@ -787,30 +469,45 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     rated = tk.LabelFrame(left_col, text="Rated Point", bg="#f0f0f0")
     rated.grid(row=1, column=0, sticky="new", pady=(6, 0))
 
-    try:
-        import unit_converter as uc
-        flow_unit = uc.get_unit_label('flow', unit_system)
-        head_unit = uc.get_unit_label('head', unit_system)
-        power_unit = uc.get_unit_label('power', unit_system)
-        temp_unit = uc.get_unit_label('temp', unit_system)
-        npsh_unit = uc.get_unit_label('npsh', unit_system)
-    except:
-        flow_unit = "m³/h"
-        head_unit = "m"
-        power_unit = "kW"
-        temp_unit = "°C"
-        npsh_unit = "m"
-
-    _kv(rated, f"Capacity [{flow_unit}]", _fmt_if_number(meta.get("capacity", "—")))
-    _kv(rated, f"TDH [{head_unit}]",         _fmt_if_number(meta.get("tdh", "—")))
-    _kv(rated, "Efficiency [%]",  _fmt_if_number(meta.get("eff", "—")))
-    _kv(rated, f"ABS_Power [{power_unit}]",  _fmt_if_number(meta.get("abs_pow", "—")))
-    _kv(rated, "Speed [rpm]",     _fmt_if_number(meta.get("speed", "—")))
-    _kv(rated, "SG",              _fmt_if_number(meta.get("sg", "—")))
-    _kv(rated, f"Temperature [{temp_unit}]",_fmt_if_number(meta.get("temp", "—")))
-    _kv(rated, "Viscosity [cP]",  _fmt_if_number(meta.get("visc", "—")))
-    _kv(rated, f"NPSH [{npsh_unit}]",        _fmt_if_number(meta.get("npsh", "—")))
-    _kv(rated, "Liquid",          meta.get("liquid", "—"))
+    def _rated_items():
+        """(etichetta, valore) del Rated Point nel sistema di unità corrente."""
+        try:
+            import unit_converter as uc
+            flow_unit = uc.get_unit_label('flow', unit_system)
+            head_unit = uc.get_unit_label('head', unit_system)
+            power_unit = uc.get_unit_label('power', unit_system)
+            temp_unit = uc.get_unit_label('temp', unit_system)
+            npsh_unit = uc.get_unit_label('npsh', unit_system)
+        except:
+            flow_unit = "m³/h"
+            head_unit = "m"
+            power_unit = "kW"
+            temp_unit = "°C"
+            npsh_unit = "m"
+
+        rated_meta = {
+            "capacity": get_converted_value("capacity", "flow"),
+            "tdh":      get_converted_value("tdh", "head"),
+            "abs_pow":  get_converted_value("abs_power", "power") or get_converted_value("power", "power"),
+            "speed":    get_converted_value("speed", "speed"),
+            "temp":     get_converted_value("temperature", "temp"),
+            "npsh":     get_converted_value("npsh", "npsh"),
+        }
+        return [
+            (f"Capacity [{flow_unit}]",   _fmt_if_number(rated_meta.get("capacity", "—"))),
+            (f"TDH [{head_unit}]",        _fmt_if_number(rated_meta.get("tdh", "—"))),
+            ("Efficiency [%]",            _fmt_if_number(meta.get("eff", "—"))),
+            (f"ABS_Power [{power_unit}]", _fmt_if_number(rated_meta.get("abs_pow", "—"))),
+            ("Speed [rpm]",               _fmt_if_number(rated_meta.get("speed", "—"))),
+            ("SG",                        _fmt_if_number(meta.get("sg", "—"))),
+            (f"Temperature [{temp_unit}]", _fmt_if_number(rated_meta.get("temp", "—"))),
+            ("Viscosity [cP]",            _fmt_if_number(meta.get("visc", "—"))),
+            (f"NPSH [{npsh_unit}]",       _fmt_if_number(rated_meta.get("npsh", "—"))),
+            ("Liquid",                    meta.get("liquid", "—")),
+        ]
+
+    # righe tenute per aggiornarle in place al cambio unità
+    rated_rows = [_kv(rated, k, v) for k, v in _rated_items()]
     
     # =====================================================
     # Controlli scala efficienza (sotto Rated Point)
@@ -882,6 +579,7 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     eff_points_artist = None
     pwr_points_artist = None
     ax2 = None  # asse Efficiency per modifiche veloci senza rigenerare
+    fig_artists = {}  # tutti gli artist della figura, per update_curve_figure
 
     # Funzione per rigenerare la figura (usata da Apply e dal rendering iniziale)
     def _regenerate_figure():
@@ -901,7 +599,8 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
             eff_min=current_eff_min, 
             eff_max=current_eff_max,
             unit_system=unit_system,
-            return_artists=True
+            return_artists=True,
+            series=_series(unit_system),
         )
         
         if result is None or result == (None, {}, None):
@@ -911,7 +610,7 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
 
     def apply_eff_scale():
         """Applica la nuova scala di efficienza modificando ax2 (veloce) o rigenerando se necessario."""
-        nonlocal ax2, canvas, tdh_points_artist, eff_points_artist, pwr_points_artist
+        nonlocal ax2, canvas, tdh_points_artist, eff_points_artist, pwr_points_artist, fig_artists
         
         try:
             vmin = float(entry_eff_min.get())
@@ -945,7 +644,9 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
                 tdh_points_artist = new_artists.get('tdh')
                 eff_points_artist = new_artists.get('eff')
                 pwr_points_artist = new_artists.get('pwr')
+                fig_artists = new_artists
                 ax2 = new_ax2
+                _apply_overlay(redraw=False)
                 
                 _save_settings()
         except Exception:
@@ -969,6 +670,31 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     )
     chk_show_points.grid(row=3, column=0, sticky="w", padx=12, pady=(8, 0))
 
+    # =====================================================
+    # Storico: trendline degli ultimi N test dello stesso tipo pompa / disegno girante
+    # =====================================================
+    history = tk.LabelFrame(left_col, text="Storico", bg="#f0f0f0")
+    history.grid(row=4, column=0, sticky="new", pady=(10, 0))
+
+    overlay_var = tk.BooleanVar(value=False)
+    overlay_n_var = tk.StringVar(value="10")
+    overlay_by_var = tk.StringVar(value="Tipo pompa")
+    overlay_by = {"Tipo pompa": "tipo_pompa", "Imp. Draw.": "impeller_drawing"}
+    overlay_info = tk.StringVar(value="")
+
+    tk.Checkbutton(
+        history, text="Overlay ultimi", variable=overlay_var,
+        bg="#f0f0f0", activebackground="#f0f0f0",
+    ).grid(row=0, column=0, sticky="w", padx=(6, 2), pady=4)
+    tk.Spinbox(history, from_=1, to=50, width=4, textvariable=overlay_n_var).grid(
+        row=0, column=1, sticky="w", padx=(0, 6), pady=4
+    )
+    ttk.Combobox(history, textvariable=overlay_by_var, values=list(overlay_by),
+                 state="readonly", width=11).grid(row=0, column=2, sticky="w", padx=(0, 6), pady=4)
+    tk.Label(history, textvariable=overlay_info, bg="#f0f0f0", fg="#555555").grid(
+        row=1, column=0, columnspan=3, sticky="w", padx=6, pady=(0, 4)
+    )
+
     # ====== COLONNA DESTRA: GRAFICO SCROLLABILE ======
     right_outer = tk.LabelFrame(parent, text="Curve", bg="#f0f0f0")
     right_outer.grid(row=0, column=1, sticky="nsew", padx=(6, 10), pady=10)
@@ -1020,13 +746,51 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     right.bind("<Enter>", _bind_wheel)
     right.bind("<Leave>", _unbind_wheel)
 
+    def set_unit_system(new_system: str):
+        """Riconverte Rated Point e grafico nel nuovo sistema di unità, in place."""
+        nonlocal unit_system
+        unit_system = new_system
+        for row, (k, v) in zip(rated_rows, _rated_items()):
+            key_lbl, val_lbl = row.winfo_children()[:2]
+            key_lbl.configure(text=k)
+            val_lbl.configure(text=(v if v else "—"))
+        if canvas is not None and fig_artists:
+            update_curve_figure(fig_artists, _series(unit_system))
+            _apply_overlay(redraw=False)
+            canvas.draw_idle()
+
+    def _apply_overlay(*_, redraw: bool = True):
+        """Aggiunge/toglie/aggiorna le trendline storiche senza rigenerare la figura."""
+        if canvas is None or not fig_artists:
+            return
+        try:
+            if not overlay_var.get() or acquisizione_id is None:
+                remove_overlay(fig_artists)
+                overlay_info.set("")
+            else:
+                from db import select_history_ids
+                try:
+                    n = max(1, min(50, int(overlay_n_var.get())))
+                except ValueError:
+                    n = 10
+                ids = select_history_ids(acquisizione_id, overlay_by[overlay_by_var.get()], n)
+                drawn = draw_overlay(fig_artists, compute_overlay_series(ids, unit_system))
+                overlay_info.set(
+                    f"{drawn} test sovrapposti" if drawn else
+                    "Nessun test con punti salvati (perf_points)"
+                )
+            if redraw:
+                canvas.draw_idle()
+        except Exception:
+            pass
+
     if not MPL_OK:
         tk.Label(
             right,
             text="Matplotlib non disponibile.\nInstalla 'matplotlib' per vedere i grafici.",
             bg="#f0f0f0", justify="left"
         ).pack(anchor="nw", padx=10, pady=10)
-        return
+        return set_unit_system
 
     # --- Genera figura iniziale ---
     result = _regenerate_figure()
@@ -1037,7 +801,7 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
             text="Impossibile generare il grafico.",
             bg="#f0f0f0", justify="left"
         ).pack(anchor="nw", padx=10, pady=10)
-        return
+        return set_unit_system
     
     fig, artists, ax2 = result
     
@@ -1045,6 +809,7 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
     tdh_points_artist = artists.get('tdh')
     eff_points_artist = artists.get('eff')
     pwr_points_artist = artists.get('pwr')
+    fig_artists = artists
 
     # --- render in Tk ---
     canvas = FigureCanvasTkAgg(fig, master=right)
@@ -1080,6 +845,8 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
             pass
 
     show_curve_points_var.trace_add("write", _toggle_curve_points)
+    for var in (overlay_var, overlay_n_var, overlay_by_var):
+        var.trace_add("write", _apply_overlay)
 
     right.update_idletasks()
     scroll_canvas.configure(scrollregion=scroll_canvas.bbox("all"))
@@ -1098,4 +865,5 @@ def render_curve_tab(parent, tdms_path: str, acquisizione_id: int = None):
             pass
 
     right.bind("<Configure>", lambda e: _resize_to_full_width())
-    scroll_canvas.bind("<Configure>", lambda e: (_on_canvas_configure(e), _resize_to_full_width()))
\ No newline at end of file
+    scroll_canvas.bind("<Configure>", lambda e: (_on_canvas_configure(e), _resize_to_full_width()))
+    return set_unit_system
\ No newline at end of file
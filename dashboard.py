@@ -1,25 +1,29 @@
 # collaudi_dashboard_db.py
 import os
-import re
 import sys
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import date
 
 import icon_helper  # Per l'icona PT2025.ico
+import perf_trace
 from notes_window import open_notes_window
-from certificate_view import open_detail_window
-from tdms_reader import read_tdms_fields
-
-from pdf_report import preview_pdf_report
+from tdms_reader import TdmsPrefetcher
+from ingest import parse_tdms_name, ingest_one_record, DuplicateTdmsError
+from ui_format import fmt_if_number
+from stato_rules import STATO_VALUES, transition_error
+# certificate_view e pdf_report (matplotlib, reportlab) sono importati al primo uso
 
 # === DB layer (modulo esterno) ===
 from db import (
     init as db_init,
     select_all_acquisizioni,
-    insert_acquisizione,
+    fts_available,
+    ChangePoller,
     delete_acquisizione,
     update_stato,
+    update_stato_many,
     note_collaudatore_get,
     note_collaudatore_set,
     note_ingegneria_get,
@@ -29,67 +33,28 @@ from db import (
 # ========= CONFIG =========
 FOLDER_PATH = os.path.expanduser("~")   # cartella predefinita utente
 
-TDMS_PATTERN = re.compile(
-    r'^DATA-REC_(?P<commessa>[A-Z0-9]+)_(?P<matricola>[A-Z0-9]+)_(?P<data>\d{8})-(?P<ora>\d{6})_(?P<progressivo>\d{5})\.tdms$'
-)
+# TIPO TEST -> test_index dei gruppi TDMS (come in certificate_view)
+TEST_INDEX = {"PERFORMANCE": 0, "NPSH": 1, "RUNNING": 2}
 
-STATO_VALUES = ["Approved", "Rejected", "Unchecked", "Checked", "Inactive"]
+# Aggiornamento automatico della lista (modifiche da altre postazioni), in secondi;
+# config.ini [Dashboard] auto_refresh_s, 0 = disattivato
+AUTO_REFRESH_S = 5
 
 DEFAULT_USERNAME = "Operatore"
 DEFAULT_RUOLO = "Visualizzatore"
 
 
-def parse_tdms_name(fname: str):
-    m = TDMS_PATTERN.fullmatch(fname)
-    if not m:
-        return None
-    commessa  = m.group("commessa")
-    matricola = m.group("matricola")
-    data_raw  = m.group("data")
-    ora_raw   = m.group("ora")
-    prog_raw  = m.group("progressivo")
-    data_iso  = f"{data_raw[0:4]}-{data_raw[4:6]}-{data_raw[6:8]}"
-    prog_int  = int(prog_raw)
-    return {
-        "job": commessa,
-        "matricola": matricola,
-        "data_file": data_raw,
-        "ora_file": ora_raw,
-        "data_iso": data_iso,
-        "progressivo": prog_int,
-    }
+# Controllo del backup automatico ([Backup] interval_h in config.ini, vedi backup.py)
+BACKUP_CHECK_MS = 10 * 60 * 1000
 
 
-def ingest_one_record(rec: dict):
-    """
-    Inserisce uno o più record nella dashboard in base ai tipi di test presenti nel TDMS.
-    
-    Un file TDMS può contenere più tipi di test (PERFORMANCE, NPSH, RUNNING).
-    Viene creato un record separato per ogni tipo di test trovato.
-    """
-    from tdms_reader import detect_test_types
-    
-    tdms_vals  = read_tdms_fields(rec["filepath"])
-    n_collaudo = tdms_vals.get("n_collaudo", "")
-    tipo_pompa = tdms_vals.get("tipo_pompa", "")
-    
-    # Rileva i tipi di test presenti nel TDMS
-    test_types = detect_test_types(rec["filepath"])
-    
-    # Se non trova nessun test type, usa un fallback (probabilmente PERFORMANCE)
-    if not test_types:
-        test_types = ["PERFORMANCE"]
-    
-    # Crea un record per ogni tipo di test trovato
-    for test_type in test_types:
-        to_insert = {
-            **rec,
-            "n_collaudo": n_collaudo,
-            "tipo_pompa": tipo_pompa,
-            "tipo_test": test_type,  # Imposta il tipo di test
-            "stato": "Unchecked",
-        }
-        insert_acquisizione(to_insert)
+def _auto_refresh_seconds() -> float:
+    """Intervallo di aggiornamento automatico da config.ini ([Dashboard] auto_refresh_s)."""
+    try:
+        from config_manager import load_config
+        return max(0.0, load_config().getfloat("Dashboard", "auto_refresh_s", fallback=AUTO_REFRESH_S))
+    except Exception:
+        return AUTO_REFRESH_S
 
 
 def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=None, on_close_callback=None):
@@ -109,8 +74,19 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     # Imposta l'icona della finestra
     icon_helper.set_window_icon(root)
     
+    # Prefetch in background dei TDMS della riga selezionata e delle vicine
+    prefetcher = TdmsPrefetcher()
+
     # Gestisci chiusura finestra
     def on_closing():
+        prefetcher.cancel()
+        if auto_refresh["job"] is not None:
+            root.after_cancel(auto_refresh["job"])
+            auto_refresh["job"] = None
+        if backup_job["id"] is not None:
+            root.after_cancel(backup_job["id"])
+            backup_job["id"] = None
+        poller.close()
         root.destroy()
         if on_close_callback:
             on_close_callback()
@@ -129,6 +105,19 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     status_lbl = tk.Label(root, textvariable=status_var, bg="#f0f0f0", anchor="w")
     status_lbl.pack(padx=20, fill=tk.X)
 
+    # Ricerca (job, matricola, customer, end user, pump, FSG order, ...) fatta in SQL
+    frame_search = tk.Frame(root, bg="#f0f0f0")
+    frame_search.pack(padx=20, pady=(6, 0), fill=tk.X)
+    tk.Label(frame_search, text="Cerca:", bg="#f0f0f0").pack(side=tk.LEFT)
+    search_var = tk.StringVar(value="")
+    search_entry = ttk.Entry(frame_search, textvariable=search_var, width=40)
+    search_entry.pack(side=tk.LEFT, padx=(5, 0))
+    # full-text (FTS5): cerca anche nelle note, risultati per pertinenza
+    fulltext_var = tk.BooleanVar(value=False)
+    if fts_available():
+        ttk.Checkbutton(frame_search, text="Anche nelle note (per pertinenza)",
+                        variable=fulltext_var).pack(side=tk.LEFT, padx=(10, 0))
+
     def set_status(msg: str):
         root.after(0, lambda: status_var.set(msg))
 
@@ -145,9 +134,31 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         "DATA APPROVAZIONE",
         "NOME APPROVATORE",
         "TIPO TEST",
+        "CUSTOMER",
+        "RATED Q [m³/h]",
+        "RATED TDH [m]",
+        "NOTE",
     )
     header_texts = {c: c for c in columns}
 
+    # intestazione -> chiave di ordinamento SQL (db.SORT_KEYS)
+    sort_keys = {
+        "JOB": "job",
+        "N° COLLAUDO": "n_collaudo",
+        "MATRICOLA": "matricola",
+        "TIPO POMPA": "tipo_pompa",
+        "DATA": "data",
+        "STATO": "stato",
+        "DATA APPROVAZIONE": "data_approvazione",
+        "NOME APPROVATORE": "nome_approvatore",
+        "TIPO TEST": "tipo_test",
+        "CUSTOMER": "customer",
+        "RATED Q [m³/h]": "rated_capacity",
+        "RATED TDH [m]": "rated_tdh",
+        "NOTE": "notes",
+    }
+    sort_state = {"col": None, "desc": False}
+
     col_weights = {
         "JOB": 1.0,
         "N° COLLAUDO": 1.0,
@@ -158,6 +169,10 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         "DATA APPROVAZIONE": 1.2,
         "NOME APPROVATORE": 1.4,
         "TIPO TEST": 1.1,
+        "CUSTOMER": 1.4,
+        "RATED Q [m³/h]": 1.0,
+        "RATED TDH [m]": 1.0,
+        "NOTE": 0.7,
     }
     total_weight = sum(col_weights[c] for c in columns)
 
@@ -171,8 +186,18 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     vsb = ttk.Scrollbar(frame_tree, orient="vertical", command=tree.yview)
     tree.configure(yscrollcommand=vsb.set)
 
+    def on_heading_click(col):
+        if sort_state["col"] == col:
+            sort_state["desc"] = not sort_state["desc"]
+        else:
+            sort_state["col"], sort_state["desc"] = col, False
+        for c in columns:
+            arrow = (" ▼" if sort_state["desc"] else " ▲") if c == sort_state["col"] else ""
+            tree.heading(c, text=header_texts[c] + arrow)
+        refresh_from_db()
+
     for col in columns:
-        tree.heading(col, text=header_texts[col])
+        tree.heading(col, text=header_texts[col], command=lambda c=col: on_heading_click(c))
         tree.column(col, width=100, anchor="w", stretch=True)
 
     tree.grid(row=0, column=0, sticky="nsew")
@@ -208,6 +233,10 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     root.after(100, autosize_columns)
 
     data_by_iid = {}
+    iid_by_id = {}
+    poller = ChangePoller()
+    auto_refresh = {"job": None, "ms": int(_auto_refresh_seconds() * 1000)}
+    backup_job = {"id": None, "thread": None}
 
     # -------------------------
     # PULSANTI
@@ -220,6 +249,7 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     btn_note        = tk.Button(frame_btn, text="NOTE",        bg="#1a73e8", fg="white", width=15)
     btn_open_cert   = tk.Button(frame_btn, text="Apri certificato", bg="#6c757d", fg="white", width=15)
     btn_pdf_preview = tk.Button(frame_btn, text="Export PDF", bg="#0b5ed7", fg="white", width=15)
+    btn_dossier     = tk.Button(frame_btn, text="Dossier Job", bg="#0b5ed7", fg="white", width=15)
     btn_verify_tdms = tk.Button(frame_btn, text="Verifica TDMS", bg="#fbbc04", fg="black", width=15)
 
     btn_load_tdms.pack(side=tk.LEFT, padx=(0, 5))
@@ -227,42 +257,190 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
     btn_note.pack(side=tk.LEFT, padx=5)
     btn_open_cert.pack(side=tk.LEFT, padx=5)
     btn_pdf_preview.pack(side=tk.LEFT, padx=5)
+    btn_dossier.pack(side=tk.LEFT, padx=5)
     btn_verify_tdms.pack(side=tk.LEFT, padx=5)
 
-    for b in (btn_note, btn_unload_tdms, btn_open_cert, btn_pdf_preview):
+    for b in (btn_note, btn_unload_tdms, btn_open_cert, btn_pdf_preview, btn_dossier):
         b.config(state="disabled")
 
     stato_combo = ttk.Combobox(tree, values=STATO_VALUES, state="readonly")
     stato_combo.place_forget()
 
     # ---- Helpers DB → UI ----
-    def refresh_from_db():
+    def _row_view(r):
+        """Riga di select_all_acquisizioni -> (valori colonne, tag stato, meta)."""
+        # r[1:10] = job, n_collaudo, matricola, tipo_pompa, data, stato,
+        #           data_approvazione, nome_approvatore, tipo_test
+        # ESCLUDIAMO taglio_girante dalla visualizzazione
+        raw_vals = r[1:10]
+
+        values = tuple("" if v is None else v for v in raw_vals)
+        # customer, rated_capacity, rated_tdh = r[13:16]
+        values += ("" if r[13] is None else r[13], fmt_if_number(r[14], ""), fmt_if_number(r[15], ""))
+        # lunghezze delle note collaudatore / ingegneria = r[16:18]
+        values += (notes_flag(r[16], r[17]),)
+        tag = tag_for_status(values[5])
+
+        # taglio_girante = r[10], filepath = r[11], filename = r[12]
+        meta = {"id": r[0], "_FilePath": r[11], "_FileName": r[12],
+                "_NoteColl": bool(r[16]), "_NoteIng": bool(r[17])}
+        return values, tag, meta
+
+    @perf_trace.traced("dashboard.refresh_from_db", "ui")
+    def refresh_from_db(keep_view=False):
+        """
+        Ricarica la lista. keep_view=True (aggiornamenti automatici) ripristina
+        selezione, riga attiva e scorrimento sulle righe ancora presenti.
+        """
+        view = None
+        if keep_view:
+            view = ([data_by_iid[i]["id"] for i in tree.selection() if i in data_by_iid],
+                    (data_by_iid.get(tree.focus()) or {}).get("id"),
+                    tree.yview()[0])
         tree.delete(*tree.get_children())
         data_by_iid.clear()
-
-        rows = select_all_acquisizioni()
+        iid_by_id.clear()
+        # versione letta PRIMA della lista: quello che cambia dopo arriva col prossimo controllo
+        try:
+            poller.sync()
+        except Exception:
+            pass
+
+        col = sort_state["col"]
+        rows = select_all_acquisizioni(
+            search=search_var.get(),
+            sort_key=sort_keys.get(col) if col else None,
+            descending=sort_state["desc"],
+            fulltext=fulltext_var.get(),
+        )
 
         for idx, r in enumerate(rows, start=1):
-            acq_id = r[0]
-
-            # r[1:10] = job, n_collaudo, matricola, tipo_pompa, data, stato,
-            #           data_approvazione, nome_approvatore, tipo_test
-            # ESCLUDIAMO taglio_girante dalla visualizzazione
-            raw_vals = r[1:10]
-
-            values = tuple("" if v is None else v for v in raw_vals)
-            stato_val = values[5]
-            tag = tag_for_status(stato_val)
+            values, tag, meta = _row_view(r)
             iid = f"row_{idx}"
             tree.insert("", tk.END, iid=iid, values=values, tags=(tag,))
-
-            # taglio_girante = r[10], filepath = r[11], filename = r[12]
-            data_by_iid[iid] = {"id": acq_id, "_FilePath": r[11], "_FileName": r[12]}
+            data_by_iid[iid] = meta
+            iid_by_id[meta["id"]] = iid
 
         autosize_columns()
         status_var.set(f"Record caricati: {len(rows)}")
+        if view:
+            sel_ids, focus_id, top = view
+            tree.selection_set([iid_by_id[i] for i in sel_ids if i in iid_by_id])
+            if focus_id in iid_by_id:
+                tree.focus(iid_by_id[focus_id])
+            tree.yview_moveto(top)
         on_tree_select()
 
+    # ---- Aggiornamento automatico (modifiche di altre postazioni) ----
+    def apply_changes(rows, deleted, excluded):
+        """
+        Applica alla lista solo le modifiche: le righe (già filtrate dal DB con
+        la ricerca attiva) vengono aggiornate in posto; cancellate ed escluse
+        dalla ricerca tolte se visibili. Serve la lista completa (con
+        selezione e scorrimento mantenuti) solo per una riga che deve comparire
+        (import, o riga che ora rispetta la ricerca) o se cambia il valore
+        della colonna di ordinamento.
+        """
+        sort_col = sort_state["col"]
+
+        def _needs_reload(r):
+            iid = iid_by_id.get(r[0])
+            if iid is None:
+                return True
+            return bool(sort_col) and str(_row_view(r)[0][columns.index(sort_col)]) != tree.set(iid, sort_col)
+
+        if any(_needs_reload(r) for r in rows):
+            refresh_from_db(keep_view=True)
+            return
+        removed = 0
+        for acq_id in list(deleted) + list(excluded):
+            iid = iid_by_id.pop(acq_id, None)
+            if iid and tree.exists(iid):
+                tree.delete(iid)
+                data_by_iid.pop(iid, None)
+                removed += 1
+        for r in rows:
+            iid = iid_by_id[r[0]]
+            values, tag, meta = _row_view(r)
+            tree.item(iid, values=values, tags=(tag,))
+            data_by_iid[iid] = meta
+        if rows or removed:
+            status_var.set(f"Lista aggiornata: {len(rows)} modificati, {removed} rimossi")
+            on_tree_select()
+
+    def _auto_refresh_tick():
+        auto_refresh["job"] = None
+        # non toccare la lista mentre l'utente sta cambiando uno stato
+        if not stato_combo.winfo_ismapped():
+            try:
+                if poller.changed():
+                    apply_changes(*poller.fetch(search_var.get(), fulltext_var.get()))
+            except Exception:
+                pass  # DB momentaneamente non raggiungibile: si riprova al giro dopo
+        auto_refresh["job"] = root.after(auto_refresh["ms"], _auto_refresh_tick)
+
+    # ---- Backup automatico (a caldo, in background) ----
+    def _backup_tick():
+        backup_job["id"] = None
+        import backup
+        if backup.backup_settings()["interval_h"] <= 0:
+            return  # disattivato
+        t = backup_job["thread"]
+        if not (t and t.is_alive()):
+            # run_if_due decide se è ora e se un'altra postazione lo sta già facendo
+            t = threading.Thread(target=_run_backup_bg, daemon=True)
+            backup_job["thread"] = t
+            t.start()
+        backup_job["id"] = root.after(BACKUP_CHECK_MS, _backup_tick)
+
+    def _run_backup_bg():
+        try:
+            import backup
+            backup.run_if_due()
+        except Exception:
+            pass  # share non raggiungibile: si riprova al prossimo controllo
+
+    def notes_flag(len_coll, len_ing) -> str:
+        """Indicatore colonna NOTE: C = nota collaudatore, I = nota ingegneria."""
+        return " + ".join(t for t, n in (("C", len_coll), ("I", len_ing)) if n)
+
+    def has_note(meta, key) -> bool:
+        """
+        Nota presente secondo la lista (nessuna query). Se risulta assente si
+        rilegge dal DB: potrebbe averla appena scritta un'altra postazione.
+        """
+        if meta.get(key):
+            return True
+        getter = note_collaudatore_get if key == "_NoteColl" else note_ingegneria_get
+        present = bool((getter(meta["_FilePath"]) or "").strip())
+        if present:
+            note_saved(meta["_FilePath"], key, "x")
+        return present
+
+    def note_saved(filepath, key, note):
+        """Aggiorna flag e colonna NOTE di tutte le righe del file (una per tipo test)."""
+        for iid, meta in data_by_iid.items():
+            if meta.get("_FilePath") != filepath:
+                continue
+            meta[key] = bool((note or "").strip())
+            if tree.exists(iid):
+                tree.set(iid, "NOTE", notes_flag(meta["_NoteColl"], meta["_NoteIng"]))
+
+    # ricerca: aggiorna la lista poco dopo l'ultimo tasto
+    search_job = {"id": None}
+
+    def on_search_changed(*_):
+        if search_job["id"] is not None:
+            root.after_cancel(search_job["id"])
+        search_job["id"] = root.after(250, _run_search)
+
+    def _run_search():
+        search_job["id"] = None
+        refresh_from_db()
+
+    search_var.trace_add("write", on_search_changed)
+    fulltext_var.trace_add("write", on_search_changed)
+
     def _selected_state():
         sel = tree.focus()
         if not sel:
@@ -270,11 +448,23 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         vals = tree.item(sel, "values")
         return vals[5] if vals and len(vals) > 5 else ""
 
+    def _exportable_selection():
+        """Righe selezionate (anche multiple) con stato Approved/Rejected."""
+        out = []
+        for iid in tree.selection():
+            vals = tree.item(iid, "values")
+            stato = vals[5] if vals and len(vals) > 5 else ""
+            meta = data_by_iid.get(iid)
+            if meta and stato in ("Approved", "Rejected"):
+                out.append(meta["id"])
+        return out
+
     def on_tree_select(_=None):
         sel = tree.focus()
         has_sel = bool(sel)
 
         btn_open_cert.config(state="normal" if has_sel else "disabled")
+        btn_dossier.config(state="normal" if has_sel else "disabled")
         btn_note.config(state="normal" if has_sel else "disabled")
 
         # Solo Admin può cancellare TDMS
@@ -286,9 +476,30 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         stato_cur = _selected_state()
         if has_sel and stato_cur in ("Approved", "Rejected"):
             btn_pdf_preview.config(state="normal")
+        elif len(tree.selection()) > 1 and _exportable_selection():
+            # selezione multipla: export in blocco delle righe Approved/Rejected
+            btn_pdf_preview.config(state="normal")
         else:
             btn_pdf_preview.config(state="disabled")
 
+        _prefetch_around(sel)
+
+    def _prefetch_around(sel):
+        """Scalda la cache TDMS per la riga selezionata e le due vicine (annulla le richieste precedenti)."""
+        if not sel:
+            prefetcher.cancel()
+            return
+        items = []
+        for iid in (sel, tree.next(sel), tree.prev(sel)):
+            meta = data_by_iid.get(iid) if iid else None
+            if not meta or not meta.get("_FilePath"):
+                continue
+            vals = tree.item(iid, "values")
+            tipo_test = str(vals[8]).upper() if vals and len(vals) > 8 else "PERFORMANCE"
+            # certificato: gruppi del tipo test; curva e PDF: sempre PERFORMANCE (0)
+            items.append((meta["_FilePath"], (TEST_INDEX.get(tipo_test, 0), 0)))
+        prefetcher.request(items)
+
     # ---- In-cell editor per STATO ----
     def on_tree_click(event):
         item = tree.identify_row(event.y)
@@ -303,6 +514,15 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
             return
 
         x, y, w, h = bbox
+        selection = tree.selection()
+        if item in selection and len(selection) > 1:
+            # clic sullo STATO di una riga della selezione multipla: cambio in blocco
+            stato_combo.set("")
+            stato_combo.place(x=x, y=y, width=w, height=h)
+            stato_combo.unbind("<<ComboboxSelected>>")
+            stato_combo.bind("<<ComboboxSelected>>", lambda _e: on_sel_many(list(selection)))
+            return "break"  # non perdere la selezione multipla
+
         current_values = list(tree.item(item, "values"))
         current_stato = current_values[5] if len(current_values) > 5 else ""
         stato_combo.set(current_stato if current_stato in STATO_VALUES else "")
@@ -321,61 +541,14 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
                 stato_combo.place_forget()
                 return
 
-            if new_val == "Unchecked":
-                messagebox.showwarning("Cambio non consentito", "Non è possibile riportare un collaudo allo stato UNCHECKED.")
-                stato_combo.set(current_stato_local)
-                stato_combo.place_forget()
-                return
-
-            if new_val == "Checked" and current_stato_local in ("Approved", "Rejected"):
-                messagebox.showwarning("Cambio non consentito", "Non è possibile riportare un collaudo da APPROVED/REJECTED a CHECKED.")
-                stato_combo.set(current_stato_local)
-                stato_combo.place_forget()
-                return
-
-            if ruolo == "Visualizzatore":
-                messagebox.showwarning("Permesso negato", "Con il ruolo Visualizzatore non puoi modificare lo stato.")
-                stato_combo.set(current_stato_local)
-                stato_combo.place_forget()
-                return
-
-            if ruolo == "Collaudatore":
-                if not (current_stato_local == "Unchecked" and new_val == "Checked"):
-                    messagebox.showwarning("Permesso negato", "Come collaudatore puoi solo passare lo stato da UNCHECKED a CHECKED.")
-                    stato_combo.set(current_stato_local)
-                    stato_combo.place_forget()
-                    return
-                note_coll = (note_collaudatore_get(meta["_FilePath"]) or "").strip()
-                if not note_coll:
-                    messagebox.showwarning("Nota mancante", "Per passare lo stato a CHECKED devi prima inserire una nota (pulsante NOTE).")
-                    stato_combo.set(current_stato_local)
-                    stato_combo.place_forget()
-                    return
-
-            elif ruolo == "Ingegneria":
-                if not (current_stato_local == "Checked" and new_val in ("Approved", "Rejected")):
-                    messagebox.showwarning("Permesso negato", "Con il ruolo Ingegneria puoi cambiare stato solo da CHECKED a APPROVED o REJECTED.")
-                    stato_combo.set(current_stato_local)
-                    stato_combo.place_forget()
-                    return
-                note_ing = (note_ingegneria_get(meta["_FilePath"]) or "").strip()
-                if not note_ing:
-                    messagebox.showwarning("Nota mancante", "Per passare lo stato a APPROVED o REJECTED devi prima inserire una nota di ingegneria (pulsante NOTE).")
-                    stato_combo.set(current_stato_local)
-                    stato_combo.place_forget()
-                    return
-
-            elif ruolo == "Admin":
-                if new_val in ("Approved", "Rejected"):
-                    note_ing = (note_ingegneria_get(meta["_FilePath"]) or "").strip()
-                    if not note_ing:
-                        messagebox.showwarning("Nota mancante", "Per passare lo stato a APPROVED o REJECTED devi prima inserire una nota di ingegneria (pulsante NOTE).")
-                        stato_combo.set(current_stato_local)
-                        stato_combo.place_forget()
-                        return
-
-            if new_val == "Inactive" and ruolo != "Admin":
-                messagebox.showwarning("Permesso negato", "Solo un Admin può impostare lo stato a INACTIVE.")
+            err = transition_error(ruolo, current_stato_local, new_val,
+                                   meta.get("_NoteColl", False), meta.get("_NoteIng", False))
+            if err and err[0] == "Nota mancante":
+                # la lista può essere indietro: la nota va ricontrollata sul DB
+                err = transition_error(ruolo, current_stato_local, new_val,
+                                       has_note(meta, "_NoteColl"), has_note(meta, "_NoteIng"))
+            if err:
+                messagebox.showwarning(*err)
                 stato_combo.set(current_stato_local)
                 stato_combo.place_forget()
                 return
@@ -396,6 +569,53 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         stato_combo.unbind("<<ComboboxSelected>>")
         stato_combo.bind("<<ComboboxSelected>>", on_sel)
 
+    def on_sel_many(items):
+        """Cambio stato di più righe: controllo e UPDATE in blocco (db.update_stato_many)."""
+        new_val = stato_combo.get()
+        stato_combo.place_forget()
+        ids = [data_by_iid[i]["id"] for i in items if i in data_by_iid]
+        if not (ids and new_val in STATO_VALUES):
+            return
+        change_date_local = date.today().isoformat()
+
+        check = update_stato_many(ids, new_val, change_date_local, username, ruolo, dry_run=True)
+        if not check["updated"]:
+            if not check["rejected"]:
+                messagebox.showinfo("Cambio stato", f"Le righe selezionate sono già in stato {new_val.upper()}.")
+                return
+            msg = "Nessuna delle righe selezionate può passare a " + new_val.upper() + "."
+            msg += "\n\n" + check["rejected"][0][2]
+            messagebox.showwarning("Cambio stato", msg)
+            return
+        if check["rejected"]:
+            motivi = {}
+            for _id, _titolo, msg in check["rejected"]:
+                motivi[msg] = motivi.get(msg, 0) + 1
+            dettaglio = "\n".join(f"- {n} x {msg}" for msg, n in motivi.items())
+            if not messagebox.askyesno(
+                "Cambio stato",
+                f"{len(check['rejected'])} righe non possono passare a {new_val.upper()}:\n{dettaglio}\n\n"
+                f"Applicare il cambio alle altre {len(check['updated'])}?",
+            ):
+                return
+
+        # solo le righe confermate, e solo se il loro stato è ancora quello controllato
+        confirmed = check["updated"]
+        res = update_stato_many(confirmed, new_val, change_date_local, username, ruolo,
+                                expected={i: check["stati"][i] for i in confirmed})
+        for acq_id in res["updated"]:
+            iid = iid_by_id.get(acq_id)
+            if not (iid and tree.exists(iid)):
+                continue
+            values = list(tree.item(iid, "values"))
+            values[5], values[6], values[7] = new_val, change_date_local, username
+            tree.item(iid, values=tuple(values), tags=(tag_for_status(new_val),))
+        # tra controllo e scrittura un'altra postazione può aver cambiato qualche riga
+        skipped = len(confirmed) - len(res["updated"])
+        status_var.set(f"Stato {new_val}: {len(res['updated'])} righe aggiornate"
+                       + (f", {skipped} cambiate nel frattempo e saltate" if skipped > 0 else ""))
+        on_tree_select()
+
     # ---- Azioni ----
     def get_sel_row_meta():
         sel = tree.focus()
@@ -413,6 +633,14 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         vals = tree.item(sel, "values")
         stato_cur = vals[5] if vals and len(vals) > 5 else ""
 
+        def _set_coll(filepath, note):
+            note_collaudatore_set(filepath, note)
+            note_saved(filepath, "_NoteColl", note)
+
+        def _set_ing(filepath, note):
+            note_ingegneria_set(filepath, note)
+            note_saved(filepath, "_NoteIng", note)
+
         open_notes_window(
             root,
             filepath=meta["_FilePath"],
@@ -420,9 +648,9 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
             ruolo=ruolo,
             stato_cur=stato_cur,
             note_collaudatore_get=note_collaudatore_get,
-            note_collaudatore_set=note_collaudatore_set,
+            note_collaudatore_set=_set_coll,
             note_ingegneria_get=note_ingegneria_get,
-            note_ingegneria_set=note_ingegneria_set,
+            note_ingegneria_set=_set_ing,
         )
 
     def do_open_cert():
@@ -436,9 +664,95 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
         # vals[8] contiene TIPO TEST (PERFORMANCE, NPSH, RUNNING)
         tipo_test = vals[8] if vals and len(vals) > 8 else "PERFORMANCE"
         
+        from certificate_view import open_detail_window
         open_detail_window(root, columns, vals, meta, tipo_test=tipo_test)
 
+    def do_pdf_batch():
+        acq_ids = _exportable_selection()
+        if not acq_ids:
+            messagebox.showinfo("PDF non disponibile", "Il PDF è disponibile solo per collaudi APPROVED o REJECTED.")
+            return
+
+        out_dir = filedialog.askdirectory(title="Cartella di destinazione dei PDF")
+        if not out_dir:
+            return
+
+        btn_pdf_preview.config(state="disabled")
+        set_status(f"Export PDF: 0/{len(acq_ids)}...")
+
+        def _progress(done, total, _acq_id, _path, _err):
+            set_status(f"Export PDF: {done}/{total}...")
+
+        def _finish(res=None, error=None):
+            on_tree_select()
+            if error:
+                set_status("Export PDF fallito.")
+                messagebox.showerror("Export PDF", f"Impossibile esportare i PDF:\n{error}")
+                return
+            set_status(f"Export PDF completato: {len(res['ok'])} file in {out_dir}")
+            msg = f"PDF generati: {len(res['ok'])}\nCartella: {out_dir}"
+            if res["failed"]:
+                errs = "\n".join(f"  • id {i}: {e}" for i, e in res["failed"][:10])
+                messagebox.showwarning("Export PDF", f"{msg}\n\nErrori: {len(res['failed'])}\n{errs}")
+            else:
+                messagebox.showinfo("Export PDF", msg)
+
+        def _worker():
+            # Il pool di processi gira in un thread per non bloccare la UI
+            try:
+                from pdf_batch import export_pdfs
+                res = export_pdfs(acq_ids, out_dir, username=username, progress=_progress)
+                root.after(0, lambda: _finish(res))
+            except Exception as e:
+                root.after(0, lambda e=e: _finish(error=e))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    def do_job_dossier():
+        sel = tree.focus()
+        vals = tree.item(sel, "values") if sel else ()
+        job = str(vals[0]).strip() if vals else ""
+        if not job:
+            messagebox.showwarning("Selezione", "Seleziona una riga della commessa.")
+            return
+
+        from pdf_report import _sanitize_filename
+        pdf_path = filedialog.asksaveasfilename(
+            title="Salva dossier commessa",
+            defaultextension=".pdf",
+            initialfile=_sanitize_filename(f"{job} - Dossier.pdf"),
+            filetypes=[("PDF", "*.pdf")],
+        )
+        if not pdf_path:
+            return
+
+        btn_dossier.config(state="disabled")
+        set_status(f"Dossier {job} in generazione...")
+
+        def _finish(n=0, error=None):
+            on_tree_select()
+            if error:
+                set_status("Dossier non generato.")
+                messagebox.showerror("Dossier Job", f"Impossibile generare il dossier:\n{error}")
+                return
+            set_status(f"Dossier {job}: {n} certificati -> {pdf_path}")
+            messagebox.showinfo("Dossier Job", f"Dossier generato ({n} certificati):\n{pdf_path}")
+
+        def _worker():
+            try:
+                from pdf_dossier import generate_job_dossier
+                n = generate_job_dossier(job, pdf_path, username=username)
+                root.after(0, lambda: _finish(n))
+            except Exception as e:
+                root.after(0, lambda e=e: _finish(error=e))
+
+        threading.Thread(target=_worker, daemon=True).start()
+
     def do_pdf_preview():
+        if len(tree.selection()) > 1:
+            do_pdf_batch()
+            return
+
         meta = get_sel_row_meta()
         if not meta:
             messagebox.showwarning("Selezione", "Seleziona una riga.")
@@ -453,6 +767,7 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
 
         change_date_local = vals[6] if vals and len(vals) > 6 else date.today().isoformat()
 
+        from pdf_report import preview_pdf_report
         preview_pdf_report(
             root,
             meta_dict=meta,
@@ -491,7 +806,17 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
             "created_by": username,
         }
         try:
-            ingest_one_record(rec)
+            try:
+                ingest_one_record(rec)
+            except DuplicateTdmsError as dup:
+                # Stesso contenuto già importato da un altro percorso (copia su altra share)
+                if not messagebox.askyesno(
+                    "Già presente",
+                    "Il contenuto di questo file è già in archivio come:\n"
+                    f"{dup.existing}\n\nImportarlo comunque?"
+                ):
+                    return
+                ingest_one_record(rec, allow_duplicate=True)
             set_status("TDMS importato correttamente.")
             refresh_from_db()
         except Exception as e:
@@ -555,31 +880,86 @@ def launch_dashboard(folder_path: str, username: str, ruolo: str, parent_root=No
                 missing_list = "\n".join(f"  • {f}" for f in missing[:10])
                 if len(missing) > 10:
                     missing_list += f"\n  ... e altri {len(missing) - 10} file"
-                
-                messagebox.showwarning(
+
+                import relocate
+                roots = relocate.roots_from_config()
+                if not roots:
+                    messagebox.showwarning(
+                        "⚠️ File mancanti",
+                        f"Verifica completata:\n\n"
+                        f"✓ {found} file trovati\n"
+                        f"✗ {len(missing)} file mancanti:\n\n"
+                        f"{missing_list}\n\n"
+                        f"Apri i certificati per aggiornare i percorsi."
+                    )
+                elif messagebox.askyesno(
                     "⚠️ File mancanti",
                     f"Verifica completata:\n\n"
                     f"✓ {found} file trovati\n"
                     f"✗ {len(missing)} file mancanti:\n\n"
                     f"{missing_list}\n\n"
-                    f"Apri i certificati per aggiornare i percorsi."
-                )
-        
+                    f"Cercarli nelle cartelle configurate ([Relocate] roots)\n"
+                    f"e ricollegarli?"
+                ):
+                    do_relocate_tdms(roots)
+
         except Exception as e:
             messagebox.showerror("Errore verifica", f"Impossibile verificare i file:\n{e}")
 
+    def do_relocate_tdms(roots):
+        """Scansione delle cartelle radice in un thread (la GUI resta libera) e ricollegamento in blocco."""
+        import relocate
+        outcome = {}
+
+        def _work():
+            try:
+                outcome["res"] = relocate.relocate(roots)
+            except Exception as e:
+                outcome["err"] = e
+
+        def _poll():
+            if worker.is_alive():
+                root.after(200, _poll)
+                return
+            btn_verify_tdms.config(state="normal")
+            if "err" in outcome:
+                set_status("Ricerca file TDMS non riuscita.")
+                messagebox.showerror("Errore ricerca", f"Impossibile ricollegare i file:\n{outcome['err']}")
+                return
+            res = outcome["res"]
+            set_status(f"Ricollegati {len(res['relinked'])} file TDMS.")
+            refresh_from_db()
+            messagebox.showinfo(
+                "Ricerca completata",
+                f"✓ {len(res['relinked'])} file ricollegati\n"
+                f"✗ {len(res['not_found'])} file non trovati"
+                + (f"\n⚠ {len(res['conflicts'])} file già importati dal nuovo percorso (non ricollegati)"
+                   if res["conflicts"] else "")
+            )
+
+        btn_verify_tdms.config(state="disabled")
+        set_status("Ricerca dei file TDMS mancanti in corso...")
+        worker = threading.Thread(target=_work, daemon=True)
+        worker.start()
+        root.after(200, _poll)
+
     # Wiring bottoni ed eventi
     btn_note.config(command=do_note)
     btn_load_tdms.config(command=do_load_tdms)
     btn_unload_tdms.config(command=do_unload_tdms)
     btn_open_cert.config(command=do_open_cert)
     btn_pdf_preview.config(command=do_pdf_preview)
+    btn_dossier.config(command=do_job_dossier)
     btn_verify_tdms.config(command=do_verify_tdms)
 
     tree.bind("<<TreeviewSelect>>", on_tree_select)
     tree.bind("<Button-1>", on_tree_click)
 
     refresh_from_db()
+    if auto_refresh["ms"] > 0:
+        auto_refresh["job"] = root.after(auto_refresh["ms"], _auto_refresh_tick)
+    backup_job["id"] = root.after(60 * 1000, _backup_tick)
+    root.after_idle(lambda: perf_trace.mark("dashboard.ready", "startup"))
     
     # mainloop solo se standalone (non chiamato da login)
     if not parent_root:
@@ -1,8 +1,15 @@
 import os
+import re
+import sys
+import time
+import random
 import sqlite3
+from contextlib import contextmanager
 from typing import Iterable, Optional
 from datetime import datetime
 
+import perf_trace
+
 # ================== GESTIONE PERCORSO DB ==================
 
 # Percorso di default: file "collaudi.db" nella stessa cartella del modulo
@@ -23,6 +30,23 @@ def get_db_path() -> str:
     return _DB_PATH
 
 
+def open_db(path: Optional[str] = None) -> str:
+    """
+    Apertura per la riga di comando (--db): path, altrimenti l'ultimo DB usato
+    (config_manager), altrimenti quello di default; poi init(). Ritorna il percorso.
+    """
+    if not path:
+        try:
+            from config_manager import get_last_db_path
+            path = get_last_db_path()
+        except Exception:
+            path = None
+    if path:
+        set_db_path(path)
+    init()
+    return get_db_path()
+
+
 def db_file_exists(path: Optional[str] = None) -> bool:
     """
     Ritorna True se il file fisico esiste.
@@ -32,19 +56,188 @@ def db_file_exists(path: Optional[str] = None) -> bool:
     return os.path.exists(p)
 
 
+# ================== CONCORRENZA (DB condiviso tra più postazioni) ==================
+
+# Impostazioni di default; config.ini le può cambiare:
+#     [Database]
+#     busy_timeout_ms = 15000   attesa massima di SQLite su un lock, per tentativo
+#     write_retries = 5         tentativi di BEGIN IMMEDIATE prima di arrendersi
+#     journal_mode = WAL        DELETE se il file è su una share di rete (WAL vuole
+#                               che tutte le postazioni siano sullo stesso host)
+_CONCURRENCY_DEFAULTS = {"busy_timeout_ms": 15000, "write_retries": 5, "journal_mode": "WAL"}
+_concurrency = None
+
+
+def _concurrency_settings() -> dict:
+    global _concurrency
+    if _concurrency is None:
+        settings = dict(_CONCURRENCY_DEFAULTS)
+        try:
+            from config_manager import load_config
+            cfg = load_config()
+            settings["busy_timeout_ms"] = cfg.getint("Database", "busy_timeout_ms",
+                                                     fallback=settings["busy_timeout_ms"])
+            settings["write_retries"] = cfg.getint("Database", "write_retries",
+                                                   fallback=settings["write_retries"])
+            settings["journal_mode"] = cfg.get("Database", "journal_mode",
+                                               fallback=settings["journal_mode"]).strip().upper()
+        except Exception:
+            pass
+        _concurrency = settings
+    return _concurrency
+
+
+def configure_concurrency(**overrides) -> dict:
+    """Cambia a runtime busy_timeout_ms / write_retries / journal_mode (CLI, strumenti). Ritorna le impostazioni."""
+    settings = dict(_concurrency_settings())
+    settings.update({k: v for k, v in overrides.items() if v is not None and k in settings})
+    globals()["_concurrency"] = settings
+    return settings
+
+
 def connect() -> sqlite3.Connection:
     """
     Apre una connessione al DB corrente (_DB_PATH), con le PRAGMA già impostate.
     ATTENZIONE: se il file non esiste, QUI viene creato.
     Per questo motivo NON deve essere chiamata nelle funzioni
     che fanno solo "controllo esistenza".
+
+    Per le scritture usare write_transaction(), che prende subito il lock di scrittura.
     """
-    conn = sqlite3.connect(_DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL;")
+    settings = _concurrency_settings()
+    conn = sqlite3.connect(_DB_PATH, timeout=settings["busy_timeout_ms"] / 1000.0)
+    perf_trace.watch_connection(conn)
+    try:
+        conn.execute(f"PRAGMA journal_mode={settings['journal_mode']};")
+    except sqlite3.OperationalError as e:
+        # il cambio WAL <-> DELETE vuole il file libero: se altri lo usano resta com'è
+        if not _is_busy(e):
+            raise
     conn.execute("PRAGMA foreign_keys=ON;")
     return conn
 
 
+def _is_busy(exc: Exception) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
+
+
+@contextmanager
+def write_transaction():
+    """
+    Transazione di scrittura breve: BEGIN IMMEDIATE (il lock di scrittura si
+    prende subito, niente "database is locked" a metà transazione quando un
+    lettore diventa scrittore), COMMIT all'uscita, ROLLBACK su eccezione.
+
+    Se il lock non arriva entro busy_timeout_ms si riprova fino a
+    write_retries volte con attesa crescente e casuale (jitter), così le
+    postazioni in coda non si risvegliano tutte insieme.
+
+        with write_transaction() as conn:
+            conn.execute("UPDATE ...")
+    """
+    settings = _concurrency_settings()
+    conn = connect()
+    conn.isolation_level = None  # BEGIN/COMMIT espliciti
+    try:
+        t0 = time.perf_counter()
+        for attempt in range(settings["write_retries"] + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt >= settings["write_retries"]:
+                    raise
+                perf_trace.count("db_lock_retries")
+                time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** attempt))))
+        perf_trace.count("db_lock_wait_us", int((time.perf_counter() - t0) * 1e6))
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+
+# ================== CAMPI CONTRATTUALI (copiati dal TDMS) ==================
+
+# colonna DB -> chiave di tdms_reader.read_contract_and_loop_data
+CONTRACT_COLUMNS = {
+    "customer": "Customer",
+    "end_user": "End User",
+    "pump": "Pump",
+    "fsg_order": "FSG ORDER",
+    "impeller_material": "Impeller Material",
+    "impeller_drawing": "Impeller Drawing",
+    "rated_capacity": "Capacity [m3/h]",   # Metric, come nel TDMS
+    "rated_tdh": "TDH [m]",
+}
+_REAL_CONTRACT_COLUMNS = ("rated_capacity", "rated_tdh")
+
+# ordinamenti ammessi per la lista dashboard (chiave -> espressione SQL)
+SORT_KEYS = {
+    "job": "job COLLATE NOCASE",
+    "n_collaudo": "n_collaudo COLLATE NOCASE",
+    "matricola": "matricola COLLATE NOCASE",
+    "tipo_pompa": "tipo_pompa COLLATE NOCASE",
+    "data": "data_file, ora_file, progressivo",
+    "stato": "stato",
+    "data_approvazione": "data_approvazione",
+    "nome_approvatore": "nome_approvatore COLLATE NOCASE",
+    "tipo_test": "tipo_test",
+    "customer": "customer COLLATE NOCASE",
+    "rated_capacity": "rated_capacity",
+    "rated_tdh": "rated_tdh",
+    "notes": "note_collaudatore_len > 0, note_ingegneria_len > 0",
+}
+
+# colonne su cui lavora la ricerca testuale della dashboard
+SEARCH_COLUMNS = ("job", "n_collaudo", "matricola", "tipo_pompa",
+                  "customer", "end_user", "pump", "fsg_order", "impeller_material",
+                  "impeller_drawing")
+
+# indice full-text (FTS5): colonne di acquisizioni + note, con peso per il ranking bm25
+FTS_COLUMNS = ("job", "n_collaudo", "matricola", "tipo_pompa", "customer", "end_user",
+               "pump", "fsg_order", "impeller_material", "impeller_drawing")
+FTS_NOTE_COLUMNS = ("note_collaudatore", "note_ingegneria")
+_FTS_WEIGHTS = (3.0, 3.0, 3.0, 2.0, 2.0, 2.0, 1.5, 1.5, 1.5, 1.5, 1.0, 1.0)
+
+# criteri per lo storico (overlay curve): chiave -> colonna di acquisizioni
+HISTORY_KEYS = {"tipo_pompa": "tipo_pompa", "impeller_drawing": "impeller_drawing"}
+
+
+def _to_real(v) -> Optional[float]:
+    """
+    Numero da un valore del TDMS, anche scritto all'italiana o con separatori
+    delle migliaia: "12,5", "1.234,5", "1,234.5", "1 234,5", "1'234.5".
+    Con entrambi '.' e ',' il decimale è l'ultimo; un separatore ripetuto è
+    delle migliaia. None (e contatore perf_trace "unparsed_numbers") se non è
+    un numero.
+    """
+    if v is None:
+        return None
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return float(v)
+    s = str(v).strip().replace("\u00a0", "").replace(" ", "").replace("'", "")
+    if not s:
+        return None
+    if "," in s and "." in s:
+        dec = "," if s.rfind(",") > s.rfind(".") else "."
+        s = s.replace("." if dec == "," else ",", "").replace(",", ".")
+    elif s.count(",") > 1 or s.count(".") > 1:
+        s = s.replace(",", "").replace(".", "")  # un solo tipo di separatore, ripetuto
+    else:
+        s = s.replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        perf_trace.count("unparsed_numbers")
+        return None
+
+
 # ================== INIZIALIZZAZIONE TABELLE ==================
 
 def _ensure_tabelle_collaudi(conn: sqlite3.Connection) -> None:
@@ -95,6 +288,7 @@ def _ensure_tabelle_collaudi(conn: sqlite3.Connection) -> None:
     )
     cur.execute("CREATE INDEX IF NOT EXISTS idx_acq_job ON acquisizioni(job)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_acq_matricola ON acquisizioni(matricola)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_acq_tipo_pompa ON acquisizioni(tipo_pompa, tipo_test)")
 
 
 def _ensure_curve_settings_table(conn: sqlite3.Connection) -> None:
@@ -111,6 +305,54 @@ def _ensure_curve_settings_table(conn: sqlite3.Connection) -> None:
     """)
 
 
+def _ensure_perf_points_table(conn: sqlite3.Connection) -> None:
+    """
+    Punti di performance ridotti dal TDMS (medie dei canali), una riga per valore:
+    (acquisizione, tabella Recorded/Calc/Converted, punto 1..n, colonna).
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS perf_points (
+            acquisizione_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            point INTEGER NOT NULL,
+            column_name TEXT NOT NULL,
+            value REAL,
+            PRIMARY KEY (acquisizione_id, kind, column_name, point),
+            FOREIGN KEY(acquisizione_id) REFERENCES acquisizioni(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+    # una colonna su molte acquisizioni (confronti tra pompe, overlay curve)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_perf_points_col "
+        "ON perf_points(kind, column_name, acquisizione_id)"
+    )
+
+
+def _ensure_tdms_index_tables(conn: sqlite3.Connection) -> None:
+    """
+    Indice nome file TDMS -> percorso delle cartelle radice (relocate.py), per
+    ricollegare i file spostati. tdms_index_dirs tiene mtime e sottocartelle di
+    ogni cartella visitata: le cartelle non modificate non vengono rilette.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tdms_index (
+            filename TEXT PRIMARY KEY COLLATE NOCASE,
+            filepath TEXT NOT NULL,
+            dir TEXT NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tdms_index_dir ON tdms_index(dir)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS tdms_index_dirs (
+            path TEXT PRIMARY KEY,
+            mtime REAL,
+            subdirs TEXT DEFAULT ''
+        )
+    """)
+
+
 def _ensure_tabella_utenti(
     conn: sqlite3.Connection,
     create_admin_if_missing: bool = True
@@ -145,6 +387,7 @@ def _column_exists(table: str, column: str) -> bool:
         return False
 
 
+@perf_trace.traced(cat="db")
 def init() -> None:
     """
     Inizializza SOLO le tabelle dei collaudi (acquisizioni, notes)
@@ -154,11 +397,18 @@ def init() -> None:
     with connect() as conn:
         _ensure_tabelle_collaudi(conn)
         _ensure_curve_settings_table(conn)
+        _ensure_perf_points_table(conn)
+        _ensure_tdms_index_tables(conn)
         conn.commit()
     
     # Migrazioni schema
     _ensure_taglio_girante_column()
     _ensure_unit_system_column()
+    _ensure_contract_columns()
+    _ensure_perf_points_column()
+    _ensure_fingerprint_columns()
+    _ensure_fts_index()
+    _ensure_change_tracking()
 
 
 def ensure_full_schema(
@@ -196,12 +446,19 @@ def ensure_full_schema(
     with connect() as conn:
         _ensure_tabelle_collaudi(conn)
         _ensure_curve_settings_table(conn)
+        _ensure_perf_points_table(conn)
+        _ensure_tdms_index_tables(conn)
         _ensure_tabella_utenti(conn, create_admin_if_missing=create_admin_if_missing)
         conn.commit()
 
     # Migrazioni schema su DB esistenti
     _ensure_taglio_girante_column()
     _ensure_unit_system_column()
+    _ensure_contract_columns()
+    _ensure_perf_points_column()
+    _ensure_fingerprint_columns()
+    _ensure_fts_index()
+    _ensure_change_tracking()
 
     return db_path
 
@@ -235,11 +492,13 @@ def ensure_default_db(create_if_missing: bool = False) -> str:
 
 # ================== CRUD ACQUISIZIONI ==================
 
-def insert_acquisizione(rec: dict) -> None:
+@perf_trace.traced(cat="db")
+def insert_acquisizione(rec: dict) -> int:
     """
-    Inserisce un record nella tabella acquisizioni del DB corrente.
+    Inserisce un record nella tabella acquisizioni del DB corrente e ne ritorna l'id.
     rec atteso: chiavi job, n_collaudo, matricola, tipo_pompa, data_iso, stato,
                 filepath, filename, data_file, ora_file, progressivo, tipo_test
+                (opzionale: fingerprint, vedi fingerprint.py)
 
     created_by / checked_* / engineering_* rimangono NULL in inserimento
     e verranno compilati dalle logiche di cambio stato.
@@ -249,12 +508,14 @@ def insert_acquisizione(rec: dict) -> None:
         (job, n_collaudo, matricola, tipo_pompa, data, stato,
          data_approvazione, nome_approvatore, tipo_test, taglio_girante,
          filepath, filename, data_file, ora_file, progressivo,
-         created_by, checked_by, checked_at, engineering_user, engineering_at)
+         created_by, checked_by, checked_at, engineering_user, engineering_at,
+         fingerprint)
         VALUES
         (?,   ?,          ?,         ?,          ?,    ?,
          NULL,              '',               ?,         '',
          ?,        ?,        ?,        ?,       ?,
-         ?,         NULL,      NULL,      NULL,           NULL)
+         ?,         NULL,      NULL,      NULL,           NULL,
+         ?)
     """
     vals = (
         rec["job"],
@@ -270,10 +531,11 @@ def insert_acquisizione(rec: dict) -> None:
         rec["ora_file"],
         rec["progressivo"],
         rec.get("created_by", None),
+        rec.get("fingerprint") or None,
     )
-    with connect() as conn:
-        conn.execute(sql, vals)
-        conn.commit()
+    with write_transaction() as conn:
+        cur = conn.execute(sql, vals)
+        return cur.lastrowid
 
 
 def _ensure_taglio_girante_column():
@@ -292,22 +554,739 @@ def _ensure_unit_system_column():
             conn.commit()
 
 
-def select_all_acquisizioni() -> Iterable[tuple]:
+def _ensure_contract_columns():
+    """Aggiunge le colonne dei campi contrattuali (+ contract_at) e i relativi indici."""
+    with connect() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(acquisizioni)")}
+        added = [c for c in CONTRACT_COLUMNS if c not in existing]
+        for col in added + (["contract_at"] if "contract_at" not in existing else []):
+            typ = "REAL" if col in _REAL_CONTRACT_COLUMNS else "TEXT"
+            conn.execute(f"ALTER TABLE acquisizioni ADD COLUMN {col} {typ}")
+        if added and "contract_at" in existing:
+            # nuovi campi: le righe già indicizzate tornano da completare (backfill)
+            conn.execute("UPDATE acquisizioni SET contract_at = NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_customer ON acquisizioni(customer COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_fsg_order ON acquisizioni(fsg_order)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_imp_draw ON acquisizioni(impeller_drawing, tipo_test)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_rated ON acquisizioni(rated_capacity, rated_tdh)")
+        conn.commit()
+
+
+@perf_trace.traced(cat="db")
+def set_contract_fields(filepath: str, contract: dict) -> None:
     """
-    Ritorna tutte le acquisizioni ordinate per data_file, ora_file, progressivo.
-    (Usata dalla dashboard: ritorna solo le colonne necessarie per la lista.)
+    Salva i campi contrattuali letti dal TDMS (dict di read_contract_and_loop_data)
+    su tutte le righe del file (una per tipo test) e segna contract_at.
     """
-    sql = """
-        SELECT id, job, n_collaudo, matricola, tipo_pompa, data, stato, 
+    vals = []
+    for col, key in CONTRACT_COLUMNS.items():
+        v = (contract or {}).get(key, "")
+        vals.append(_to_real(v) if col in _REAL_CONTRACT_COLUMNS else (str(v).strip() if v else ""))
+    sets = ", ".join(f"{col} = ?" for col in CONTRACT_COLUMNS)
+    with write_transaction() as conn:
+        conn.execute(
+            f"UPDATE acquisizioni SET {sets}, contract_at = datetime('now') WHERE filepath = ?",
+            (*vals, filepath),
+        )
+
+
+@perf_trace.traced(cat="db")
+def select_filepaths_without_contract() -> list:
+    """File TDMS i cui campi contrattuali non sono ancora stati copiati nel DB."""
+    with connect() as conn:
+        rows = conn.execute(
+            "SELECT DISTINCT filepath FROM acquisizioni WHERE contract_at IS NULL AND filepath IS NOT NULL"
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+# righe della lista dashboard (stesse colonne per la lista completa e per gli aggiornamenti)
+_DASHBOARD_SELECT = """
+        SELECT a.id, job, n_collaudo, matricola, tipo_pompa, data, stato,
                data_approvazione, nome_approvatore, tipo_test, taglio_girante,
-               filepath, filename
-        FROM acquisizioni
-        ORDER BY data_file ASC, ora_file ASC, progressivo ASC
+               a.filepath, filename, customer, rated_capacity, rated_tdh,
+               LENGTH(TRIM(COALESCE(n.note_collaudatore, ''))) AS note_collaudatore_len,
+               LENGTH(TRIM(COALESCE(n.note_ingegneria, ''))) AS note_ingegneria_len
+        FROM acquisizioni AS a
+        LEFT JOIN notes AS n ON n.filepath = a.filepath"""
+
+
+def _dashboard_filter(search: str, fulltext: bool) -> tuple:
+    """
+    Filtro di ricerca della lista dashboard: (join, condizione, parametri, match).
+    join con acq_fts per la ricerca full-text, altrimenti condizione LIKE su
+    SEARCH_COLUMNS; tutto vuoto senza testo.
+    """
+    text = (search or "").strip()
+    match = fts_query(text) if (fulltext and text and fts_available()) else None
+    if match:
+        join = ("JOIN (SELECT rowid AS fts_id, rank AS fts_rank FROM acq_fts "
+                "WHERE acq_fts MATCH ?) AS f ON f.fts_id = a.id")
+        return join, "", [match], match
+    if text:
+        like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        cond = "(" + " OR ".join(f"{c} LIKE ? ESCAPE '\\'" for c in SEARCH_COLUMNS) + ")"
+        return "", cond, [like] * len(SEARCH_COLUMNS), None
+    return "", "", [], None
+
+
+@perf_trace.traced(cat="db")
+def select_all_acquisizioni(search: str = "", sort_key: Optional[str] = None,
+                            descending: bool = False, fulltext: bool = False) -> Iterable[tuple]:
+    """
+    Ritorna le acquisizioni per la lista della dashboard.
+    Default: ordinate per data_file, ora_file, progressivo.
+
+    search:   testo cercato (LIKE, senza maiuscole/minuscole) in SEARCH_COLUMNS
+    sort_key: una chiave di SORT_KEYS (altrimenti ordinamento di default)
+    fulltext: cerca con l'indice FTS5 (anche nelle note, per prefisso di parola);
+              senza sort_key le righe sono ordinate per pertinenza
+
+    Colonne: id, job, n_collaudo, matricola, tipo_pompa, data, stato,
+             data_approvazione, nome_approvatore, tipo_test, taglio_girante,
+             filepath, filename, customer, rated_capacity, rated_tdh,
+             note_collaudatore_len, note_ingegneria_len
+
+    Le lunghezze delle note (0 = nota assente, spazi esclusi) arrivano con la
+    stessa query (LEFT JOIN su notes, chiave primaria filepath): la dashboard
+    mostra l'indicatore e controlla i cambi di stato senza altre letture.
+    """
+    join, cond, params, match = _dashboard_filter(search, fulltext)
+    where = f"WHERE {cond}" if cond else ""
+
+    order = SORT_KEYS.get(sort_key or "", SORT_KEYS["data"])
+    if match and not sort_key:
+        order = "f.fts_rank, data_file, ora_file, progressivo"
+    elif descending:
+        order = ", ".join(f"{part.strip()} DESC" for part in order.split(","))
+    if sort_key and sort_key != "data":
+        order += ", data_file, ora_file, progressivo"
+
+    sql = f"""
+        {_DASHBOARD_SELECT}
+        {join}
+        {where}
+        ORDER BY {order}
     """
     with connect() as conn:
-        return list(conn.execute(sql).fetchall())
+        return list(conn.execute(sql, params).fetchall())
 
 
+@perf_trace.traced(cat="db")
+def select_acquisizioni_by_ids(acq_ids: Iterable[int]) -> list:
+    """
+    Come select_all_acquisizioni, ma solo per gli id indicati
+    (stesso ordinamento e stesse colonne). Usata dagli export PDF in blocco.
+    """
+    ids = [int(i) for i in acq_ids]
+    if not ids:
+        return []
+    out = []
+    with connect() as conn:
+        # chunk per restare sotto il limite di parametri SQLite
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            out.extend(conn.execute(f"""
+                SELECT id, job, n_collaudo, matricola, tipo_pompa, data, stato,
+                       data_approvazione, nome_approvatore, tipo_test, taglio_girante,
+                       filepath, filename, data_file, ora_file, progressivo
+                FROM acquisizioni
+                WHERE id IN ({marks})
+            """, chunk).fetchall())
+    out.sort(key=lambda r: (r[13] or "", r[14] or "", r[15] or 0))
+    return [r[:13] for r in out]
+
+
+@perf_trace.traced(cat="db")
+def select_all_filepaths() -> list:
+    """Percorsi TDMS distinti presenti in acquisizioni."""
+    with connect() as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT filepath FROM acquisizioni WHERE filepath IS NOT NULL"
+        ).fetchall()]
+
+
+@perf_trace.traced(cat="db")
+def select_ids_by_filter(job: Optional[str] = None, date_from: Optional[str] = None,
+                         date_to: Optional[str] = None,
+                         stati: Optional[Iterable[str]] = None) -> list:
+    """
+    Id delle acquisizioni filtrate per commessa, intervallo di date (YYYY-MM-DD,
+    estremi inclusi, sulla data del file) e stato. Filtri None = nessun filtro.
+    """
+    where, params = [], []
+    if job:
+        where.append("job = ?"); params.append(job)
+    if date_from:
+        where.append("data >= ?"); params.append(date_from)
+    if date_to:
+        where.append("data <= ?"); params.append(date_to)
+    stati = list(stati or [])
+    if stati:
+        where.append(f"stato IN ({', '.join('?' * len(stati))})"); params.extend(stati)
+    sql = "SELECT id FROM acquisizioni"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY data_file ASC, ora_file ASC, progressivo ASC"
+    with connect() as conn:
+        return [r[0] for r in conn.execute(sql, params).fetchall()]
+
+
+@perf_trace.traced(cat="db")
+def select_ids_by_job(job: str, stati: Optional[Iterable[str]] = None) -> list:
+    """Ritorna gli id delle acquisizioni di una commessa (opzionale: filtro per stato)."""
+    sql = "SELECT id FROM acquisizioni WHERE job = ?"
+    params = [job]
+    stati = list(stati or [])
+    if stati:
+        sql += f" AND stato IN ({', '.join('?' * len(stati))})"
+        params.extend(stati)
+    sql += " ORDER BY data_file ASC, ora_file ASC, progressivo ASC"
+    with connect() as conn:
+        return [r[0] for r in conn.execute(sql, params).fetchall()]
+
+
+# ================== RICERCA FULL-TEXT (FTS5) ==================
+
+def _fts_select_sql(where: str) -> str:
+    cols = ", ".join(f"a.{c}" for c in FTS_COLUMNS)
+    return (f"SELECT a.id, {cols}, COALESCE(n.note_collaudatore, ''), COALESCE(n.note_ingegneria, '') "
+            f"FROM acquisizioni AS a LEFT JOIN notes AS n ON n.filepath = a.filepath {where}")
+
+
+def _ensure_fts_index():
+    """
+    Tabella FTS5 acq_fts (rowid = acquisizioni.id) su FTS_COLUMNS + note,
+    tenuta allineata da trigger su acquisizioni e notes. Al primo avvio viene
+    riempita dai dati esistenti; se le colonne indicizzate sono cambiate
+    (DB creato da una versione precedente) indice e trigger vengono rifatti.
+    Se SQLite non ha FTS5 non fa nulla (la dashboard resta sulla ricerca LIKE).
+    """
+    all_cols = FTS_COLUMNS + FTS_NOTE_COLUMNS
+    new_vals = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+    note_vals = ", ".join(
+        f"COALESCE((SELECT {c} FROM notes WHERE filepath = new.filepath), '')" for c in FTS_NOTE_COLUMNS
+    )
+    insert_row = f"INSERT INTO acq_fts(rowid, {', '.join(all_cols)}) VALUES (new.id, {new_vals}, {note_vals});"
+    set_notes = ("UPDATE acq_fts SET note_collaudatore = new.note_collaudatore, "
+                 "note_ingegneria = new.note_ingegneria "
+                 "WHERE rowid IN (SELECT id FROM acquisizioni WHERE filepath = new.filepath);")
+    triggers = {
+        "trg_acq_fts_ins": f"AFTER INSERT ON acquisizioni BEGIN {insert_row} END",
+        # solo le colonne indicizzate: i cambi di stato non toccano l'indice
+        "trg_acq_fts_upd": (f"AFTER UPDATE OF {', '.join(FTS_COLUMNS)}, filepath ON acquisizioni BEGIN "
+                            f"DELETE FROM acq_fts WHERE rowid = old.id; {insert_row} END"),
+        "trg_acq_fts_del": "AFTER DELETE ON acquisizioni BEGIN DELETE FROM acq_fts WHERE rowid = old.id; END",
+        "trg_notes_fts_ins": f"AFTER INSERT ON notes BEGIN {set_notes} END",
+        "trg_notes_fts_upd": f"AFTER UPDATE ON notes BEGIN {set_notes} END",
+        "trg_notes_fts_del": ("AFTER DELETE ON notes BEGIN UPDATE acq_fts SET note_collaudatore = '', "
+                              "note_ingegneria = '' WHERE rowid IN "
+                              "(SELECT id FROM acquisizioni WHERE filepath = old.filepath); END"),
+    }
+    with connect() as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'acq_fts'"
+        ).fetchone()
+        if exists and [r[1] for r in conn.execute("PRAGMA table_info(acq_fts)")] != list(all_cols):
+            for name in triggers:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            conn.execute("DROP TABLE acq_fts")
+            exists = None
+        if not exists:
+            try:
+                conn.execute(
+                    f"CREATE VIRTUAL TABLE acq_fts USING fts5({', '.join(all_cols)}, "
+                    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+                )
+            except sqlite3.OperationalError:
+                return  # SQLite senza FTS5
+            conn.execute(
+                "INSERT INTO acq_fts(acq_fts, rank) VALUES ('rank', ?)",
+                (f"bm25({', '.join(str(w) for w in _FTS_WEIGHTS)})",),
+            )
+            conn.execute(f"INSERT INTO acq_fts(rowid, {', '.join(all_cols)}) {_fts_select_sql('')}")
+
+        for name, body in triggers.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        conn.commit()
+
+
+def fts_available() -> bool:
+    """True se il DB corrente ha l'indice full-text (SQLite con FTS5)."""
+    try:
+        with connect() as conn:
+            return conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'acq_fts'"
+            ).fetchone() is not None
+    except Exception:
+        return False
+
+
+def fts_query(text: str) -> Optional[str]:
+    """
+    Testo libero -> espressione MATCH FTS5: ogni parola è cercata come prefisso,
+    tutte devono comparire ("cavit ABC12" -> "cavit"* "ABC12"*). None se non ci sono parole.
+    """
+    words = re.findall(r"\w+", text or "", re.UNICODE)
+    return " ".join(f'"{w}"*' for w in words) if words else None
+
+
+@perf_trace.traced(cat="db")
+def search_fulltext(text: str, limit: int = 100) -> list:
+    """
+    Ricerca full-text su campi contrattuali e note, per pertinenza.
+    Ritorna [(id, estratto), ...]; l'estratto evidenzia le parole trovate tra [ ].
+    """
+    match = fts_query(text)
+    if not match or not fts_available():
+        return []
+    with connect() as conn:
+        return list(conn.execute(
+            "SELECT rowid, snippet(acq_fts, -1, '[', ']', '…', 10) FROM acq_fts "
+            "WHERE acq_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        ).fetchall())
+
+
+@perf_trace.traced(cat="db")
+def rebuild_fts() -> None:
+    """Ricostruisce da zero il contenuto dell'indice full-text (manutenzione)."""
+    if not fts_available():
+        return
+    all_cols = FTS_COLUMNS + FTS_NOTE_COLUMNS
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM acq_fts")
+        conn.execute(f"INSERT INTO acq_fts(rowid, {', '.join(all_cols)}) {_fts_select_sql('')}")
+        conn.execute("INSERT INTO acq_fts(acq_fts) VALUES ('optimize')")
+
+
+# ================== VERSIONI DELLE RIGHE (aggiornamento incrementale) ==================
+
+def _ensure_change_tracking():
+    """
+    Contatore globale delle modifiche (change_counter) e acquisizioni.row_version,
+    aggiornati da trigger: ogni INSERT/UPDATE di una acquisizione o della sua nota
+    incrementa il contatore e lo scrive nella riga; le cancellazioni vanno in
+    acq_deleted. select_changes_since(v) ritorna solo quello che è cambiato dopo v.
+    """
+    bump = "UPDATE change_counter SET version = version + 1 WHERE id = 1;"
+    cur_version = "(SELECT version FROM change_counter WHERE id = 1)"
+    with connect() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(acquisizioni)")}
+        if "row_version" not in existing:
+            conn.execute("ALTER TABLE acquisizioni ADD COLUMN row_version INTEGER DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_row_version ON acquisizioni(row_version)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS change_counter ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT OR IGNORE INTO change_counter (id, version) VALUES (1, 0)")
+        conn.execute("CREATE TABLE IF NOT EXISTS acq_deleted (id INTEGER PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_deleted_version ON acq_deleted(version)")
+
+        touch_note_rows = (f"UPDATE acquisizioni SET row_version = {cur_version} "
+                           "WHERE filepath = {row}.filepath;")
+        triggers = {
+            "trg_acq_ver_ins": (f"AFTER INSERT ON acquisizioni BEGIN {bump} "
+                                f"UPDATE acquisizioni SET row_version = {cur_version} WHERE id = new.id; END"),
+            # il WHEN esclude l'UPDATE di row_version fatto dai trigger stessi
+            "trg_acq_ver_upd": (f"AFTER UPDATE ON acquisizioni WHEN new.row_version IS old.row_version BEGIN {bump} "
+                                f"UPDATE acquisizioni SET row_version = {cur_version} WHERE id = new.id; END"),
+            "trg_acq_ver_del": (f"AFTER DELETE ON acquisizioni BEGIN {bump} "
+                                f"INSERT OR REPLACE INTO acq_deleted (id, version) VALUES (old.id, {cur_version}); END"),
+            "trg_notes_ver_ins": f"AFTER INSERT ON notes BEGIN {bump} {touch_note_rows.format(row='new')} END",
+            "trg_notes_ver_upd": f"AFTER UPDATE ON notes BEGIN {bump} {touch_note_rows.format(row='new')} END",
+            "trg_notes_ver_del": f"AFTER DELETE ON notes BEGIN {bump} {touch_note_rows.format(row='old')} END",
+        }
+        for name, body in triggers.items():
+            conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        conn.commit()
+
+
+@perf_trace.traced(cat="db")
+def current_change_version() -> int:
+    """Valore attuale del contatore delle modifiche."""
+    with connect() as conn:
+        row = conn.execute("SELECT version FROM change_counter WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+
+@perf_trace.traced(cat="db")
+def select_changes_since(version: int, search: str = "", fulltext: bool = False) -> tuple:
+    """
+    Modifiche successive a version, lette in un'unica transazione di lettura.
+    Ritorna (nuova_versione, righe, id_cancellati, id_esclusi): le righe
+    (colonne di select_all_acquisizioni) sono solo le cambiate che rispettano
+    la ricerca (stesso filtro di select_all_acquisizioni), id_esclusi le
+    cambiate che non la rispettano (più, se presenti, da togliere dalla lista).
+    """
+    join, cond, params, _match = _dashboard_filter(search, fulltext)
+    where = "WHERE a.row_version > ?" + (f" AND {cond}" if cond else "")
+    # i parametri del join (MATCH) vengono prima di quelli del WHERE
+    params = (params + [version]) if join else ([version] + params)
+    with connect() as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute("SELECT version FROM change_counter WHERE id = 1").fetchone()
+            new_version = row[0] if row else 0
+            rows = conn.execute(f"{_DASHBOARD_SELECT} {join} {where} ORDER BY a.id", params).fetchall()
+            changed = [r[0] for r in conn.execute("SELECT id FROM acquisizioni WHERE row_version > ?", (version,))]
+            deleted = [r[0] for r in conn.execute("SELECT id FROM acq_deleted WHERE version > ?", (version,))]
+        finally:
+            conn.execute("COMMIT")
+    shown = {r[0] for r in rows}
+    return new_version, rows, deleted, [i for i in changed if i not in shown]
+
+
+class ChangePoller:
+    """
+    Controllo economico delle modifiche fatte da altre connessioni (altre
+    postazioni, altri processi): PRAGMA data_version su una connessione tenuta
+    aperta cambia solo quando qualcun altro ha fatto commit, e non legge
+    tabelle. Solo allora fetch() chiede le righe cambiate.
+
+        poller = ChangePoller()
+        poller.sync()                 # prima di caricare la lista completa
+        ...
+        if poller.changed():
+            rows, deleted, excluded = poller.fetch(search, fulltext)
+
+    Da usare nel thread che l'ha creato (la connessione non è condivisa).
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._data_version = None
+        self.version = 0
+
+    def _data_version_now(self) -> int:
+        if self._conn is None:
+            self._conn = connect()
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def sync(self) -> None:
+        """Allinea il poller allo stato attuale del DB (dopo un caricamento completo)."""
+        self._data_version = self._data_version_now()
+        self.version = current_change_version()
+
+    def changed(self) -> bool:
+        """True se dal controllo precedente un'altra connessione ha modificato il DB."""
+        dv = self._data_version_now()
+        changed = self._data_version is not None and dv != self._data_version
+        self._data_version = dv
+        return changed
+
+    def fetch(self, search: str = "", fulltext: bool = False) -> tuple:
+        """(righe cambiate, id cancellati, id esclusi dalla ricerca) dopo l'ultima versione vista."""
+        self.version, rows, deleted, excluded = select_changes_since(self.version, search, fulltext)
+        return rows, deleted, excluded
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ================== IMPRONTE CONTENUTO (duplicati) ==================
+
+def _ensure_fingerprint_columns():
+    """Aggiunge fingerprint (impronta veloce) e content_hash (hash completo) con i loro indici."""
+    with connect() as conn:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(acquisizioni)")}
+        for col in ("fingerprint", "content_hash"):
+            if col not in existing:
+                conn.execute(f"ALTER TABLE acquisizioni ADD COLUMN {col} TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_fingerprint ON acquisizioni(fingerprint)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_acq_content_hash ON acquisizioni(content_hash)")
+        conn.commit()
+
+
+@perf_trace.traced(cat="db")
+def select_by_fingerprint(fingerprint: str) -> list:
+    """[(filepath, content_hash), ...] dei file già importati con questa impronta."""
+    if not fingerprint:
+        return []
+    with connect() as conn:
+        return list(conn.execute(
+            "SELECT filepath, MAX(COALESCE(content_hash, '')) FROM acquisizioni "
+            "WHERE fingerprint = ? GROUP BY filepath",
+            (fingerprint,),
+        ).fetchall())
+
+
+@perf_trace.traced(cat="db")
+def set_fingerprint(filepath: str, fingerprint: str) -> None:
+    with write_transaction() as conn:
+        conn.execute("UPDATE acquisizioni SET fingerprint = ? WHERE filepath = ?", (fingerprint, filepath))
+
+
+@perf_trace.traced(cat="db")
+def set_content_hash(filepath: str, content_hash: str) -> None:
+    with write_transaction() as conn:
+        conn.execute("UPDATE acquisizioni SET content_hash = ? WHERE filepath = ?", (content_hash, filepath))
+
+
+@perf_trace.traced(cat="db")
+def select_filepaths_without_fingerprint() -> list:
+    with connect() as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT filepath FROM acquisizioni WHERE fingerprint IS NULL AND filepath IS NOT NULL"
+        ).fetchall()]
+
+
+@perf_trace.traced(cat="db")
+def select_filepaths_without_content_hash() -> list:
+    with connect() as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT DISTINCT filepath FROM acquisizioni WHERE content_hash IS NULL AND filepath IS NOT NULL"
+        ).fetchall()]
+
+
+# ================== INDICE FILE TDMS (ricollegamento) ==================
+
+@perf_trace.traced(cat="db")
+def tdms_index_dirs_get() -> dict:
+    """{cartella: (mtime, [sottocartelle])} delle cartelle già indicizzate."""
+    with connect() as conn:
+        return {
+            path: (mtime, [s for s in (subdirs or "").split("\n") if s])
+            for path, mtime, subdirs in conn.execute("SELECT path, mtime, subdirs FROM tdms_index_dirs")
+        }
+
+
+@perf_trace.traced(cat="db")
+def tdms_index_apply(changed: dict, removed: Iterable[str] = ()) -> None:
+    """
+    Aggiorna l'indice in un'unica transazione.
+    changed: {cartella: (mtime, [sottocartelle], {nome_file: percorso})} delle cartelle rilette;
+    removed: cartelle sparite (tolte con i loro file).
+    """
+    with write_transaction() as conn:
+        for path in removed:
+            conn.execute("DELETE FROM tdms_index WHERE dir = ?", (path,))
+            conn.execute("DELETE FROM tdms_index_dirs WHERE path = ?", (path,))
+        for path, (mtime, subdirs, files) in changed.items():
+            conn.execute("DELETE FROM tdms_index WHERE dir = ?", (path,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO tdms_index (filename, filepath, dir) VALUES (?, ?, ?)",
+                [(name, fp, path) for name, fp in files.items()],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO tdms_index_dirs (path, mtime, subdirs) VALUES (?, ?, ?)",
+                (path, mtime, "\n".join(subdirs)),
+            )
+
+
+@perf_trace.traced(cat="db")
+def tdms_index_lookup(filenames: Iterable[str]) -> dict:
+    """{nome_file: percorso} per i nomi presenti nell'indice (confronto senza maiuscole)."""
+    names = list(dict.fromkeys(filenames))
+    found = {}
+    with connect() as conn:
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            rows = conn.execute(
+                f"SELECT filename, filepath FROM tdms_index WHERE filename IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            lower = {n.lower(): n for n in chunk}
+            for name, fp in rows:
+                found[lower.get(name.lower(), name)] = fp
+    return found
+
+
+def _merge_note(a: Optional[str], b: Optional[str]) -> str:
+    """Unisce due note dello stesso file: una sola se uguali o se l'altra è vuota."""
+    a, b = (a or "").strip(), (b or "").strip()
+    if not a or a == b:
+        return b
+    if not b:
+        return a
+    return f"{b}\n\n{a}"
+
+
+@perf_trace.traced(cat="db")
+def relink_filepaths(pairs: Iterable[tuple]) -> dict:
+    """
+    Sostituisce i percorsi (vecchio, nuovo) in acquisizioni e notes in un'unica
+    transazione.
+
+    Se il file è già stato importato anche dal nuovo percorso (stesso tipo
+    test: UNIQUE(filepath, tipo_test)) la coppia viene saltata per intero e
+    finisce in "conflicts": le righe vecchie, con la loro nota, restano come
+    sono. Se il nuovo percorso ha già una nota le due vengono unite.
+
+    Ritorna {"rows": righe di acquisizioni aggiornate, "conflicts": [(vecchio, nuovo), ...]}.
+    """
+    pairs = list(pairs)
+    res = {"rows": 0, "conflicts": []}
+    moved = []
+    with write_transaction() as conn:
+        for old, new in pairs:
+            clash = conn.execute(
+                """
+                SELECT 1 FROM acquisizioni AS a
+                JOIN acquisizioni AS b ON b.filepath = ? AND b.tipo_test IS a.tipo_test
+                WHERE a.filepath = ? LIMIT 1
+                """,
+                (new, old),
+            ).fetchone()
+            if clash:
+                res["conflicts"].append((old, new))
+                continue
+            moved += [r[0] for r in conn.execute("SELECT id FROM acquisizioni WHERE filepath = ?", (old,))]
+            res["rows"] += conn.execute("UPDATE acquisizioni SET filepath = ? WHERE filepath = ?", (new, old)).rowcount
+
+            old_note = conn.execute(
+                "SELECT note_collaudatore, note_ingegneria FROM notes WHERE filepath = ?", (old,)
+            ).fetchone()
+            if not old_note:
+                continue
+            new_note = conn.execute(
+                "SELECT note_collaudatore, note_ingegneria FROM notes WHERE filepath = ?", (new,)
+            ).fetchone()
+            if new_note:
+                conn.execute(
+                    "UPDATE notes SET note_collaudatore = ?, note_ingegneria = ? WHERE filepath = ?",
+                    (_merge_note(old_note[0], new_note[0]), _merge_note(old_note[1], new_note[1]), new),
+                )
+                conn.execute("DELETE FROM notes WHERE filepath = ?", (old,))
+            else:
+                conn.execute("UPDATE notes SET filepath = ? WHERE filepath = ?", (new, old))
+    _overlay_changed(moved)
+    return res
+
+
+# ================== PUNTI DI PERFORMANCE ==================
+
+def _overlay_changed(acq_ids) -> None:
+    """Trendline in cache di curve_data da rifare (solo se il modulo è già caricato)."""
+    curve_data = sys.modules.get("curve_data")
+    if curve_data is not None:
+        curve_data.invalidate_overlay(acq_ids)
+
+
+def _ensure_perf_points_column():
+    """Aggiunge perf_points_at (quando i punti sono stati salvati) se non esiste."""
+    if not _column_exists("acquisizioni", "perf_points_at"):
+        with connect() as conn:
+            conn.execute("ALTER TABLE acquisizioni ADD COLUMN perf_points_at TEXT")
+            conn.commit()
+
+
+@perf_trace.traced(cat="db")
+def set_perf_points(acq_id: int, perf: dict) -> int:
+    """
+    Sostituisce i punti dell'acquisizione con quelli di perf
+    (dict di tdms_reader.read_performance_tables_dynamic). Le celle vuote
+    o non numeriche non vengono salvate. Ritorna il numero di valori scritti.
+    """
+    data = []
+    for kind, table in (perf or {}).items():
+        cols = table.get("columns", [])
+        for point, row in enumerate(table.get("rows", []), start=1):
+            for col, v in zip(cols, row):
+                val = _to_real(v) if v not in (None, "") else None
+                if val is not None:
+                    data.append((acq_id, kind, point, col, val))
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM perf_points WHERE acquisizione_id = ?", (acq_id,))
+        conn.executemany(
+            "INSERT INTO perf_points (acquisizione_id, kind, point, column_name, value) VALUES (?, ?, ?, ?, ?)",
+            data,
+        )
+        conn.execute("UPDATE acquisizioni SET perf_points_at = datetime('now') WHERE id = ?", (acq_id,))
+    _overlay_changed([acq_id])
+    return len(data)
+
+
+@perf_trace.traced(cat="db")
+def select_ids_without_perf_points() -> list:
+    """(id, filepath, tipo_test) delle acquisizioni senza punti salvati."""
+    with connect() as conn:
+        return list(conn.execute(
+            "SELECT id, filepath, tipo_test FROM acquisizioni "
+            "WHERE perf_points_at IS NULL ORDER BY id"
+        ).fetchall())
+
+
+@perf_trace.traced(cat="db")
+def select_perf_points(acq_ids: Iterable[int], columns: Iterable[str],
+                       kind: str = "Converted") -> dict:
+    """
+    Colonne di una tabella (Recorded/Calc/Converted) per un insieme di acquisizioni:
+        {acq_id: {colonna: [(point, value), ...]}}   # punti in ordine
+    Una query (per blocchi da 500 id, limite parametri SQLite).
+    """
+    ids = [int(i) for i in acq_ids]
+    cols = list(columns)
+    out = {i: {c: [] for c in cols} for i in ids}
+    if not ids or not cols:
+        return out
+    col_marks = ", ".join("?" * len(cols))
+    with connect() as conn:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            for acq_id, col, point, value in conn.execute(f"""
+                SELECT acquisizione_id, column_name, point, value
+                FROM perf_points
+                WHERE kind = ? AND column_name IN ({col_marks}) AND acquisizione_id IN ({marks})
+                ORDER BY acquisizione_id, column_name, point
+            """, (kind, *cols, *chunk)):
+                out[acq_id][col].append((point, value))
+    return out
+
+
+@perf_trace.traced(cat="db")
+def select_history_ids(acq_id: int, same: str = "tipo_pompa", limit: int = 10) -> list:
+    """
+    Ultime `limit` acquisizioni con lo stesso tipo test e lo stesso tipo pompa
+    (o disegno girante, vedi HISTORY_KEYS) che hanno i punti in perf_points.
+    Esclude acq_id; più recenti per prime.
+    """
+    col = HISTORY_KEYS[same]
+    sql = f"""
+        SELECT b.id
+        FROM acquisizioni a
+        JOIN acquisizioni b
+          ON b.{col} = a.{col} AND b.tipo_test IS a.tipo_test AND b.id != a.id
+        WHERE a.id = ? AND COALESCE(a.{col}, '') != '' AND b.perf_points_at IS NOT NULL
+        ORDER BY b.data_file DESC, b.ora_file DESC, b.progressivo DESC
+        LIMIT ?
+    """
+    with connect() as conn:
+        return [r[0] for r in conn.execute(sql, (acq_id, int(limit))).fetchall()]
+
+
+@perf_trace.traced(cat="db")
+def select_perf_columns(acq_ids: Iterable[int], kind: str = "Converted") -> list:
+    """Nomi colonna presenti in perf_points per le acquisizioni indicate (ordinati)."""
+    ids = [int(i) for i in acq_ids]
+    found = set()
+    with connect() as conn:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            marks = ", ".join("?" * len(chunk))
+            found.update(r[0] for r in conn.execute(
+                f"SELECT DISTINCT column_name FROM perf_points WHERE kind = ? AND acquisizione_id IN ({marks})",
+                (kind, *chunk),
+            ))
+    return sorted(found)
+
+
+def _unit_systems() -> tuple:
+    """Sistemi di unità validi (registro di unit_converter)."""
+    try:
+        import unit_converter as uc
+        return uc.system_names()
+    except Exception:
+        return ("Metric", "US")
+
+
+@perf_trace.traced(cat="db")
 def get_unit_system(acq_id: Optional[int]) -> str:
     """Ritorna il sistema unità per una acquisizione ('Metric' default)."""
     if acq_id is None:
@@ -320,23 +1299,24 @@ def get_unit_system(acq_id: Optional[int]) -> str:
             (acq_id,)
         ).fetchone()
     val = (row[0] if row else None) or "Metric"
-    return val if val in ("Metric", "US") else "Metric"
+    return val if val in _unit_systems() else "Metric"
 
 
+@perf_trace.traced(cat="db")
 def set_unit_system(acq_id: Optional[int], unit_system: str) -> None:
     """Imposta il sistema unità per una acquisizione."""
     if acq_id is None:
         return
-    unit = unit_system if unit_system in ("Metric", "US") else "Metric"
+    unit = unit_system if unit_system in _unit_systems() else "Metric"
     _ensure_unit_system_column()
-    with connect() as conn:
+    with write_transaction() as conn:
         conn.execute(
             "UPDATE acquisizioni SET unit_system = ? WHERE id = ?",
             (unit, acq_id)
         )
-        conn.commit()
 
 
+@perf_trace.traced(cat="db")
 def curve_settings_get(acq_id: Optional[int]) -> Optional[dict]:
     """
     Legge impostazioni curva per acquisizione.
@@ -359,6 +1339,7 @@ def curve_settings_get(acq_id: Optional[int]) -> Optional[dict]:
     }
 
 
+@perf_trace.traced(cat="db")
 def curve_settings_set(
     acq_id: Optional[int],
     *,
@@ -370,7 +1351,7 @@ def curve_settings_set(
     if acq_id is None:
         return
     show_points_i = 1 if bool(show_points) else 0
-    with connect() as conn:
+    with write_transaction() as conn:
         _ensure_curve_settings_table(conn)
         conn.execute("""
             INSERT INTO curve_settings(acquisizione_id, show_points, eff_min, eff_max)
@@ -380,27 +1361,29 @@ def curve_settings_set(
                 eff_min = excluded.eff_min,
                 eff_max = excluded.eff_max
         """, (acq_id, show_points_i, float(eff_min), float(eff_max)))
-        conn.commit()
 
 
+@perf_trace.traced(cat="db")
 def select_filepath_by_id(acq_id: int) -> Optional[str]:
     with connect() as conn:
         row = conn.execute("SELECT filepath FROM acquisizioni WHERE id=?", (acq_id,)).fetchone()
         return row[0] if row else None
 
 
+@perf_trace.traced(cat="db")
 def delete_acquisizione(acq_id: int) -> None:
     """
     Cancella il record dalla tabella acquisizioni e l'eventuale nota collegata.
     """
-    path = select_filepath_by_id(acq_id)
-    with connect() as conn:
+    with write_transaction() as conn:
+        row = conn.execute("SELECT filepath FROM acquisizioni WHERE id=?", (acq_id,)).fetchone()
+        path = row[0] if row else None
         conn.execute("DELETE FROM acquisizioni WHERE id=?", (acq_id,))
         if path:
             conn.execute("DELETE FROM notes WHERE filepath=?", (path,))
-        conn.commit()
 
 
+@perf_trace.traced(cat="db")
 def update_stato(
     acq_id: int,
     nuovo_stato: str,
@@ -419,47 +1402,131 @@ def update_stato(
     - Se il nuovo stato è "Approved" o "Rejected" e il ruolo è "Ingegneria" o "Admin":
         -> aggiorna anche engineering_user / engineering_at.
     """
-    with connect() as conn:
-        fields = ["stato = ?"]
-        params = [nuovo_stato]
-
-        # Data generica di ultimo cambio stato (per la colonna visibile in lista)
-        if data_approvazione is not None:
-            fields.append("data_approvazione = ?")
-            params.append(data_approvazione)
-        else:
-            fields.append("data_approvazione = NULL")
-
-        # Nome "approvatore" = chi ha fatto l'ultimo cambio di stato
-        if username is not None:
-            fields.append("nome_approvatore = ?")
-            params.append(username)
-
-        now_ts = datetime.now().isoformat(sep=" ", timespec="seconds")
-
-        # Collaudatore che passa a CHECKED
-        if ruolo == "Collaudatore" and nuovo_stato == "Checked" and username is not None:
-            fields.append("checked_by = ?")
-            fields.append("checked_at = ?")
-            params.append(username)
-            params.append(now_ts)
-
-        # Ingegneria (o Admin) che approva o rifiuta
-        if ruolo in ("Ingegneria", "Admin") and nuovo_stato in ("Approved", "Rejected") and username is not None:
-            fields.append("engineering_user = ?")
-            fields.append("engineering_at = ?")
-            params.append(username)
-            params.append(now_ts)
-
-        sql = f"UPDATE acquisizioni SET {', '.join(fields)} WHERE id = ?"
-        params.append(acq_id)
-
-        conn.execute(sql, params)
-        conn.commit()
+    sql, params = _update_stato_sql(nuovo_stato, data_approvazione, username, ruolo)
+    with write_transaction() as conn:
+        conn.execute(sql, params + [acq_id])
+
+
+def _update_stato_sql(nuovo_stato: str, data_approvazione: Optional[str],
+                      username: Optional[str], ruolo: Optional[str]) -> tuple:
+    """UPDATE del cambio stato (regole di update_stato): (sql con 'WHERE id = ?' finale, parametri senza id)."""
+    fields = ["stato = ?"]
+    params = [nuovo_stato]
+
+    # Data generica di ultimo cambio stato (per la colonna visibile in lista)
+    if data_approvazione is not None:
+        fields.append("data_approvazione = ?")
+        params.append(data_approvazione)
+    else:
+        fields.append("data_approvazione = NULL")
+
+    # Nome "approvatore" = chi ha fatto l'ultimo cambio di stato
+    if username is not None:
+        fields.append("nome_approvatore = ?")
+        params.append(username)
+
+    now_ts = datetime.now().isoformat(sep=" ", timespec="seconds")
+
+    # Collaudatore che passa a CHECKED
+    if ruolo == "Collaudatore" and nuovo_stato == "Checked" and username is not None:
+        fields.append("checked_by = ?")
+        fields.append("checked_at = ?")
+        params.append(username)
+        params.append(now_ts)
+
+    # Ingegneria (o Admin) che approva o rifiuta
+    if ruolo in ("Ingegneria", "Admin") and nuovo_stato in ("Approved", "Rejected") and username is not None:
+        fields.append("engineering_user = ?")
+        fields.append("engineering_at = ?")
+        params.append(username)
+        params.append(now_ts)
+
+    return f"UPDATE acquisizioni SET {', '.join(fields)} WHERE id = ?", params
+
+
+def _check_stato_many(conn, ids: list, nuovo_stato: str, ruolo: Optional[str],
+                      expected: Optional[dict]) -> dict:
+    """Controllo di update_stato_many: una query (a blocchi di 500 id) per stato e note."""
+    from stato_rules import transition_error
+
+    res = {"updated": [], "unchanged": [], "rejected": [], "stati": {}}
+    found = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = conn.execute(
+            f"""
+            SELECT a.id, a.stato,
+                   LENGTH(TRIM(COALESCE(n.note_collaudatore, ''))) > 0,
+                   LENGTH(TRIM(COALESCE(n.note_ingegneria, ''))) > 0
+            FROM acquisizioni AS a
+            LEFT JOIN notes AS n ON n.filepath = a.filepath
+            WHERE a.id IN ({', '.join('?' * len(chunk))})
+            """,
+            chunk,
+        ).fetchall()
+        for acq_id, stato, has_coll, has_ing in rows:
+            found.add(acq_id)
+            res["stati"][acq_id] = stato
+            if expected is not None and expected.get(acq_id) != stato:
+                res["rejected"].append((acq_id, "Stato cambiato",
+                                        "Lo stato è stato modificato da un'altra postazione dopo il controllo."))
+                continue
+            if stato == nuovo_stato:
+                res["unchanged"].append(acq_id)
+                continue
+            err = transition_error(ruolo or "", stato or "", nuovo_stato, bool(has_coll), bool(has_ing))
+            if err:
+                res["rejected"].append((acq_id, *err))
+            else:
+                res["updated"].append(acq_id)
+    res["rejected"].extend((i, "Non trovato", "Acquisizione non presente nel DB.") for i in ids if i not in found)
+    return res
+
+
+@perf_trace.traced(cat="db")
+def update_stato_many(
+    acq_ids: Iterable[int],
+    nuovo_stato: str,
+    data_approvazione: Optional[str],
+    username: Optional[str] = None,
+    ruolo: Optional[str] = None,
+    dry_run: bool = False,
+    expected: Optional[dict] = None,
+) -> dict:
+    """
+    Cambio di stato di più acquisizioni in un'unica transazione.
+
+    Stato attuale e presenza delle note di tutte le righe arrivano con una sola
+    query; ogni riga è controllata con stato_rules.transition_error (stesse
+    regole della dashboard) e solo quelle ammesse vengono aggiornate.
+    Con dry_run=True controlla soltanto, su una normale connessione di lettura
+    (nessun lock di scrittura).
+
+    expected: {id: stato} visto al controllo (campo "stati" del dry_run); le
+    righe il cui stato nel frattempo è diverso vengono scartate, non
+    ricontrollate: si scrive solo quello che l'utente ha confermato.
+
+    Ritorna {"updated": [id, ...], "unchanged": [id, ...],
+             "rejected": [(id, titolo, messaggio), ...], "stati": {id: stato}}.
+    """
+    ids = list(dict.fromkeys(acq_ids))
+    if not ids:
+        return {"updated": [], "unchanged": [], "rejected": [], "stati": {}}
+    if dry_run:
+        with connect() as conn:
+            return _check_stato_many(conn, ids, nuovo_stato, ruolo, expected)
+
+    sql, params = _update_stato_sql(nuovo_stato, data_approvazione, username, ruolo)
+    with write_transaction() as conn:
+        res = _check_stato_many(conn, ids, nuovo_stato, ruolo, expected)
+        if res["updated"]:
+            conn.executemany(sql, [params + [acq_id] for acq_id in res["updated"]])
+    return res
 
 
 # ================== NOTE ==================
 
+@perf_trace.traced(cat="db")
 def note_collaudatore_get(filepath: str) -> str:
     """
     Ritorna la nota del collaudatore per il file indicato.
@@ -472,21 +1539,22 @@ def note_collaudatore_get(filepath: str) -> str:
         return row[0] if row and row[0] else ""
 
 
+@perf_trace.traced(cat="db")
 def note_collaudatore_set(filepath: str, note: str) -> None:
     """
     Imposta la nota del collaudatore (note_collaudatore).
     Se la riga non esiste, la crea.
     """
-    with connect() as conn:
+    with write_transaction() as conn:
         conn.execute("""
             INSERT INTO notes(filepath, note_collaudatore)
             VALUES(?, ?)
             ON CONFLICT(filepath) DO UPDATE SET
                 note_collaudatore = excluded.note_collaudatore
         """, (filepath, note))
-        conn.commit()
 
 
+@perf_trace.traced(cat="db")
 def note_ingegneria_get(filepath: str) -> str:
     """
     Ritorna la nota di ingegneria per il file indicato.
@@ -499,17 +1567,17 @@ def note_ingegneria_get(filepath: str) -> str:
         return row[0] if row and row[0] else ""
 
 
+@perf_trace.traced(cat="db")
 def note_ingegneria_set(filepath: str, note: str) -> None:
     """
     Imposta la nota di ingegneria (note_ingegneria).
     Se la riga non esiste, la crea.
     """
-    with connect() as conn:
+    with write_transaction() as conn:
         conn.execute("""
             INSERT INTO notes(filepath, note_ingegneria)
             VALUES(?, ?)
             ON CONFLICT(filepath) DO UPDATE SET
                 note_ingegneria = excluded.note_ingegneria
         """, (filepath, note))
-        conn.commit()
 
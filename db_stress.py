@@ -0,0 +1,192 @@
+"""
+Prova di carico delle scritture concorrenti su un unico file DB (più
+postazioni che cambiano stato e note nello stesso momento).
+
+N processi scrittori ripetono per --seconds secondi la transazione tipica
+della dashboard (lettura stato e nota, UPDATE dello stato, scrittura della nota)
+e alla fine si stampano throughput, errori "database is locked" e latenze
+(totale dell'operazione e attesa del lock di scrittura).
+
+    python db_stress.py --writers 8 --seconds 10
+    python db_stress.py --writers 8 --mode deferred           (transazioni come prima)
+    python db_stress.py --db //server/collaudi/stress.db --busy-timeout 15000
+
+Senza --db lavora su un file temporaneo; un --db esistente NON viene toccato
+(serve un file nuovo o inesistente).
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+
+import db
+
+N_ROWS = 200
+STATI = ("Unchecked", "Checked", "Approved", "Rejected")
+
+
+def _prepare(path: str, settings: dict) -> None:
+    db.set_db_path(path)
+    db.configure_concurrency(**settings)
+    db.init()
+    with db.write_transaction() as conn:
+        if conn.execute("SELECT COUNT(*) FROM acquisizioni").fetchone()[0]:
+            return
+        conn.executemany(
+            "INSERT INTO acquisizioni (job, n_collaudo, matricola, tipo_pompa, data, stato, tipo_test, "
+            "filepath, filename, data_file, ora_file, progressivo) "
+            "VALUES (?, ?, ?, 'STRESS', '2026-01-01', 'Unchecked', 'PERFORMANCE', ?, ?, '20260101', '120000', ?)",
+            [(f"J{i % 10}", f"C{i:04d}", f"M{i:04d}", f"/stress/{i}.tdms", f"{i}.tdms", i) for i in range(N_ROWS)],
+        )
+
+
+def _op_body(conn, acq_id: int, writer: int) -> None:
+    row = conn.execute("SELECT stato, filepath FROM acquisizioni WHERE id = ?", (acq_id,)).fetchone()
+    if not row:
+        return
+    stato, filepath = row
+    conn.execute("SELECT note_ingegneria FROM notes WHERE filepath = ?", (filepath,)).fetchone()
+    conn.execute(
+        "UPDATE acquisizioni SET stato = ?, data_approvazione = date('now'), nome_approvatore = ? WHERE id = ?",
+        (random.choice([s for s in STATI if s != stato]), f"writer{writer}", acq_id),
+    )
+    conn.execute(
+        "INSERT INTO notes(filepath, note_ingegneria) VALUES(?, ?) "
+        "ON CONFLICT(filepath) DO UPDATE SET note_ingegneria = excluded.note_ingegneria",
+        (filepath, f"stress {writer} {time.time():.6f}"),
+    )
+
+
+def _op_immediate(acq_id: int, writer: int) -> float:
+    """db.write_transaction (BEGIN IMMEDIATE + retry). Ritorna l'attesa del lock in secondi."""
+    t0 = time.perf_counter()
+    with db.write_transaction() as conn:
+        wait = time.perf_counter() - t0
+        _op_body(conn, acq_id, writer)
+    return wait
+
+
+def _op_deferred(acq_id: int, writer: int) -> float:
+    """Transazione DEFERRED (lettura poi scrittura): il lock si chiede solo all'UPDATE."""
+    conn = db.connect()
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN")
+        t0 = time.perf_counter()
+        try:
+            _op_body(conn, acq_id, writer)
+            wait = time.perf_counter() - t0
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return wait
+    finally:
+        conn.close()
+
+
+def _writer(args: tuple) -> dict:
+    path, writer, mode, seconds, start_at, settings = args
+    db.set_db_path(path)
+    db.configure_concurrency(**settings)
+    op = _op_immediate if mode == "immediate" else _op_deferred
+    rnd = random.Random(writer)
+    lat, waits, errors = [], [], 0
+    time.sleep(max(0.0, start_at - time.time()))
+    end = time.time() + seconds
+    while time.time() < end:
+        t0 = time.perf_counter()
+        try:
+            waits.append(op(rnd.randint(1, N_ROWS), writer))
+            lat.append(time.perf_counter() - t0)
+        except Exception as e:
+            if not db._is_busy(e):
+                raise
+            errors += 1
+    return {"lat": lat, "waits": waits, "errors": errors}
+
+
+def _pct(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def run(path: str, writers: int = 4, seconds: float = 5.0, mode: str = "immediate", **settings) -> dict:
+    """Esegue la prova e ritorna il riepilogo (ops, ops_s, errori, latenze in ms)."""
+    _prepare(path, settings)
+    start_at = time.time() + 1.0
+    tasks = [(path, w, mode, seconds, start_at, settings) for w in range(writers)]
+    with multiprocessing.Pool(writers) as pool:
+        results = pool.map(_writer, tasks)
+
+    lat = [x for r in results for x in r["lat"]]
+    waits = [x for r in results for x in r["waits"]]
+    ms = lambda v: round(v * 1000.0, 2)
+    return {
+        "mode": mode,
+        "writers": writers,
+        "seconds": seconds,
+        "settings": db.configure_concurrency(**settings),
+        "ops": len(lat),
+        "ops_s": round(len(lat) / seconds, 1),
+        "errors": sum(r["errors"] for r in results),
+        "latency_ms": {"p50": ms(_pct(lat, 50)), "p95": ms(_pct(lat, 95)),
+                       "p99": ms(_pct(lat, 99)), "max": ms(max(lat, default=0.0))},
+        "lock_wait_ms": {"p50": ms(_pct(waits, 50)), "p95": ms(_pct(waits, 95)),
+                         "p99": ms(_pct(waits, 99)), "max": ms(max(waits, default=0.0))},
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Prova di carico delle scritture concorrenti sul DB PT2025")
+    ap.add_argument("--db", help="file DB di prova (nuovo); default: file temporaneo")
+    ap.add_argument("--writers", type=int, default=4, help="processi scrittori (default: 4)")
+    ap.add_argument("--seconds", type=float, default=5.0, help="durata della prova (default: 5)")
+    ap.add_argument("--mode", choices=("immediate", "deferred"), default="immediate",
+                    help="immediate = write_transaction; deferred = transazioni come prima")
+    ap.add_argument("--busy-timeout", type=int, default=None, help="busy_timeout in ms")
+    ap.add_argument("--retries", type=int, default=None, help="tentativi di BEGIN IMMEDIATE")
+    ap.add_argument("--journal-mode", default=None, help="WAL (default) o DELETE")
+    ap.add_argument("--json", action="store_true", help="riepilogo in JSON")
+    args = ap.parse_args(argv)
+
+    tmpdir = None
+    path = args.db
+    if not path:
+        tmpdir = tempfile.mkdtemp(prefix="pt2025_stress_")
+        path = os.path.join(tmpdir, "stress.db")
+    elif os.path.exists(path):
+        ap.error(f"{path} esiste già: indicare un file DB nuovo")
+
+    res = run(path, args.writers, args.seconds, args.mode,
+              busy_timeout_ms=args.busy_timeout, write_retries=args.retries,
+              journal_mode=args.journal_mode.upper() if args.journal_mode else None)
+
+    if args.json:
+        print(json.dumps(res))
+    else:
+        s = res["settings"]
+        print(f"Modo: {res['mode']}  scrittori: {res['writers']}  durata: {res['seconds']} s  "
+              f"(busy_timeout {s['busy_timeout_ms']} ms, retry {s['write_retries']}, {s['journal_mode']})")
+        print(f"Operazioni: {res['ops']}  ({res['ops_s']}/s)  errori 'locked': {res['errors']}")
+        for label, key in (("Latenza", "latency_ms"), ("Attesa lock", "lock_wait_ms")):
+            v = res[key]
+            print(f"{label:12s} p50 {v['p50']:8.2f} ms  p95 {v['p95']:8.2f} ms  "
+                  f"p99 {v['p99']:8.2f} ms  max {v['max']:8.2f} ms")
+
+    if tmpdir:
+        import shutil
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 1 if res["errors"] else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Impronta del contenuto dei file TDMS, per riconoscere all'import lo stesso
+file copiato su un'altra share (UNIQUE(filepath, tipo_test) vede solo il percorso).
+
+Impronta veloce (sempre, all'import): dimensione + BLAKE2 del primo e
+dell'ultimo blocco. Il primo blocco contiene il lead-in TDMS ("TDSm", versione,
+offset del segmento) e i metadati del primo segmento, con data/ora di acquisizione.
+Due letture da BLOCK_SIZE byte, qualunque sia la dimensione del file.
+
+Hash completo (BLAKE2 di tutto il file, opzionale): conferma i duplicati
+trovati con l'impronta veloce; all'import dalla dashboard viene calcolato
+in background con
+    config.ini
+        [Ingest]
+        full_hash = 1
+
+Backfill delle acquisizioni già presenti:
+    python -m pt2025 backfill fingerprint
+    python -m pt2025 --db D:/dati/collaudi.db backfill fingerprint --full
+"""
+import os
+import hashlib
+
+import db
+
+BLOCK_SIZE = 64 * 1024
+_CHUNK = 1024 * 1024
+
+
+def quick_fingerprint(filepath: str) -> str:
+    """'<dimensione>:<blake2b 128 bit di primo+ultimo blocco>'."""
+    size = os.path.getsize(filepath)
+    h = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        head = f.read(BLOCK_SIZE)
+        h.update(head)
+        if size > BLOCK_SIZE:
+            f.seek(max(BLOCK_SIZE, size - BLOCK_SIZE))
+            h.update(f.read(BLOCK_SIZE))
+    return f"{size}:{h.hexdigest()}"
+
+
+def full_hash(filepath: str) -> str:
+    """BLAKE2b (256 bit) dell'intero file, letto a blocchi."""
+    h = hashlib.blake2b(digest_size=32)
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def full_hash_enabled() -> bool:
+    """True se config.ini chiede l'hash completo all'import ([Ingest] full_hash)."""
+    try:
+        from config_manager import load_config
+        cfg = load_config()
+        return cfg.getboolean("Ingest", "full_hash", fallback=False)
+    except Exception:
+        return False
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def find_duplicate(filepath: str, fingerprint: str, content_hash: str = "") -> str:
+    """
+    Percorso di un'acquisizione già nel DB con lo stesso contenuto, "" se non c'è.
+
+    L'impronta veloce basta quasi sempre (lookup sull'indice, nessuna lettura
+    in più); solo se coincide e il file già importato è raggiungibile si
+    confronta l'hash completo, calcolato al bisogno e salvato.
+    """
+    for other, other_hash in db.select_by_fingerprint(fingerprint):
+        if _same_file(other, filepath):
+            continue
+        if not os.path.exists(other):
+            return other
+        try:
+            if not other_hash:
+                other_hash = full_hash(other)
+                db.set_content_hash(other, other_hash)
+            if not content_hash:
+                content_hash = full_hash(filepath)
+        except OSError:
+            return other
+        if other_hash == content_hash:
+            return other
+    return ""
+
+
+def store_full_hash(filepath: str) -> bool:
+    """Calcola e salva l'hash completo. False se il file non c'è."""
+    if not (filepath and os.path.exists(filepath)):
+        return False
+    db.set_content_hash(filepath, full_hash(filepath))
+    return True
+
+
+def backfill(full: bool = False, progress=None) -> dict:
+    """
+    Calcola l'impronta veloce (e con full=True l'hash completo) dei file che non l'hanno.
+    progress(done, total, filepath, ok) viene chiamata dopo ogni file.
+    """
+    res = {"ok": [], "missing": []}
+    paths = db.select_filepaths_without_fingerprint()
+    if full:
+        paths = list(dict.fromkeys(paths + db.select_filepaths_without_content_hash()))
+    for i, path in enumerate(paths, start=1):
+        ok = bool(path) and os.path.exists(path)
+        if ok:
+            db.set_fingerprint(path, quick_fingerprint(path))
+            if full:
+                store_full_hash(path)
+        res["ok" if ok else "missing"].append(path)
+        if progress:
+            progress(i, len(paths), path, ok)
+    return res
@@ -0,0 +1,252 @@
+"""
+Import dei file TDMS nel DB, senza interfaccia grafica.
+
+Usato dalla dashboard (Load TDMS, un file) e dalla riga di comando
+(python -m pt2025 ingest <cartella>, tanti file in parallelo).
+
+La lettura del TDMS (scan_tdms) è separata dalla scrittura sul DB
+(store_scanned): i worker leggono, il processo principale scrive.
+
+Lo stesso file copiato in un'altra cartella viene riconosciuto dall'impronta
+del contenuto (fingerprint.py) e rifiutato con DuplicateTdmsError.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import db
+from tdms_reader import read_tdms_fields, detect_test_types, read_contract_and_loop_data
+import perf_points
+import fingerprint
+
+TDMS_PATTERN = re.compile(
+    r'^DATA-REC_(?P<commessa>[A-Z0-9]+)_(?P<matricola>[A-Z0-9]+)_(?P<data>\d{8})-(?P<ora>\d{6})_(?P<progressivo>\d{5})\.tdms$'
+)
+
+
+class DuplicateTdmsError(Exception):
+    """Il contenuto del TDMS è già in archivio con un altro percorso (existing)."""
+
+    def __init__(self, filepath: str, existing: str):
+        super().__init__(f"{filepath} è una copia di {existing}")
+        self.filepath = filepath
+        self.existing = existing
+
+
+def parse_tdms_name(fname: str):
+    m = TDMS_PATTERN.fullmatch(fname)
+    if not m:
+        return None
+    commessa  = m.group("commessa")
+    matricola = m.group("matricola")
+    data_raw  = m.group("data")
+    ora_raw   = m.group("ora")
+    prog_raw  = m.group("progressivo")
+    data_iso  = f"{data_raw[0:4]}-{data_raw[4:6]}-{data_raw[6:8]}"
+    prog_int  = int(prog_raw)
+    return {
+        "job": commessa,
+        "matricola": matricola,
+        "data_file": data_raw,
+        "ora_file": ora_raw,
+        "data_iso": data_iso,
+        "progressivo": prog_int,
+    }
+
+
+def scan_tdms(filepath: str, with_points: bool = False, with_hash: bool = False) -> dict:
+    """
+    Legge dal TDMS tutto quello che serve all'import (nessun accesso al DB):
+    {"n_collaudo", "tipo_pompa", "test_types", "contract", "perf": {tipo_test: tabelle},
+     "fingerprint", "content_hash"}
+    contract è None se la lettura fallisce; perf è vuoto se with_points=False;
+    content_hash è "" se with_hash=False.
+    """
+    fp = fingerprint.quick_fingerprint(filepath)
+    content_hash = fingerprint.full_hash(filepath) if with_hash else ""
+    tdms_vals = read_tdms_fields(filepath)
+
+    # Un file TDMS può contenere più tipi di test (PERFORMANCE, NPSH, RUNNING);
+    # se non ne trova nessuno usa un fallback (probabilmente PERFORMANCE)
+    test_types = detect_test_types(filepath) or ["PERFORMANCE"]
+
+    try:
+        contract = read_contract_and_loop_data(filepath)
+    except Exception:
+        contract = None
+
+    perf = {}
+    if with_points:
+        for test_type in test_types:
+            try:
+                perf[test_type] = perf_points.read_tables(filepath, test_type)
+            except Exception:
+                pass
+
+    return {
+        "n_collaudo": tdms_vals.get("n_collaudo", ""),
+        "tipo_pompa": tdms_vals.get("tipo_pompa", ""),
+        "test_types": list(test_types),
+        "contract": contract,
+        "perf": perf,
+        "fingerprint": fp,
+        "content_hash": content_hash,
+    }
+
+
+def store_scanned(rec: dict, scan: dict, allow_duplicate: bool = False) -> list:
+    """
+    Scrive nel DB un TDMS letto con scan_tdms: un record per tipo di test,
+    campi contrattuali e (se letti) punti di performance.
+    Ritorna [(acq_id, tipo_test), ...].
+
+    DuplicateTdmsError se lo stesso contenuto è già in archivio con un altro
+    percorso (salvo allow_duplicate=True).
+    """
+    fp = scan.get("fingerprint", "")
+    if fp and not allow_duplicate:
+        existing = fingerprint.find_duplicate(rec["filepath"], fp, scan.get("content_hash", ""))
+        if existing:
+            raise DuplicateTdmsError(rec["filepath"], existing)
+
+    inserted = []
+    for test_type in scan["test_types"]:
+        to_insert = {
+            **rec,
+            "fingerprint": fp,
+            "n_collaudo": scan["n_collaudo"],
+            "tipo_pompa": scan["tipo_pompa"],
+            "tipo_test": test_type,  # Imposta il tipo di test
+            "stato": "Unchecked",
+        }
+        inserted.append((db.insert_acquisizione(to_insert), test_type))
+
+    # Campi contrattuali nel DB (ricerca/ordinamento in SQL); se fallisce
+    # la riga resta da indicizzare e la recupera `python -m pt2025 backfill contract`
+    if scan.get("contract") is not None:
+        try:
+            db.set_contract_fields(rec["filepath"], scan["contract"])
+        except Exception:
+            pass
+
+    for acq_id, test_type in inserted:
+        if test_type in scan.get("perf", {}):
+            try:
+                db.set_perf_points(acq_id, scan["perf"][test_type])
+            except Exception:
+                pass
+
+    if scan.get("content_hash"):
+        try:
+            db.set_content_hash(rec["filepath"], scan["content_hash"])
+        except Exception:
+            pass
+    return inserted
+
+
+def ingest_one_record(rec: dict, allow_duplicate: bool = False):
+    """
+    Inserisce uno o più record nella dashboard in base ai tipi di test presenti nel TDMS.
+
+    Un file TDMS può contenere più tipi di test (PERFORMANCE, NPSH, RUNNING).
+    Viene creato un record separato per ogni tipo di test trovato.
+    I punti di performance vanno in perf_points solo con [Ingest] perf_points in config.ini;
+    con [Ingest] full_hash l'hash completo del file viene calcolato in un thread a parte.
+    """
+    inserted = store_scanned(rec, scan_tdms(rec["filepath"], with_points=perf_points.enabled()),
+                             allow_duplicate=allow_duplicate)
+    if inserted and fingerprint.full_hash_enabled():
+        import threading
+        threading.Thread(target=_store_full_hash_quietly, args=(rec["filepath"],), daemon=True).start()
+    return inserted
+
+
+def _store_full_hash_quietly(filepath: str) -> None:
+    try:
+        fingerprint.store_full_hash(filepath)
+    except Exception:
+        pass
+
+
+# -------------------- Import di una cartella --------------------
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def find_new_tdms(folder: str, recursive: bool = True) -> list:
+    """File TDMS con nome valido sotto folder e non ancora presenti nel DB."""
+    known = {_norm(p) for p in db.select_all_filepaths()}
+    found = []
+    for root, dirs, files in os.walk(folder):
+        for fname in sorted(files):
+            if parse_tdms_name(fname) and _norm(os.path.join(root, fname)) not in known:
+                found.append(os.path.join(root, fname))
+        if not recursive:
+            break
+        dirs.sort()
+    return found
+
+
+def _scan_worker(filepath: str, with_points: bool, with_hash: bool) -> tuple:
+    """Gira nel worker: (filepath, scan, errore)."""
+    try:
+        return filepath, scan_tdms(filepath, with_points=with_points, with_hash=with_hash), ""
+    except Exception as e:
+        return filepath, None, f"{type(e).__name__}: {e}"
+
+
+def ingest_folder(folder: str, *, created_by: str = "", workers: int = None,
+                  recursive: bool = True, with_points: bool = None, with_hash: bool = None,
+                  progress=None) -> dict:
+    """
+    Importa tutti i TDMS nuovi di una cartella. La lettura gira su più processi,
+    le scritture sul DB restano nel processo chiamante.
+
+    progress: callback opzionale progress(fatti, totale, filepath, errore).
+    Ritorna {"ok": [filepath, ...], "failed": [(filepath, errore), ...],
+             "duplicates": [(filepath, percorso già in archivio), ...]}.
+    """
+    if with_points is None:
+        with_points = perf_points.enabled()
+    if with_hash is None:
+        with_hash = fingerprint.full_hash_enabled()
+    paths = find_new_tdms(folder, recursive=recursive)
+    result = {"ok": [], "failed": [], "duplicates": []}
+    total = len(paths)
+    if not paths:
+        return result
+
+    def _store(done, filepath, scan, err):
+        bucket = "failed"
+        if not err:
+            fname = os.path.basename(filepath)
+            rec = {**parse_tdms_name(fname), "filepath": filepath, "filename": fname,
+                   "created_by": created_by}
+            try:
+                store_scanned(rec, scan)
+            except DuplicateTdmsError as e:
+                bucket, err = "duplicates", f"duplicato di {e.existing}"
+                result["duplicates"].append((filepath, e.existing))
+            except Exception as e:
+                err = f"{type(e).__name__}: {e}"
+        if not err:
+            result["ok"].append(filepath)
+        elif bucket == "failed":
+            result["failed"].append((filepath, err))
+        if progress:
+            try:
+                progress(done, total, filepath, err)
+            except Exception:
+                pass
+
+    max_workers = max(1, min(workers or os.cpu_count() or 1, total))
+    if max_workers == 1:
+        for done, filepath in enumerate(paths, start=1):
+            _store(done, *_scan_worker(filepath, with_points, with_hash))
+        return result
+
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        futures = [ex.submit(_scan_worker, p, with_points, with_hash) for p in paths]
+        for done, fut in enumerate(as_completed(futures), start=1):
+            _store(done, *fut.result())
+    return result
@@ -0,0 +1,57 @@
+"""
+Import differiti per i sottosistemi pesanti (nptdms, numpy, reportlab, matplotlib, PIL).
+
+    np = lazy_import("numpy")      # nessun costo qui
+    ...
+    np.asarray(x)                  # il vero import avviene al primo attributo usato
+
+Se il pacchetto non è installato lazy_import solleva ImportError subito (come un
+import normale), così i flag tipo NUMPY_OK restano affidabili. Il caricamento
+vero è protetto da un lock: il primo accesso può arrivare da un thread di
+background (es. prefetch TDMS).
+
+Controllo tempi di avvio (login/dashboard entro il budget e senza HEAVY_MODULES):
+    python -m pytest -q test_lazy_import.py
+"""
+import sys
+import importlib
+import importlib.util
+import threading
+
+HEAVY_MODULES = ("reportlab", "matplotlib", "nptdms", "numpy", "PIL")
+
+
+class _DeferredModule:
+    """Segnaposto di un modulo: lo importa al primo accesso a un attributo."""
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self.__dict__["_module"] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._module or self._load(), attr)
+
+    def __repr__(self):
+        state = "caricato" if self._module is not None else "differito"
+        return f"<modulo {self._name!r} ({state})>"
+
+
+def lazy_import(name: str):
+    """
+    Ritorna il modulo `name` se già importato, altrimenti un segnaposto che
+    lo importa al primo uso. ImportError se il modulo non esiste.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if importlib.util.find_spec(name) is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    return _DeferredModule(name)
+
@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-from PIL import Image, ImageTk
 import os
+import multiprocessing
 
+import perf_trace  # per primo: il trace misura i tempi dall'avvio
 import dashboard
 import db
 import icon_helper  # Per l'icona PT2025.ico
@@ -226,13 +227,11 @@ def apri_finestra_crea_utente():
             return
 
         try:
-            with db.connect() as conn:
-                cursor = conn.cursor()
-                cursor.execute(
+            with db.write_transaction() as conn:
+                conn.execute(
                     "INSERT INTO Utenti (Username, Password, Ruolo) VALUES (?, ?, ?)",
                     (new_user, new_pwd, new_role)
                 )
-                conn.commit()
             messagebox.showinfo("Successo", f"Utente '{new_user}' creato!")
             win.destroy()
         except Exception as e:
@@ -287,10 +286,8 @@ def apri_finestra_elimina_utente():
         if not confirm:
             return
 
-        with db.connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM Utenti WHERE Username = ?", (user_to_delete,))
-            conn.commit()
+        with db.write_transaction() as conn:
+            conn.execute("DELETE FROM Utenti WHERE Username = ?", (user_to_delete,))
 
         messagebox.showinfo("Successo", f"Utente '{user_to_delete}' eliminato.")
         win.destroy()
@@ -374,13 +371,11 @@ def password_dimenticata():
             return
 
         username = entry_user_reset.get()
-        with db.connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
+        with db.write_transaction() as conn:
+            conn.execute(
                 "UPDATE Utenti SET Password = ? WHERE Username = ?",
                 (nuova_pwd, username)
             )
-            conn.commit()
 
         messagebox.showinfo("Successo", "Password aggiornata con successo!")
         win_reset.destroy()
@@ -431,268 +426,275 @@ def centra_finestra(win):
 
 
 # === Interfaccia principale ===
-root = tk.Tk()
-root.title("Login Flowserve PT2025")
-root.geometry("400x600")
-root.configure(bg="#d91e18")
-root.resizable(False, False)
-
-# Imposta l'icona della finestra
-icon_helper.set_window_icon(root)
-
-# Carica il logo (funziona sia in sviluppo che nell'eseguibile)
-logo_path = icon_helper.get_resource_path("logo.png")
-if logo_path:
-    logo_img = Image.open(logo_path)
-    logo_img.thumbnail((250, 250))
-    logo_photo = ImageTk.PhotoImage(logo_img)
-    
-    label_logo = tk.Label(root, image=logo_photo, bg="#d91e18")
-    label_logo.pack(pady=10)
-else:
-    # Fallback se logo non trovato
-    label_logo = tk.Label(root, text="PT2025", font=("Calibri", 32, "bold"), 
-                         bg="#d91e18", fg="white")
+# Protetta da __main__: i processi del pool PDF (spawn su Windows / PyInstaller)
+# reimportano il modulo principale e NON devono aprire la finestra di login.
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
+    root = tk.Tk()
+    root.title("Login Flowserve PT2025")
+    root.geometry("400x600")
+    root.configure(bg="#d91e18")
+    root.resizable(False, False)
+
+    # Imposta l'icona della finestra
+    icon_helper.set_window_icon(root)
+
+    # Carica il logo (funziona sia in sviluppo che nell'eseguibile)
+    logo_path = icon_helper.get_resource_path("logo.png")
+    if logo_path:
+        from PIL import Image, ImageTk
+        logo_img = Image.open(logo_path)
+        logo_img.thumbnail((250, 250))
+        logo_photo = ImageTk.PhotoImage(logo_img)
+
+        label_logo = tk.Label(root, image=logo_photo, bg="#d91e18")
+        label_logo.pack(pady=10)
+    else:
+        # Fallback se logo non trovato
+        label_logo = tk.Label(root, text="PT2025", font=("Calibri", 32, "bold"), 
+                             bg="#d91e18", fg="white")
+        label_logo.pack(pady=10)
+
     label_logo.pack(pady=10)
 
-label_logo.pack(pady=10)
-
-label_benvenuto = tk.Label(
-    root,
-    text="Benvenuto in PT2025",
-    font=("Calibri", 20, "bold"),
-    bg="#d91e18",
-    fg="white"
-)
-label_benvenuto.pack(pady=10)
-
-frame_login = tk.Frame(root, bg="#F2F2F2", padx=20, pady=20)
-frame_login.pack(pady=10)
-
-entry_username = tk.Entry(frame_login, width=25, font=("Helvetica", 12))
-entry_username.insert(0, "Nome utente")
-entry_username.pack(pady=5)
-
-entry_password = tk.Entry(frame_login, width=25, font=("Helvetica", 12))
-entry_password.insert(0, "Password")
-entry_password.pack(pady=5)
-
-
-def on_entry_click_username(event):
-    if entry_username.get() == "Nome utente":
-        entry_username.delete(0, tk.END)
-
-
-def on_focusout_username(event):
-    if entry_username.get() == "":
-        entry_username.insert(0, "Nome utente")
-
-
-def on_entry_click_password(event):
-    if entry_password.get() == "Password":
-        entry_password.delete(0, tk.END)
-        entry_password.config(show="*")
-
-
-def on_focusout_password(event):
-    if entry_password.get() == "":
-        entry_password.insert(0, "Password")
-        entry_password.config(show="")
-
-
-entry_username.bind("<FocusIn>", on_entry_click_username)
-entry_username.bind("<FocusOut>", on_focusout_username)
-
-entry_password.bind("<FocusIn>", on_entry_click_password)
-entry_password.bind("<FocusOut>", on_focusout_password)
-entry_password.bind("<Return>", lambda e: login())  # Enter per login
-
-btn_login = tk.Button(
-    frame_login,
-    text="Accedi",
-    command=login,
-    bg="#1a73e8",
-    fg="white",
-    width=20,
-    font=("Helvetica", 12, "bold")
-)
-btn_login.pack(pady=10)
-
-# Anche username può inviare con Enter
-entry_username.bind("<Return>", lambda e: login())
-
-link_pwd = tk.Label(
-    frame_login,
-    text="Password dimenticata?",
-    fg="#1a73e8",
-    bg="#F2F2F2",
-    cursor="hand2",
-    font=("Helvetica", 10, "underline")
-)
-link_pwd.pack()
-link_pwd.bind("<Button-1>", lambda e: password_dimenticata())
-
-label_db = tk.Label(
-    root,
-    text=f"Database: {db_path}",
-    height=2,
-    bg="#d91e18",
-    fg="white",
-    wraplength=350
-)
-label_db.pack(pady=10)
-
-btn_db = tk.Button(
-    root,
-    text="Cambia DB",
-    command=cambia_db,
-    width=20,
-    font=("Helvetica", 10, "bold")
-)
-btn_db.pack(pady=5)
-
-def crea_database_nuovo():
-    """Crea un database nuovo con lo schema completo (richiede password admin)."""
-    global db_path
-    
-    # PRIMA verifica password admin (stesso layout di "Crea Nuovo Utente")
-    pwd_win = crea_finestra_figlia("Verifica amministratore", 350, 220)
-    pwd_win.lift()  # Porta in primo piano
-    
-    tk.Label(
-        pwd_win,
-        text="Password amministratore",
+    label_benvenuto = tk.Label(
+        root,
+        text="Benvenuto in PT2025",
+        font=("Calibri", 20, "bold"),
         bg="#d91e18",
+        fg="white"
+    )
+    label_benvenuto.pack(pady=10)
+
+    frame_login = tk.Frame(root, bg="#F2F2F2", padx=20, pady=20)
+    frame_login.pack(pady=10)
+
+    entry_username = tk.Entry(frame_login, width=25, font=("Helvetica", 12))
+    entry_username.insert(0, "Nome utente")
+    entry_username.pack(pady=5)
+
+    entry_password = tk.Entry(frame_login, width=25, font=("Helvetica", 12))
+    entry_password.insert(0, "Password")
+    entry_password.pack(pady=5)
+
+
+    def on_entry_click_username(event):
+        if entry_username.get() == "Nome utente":
+            entry_username.delete(0, tk.END)
+
+
+    def on_focusout_username(event):
+        if entry_username.get() == "":
+            entry_username.insert(0, "Nome utente")
+
+
+    def on_entry_click_password(event):
+        if entry_password.get() == "Password":
+            entry_password.delete(0, tk.END)
+            entry_password.config(show="*")
+
+
+    def on_focusout_password(event):
+        if entry_password.get() == "":
+            entry_password.insert(0, "Password")
+            entry_password.config(show="")
+
+
+    entry_username.bind("<FocusIn>", on_entry_click_username)
+    entry_username.bind("<FocusOut>", on_focusout_username)
+
+    entry_password.bind("<FocusIn>", on_entry_click_password)
+    entry_password.bind("<FocusOut>", on_focusout_password)
+    entry_password.bind("<Return>", lambda e: login())  # Enter per login
+
+    btn_login = tk.Button(
+        frame_login,
+        text="Accedi",
+        command=login,
+        bg="#1a73e8",
         fg="white",
+        width=20,
         font=("Helvetica", 12, "bold")
-    ).pack(pady=10)
-    
-    frame = tk.Frame(pwd_win, bg="#F2F2F2", padx=20, pady=20)
-    frame.pack(pady=5)
-    
-    entry_pwd = tk.Entry(frame, show="*")
-    entry_pwd.pack()
-    entry_pwd.focus()
-    
-    def verifica_e_procedi():
-        pwd_admin = entry_pwd.get()
-        with db.connect() as conn:
-            cursor = conn.cursor()
-            try:
-                cursor.execute(
-                    "SELECT * FROM Utenti WHERE Ruolo = 'Admin' AND Password = ?",
-                    (pwd_admin,)
-                )
-                row = cursor.fetchone()
-            except Exception:
-                row = None
-        
-        if not row:
-            messagebox.showerror("Errore", "Password amministratore errata!")
-            return
-        
-        # Password corretta, chiudi finestra password e procedi
-        pwd_win.destroy()
-        
-        # Ora chiedi dove salvare il nuovo DB
-        path = filedialog.asksaveasfilename(
-            title="Crea nuovo database",
-            defaultextension=".db",
-            initialfile="collaudi.db",
-            filetypes=[("SQLite DB", "*.db")]
-        )
-        if not path:
-            return
-        
-        # Conferma se il file esiste già
-        if os.path.exists(path):
-            conferma = messagebox.askyesno(
-                "File esistente",
-                f"Il file '{os.path.basename(path)}' esiste già.\n\n"
-                "Sovrascriverlo con un database vuoto?\n"
-                "⚠️ ATTENZIONE: Tutti i dati esistenti verranno persi!"
+    )
+    btn_login.pack(pady=10)
+
+    # Anche username può inviare con Enter
+    entry_username.bind("<Return>", lambda e: login())
+
+    link_pwd = tk.Label(
+        frame_login,
+        text="Password dimenticata?",
+        fg="#1a73e8",
+        bg="#F2F2F2",
+        cursor="hand2",
+        font=("Helvetica", 10, "underline")
+    )
+    link_pwd.pack()
+    link_pwd.bind("<Button-1>", lambda e: password_dimenticata())
+
+    label_db = tk.Label(
+        root,
+        text=f"Database: {db_path}",
+        height=2,
+        bg="#d91e18",
+        fg="white",
+        wraplength=350
+    )
+    label_db.pack(pady=10)
+
+    btn_db = tk.Button(
+        root,
+        text="Cambia DB",
+        command=cambia_db,
+        width=20,
+        font=("Helvetica", 10, "bold")
+    )
+    btn_db.pack(pady=5)
+
+    def crea_database_nuovo():
+        """Crea un database nuovo con lo schema completo (richiede password admin)."""
+        global db_path
+
+        # PRIMA verifica password admin (stesso layout di "Crea Nuovo Utente")
+        pwd_win = crea_finestra_figlia("Verifica amministratore", 350, 220)
+        pwd_win.lift()  # Porta in primo piano
+
+        tk.Label(
+            pwd_win,
+            text="Password amministratore",
+            bg="#d91e18",
+            fg="white",
+            font=("Helvetica", 12, "bold")
+        ).pack(pady=10)
+
+        frame = tk.Frame(pwd_win, bg="#F2F2F2", padx=20, pady=20)
+        frame.pack(pady=5)
+
+        entry_pwd = tk.Entry(frame, show="*")
+        entry_pwd.pack()
+        entry_pwd.focus()
+
+        def verifica_e_procedi():
+            pwd_admin = entry_pwd.get()
+            with db.connect() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(
+                        "SELECT * FROM Utenti WHERE Ruolo = 'Admin' AND Password = ?",
+                        (pwd_admin,)
+                    )
+                    row = cursor.fetchone()
+                except Exception:
+                    row = None
+
+            if not row:
+                messagebox.showerror("Errore", "Password amministratore errata!")
+                return
+
+            # Password corretta, chiudi finestra password e procedi
+            pwd_win.destroy()
+
+            # Ora chiedi dove salvare il nuovo DB
+            path = filedialog.asksaveasfilename(
+                title="Crea nuovo database",
+                defaultextension=".db",
+                initialfile="collaudi.db",
+                filetypes=[("SQLite DB", "*.db")]
             )
-            if not conferma:
+            if not path:
                 return
-        
-        # Crea il database usando lo script create_fresh_db
-        try:
-            from create_fresh_db import create_database
-            success = create_database(path, make_backup=True)
-            
-            if success:
-                messagebox.showinfo(
-                    "Database creato",
-                    f"Database creato con successo:\n{path}\n\n"
-                    "📊 Tabelle: Utenti, acquisizioni, notes, curve_settings\n"
-                    "🔐 Utente iniziale: admin / admin\n\n"
-                    "⚠️ Cambia la password admin al primo accesso!"
+
+            # Conferma se il file esiste già
+            if os.path.exists(path):
+                conferma = messagebox.askyesno(
+                    "File esistente",
+                    f"Il file '{os.path.basename(path)}' esiste già.\n\n"
+                    "Sovrascriverlo con un database vuoto?\n"
+                    "⚠️ ATTENZIONE: Tutti i dati esistenti verranno persi!"
                 )
-                
-                # Imposta il nuovo DB come corrente
-                db.set_db_path(path)
-                db_path = path
-                label_db.config(text=f"Database: {db_path}")
-                
-                # Salva il percorso nelle configurazioni
-                config_manager.save_last_db_path(db_path)
-            else:
-                messagebox.showerror("Errore", "Creazione database fallita")
-                
-        except Exception as e:
-            messagebox.showerror("Errore creazione", f"Impossibile creare il database:\n{e}")
-    
-    tk.Button(
-        frame,
-        text="Verifica",
-        command=verifica_e_procedi,
+                if not conferma:
+                    return
+
+            # Crea il database usando lo script create_fresh_db
+            try:
+                from create_fresh_db import create_database
+                success = create_database(path, make_backup=True)
+
+                if success:
+                    messagebox.showinfo(
+                        "Database creato",
+                        f"Database creato con successo:\n{path}\n\n"
+                        "📊 Tabelle: Utenti, acquisizioni, notes, curve_settings\n"
+                        "🔐 Utente iniziale: admin / admin\n\n"
+                        "⚠️ Cambia la password admin al primo accesso!"
+                    )
+
+                    # Imposta il nuovo DB come corrente
+                    db.set_db_path(path)
+                    db_path = path
+                    label_db.config(text=f"Database: {db_path}")
+
+                    # Salva il percorso nelle configurazioni
+                    config_manager.save_last_db_path(db_path)
+                else:
+                    messagebox.showerror("Errore", "Creazione database fallita")
+
+            except Exception as e:
+                messagebox.showerror("Errore creazione", f"Impossibile creare il database:\n{e}")
+
+        tk.Button(
+            frame,
+            text="Verifica",
+            command=verifica_e_procedi,
+            width=20,
+            bg="#1a73e8",
+            fg="white"
+        ).pack(pady=10)
+
+        entry_pwd.bind("<Return>", lambda e: verifica_e_procedi())
+
+    btn_crea_db = tk.Button(
+        root,
+        text="Crea Nuovo Database",
+        command=crea_database_nuovo,
         width=20,
-        bg="#1a73e8",
-        fg="white"
-    ).pack(pady=10)
-    
-    entry_pwd.bind("<Return>", lambda e: verifica_e_procedi())
-
-btn_crea_db = tk.Button(
-    root,
-    text="Crea Nuovo Database",
-    command=crea_database_nuovo,
-    width=20,
-    font=("Helvetica", 10, "bold")
-)
-btn_crea_db.pack(pady=5)
-
-btn_crea_utente = tk.Button(
-    root,
-    text="Crea nuovo utente",
-    command=chiedi_password_admin,
-    width=20,
-    font=("Helvetica", 10, "bold")
-)
-btn_crea_utente.pack(pady=5)
-
-btn_elimina_utente = tk.Button(
-    root,
-    text="Elimina utente",
-    command=chiedi_password_admin_elimina,
-    width=20,
-    font=("Helvetica", 10, "bold")
-)
-btn_elimina_utente.pack(pady=5)
-
-# ---- Controllo DB appena parte il login ----
-if not db.db_file_exists(db_path):
-    crea_subito = messagebox.askyesno(
-        "Database mancante",
-        f"Il database '{db_path}' non esiste.\n\n"
-        "Vuoi crearne uno nuovo con le tabelle necessarie\n"
-        "e l'utente Admin (admin / adminpass)?"
+        font=("Helvetica", 10, "bold")
     )
-    if crea_subito:
-        db.ensure_full_schema(db_path, create_if_missing=True)
-        db_path = db.get_db_path()
-        label_db.config(text=f"Database: {db_path}")
-    else:
-        label_db.config(text=f"Database mancante: {db_path}")
+    btn_crea_db.pack(pady=5)
+
+    btn_crea_utente = tk.Button(
+        root,
+        text="Crea nuovo utente",
+        command=chiedi_password_admin,
+        width=20,
+        font=("Helvetica", 10, "bold")
+    )
+    btn_crea_utente.pack(pady=5)
+
+    btn_elimina_utente = tk.Button(
+        root,
+        text="Elimina utente",
+        command=chiedi_password_admin_elimina,
+        width=20,
+        font=("Helvetica", 10, "bold")
+    )
+    btn_elimina_utente.pack(pady=5)
+
+    # ---- Controllo DB appena parte il login ----
+    if not db.db_file_exists(db_path):
+        crea_subito = messagebox.askyesno(
+            "Database mancante",
+            f"Il database '{db_path}' non esiste.\n\n"
+            "Vuoi crearne uno nuovo con le tabelle necessarie\n"
+            "e l'utente Admin (admin / adminpass)?"
+        )
+        if crea_subito:
+            db.ensure_full_schema(db_path, create_if_missing=True)
+            db_path = db.get_db_path()
+            label_db.config(text=f"Database: {db_path}")
+        else:
+            label_db.config(text=f"Database mancante: {db_path}")
 
-root.mainloop()
+    root.after_idle(lambda: perf_trace.mark("login.ready", "startup"))
+    root.mainloop()
@@ -0,0 +1,186 @@
+"""
+Export PDF in blocco (più collaudi in una volta), in parallelo su più processi.
+
+Ogni report è indipendente (TDMS diverso, PDF diverso), quindi il lavoro
+viene distribuito su un ProcessPoolExecutor: un worker per core.
+
+Uso da riga di comando:
+    python pdf_batch.py 12 13 14 --out D:/report
+    python pdf_batch.py --job J1 --out D:/report --db D:/dati/collaudi.db
+
+NB: su Windows i worker vengono avviati con "spawn" e reimportano il modulo
+principale: tutto ciò che apre finestre deve stare sotto `if __name__ == "__main__"`.
+"""
+import os
+import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import db
+from pdf_report import generate_pdf_report_like_standard, _sanitize_filename
+
+# Stessa regola della dashboard: il PDF esiste solo per collaudi chiusi
+EXPORTABLE_STATES = ("Approved", "Rejected")
+
+
+def _init_worker(db_path: str) -> None:
+    """Inizializzatore dei processi worker: punta al DB del processo padre."""
+    db.set_db_path(db_path)
+
+
+def _export_one(task: dict) -> tuple:
+    """
+    Genera un singolo PDF (gira nel worker).
+    Ritorna (acq_id, pdf_path, errore) con errore = "" se tutto ok.
+    """
+    acq_id = task["meta"].get("id")
+    pdf_path = task["pdf_path"]
+    try:
+        tdms_path = task["meta"].get("_FilePath", "")
+        note_coll = db.note_collaudatore_get(tdms_path) or ""
+        note_ing = db.note_ingegneria_get(tdms_path) or ""
+
+        generate_pdf_report_like_standard(
+            pdf_path=pdf_path,
+            values_tuple=task["values"],
+            meta_dict=task["meta"],
+            change_date=task["change_date"],
+            username=task["username"],
+            note_collaudo=note_coll,
+            note_ingegneria=note_ing,
+            acquisizione_id=acq_id,
+        )
+        return acq_id, pdf_path, ""
+    except Exception as e:
+        return acq_id, pdf_path, f"{type(e).__name__}: {e}"
+
+
+def build_export_tasks(rows, out_dir: str, *, username: str = "", only_exportable: bool = True):
+    """
+    Prepara i task di export a partire dalle righe di db.select_acquisizioni_by_ids.
+    Ritorna (tasks, skipped) dove skipped è la lista degli id non esportabili.
+    """
+    tasks, skipped = [], []
+    used_names = set()
+
+    for r in rows:
+        acq_id = r[0]
+        stato = r[6] or ""
+        if only_exportable and stato not in EXPORTABLE_STATES:
+            skipped.append(acq_id)
+            continue
+
+        # Stesso layout dei valori della Treeview della dashboard (r[1:10])
+        values = tuple("" if x is None else x for x in r[1:10])
+        job, n_collaudo = str(values[0]).strip(), str(values[1]).strip()
+        tipo_test = str(r[9] or "").strip()
+
+        fname = _sanitize_filename(f"{n_collaudo} - {job}.pdf")
+        if fname.lower() in used_names:
+            # stesso collaudo con più test (es. Performance / NPSH): evita sovrascritture
+            suffix = tipo_test or str(acq_id)
+            fname = _sanitize_filename(f"{n_collaudo} - {job} - {suffix}.pdf")
+            if fname.lower() in used_names:
+                fname = _sanitize_filename(f"{n_collaudo} - {job} - {acq_id}.pdf")
+        used_names.add(fname.lower())
+
+        tasks.append({
+            "pdf_path": os.path.join(out_dir, fname),
+            "values": values,
+            "meta": {"id": acq_id, "_FilePath": r[11] or "", "_FileName": r[12] or ""},
+            "change_date": r[7] or "",
+            "username": username,
+        })
+
+    return tasks, skipped
+
+
+def export_pdfs(acq_ids, out_dir: str, *, username: str = "", workers: int = None,
+                progress=None, only_exportable: bool = True) -> dict:
+    """
+    Esporta i PDF delle acquisizioni indicate in out_dir.
+
+    progress: callback opzionale progress(fatti, totale, acq_id, pdf_path, errore),
+              chiamata nel thread/processo chiamante ad ogni report completato.
+
+    Ritorna {"ok": [pdf_path, ...], "failed": [(acq_id, errore), ...], "skipped": [acq_id, ...]}.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rows = db.select_acquisizioni_by_ids(acq_ids)
+    tasks, skipped = build_export_tasks(
+        rows, out_dir, username=username, only_exportable=only_exportable
+    )
+    result = {"ok": [], "failed": [], "skipped": skipped}
+    if not tasks:
+        return result
+
+    max_workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    total = len(tasks)
+    done = 0
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(db.get_db_path(),),
+    ) as ex:
+        futures = [ex.submit(_export_one, t) for t in tasks]
+        for fut in as_completed(futures):
+            acq_id, pdf_path, err = fut.result()
+            done += 1
+            if err:
+                result["failed"].append((acq_id, err))
+            else:
+                result["ok"].append(pdf_path)
+            if progress:
+                try:
+                    progress(done, total, acq_id, pdf_path, err)
+                except Exception:
+                    pass
+
+    return result
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Export PDF in blocco dei collaudi PT2025")
+    ap.add_argument("ids", nargs="*", type=int, help="id delle acquisizioni da esportare")
+    ap.add_argument("--job", help="esporta tutte le acquisizioni della commessa indicata")
+    ap.add_argument("--out", required=True, help="cartella di destinazione dei PDF")
+    ap.add_argument("--db", help="percorso del database (default: ultimo usato / collaudi.db)")
+    ap.add_argument("--workers", type=int, default=None, help="numero di processi (default: n. core)")
+    ap.add_argument("--all-states", action="store_true",
+                    help="esporta anche i collaudi non Approved/Rejected")
+    ap.add_argument("--user", default="", help="nome utente da riportare nel report")
+    args = ap.parse_args(argv)
+
+    db.open_db(args.db)
+
+    ids = list(args.ids)
+    if args.job:
+        stati = None if args.all_states else EXPORTABLE_STATES
+        ids.extend(db.select_ids_by_job(args.job, stati))
+    if not ids:
+        ap.error("nessuna acquisizione indicata (id oppure --job)")
+
+    def _progress(done, total, acq_id, pdf_path, err):
+        if err:
+            print(f"[{done}/{total}] id={acq_id} ERRORE: {err}")
+        else:
+            print(f"[{done}/{total}] id={acq_id} -> {pdf_path}")
+
+    res = export_pdfs(
+        ids, args.out,
+        username=args.user,
+        workers=args.workers,
+        progress=_progress,
+        only_exportable=not args.all_states,
+    )
+    if res["skipped"]:
+        print(f"Saltati (stato non Approved/Rejected): {', '.join(map(str, res['skipped']))}")
+    print(f"Completati: {len(res['ok'])}  Errori: {len(res['failed'])}")
+    return 1 if res["failed"] else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# pdf_curves.py
+"""
+Curve del certificato disegnate come grafica vettoriale reportlab (niente matplotlib).
+
+Parte dalle stesse serie usate dalla UI (curve_data.compute_curve_series) e
+produce Drawing reportlab da inserire direttamente nella story del PDF:
+- build_tdh_eff_drawing(series, width, height, ...) -> Drawing  (TDH + Efficiency)
+- build_power_drawing(series, width, height, ...)   -> Drawing  (Absorbed Power)
+"""
+import math
+
+from reportlab.graphics.shapes import Drawing, Group, Line, PolyLine, Circle, Polygon, Rect, String
+from reportlab.lib import colors
+
+from ui_format import fmt_num
+
+# Colori equivalenti a quelli di matplotlib usati in curve_view
+C_POINTS = colors.HexColor("#1f77b4")     # tab:blue (scatter)
+C_TDH    = colors.HexColor("#1f77b4")     # tab:blue
+C_RATED_EFF = colors.HexColor("#ff7f0e")  # tab:orange
+C_EFF    = colors.HexColor("#ffa500")     # orange
+C_BEP    = colors.red
+C_POWER  = colors.black
+C_GRID   = colors.HexColor("#b0b0b0")
+
+FONT = "Helvetica"
+LABEL_SIZE = 10
+TICK_SIZE = 9
+LEGEND_SIZE = 9
+
+# Margini area di plot (pt) attorno agli assi
+PAD_LEFT = 52
+PAD_RIGHT = 52
+PAD_BOTTOM = 38
+PAD_TOP = 12
+
+
+# -------------------- Scale e tick --------------------
+def _nice_ticks(vmin: float, vmax: float, max_ticks: int = 8) -> list:
+    """Tick "tondi" (1, 2, 2.5, 5 x 10^n) compresi in [vmin, vmax]."""
+    span = vmax - vmin
+    if not (math.isfinite(span) and span > 0):
+        return [vmin]
+    raw = span / max_ticks
+    mag = 10 ** math.floor(math.log10(raw))
+    step = mag
+    for m in (1, 2, 2.5, 5, 10):
+        step = m * mag
+        if step >= raw:
+            break
+    ticks = []
+    v = math.ceil(vmin / step - 1e-9) * step
+    while v <= vmax + step * 1e-9:
+        ticks.append(round(v, 10))
+        v += step
+    return ticks
+
+def _upper_limit(values, extra: float = 1.10) -> float:
+    """Limite superiore asse: max dati + margine 5% (come autoscale) * extra."""
+    vals = [v for v in values if v is not None and math.isfinite(v)]
+    top = max(vals) if vals else 0.0
+    if top <= 0:
+        return 1.0
+    return top * 1.05 * extra
+
+
+class _Axis:
+    """Mappa coordinate dati -> punti del Drawing per un'area di plot rettangolare."""
+
+    def __init__(self, x0, y0, w, h, xlim, ylim):
+        self.x0, self.y0, self.w, self.h = x0, y0, w, h
+        self.xmin, self.xmax = xlim
+        self.ymin, self.ymax = ylim
+
+    def px(self, x):
+        return self.x0 + (x - self.xmin) / (self.xmax - self.xmin) * self.w
+
+    def py(self, y):
+        return self.y0 + (y - self.ymin) / (self.ymax - self.ymin) * self.h
+
+    def contains(self, x, y):
+        return self.xmin <= x <= self.xmax and self.ymin <= y <= self.ymax
+
+
+# -------------------- Primitive --------------------
+def _clip_t(y0, y1, ymin, ymax):
+    """Clipping verticale di un segmento (Liang-Barsky su y). Ritorna (t0, t1) o None."""
+    t0, t1 = 0.0, 1.0
+    dy = y1 - y0
+    for p, q in ((-dy, y0 - ymin), (dy, ymax - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+    if t0 > t1:
+        return None
+    return t0, t1
+
+def _polyline(g, axis, xs, ys, color, width=1.8):
+    """Aggiunge la spezzata (xs, ys) a g, tagliando le parti fuori dai limiti y dell'asse."""
+    runs = []
+    cur = None
+    prev_t1 = None
+    for i in range(len(xs) - 1):
+        x0, y0, x1, y1 = xs[i], ys[i], xs[i + 1], ys[i + 1]
+        tt = _clip_t(y0, y1, axis.ymin, axis.ymax)
+        if tt is None:
+            cur = None
+            prev_t1 = None
+            continue
+        t0, t1 = tt
+        a = (x0 + t0 * (x1 - x0), y0 + t0 * (y1 - y0))
+        b = (x0 + t1 * (x1 - x0), y0 + t1 * (y1 - y0))
+        if cur is not None and t0 == 0.0 and prev_t1 == 1.0:
+            cur.append(b)
+        else:
+            cur = [a, b]
+            runs.append(cur)
+        prev_t1 = t1
+    for run in runs:
+        pts = []
+        for x, y in run:
+            pts.extend((axis.px(x), axis.py(y)))
+        g.add(PolyLine(pts, strokeColor=color, strokeWidth=width,
+                       strokeLineJoin=1, strokeLineCap=1))
+
+def _scatter(g, axis, xs, ys, color, r=2.6):
+    for x, y in zip(xs, ys):
+        if axis.contains(x, y):
+            g.add(Circle(axis.px(x), axis.py(y), r, fillColor=color, strokeColor=None))
+
+def _marker_rated(g, cx, cy, color, size=11.8):
+    """Triangolo rettangolo con angolo retto in alto a destra (come RIGHT_ANGLE_TR_MARKER)."""
+    h = size / 2.0
+    g.add(Polygon([cx - h, cy + h, cx + h, cy + h, cx + h, cy - h],
+                  fillColor=None, strokeColor=color, strokeWidth=1.6))
+
+def _marker_diamond(g, cx, cy, color, size=9.0):
+    h = size / 2.0
+    g.add(Polygon([cx, cy + h, cx + h, cy, cx, cy - h, cx - h, cy],
+                  fillColor=color, strokeColor=color, strokeWidth=1))
+
+def _vlabel(g, x, y, text):
+    """Etichetta ruotata di 90° (lettura dal basso verso l'alto)."""
+    lbl = Group(String(0, 0, text, fontName=FONT, fontSize=LABEL_SIZE, textAnchor="middle"))
+    lbl.transform = (0, 1, -1, 0, x, y)
+    g.add(lbl)
+
+def _frame_and_grid(g, axis, xticks, yticks, *, xlabel, ylabel):
+    """Griglia tratteggiata, cornice, tick e label degli assi x / y sinistro."""
+    for t in xticks:
+        x = axis.px(t)
+        g.add(Line(x, axis.y0, x, axis.y0 + axis.h, strokeColor=C_GRID,
+                   strokeWidth=0.8, strokeDashArray=[1, 2]))
+        g.add(Line(x, axis.y0, x, axis.y0 - 3.5, strokeColor=colors.black, strokeWidth=0.8))
+        g.add(String(x, axis.y0 - 13, fmt_num(t), fontName=FONT, fontSize=TICK_SIZE,
+                     textAnchor="middle"))
+    for t in yticks:
+        y = axis.py(t)
+        g.add(Line(axis.x0, y, axis.x0 + axis.w, y, strokeColor=C_GRID,
+                   strokeWidth=0.8, strokeDashArray=[1, 2]))
+        g.add(Line(axis.x0, y, axis.x0 - 3.5, y, strokeColor=colors.black, strokeWidth=0.8))
+        g.add(String(axis.x0 - 6, y - 3, fmt_num(t), fontName=FONT, fontSize=TICK_SIZE,
+                     textAnchor="end"))
+    g.add(Rect(axis.x0, axis.y0, axis.w, axis.h, fillColor=None,
+               strokeColor=colors.black, strokeWidth=0.8))
+    g.add(String(axis.x0 + axis.w / 2.0, axis.y0 - 30, xlabel, fontName=FONT,
+                 fontSize=LABEL_SIZE, textAnchor="middle"))
+    _vlabel(g, axis.x0 - 38, axis.y0 + axis.h / 2.0, ylabel)
+
+def _legend(g, axis, entries):
+    """
+    Legenda in basso a destra. entries: lista (kind, color, label) con
+    kind in {"line", "rated", "bep"}.
+    """
+    if not entries:
+        return
+    row_h = 13
+    sample_w = 22
+    text_w = max(len(lbl) for _k, _c, lbl in entries) * LEGEND_SIZE * 0.52
+    box_w = 8 + sample_w + 6 + text_w + 8
+    box_h = 6 + row_h * len(entries) + 2
+    bx = axis.x0 + axis.w - box_w - 6
+    by = axis.y0 + 6
+    g.add(Rect(bx, by, box_w, box_h, fillColor=colors.white,
+               strokeColor=colors.HexColor("#cccccc"), strokeWidth=0.8, rx=2, ry=2))
+    for i, (kind, color, label) in enumerate(entries):
+        cy = by + box_h - 6 - row_h * i - row_h / 2.0 + 1
+        sx = bx + 8
+        if kind == "line":
+            g.add(Line(sx, cy, sx + sample_w, cy, strokeColor=color, strokeWidth=1.8))
+        elif kind == "rated":
+            _marker_rated(g, sx + sample_w / 2.0, cy, color, size=10)
+        elif kind == "bep":
+            _marker_diamond(g, sx + sample_w / 2.0, cy, color, size=7)
+        g.add(String(sx + sample_w + 6, cy - 3, label, fontName=FONT, fontSize=LEGEND_SIZE))
+
+
+# -------------------- Drawing pubblici --------------------
+def build_tdh_eff_drawing(series: dict, width: float, height: float, *,
+                          show_points: bool = True, eff_min: float = 0.0,
+                          eff_max: float = 100.0) -> Drawing:
+    """TDH (asse sinistro) + Efficiency (asse destro) come Drawing vettoriale."""
+    d = Drawing(width, height)
+    g = Group()
+
+    xs_raw, ys_raw = series["tdh_points"]
+    tx, ty = series["tdh_trend"]
+    xs_eff, ys_eff = series["eff_points"]
+    ex, ey = series["eff_trend"]
+    rated_tdh = series["rated_tdh"]
+    rated_eff = series["rated_eff"]
+    bep = series["bep"]
+    has_eff = bool(xs_eff and ys_eff)
+
+    all_x = list(xs_raw) + list(tx) + list(xs_eff) + list(ex)
+    all_y = list(ys_raw) + list(ty)
+    if rated_tdh is not None:
+        all_x.append(rated_tdh[0]); all_y.append(rated_tdh[1])
+    if rated_eff is not None:
+        all_x.append(rated_eff[0])
+
+    pad_right = PAD_RIGHT if has_eff else 16
+    x0, y0 = PAD_LEFT, PAD_BOTTOM
+    w = max(10.0, width - PAD_LEFT - pad_right)
+    h = max(10.0, height - PAD_BOTTOM - PAD_TOP)
+
+    xlim = (0.0, _upper_limit(all_x, extra=1.0))
+    ylim = (0.0, _upper_limit(all_y))
+    ax = _Axis(x0, y0, w, h, xlim, ylim)
+    _frame_and_grid(g, ax, _nice_ticks(*xlim), _nice_ticks(*ylim),
+                    xlabel=f"Capacity [{series['flow_unit']}]",
+                    ylabel=f"TDH [{series['head_unit']}]")
+
+    legend = []
+
+    # Efficiency sotto (come zorder matplotlib: ax2 dietro ad ax)
+    if has_eff:
+        lo, hi = (eff_min, eff_max) if eff_max > eff_min else (0.0, 100.0)
+        ax2 = _Axis(x0, y0, w, h, xlim, (lo, hi))
+        for t in _nice_ticks(lo, hi):
+            y = ax2.py(t)
+            g.add(Line(x0 + w, y, x0 + w + 3.5, y, strokeColor=colors.black, strokeWidth=0.8))
+            g.add(String(x0 + w + 6, y - 3, fmt_num(t), fontName=FONT, fontSize=TICK_SIZE))
+        _vlabel(g, x0 + w + 40, y0 + h / 2.0, "Efficiency [%]")
+
+        if show_points:
+            _scatter(g, ax2, xs_eff, ys_eff, C_POINTS, r=2.5)
+        if ex:
+            _polyline(g, ax2, ex, ey, C_EFF)
+        if rated_eff is not None and ax2.contains(*rated_eff):
+            _marker_rated(g, ax2.px(rated_eff[0]), ax2.py(rated_eff[1]), C_RATED_EFF)
+        if bep is not None and ax2.contains(*bep):
+            _marker_diamond(g, ax2.px(bep[0]), ax2.py(bep[1]), C_BEP)
+
+    # TDH
+    if show_points and xs_raw and ys_raw:
+        _scatter(g, ax, xs_raw, ys_raw, C_POINTS)
+    if tx:
+        _polyline(g, ax, tx, ty, C_TDH)
+    if rated_tdh is not None and ax.contains(*rated_tdh):
+        _marker_rated(g, ax.px(rated_tdh[0]), ax.py(rated_tdh[1]), C_TDH)
+
+    if tx:
+        legend.append(("line", C_TDH, "TDH"))
+    if ex:
+        legend.append(("line", C_EFF, "Efficiency"))
+    if rated_tdh is not None:
+        legend.append(("rated", C_TDH, "Rated TDH"))
+    if rated_eff is not None:
+        legend.append(("rated", C_RATED_EFF, "Rated Efficiency"))
+    if bep is not None:
+        legend.append(("bep", C_BEP, "BEP point"))
+    _legend(g, ax, legend)
+
+    d.add(g)
+    return d
+
+
+def build_power_drawing(series: dict, width: float, height: float, *,
+                        show_points: bool = True) -> Drawing:
+    """Absorbed Power come Drawing vettoriale."""
+    d = Drawing(width, height)
+    g = Group()
+
+    pxs, pys = series["pwr_points"]
+    px_, py_ = series["pwr_trend"]
+
+    x0, y0 = PAD_LEFT, PAD_BOTTOM
+    w = max(10.0, width - PAD_LEFT - 16)
+    h = max(10.0, height - PAD_BOTTOM - PAD_TOP)
+
+    xlim = (0.0, _upper_limit(list(pxs) + list(px_), extra=1.0))
+    ylim = (0.0, _upper_limit(list(pys) + list(py_)))
+    ax = _Axis(x0, y0, w, h, xlim, ylim)
+    _frame_and_grid(g, ax, _nice_ticks(*xlim), _nice_ticks(*ylim),
+                    xlabel=f"Capacity [{series['flow_unit']}]",
+                    ylabel=f"Abs Power [{series['power_unit']}]")
+
+    if pxs and pys:
+        if show_points:
+            _scatter(g, ax, pxs, pys, C_POINTS)
+        if px_:
+            _polyline(g, ax, px_, py_, C_POWER)
+            _legend(g, ax, [("line", C_POWER, "Absorbed Power")])
+
+    d.add(g)
+    return d
@@ -0,0 +1,236 @@
+"""
+Dossier di commessa: un unico PDF con tutti i certificati APPROVED di un job.
+
+Struttura:
+- copertina con indice (voci cliccabili) dei certificati
+- un certificato dopo l'altro, ognuno con il proprio segnalibro (outline PDF)
+
+I certificati NON vengono costruiti tutti prima del build: nella story c'è solo un
+segnaposto per certificato, espanso nei flowable veri quando reportlab ci arriva.
+Così in memoria c'è al massimo un certificato (tabelle + curve) alla volta e
+l'occupazione resta piatta anche con 100+ certificati.
+
+Uso da riga di comando:
+    python pdf_dossier.py J1 --out D:/report/J1_dossier.pdf [--db D:/dati/collaudi.db]
+"""
+import sys
+import argparse
+from datetime import date
+
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.platypus.flowables import Flowable
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.units import mm
+
+import db
+from ui_format import DASH
+from pdf_report import (
+    build_certificate_story, _safe, P, _styles,
+    _PAGE_W, _PAGE_H, _MARG_L, _MARG_R, _MARG_T, _MARG_B,
+)
+
+DOSSIER_STATES = ("Approved",)
+
+_P_TITLE = ParagraphStyle("dossier_title", parent=_styles["Normal"], fontName="Helvetica-Bold", fontSize=18, leading=22)
+_P_SUBTITLE = ParagraphStyle("dossier_sub", parent=_styles["Normal"], fontName="Helvetica", fontSize=10, leading=13)
+_P_CELL = ParagraphStyle("dossier_cell", parent=_styles["Normal"], fontName="Helvetica", fontSize=8, leading=9.5)
+
+
+class _Bookmark(Flowable):
+    """Flowable a ingombro zero: crea destinazione + voce outline sulla pagina corrente."""
+
+    def __init__(self, key: str, title: str):
+        super().__init__()
+        self.key = key
+        self.title = title
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0, closed=True)
+
+
+class _LazyCertificate(Flowable):
+    """
+    Segnaposto di un certificato: viene sostituito dalla sua story solo quando
+    il documento arriva a questo punto (vedi _DossierDocTemplate.filterFlowables).
+    """
+
+    def __init__(self, task: dict):
+        super().__init__()
+        self.task = task
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        pass
+
+    def expand(self, doc) -> list:
+        t = self.task
+        try:
+            tdms_path = t["meta"].get("_FilePath", "")
+            story, _cert_num, templates = build_certificate_story(
+                values_tuple=t["values"],
+                meta_dict=t["meta"],
+                change_date=t["change_date"],
+                username=t["username"],
+                note_collaudo=db.note_collaudatore_get(tdms_path) or "",
+                note_ingegneria=db.note_ingegneria_get(tdms_path) or "",
+                acquisizione_id=t["meta"].get("id"),
+                key=t["key"],
+            )
+        except Exception as e:
+            # certificato non generabile (es. TDMS mancante): pagina segnaposto, il dossier continua
+            out = [PageBreak(nextTemplate="cover"), _Bookmark(t["key"], t["title"])]
+            out.append(Paragraph(f"<b>{_safe(t['title'])}</b>", _P_TITLE))
+            out.append(Spacer(1, 6))
+            out.append(Paragraph(f"Certificato non disponibile: {_safe(e)}", _P_SUBTITLE))
+            return out
+
+        # template del certificato corrente al posto di quelli del precedente
+        # (quello in uso sulla pagina aperta resta referenziato dal doc fino a fine pagina)
+        doc.pageTemplates = [pt for pt in doc.pageTemplates if pt.id == "cover"] + templates
+        return [PageBreak(nextTemplate=templates[0].id), _Bookmark(t["key"], t["title"])] + story
+
+
+class _DossierDocTemplate(BaseDocTemplate):
+    """DocTemplate che espande i _LazyCertificate al momento del layout."""
+
+    def filterFlowables(self, flowables):
+        while flowables and isinstance(flowables[0], _LazyCertificate):
+            flowables[0:1] = flowables[0].expand(self)
+
+
+def _dossier_tasks(rows, username: str) -> list:
+    tasks = []
+    for r in rows:
+        values = tuple("" if x is None else x for x in r[1:10])
+        n_collaudo, matricola, tipo_test = str(values[1]).strip(), str(values[2]).strip(), str(r[9] or "").strip()
+        title = " - ".join(x for x in (n_collaudo, matricola, tipo_test) if x) or f"id {r[0]}"
+        tasks.append({
+            "key": f"cert_{r[0]}",
+            "title": title,
+            "row": r,
+            "values": values,
+            "meta": {"id": r[0], "_FilePath": r[11] or "", "_FileName": r[12] or ""},
+            "change_date": r[7] or "",
+            "username": username,
+        })
+    return tasks
+
+
+def _cover_story(job: str, tasks: list, username: str) -> list:
+    story = [
+        Paragraph("FLOWSERVE", P["hdr_logo"]),
+        Spacer(1, 8 * mm),
+        Paragraph(f"Test Dossier &mdash; FSG ORDER {_safe(job)}", _P_TITLE),
+        Spacer(1, 2 * mm),
+        Paragraph(
+            f"Certificates: {len(tasks)}&nbsp;&nbsp;&nbsp;&nbsp;"
+            f"Date of Issue: {date.today().strftime('%d/%m/%Y')}"
+            + (f"&nbsp;&nbsp;&nbsp;&nbsp;Issued by: {_safe(username)}" if username else ""),
+            _P_SUBTITLE,
+        ),
+        Spacer(1, 6 * mm),
+    ]
+
+    hdr = ["#", "Test Certificate num.", "S. N.", "Pump", "Test", "Test Date", "Approved", "Approved by"]
+    data = [[Paragraph(f"<b>{h}</b>", _P_CELL) for h in hdr]]
+    for i, t in enumerate(tasks, start=1):
+        r = t["row"]
+        link = f'<a href="#{t["key"]}" color="blue">{_safe(r[2]) or DASH}</a>'
+        data.append([
+            Paragraph(str(i), _P_CELL),
+            Paragraph(link, _P_CELL),
+            Paragraph(_safe(r[3]), _P_CELL),
+            Paragraph(_safe(r[4]), _P_CELL),
+            Paragraph(_safe(r[9]), _P_CELL),
+            Paragraph(_safe(r[5]), _P_CELL),
+            Paragraph(_safe(r[7]), _P_CELL),
+            Paragraph(_safe(r[8]), _P_CELL),
+        ])
+
+    total_w = _PAGE_W - _MARG_L - _MARG_R
+    fixed = [10 * mm, 45 * mm, 35 * mm]
+    rest = (total_w - sum(fixed)) / 5
+    index = Table(data, colWidths=fixed + [rest] * 5, repeatRows=1)
+    index.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.6, colors.black),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#efefef")),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 3),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ]))
+    story.append(index)
+    return story
+
+
+def generate_job_dossier(job: str, pdf_path: str, *, username: str = "", acq_ids=None) -> int:
+    """
+    Genera il dossier PDF della commessa `job` in pdf_path.
+    acq_ids: opzionale, limita il dossier a questi id (altrimenti tutti gli APPROVED del job).
+    Ritorna il numero di certificati inclusi.
+    """
+    if acq_ids is None:
+        acq_ids = db.select_ids_by_job(job, DOSSIER_STATES)
+    tasks = _dossier_tasks(db.select_acquisizioni_by_ids(acq_ids), username)
+    if not tasks:
+        raise ValueError(f"Nessun collaudo APPROVED per la commessa {job}.")
+
+    doc = _DossierDocTemplate(
+        pdf_path,
+        pagesize=landscape(A4),
+        leftMargin=_MARG_L,
+        rightMargin=_MARG_R,
+        topMargin=_MARG_T,
+        bottomMargin=_MARG_B,
+        title=f"Test Dossier - {job}",
+        author=_safe(username),
+        pageTemplates=[PageTemplate(id="cover", frames=[Frame(
+            _MARG_L, _MARG_B, _PAGE_W - _MARG_L - _MARG_R, _PAGE_H - _MARG_T - _MARG_B, id="cover_frame",
+        )])],
+    )
+
+    # ogni certificato si apre con il proprio PageBreak(nextTemplate=...) dopo l'espansione
+    story = _cover_story(job, tasks, username)
+    story.extend(_LazyCertificate(t) for t in tasks)
+    # il dossier si apre con i segnalibri visibili
+    doc.build(story, canvasmaker=_outline_canvas)
+    return len(tasks)
+
+
+def _outline_canvas(*args, **kwargs):
+    from reportlab.pdfgen.canvas import Canvas
+    c = Canvas(*args, **kwargs)
+    c.showOutline()
+    return c
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Dossier PDF di commessa (tutti i collaudi APPROVED)")
+    ap.add_argument("job", help="commessa (FSG order)")
+    ap.add_argument("--out", required=True, help="file PDF di destinazione")
+    ap.add_argument("--db", help="percorso del database (default: ultimo usato / collaudi.db)")
+    ap.add_argument("--user", default="", help="nome utente da riportare nel dossier")
+    args = ap.parse_args(argv)
+
+    db.open_db(args.db)
+
+    try:
+        n = generate_job_dossier(args.job, args.out, username=args.user)
+    except Exception as e:
+        print(f"ERRORE: {e}")
+        return 1
+    print(f"Dossier {args.out}: {n} certificati")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,15 +5,19 @@ import re
 import sys
 import tempfile
 import subprocess
+import threading
 from datetime import date
-from tkinter import filedialog, messagebox
+# tkinter solo nelle funzioni con finestre: la generazione PDF gira anche senza GUI (CLI, worker)
 
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+from reportlab.platypus import (
+    BaseDocTemplate, PageTemplate, Frame, Table, LongTable, TableStyle, Paragraph, PageBreak,
+)
+from reportlab.platypus.flowables import Flowable
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import mm
-from io import BytesIO
 
 from tdms_reader import (
     read_contract_and_loop_data,
@@ -22,8 +26,7 @@ from tdms_reader import (
 )
 
 from ui_format import fmt_if_number, fmt_seq, clean_header_brackets, DASH
-
-# Curve matplotlib (opzionale: se non disponibile si salta silenziosamente)
+import perf_trace
 
 # --- DB: recupero checked_by / engineering_user direttamente dal DB usando n_collaudo ---
 try:
@@ -39,6 +42,10 @@ _BAD_CHARS_RE = re.compile(r'[\\/:*?"<>|]')
 _UNIT_IN_BRACKETS_RE = re.compile(r"^(?P<name>.+?)\s*\[(?P<unit>.+?)\]\s*$")
 
 
+class PdfCancelled(Exception):
+    """Generazione PDF annullata dall'utente."""
+
+
 def _safe(x):
     return "" if x is None else str(x)
 
@@ -154,9 +161,96 @@ def _kv_table(kv_pairs, col_widths, font_size=7.2, hpad=2, vpad=1.5):
     return t
 
 
+# -------------------------
+# Page templates certificato (header/footer disegnati in onPage)
+# -------------------------
+class _PagesTotal(Flowable):
+    """
+    Flowable a ingombro zero messo dopo l'ultima pagina dati del certificato:
+    quando viene disegnato il numero di pagine è noto e definisce la form PDF
+    col totale, già referenziata ("Page X of ...") da tutte le pagine precedenti.
+    """
+
+    def __init__(self, form_name: str, state: dict, x: float, y: float):
+        super().__init__()
+        self.form_name = form_name
+        self.state = state
+        self.x, self.y = x, y
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        canv = self.canv
+        canv.beginForm(self.form_name)
+        canv.setFont("Helvetica", 8)
+        canv.drawString(self.x, self.y, str(self.state["page"]))
+        canv.endForm()
+
+
+def _certificate_page_templates(*, key: str, head_blocks: list, footer):
+    """
+    Crea i due PageTemplate di un certificato:
+    - "<key>_data":  header + sub + top3 in alto, footer con "Page X of Y" in basso
+    - "<key>_curve": solo header in alto (pagine curve, senza footer)
+    Le tabelle fisse vengono misurate una volta e ridisegnate con drawOn su ogni pagina.
+    Ritorna ([data_tpl, curve_tpl], flowable_totale_pagine).
+    """
+    avail_w = _PAGE_W - _MARG_L - _MARG_R
+    head = [(t, t.wrap(avail_w, _PAGE_H)[1]) for t in head_blocks]
+    head_h = sum(h for _t, h in head)
+    hdr_h = head[0][1]
+    foot_h = footer.wrap(avail_w, _PAGE_H)[1]
+
+    # "Page X of " allineato a destra, il totale (form) occupa uno spazio fisso
+    state = {"page": 0}
+    form_name = f"{key}_pages_total"
+    text_y = _MARG_B + foot_h / 2 - 8 * 0.35
+    total_x = _MARG_L + avail_w - 4 - stringWidth("000", "Helvetica", 8)
+
+    def _draw_head(canv, blocks):
+        y = _PAGE_H - _MARG_T
+        for t, h in blocks:
+            y -= h
+            t.drawOn(canv, _MARG_L, y)
+
+    def _on_data_page(canv, doc):
+        state["page"] += 1
+        canv.saveState()
+        _draw_head(canv, head)
+        footer.drawOn(canv, _MARG_L, _MARG_B)
+        num = f" {state['page']} of "
+        canv.setFont("Helvetica", 8)
+        canv.drawRightString(total_x, text_y, num)
+        canv.setFont("Helvetica-Bold", 8)
+        canv.drawRightString(total_x - stringWidth(num, "Helvetica", 8), text_y, "Page")
+        canv.doForm(form_name)
+        canv.restoreState()
+
+    def _on_curve_page(canv, doc):
+        canv.saveState()
+        _draw_head(canv, head[:1])
+        canv.restoreState()
+
+    data_frame = Frame(
+        _MARG_L, _MARG_B + foot_h + 4, avail_w, _PAGE_H - _MARG_T - head_h - 3 - (_MARG_B + foot_h + 4),
+        leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id=f"{key}_data_frame",
+    )
+    curve_frame = Frame(
+        _MARG_L, _MARG_B, avail_w, _PAGE_H - _MARG_T - hdr_h - 4 - _MARG_B,
+        leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id=f"{key}_curve_frame",
+    )
+    templates = [
+        PageTemplate(id=f"{key}_data", frames=[data_frame], onPage=_on_data_page, pagesize=landscape(A4)),
+        PageTemplate(id=f"{key}_curve", frames=[curve_frame], onPage=_on_curve_page, pagesize=landscape(A4)),
+    ]
+    return templates, _PagesTotal(form_name, state, total_x, text_y)
+
+
 # -------------------------
 # PDF core
 # -------------------------
+@perf_trace.traced(cat="pdf")
 def generate_pdf_report_like_standard(
     *,
     pdf_path: str,
@@ -167,9 +261,82 @@ def generate_pdf_report_like_standard(
     note_collaudo: str,
     note_ingegneria: str,
     acquisizione_id: int = None,
+    progress=None,
+    cancel_event=None,
 ):
     """
     Replica layout standard + riempie campi da TDMS via tdms_reader.
+
+    progress:     callback opzionale progress(frazione 0..1, messaggio), chiamata dal thread che genera
+    cancel_event: threading.Event opzionale; se viene settato la generazione si interrompe
+                  con PdfCancelled prima di scrivere il file
+    """
+    def _report(frac, msg):
+        if cancel_event is not None and cancel_event.is_set():
+            raise PdfCancelled()
+        if progress:
+            progress(frac, msg)
+
+    _report(0.0, "Lettura TDMS...")
+    story, cert_num, templates = build_certificate_story(
+        values_tuple=values_tuple,
+        meta_dict=meta_dict,
+        change_date=change_date,
+        username=username,
+        note_collaudo=note_collaudo,
+        note_ingegneria=note_ingegneria,
+        acquisizione_id=acquisizione_id,
+    )
+    job = _safe(values_tuple[0]).strip() if values_tuple else ""
+    _report(0.4, "Impaginazione...")
+
+    doc = BaseDocTemplate(
+        pdf_path,
+        pagesize=landscape(A4),
+        leftMargin=_MARG_L,
+        rightMargin=_MARG_R,
+        topMargin=_MARG_T,
+        bottomMargin=_MARG_B,
+        title=f"{cert_num} - {job}",
+        author=_safe(username),
+        pageTemplates=templates,
+    )
+
+    # Avanzamento del build per flowable gestiti (il file viene scritto solo alla fine)
+    size_est = {"n": max(len(story), 1), "last": -1}
+
+    def _on_build(typ, value):
+        if typ == "SIZE_EST":
+            size_est["n"] = max(value, 1)
+        elif typ == "PROGRESS":
+            pct = int(40 + 55 * min(value / size_est["n"], 1.0))
+            if pct != size_est["last"]:
+                size_est["last"] = pct
+                _report(pct / 100.0, "Impaginazione...")
+
+    doc.setProgressCallBack(_on_build)
+    doc.build(story)
+    if progress:
+        progress(1.0, "Completato")
+
+
+@perf_trace.traced(cat="pdf")
+def build_certificate_story(
+    *,
+    values_tuple,
+    meta_dict: dict,
+    change_date: str,
+    username: str,
+    note_collaudo: str,
+    note_ingegneria: str,
+    acquisizione_id: int = None,
+    key: str = "cert",
+):
+    """
+    Costruisce i flowable di un certificato (tabelle + pagine curve) senza creare il documento.
+    Ritorna (story, cert_num, page_templates): la story va costruita con i template
+    "<key>_data" / "<key>_curve", che disegnano header e footer di ogni pagina.
+    Usata sia dal PDF singolo che dal dossier di commessa.
     """
     v = list(values_tuple) if values_tuple else [""] * 10
     while len(v) < 10:
@@ -182,6 +349,8 @@ def generate_pdf_report_like_standard(
     data_file  = _safe(v[4]).strip()
 
     tdms_path = _safe(meta_dict.get("_FilePath", "")).strip()
+    if not tdms_path or not os.path.exists(tdms_path):
+        raise FileNotFoundError(f"File TDMS non trovato: {tdms_path or DASH}")
     
     # Leggi unit_system dal DB
     try:
@@ -193,6 +362,7 @@ def generate_pdf_report_like_standard(
     # TDMS read
     contract = read_contract_and_loop_data(tdms_path) if tdms_path else {}
     perf = read_performance_tables_dynamic(tdms_path, test_index=0) if tdms_path else {"Recorded": {}, "Calc": {}, "Converted": {}}
+    perf_metric = dict(perf)  # copia Metric (le curve convertono per conto loro)
     
     # Helper per convertire valori individuali dal contract
     def get_contract_value(key_pattern: str, param_type: str = None):
@@ -234,24 +404,17 @@ def generate_pdf_report_like_standard(
     tdms_fields = read_tdms_fields(tdms_path) if tdms_path else {}
     cert_num = tdms_fields.get("n_collaudo", "") or n_collaudo or DASH
 
-    doc = SimpleDocTemplate(
-        pdf_path,
-        pagesize=landscape(A4),
-        leftMargin=_MARG_L,
-        rightMargin=_MARG_R,
-        topMargin=_MARG_T,
-        bottomMargin=_MARG_B,
-        title=f"{cert_num} - {job}",
-        author=_safe(username),
-    )
-
-    story = []
-
     # -------------------------
     # HEADER (3 colonne)
+    # Header, sub, top3 e footer NON stanno nella story: li disegna il PageTemplate
+    # (onPage) su ogni pagina dati, costruiti e misurati una volta sola.
     # -------------------------
     system_id = contract.get("FSG ORDER", "") or f"{job}-{matricola}"
-    unit_label = "SI (Metric)" if unit_system == "Metric" else "U.S. Customary"
+    try:
+        import unit_converter as uc
+        unit_label = uc.system_title(unit_system)
+    except Exception:
+        unit_label = "SI (Metric)" if unit_system == "Metric" else "U.S. Customary"
     left_cell = Paragraph("FLOWSERVE", P["hdr_logo"])
     center_cell = Paragraph(f"ENGINEERING USE ONLY&nbsp;&nbsp;&nbsp;&nbsp;U.M. System : {unit_label}", P["hdr_mid"])
     right_cell = Paragraph(
@@ -271,7 +434,6 @@ def generate_pdf_report_like_standard(
         ("TOPPADDING", (0, 0), (-1, -1), 3),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
     ]))
-    story.append(header)
 
     # Riga grigia: Contractual Data | System ID | Loop Details
     sub = Table(
@@ -291,7 +453,6 @@ def generate_pdf_report_like_standard(
         ("TOPPADDING", (0, 0), (-1, -1), 2),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
     ]))
-    story.append(sub)
 
     # -------------------------
     # BLOCCO SUPERIORE 3 COLONNE
@@ -369,10 +530,9 @@ def generate_pdf_report_like_standard(
         ("TOPPADDING", (0, 0), (-1, -1), 3),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
     ]))
-    story.append(top3)
 
     # -------------------------
-    # TABELLONE DATI (colonne+righe TDMS) - con paginazione automatica
+    # TABELLONE DATI (colonne+righe TDMS) - LongTable, paginata da reportlab
     # -------------------------
     rec = perf.get("Recorded", {}) or {}
     cal = perf.get("Calc", {}) or {}
@@ -405,133 +565,87 @@ def generate_pdf_report_like_standard(
         r = r[:width] + [""] * max(0, width - len(r))
         return fmt_seq(r, dash=DASH)
 
-    # Righe intestazione (nome + unità) + tutte le righe dati
-    hdr_row_names = [Paragraph(f"<b>{_safe(x)}</b>", P["tiny_center"]) for x in col_names]
-    hdr_row_units = [Paragraph(_safe(u), P["tiny_center"]) for u in col_units]
+    total_cols = max(len(all_cols), 1)
+
+    def _pad(row):
+        return list(row) + [""] * (total_cols - len(row))
 
-    all_data_rows = []
+    # Riga 0: sezioni (SPAN sulle colonne di ogni blocco); righe 1-2: nome + unità
+    sections = [
+        ("<b><i>Recorded Data</i></b>", len(rec_cols)),
+        ("<b><i>Calculated Values</i></b>", len(cal_cols)),
+        ("<b><i>Values Converted to contractual RPM &amp; S.G.</i></b>", len(con_cols)),
+    ]
+    sec_row = [""] * total_cols
+    sec_spans = []
+    start = 0
+    for label, n in sections:
+        if n <= 0:
+            continue
+        sec_row[start] = Paragraph(label, P["th"])
+        sec_spans.append(("SPAN", (start, 0), (start + n - 1, 0)))
+        start += n
+
+    hdr_row_names = _pad([Paragraph(f"<b>{_safe(x)}</b>", P["tiny_center"]) for x in col_names])
+    hdr_row_units = _pad([Paragraph(_safe(u), P["tiny_center"]) for u in col_units])
+
+    data = [sec_row, hdr_row_names, hdr_row_units]
     for i in range(n_rows):
         row = []
         row.extend(_row_at(rec_rows, i, len(rec_cols)))
         row.extend(_row_at(cal_rows, i, len(cal_cols)))
         row.extend(_row_at(con_rows, i, len(con_cols)))
-        all_data_rows.append(row)
+        data.append(_pad(row))
 
-    # -------------------------
-    # LARGHEZZE DINAMICHE tabellone + header 3 sezioni
-    # -------------------------
     available_w = _PAGE_W - 2*_MARG_L
+    col_widths = [available_w / total_cols] * total_cols
+
+    # Le 3 righe di intestazione si ripetono su ogni pagina; lo stile è uno solo
+    big_table = LongTable(data, colWidths=col_widths, repeatRows=3)
+    big_table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.6, colors.black),
+        ("BOX", (0, 0), (-1, 0), 0.9, colors.black),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#efefef")),
+        ("BACKGROUND", (0, 1), (-1, 2), colors.HexColor("#f5f5f5")),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("FONTSIZE", (0, 0), (-1, -1), 6.7),
+        ("TOPPADDING", (0, 0), (-1, -1), 1.2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 1.2),
+        ("LEFTPADDING", (0, 0), (-1, -1), 1.2),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 1.2),
+        ("TOPPADDING", (0, 0), (-1, 0), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 2),
+    ] + sec_spans))
 
-    n_rec = len(rec_cols)
-    n_cal = len(cal_cols)
-    n_con = len(con_cols)
-
-    total_cols = n_rec + n_cal + n_con
-    if total_cols <= 0:
-        total_cols = 1
-        n_rec = 1
-        n_cal = 0
-        n_con = 0
-
-    base_w = available_w / total_cols
-    col_widths = ([base_w] * n_rec) + ([base_w] * n_cal) + ([base_w] * n_con)
-
-    w_rec = max(base_w * n_rec, 8 * mm)
-    w_cal = max(base_w * n_cal, 8 * mm)
-    w_con = max(base_w * n_con, 8 * mm)
-
-    s = w_rec + w_cal + w_con
-    scale = (available_w / s) if s > 0 else 1.0
-    w_rec *= scale
-    w_cal *= scale
-    w_con *= scale
+    story = [big_table]
 
     # -------------------------
-    # Calcolo righe per pagina
-    # Pagina A4 landscape = 210mm di altezza.
-    # Spazio fisso (header+sub+top3+spacer+big_hdr+2 righe intestazione+footer+bottom):
-    #   ~110mm. Rimangono ~100mm per le righe dati.
-    # Ogni riga dati: fontsize 6.7pt + padding 2*1.2pt = 9.1pt ≈ 3.21mm
-    # Con margine di sicurezza usiamo MAX_ROWS_PER_PAGE = 22
+    # FOOTER (disegnato dal PageTemplate; "Page X of Y" con totale differito)
     # -------------------------
-    MAX_ROWS_PER_PAGE = 22
-
-    chunks = []
-    for start in range(0, max(len(all_data_rows), 1), MAX_ROWS_PER_PAGE):
-        chunks.append(all_data_rows[start:start + MAX_ROWS_PER_PAGE])
-    total_pages = len(chunks)
-
     test_date  = data_file or date.today().strftime("%d/%m/%Y")
     issue_date = date.today().strftime("%d/%m/%Y")
 
-    from reportlab.platypus import PageBreak
-
-    for page_idx, chunk in enumerate(chunks):
-        page_num = page_idx + 1
-
-        # Dalla pagina 2 in poi: ripeti header, sub e top3
-        if page_idx > 0:
-            story.append(PageBreak())
-            story.append(header)
-            story.append(sub)
-            story.append(top3)
-
-        # Header tabella sezioni
-        story.append(Spacer(1, 3))
-        big_hdr = Table(
-            [[
-                Paragraph("<b><i>Recorded Data</i></b>", P["th"]),
-                Paragraph("<b><i>Calculated Values</i></b>", P["th"]),
-                Paragraph("<b><i>Values Converted to contractual RPM &amp; S.G.</i></b>", P["th"]),
-            ]],
-            colWidths=[w_rec, w_cal, w_con]
-        )
-        big_hdr.setStyle(TableStyle([
-            ("GRID", (0, 0), (-1, -1), 0.9, colors.black),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#efefef")),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-        ]))
-        story.append(big_hdr)
-
-        # Tabella dati (2 righe intestazione + righe del chunk)
-        data = [hdr_row_names, hdr_row_units] + chunk
-
-        big_table = Table(data, colWidths=col_widths)
-        big_table.setStyle(TableStyle([
-            ("GRID", (0, 0), (-1, -1), 0.6, colors.black),
-            ("BACKGROUND", (0, 0), (-1, 1), colors.HexColor("#f5f5f5")),
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("FONTSIZE", (0, 0), (-1, -1), 6.7),
-            ("TOPPADDING", (0, 0), (-1, -1), 1.2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 1.2),
-            ("LEFTPADDING", (0, 0), (-1, -1), 1.2),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 1.2),
-        ]))
-        story.append(big_table)
-
-        # Footer con numero pagina corretto
-        story.append(Spacer(1, 4))
-        footer = Table(
-            [[
-                Paragraph(f"<b>Test Date :</b>&nbsp;{_safe(test_date)}", P["foot"]),
-                Paragraph(f"<b>Date of Issue :</b>&nbsp;{_safe(issue_date)}", P["foot"]),
-                Paragraph(f"<b>Page</b>&nbsp;{page_num} of {total_pages}", P["foot_right"]),
-            ]],
-            colWidths=[120*mm, 120*mm, (_PAGE_W - 2*_MARG_L - 240*mm)]
-        )
-        footer.setStyle(TableStyle([
-            ("GRID", (0, 0), (-1, -1), 0.9, colors.black),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ("LEFTPADDING", (0, 0), (-1, -1), 4),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-        ]))
-        story.append(footer)
+    footer = Table(
+        [[
+            Paragraph(f"<b>Test Date :</b>&nbsp;{_safe(test_date)}", P["foot"]),
+            Paragraph(f"<b>Date of Issue :</b>&nbsp;{_safe(issue_date)}", P["foot"]),
+            "",
+        ]],
+        colWidths=[120*mm, 120*mm, (_PAGE_W - 2*_MARG_L - 240*mm)]
+    )
+    footer.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.9, colors.black),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ]))
+
+    templates, pages_total = _certificate_page_templates(
+        key=key, head_blocks=[header, sub, top3], footer=footer
+    )
 
     # -------------------------
     # BLOCCO FINALE
@@ -616,14 +730,17 @@ def generate_pdf_report_like_standard(
         ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
     ]))
     story.append(notes_row)
+    # fine delle pagine dati: da qui il totale "Page X of Y" è noto
+    story.append(pages_total)
 
     # -------------------------
-    # PAGINE CURVE (due pagine: TDH+Eff, Power)
+    # PAGINE CURVE (due pagine: TDH+Eff, Power) - grafica vettoriale reportlab
+    # L'header lo disegna il template "curve"; qui resta solo il grafico.
     # -------------------------
     if tdms_path:
         try:
-            from reportlab.platypus import PageBreak
-            from curve_view import build_tdh_eff_figure, build_power_figure
+            from curve_data import compute_curve_series
+            from pdf_curves import build_tdh_eff_drawing, build_power_drawing
 
             # Leggi impostazioni salvate + unit_system
             try:
@@ -636,53 +753,27 @@ def generate_pdf_report_like_standard(
                 cs = {"show_points": True, "eff_min": 0.0, "eff_max": 100.0}
                 unit_system = "Metric"
 
-            def add_curve_page(curve_fig, title="Curve"):
-                if curve_fig is None:
+            # Stesse serie della UI, calcolate una volta dai dati TDMS già letti
+            series = compute_curve_series(
+                tdms_path, unit_system, perf=perf_metric, contract=contract
+            )
+
+            # Area disegno: stesso rapporto 11x7 delle vecchie figure matplotlib
+            avail_w = _PAGE_W - 2 * _MARG_L
+            avail_h = _PAGE_H - _MARG_T - _MARG_B - 20 * mm
+            fig_w_pt, fig_h_pt = 11 * 72, 7 * 72
+            scale = min(avail_w / fig_w_pt, avail_h / fig_h_pt)
+            draw_w = fig_w_pt * scale
+            draw_h = fig_h_pt * scale
+
+            def add_curve_page(drawing, title="Curve"):
+                if drawing is None:
                     return
-                buf = BytesIO()
-                curve_fig.savefig(buf, format="png", dpi=150, bbox_inches="tight")
-                buf.seek(0)
-
-                avail_w = _PAGE_W - 2 * _MARG_L
-                avail_h = _PAGE_H - _MARG_T - _MARG_B - 20 * mm
-
-                img_w_pt = curve_fig.get_figwidth() * 72
-                img_h_pt = curve_fig.get_figheight() * 72
-
-                scale = min(avail_w / img_w_pt, avail_h / img_h_pt)
-                draw_w = img_w_pt * scale
-                draw_h = img_h_pt * scale
-
-                story.append(PageBreak())
-
-                # Header con unit_system dinamico
-                unit_label = "SI (Metric)" if unit_system == "Metric" else "U.S. Customary"
-                curve_hdr = Table(
-                    [[
-                        Paragraph("FLOWSERVE", P["hdr_logo"]),
-                        Paragraph(f"ENGINEERING USE ONLY&nbsp;&nbsp;&nbsp;&nbsp;U.M. System : {unit_label}", P["hdr_mid"]),
-                        Paragraph(
-                            f"<b>Test Certificate num.</b>&nbsp;&nbsp;{_safe(cert_num)}<br/>"
-                            f"<b>{_safe(system_id)}</b>",
-                            P["hdr_right"]
-                        ),
-                    ]],
-                    colWidths=[50*mm, 160*mm, (_PAGE_W - 2*_MARG_L - 210*mm)]
-                )
-                curve_hdr.setStyle(TableStyle([
-                    ("GRID",          (0, 0), (-1, -1), 0.9, colors.black),
-                    ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING",   (0, 0), (-1, -1), 4),
-                    ("RIGHTPADDING",  (0, 0), (-1, -1), 4),
-                    ("TOPPADDING",    (0, 0), (-1, -1), 3),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-                ]))
-                story.append(curve_hdr)
-                story.append(Spacer(1, 4))
 
-                # Immagine con bordo
-                img = Image(buf, width=draw_w, height=draw_h)
-                img_frame = Table([[img]], colWidths=[draw_w])
+                story.append(PageBreak(nextTemplate=templates[1].id))
+
+                # Grafico vettoriale con bordo
+                img_frame = Table([[drawing]], colWidths=[draw_w])
                 img_frame.setStyle(TableStyle([
                     ("BOX",           (0, 0), (-1, -1), 0.9, colors.black),
                     ("LEFTPADDING",   (0, 0), (-1, -1), 0),
@@ -693,39 +784,73 @@ def generate_pdf_report_like_standard(
                 img_frame.hAlign = "CENTER"
                 story.append(img_frame)
 
-                try:
-                    import matplotlib
-                    matplotlib.pyplot.close(curve_fig)
-                except Exception:
-                    pass
-
             # Pagina 1: TDH + Efficiency
-            tdh_fig = build_tdh_eff_figure(
-                tdms_path,
+            add_curve_page(build_tdh_eff_drawing(
+                series, draw_w, draw_h,
                 show_points=cs["show_points"],
                 eff_min=cs["eff_min"],
                 eff_max=cs["eff_max"],
-                unit_system=unit_system,
-            )
-            add_curve_page(tdh_fig, "TDH + Efficiency")
+            ), "TDH + Efficiency")
 
             # Pagina 2: Power
-            pwr_fig = build_power_figure(
-                tdms_path,
+            add_curve_page(build_power_drawing(
+                series, draw_w, draw_h,
                 show_points=cs["show_points"],
-                unit_system=unit_system
-            )
-            add_curve_page(pwr_fig, "Absorbed Power")
+            ), "Absorbed Power")
 
         except Exception:
             pass  # se le curve falliscono, il PDF continua senza
 
-    doc.build(story)
+    return story, cert_num, templates
 
 
 # -------------------------
-# NEW: Preview helper (TEMP + open)
+# NEW: Preview helper (TEMP + open) - in background, con avanzamento
 # -------------------------
+# Anteprime in corso, per acquisizione: un secondo click non accoda un altro export
+_PREVIEW_INFLIGHT = {}
+
+
+def _progress_window(parent, title: str, on_cancel):
+    """Piccola finestra non modale: barra di avanzamento + Annulla. Ritorna (win, set_progress)."""
+    import tkinter as tk
+    from tkinter import ttk
+    win = tk.Toplevel(parent)
+    win.title(title)
+    win.resizable(False, False)
+    win.configure(bg="#f0f0f0")
+    win.transient(parent)
+    try:
+        import icon_helper
+        icon_helper.set_window_icon(win)
+    except Exception:
+        pass
+
+    msg_var = tk.StringVar(value="Avvio...")
+    tk.Label(win, textvariable=msg_var, bg="#f0f0f0", anchor="w", width=40).pack(padx=12, pady=(12, 4), fill=tk.X)
+    bar = ttk.Progressbar(win, orient="horizontal", length=320, mode="determinate", maximum=100)
+    bar.pack(padx=12, pady=4)
+
+    def _cancel():
+        msg_var.set("Annullamento...")
+        btn.config(state="disabled")
+        on_cancel()
+
+    btn = tk.Button(win, text="Annulla", width=12, command=_cancel)
+    btn.pack(padx=12, pady=(4, 12))
+    win.protocol("WM_DELETE_WINDOW", _cancel)
+
+    def set_progress(frac, msg):
+        try:
+            bar["value"] = int(frac * 100)
+            if str(btn["state"]) != "disabled":
+                msg_var.set(msg)
+        except tk.TclError:
+            pass  # finestra già chiusa
+
+    return win, set_progress
+
+
 def preview_pdf_report(
     parent,
     *,
@@ -738,10 +863,15 @@ def preview_pdf_report(
 ):
     """
     ✅ PREVIEW:
-    - Genera un PDF temporaneo in %TEMP%
-    - Lo apre nel viewer di default
+    - Genera un PDF temporaneo in %TEMP% in un thread separato (la UI resta reattiva)
+    - Mostra l'avanzamento con possibilità di annullare
+    - Lo apre nel viewer di default quando è pronto
     - L'utente può salvarlo dal viewer (Salva con nome...)
+    Se per la stessa acquisizione c'è già un'anteprima in corso, porta in primo piano
+    quella e ritorna None; altrimenti ritorna il percorso del PDF che verrà generato.
     """
+    import tkinter as tk
+    from tkinter import messagebox
     tdms_path      = _safe(meta_dict.get("_FilePath", "")).strip()
     acquisizione_id = meta_dict.get("id")
 
@@ -751,27 +881,53 @@ def preview_pdf_report(
     fname = _sanitize_filename(f"{n_collaudo} - {job}.pdf")
     pdf_path = os.path.join(tempfile.gettempdir(), fname)
 
-    try:
-        note_coll = note_collaudatore_get(tdms_path) or ""
-        note_ing  = note_ingegneria_get(tdms_path) or ""
+    key = acquisizione_id if acquisizione_id is not None else (tdms_path or pdf_path)
+    running = _PREVIEW_INFLIGHT.get(key)
+    if running:
+        try:
+            running["win"].lift()
+        except Exception:
+            pass
+        return None
 
-        generate_pdf_report_like_standard(
-            pdf_path=pdf_path,
-            values_tuple=values_tuple,
-            meta_dict=meta_dict,
-            change_date=change_date,
-            username=username,
-            note_collaudo=note_coll,
-            note_ingegneria=note_ing,
-            acquisizione_id=acquisizione_id,
-        )
+    cancel = threading.Event()
+    win, set_progress = _progress_window(parent, f"PDF {n_collaudo}", on_cancel=cancel.set)
+    _PREVIEW_INFLIGHT[key] = {"win": win, "cancel": cancel}
 
-        _open_file_default_app(pdf_path)
-        return pdf_path
+    def _finish(error=None):
+        _PREVIEW_INFLIGHT.pop(key, None)
+        try:
+            win.destroy()
+        except tk.TclError:
+            pass
+        if error is None:
+            _open_file_default_app(pdf_path)
+        elif not isinstance(error, PdfCancelled):
+            messagebox.showerror("Anteprima PDF", f"Impossibile generare/aprire il PDF:\n{error}")
+
+    def _worker():
+        try:
+            note_coll = note_collaudatore_get(tdms_path) or ""
+            note_ing  = note_ingegneria_get(tdms_path) or ""
+
+            generate_pdf_report_like_standard(
+                pdf_path=pdf_path,
+                values_tuple=values_tuple,
+                meta_dict=meta_dict,
+                change_date=change_date,
+                username=username,
+                note_collaudo=note_coll,
+                note_ingegneria=note_ing,
+                acquisizione_id=acquisizione_id,
+                progress=lambda f, m: parent.after(0, lambda: set_progress(f, m)),
+                cancel_event=cancel,
+            )
+            parent.after(0, _finish)
+        except Exception as e:
+            parent.after(0, lambda e=e: _finish(e))
 
-    except Exception as e:
-        messagebox.showerror("Anteprima PDF", f"Impossibile generare/aprire il PDF:\n{e}")
-        return None
+    threading.Thread(target=_worker, daemon=True).start()
+    return pdf_path
 
 
 # -------------------------
@@ -794,6 +950,7 @@ def generate_and_save_pdf_interactive(
       - formattazione numeri/placeholder con ui_format
       - nome suggerito "N° COLLAUDO - JOB.pdf"
     """
+    from tkinter import filedialog, messagebox
     job = _safe(values_tuple[0]).strip() if values_tuple and len(values_tuple) > 0 else "JOB"
     n_collaudo = _safe(values_tuple[1]).strip() if values_tuple and len(values_tuple) > 1 else "COLLAUDO"
     suggested = _sanitize_filename(f"{n_collaudo} - {job}.pdf")
@@ -806,7 +963,7 @@ def generate_and_save_pdf_interactive(
         filetypes=[("PDF", "*.pdf")],
     )
     if not pdf_path:
-        return None
+        return None
 
     try:
         tdms_path       = _safe(meta_dict.get("_FilePath", ""))
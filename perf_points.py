@@ -0,0 +1,61 @@
+"""
+Punti di performance (tabelle Recorded/Calc/Converted del TDMS) salvati nella
+tabella perf_points, per confronti tra collaudi e overlay senza riaprire i file.
+
+Opzionale all'import dalla dashboard (il calcolo delle medie dei canali costa):
+    config.ini
+        [Ingest]
+        perf_points = 1
+
+Backfill delle acquisizioni già presenti:
+    python -m pt2025 backfill points
+    python -m pt2025 --db D:/dati/collaudi.db backfill points
+
+Lettura: db.select_perf_points(ids, ["FLOW", "TDH"], kind="Converted").
+"""
+import os
+
+import db
+from tdms_reader import read_performance_tables_dynamic
+
+# TIPO TEST -> test_index dei gruppi TDMS (come in certificate_view)
+_TEST_INDEX = {"PERFORMANCE": 0, "NPSH": 1, "RUNNING": 2}
+
+
+def enabled() -> bool:
+    """True se config.ini chiede di salvare i punti all'import ([Ingest] perf_points)."""
+    try:
+        from config_manager import load_config
+        cfg = load_config()
+        return cfg.getboolean("Ingest", "perf_points", fallback=False)
+    except Exception:
+        return False
+
+
+def read_tables(filepath: str, tipo_test: str = "PERFORMANCE") -> dict:
+    """Tabelle Recorded/Calc/Converted del TDMS per il tipo test (nessun accesso al DB)."""
+    test_index = _TEST_INDEX.get(str(tipo_test or "").upper(), 0)
+    return read_performance_tables_dynamic(filepath, test_index=test_index)
+
+
+def store(acq_id: int, filepath: str, tipo_test: str = "PERFORMANCE") -> bool:
+    """Legge le tabelle del TDMS e le salva per l'acquisizione. False se il file non c'è."""
+    if not (filepath and os.path.exists(filepath)):
+        return False
+    db.set_perf_points(acq_id, read_tables(filepath, tipo_test))
+    return True
+
+
+def backfill(progress=None) -> dict:
+    """
+    Salva i punti per tutte le acquisizioni che non li hanno ancora.
+    progress(done, total, acq_id, ok) viene chiamata dopo ogni acquisizione.
+    """
+    todo = db.select_ids_without_perf_points()
+    res = {"ok": [], "missing": []}
+    for i, (acq_id, filepath, tipo_test) in enumerate(todo, start=1):
+        ok = store(acq_id, filepath, tipo_test)
+        res["ok" if ok else "missing"].append(acq_id)
+        if progress:
+            progress(i, len(todo), acq_id, ok)
+    return res
@@ -0,0 +1,265 @@
+"""
+Strumentazione leggera dei percorsi caldi (lettura TDMS, DB, curve, PDF).
+
+Attivazione (letta una volta all'import):
+  - variabile d'ambiente PT2025_TRACE=1, oppure
+  - config.ini:
+        [Debug]
+        trace = 1
+        trace_file = C:/temp/pt2025_trace.json   (opzionale)
+        trace_buffer = 50000                     (opzionale, eventi nel ring buffer)
+
+Uso:
+    @perf_trace.traced(cat="tdms")
+    def read_xxx(...): ...
+
+    with perf_trace.span("render_blocks", "ui"):
+        ...
+
+    perf_trace.count("bytes_read", arr.nbytes)   # sommato allo span attivo
+
+Ogni span registra tempo, thread e contatori (byte letti, statement DB, ...)
+in un ring buffer. All'uscita dell'app vengono scritti il trace in formato
+Chrome (apribile con chrome://tracing o https://ui.perfetto.dev) e un
+riepilogo testuale per funzione (<trace_file>.txt).
+
+Da disattivato: traced() ritorna la funzione originale, span() un context
+manager vuoto e count()/mark() escono al primo controllo.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from collections import deque
+from contextlib import nullcontext
+
+import config_manager
+
+ENV_FLAG = "PT2025_TRACE"
+ENV_FILE = "PT2025_TRACE_FILE"
+DEFAULT_BUFFER = 50000
+
+_NULL = nullcontext()
+_EPOCH_NS = time.perf_counter_ns()
+_PID = os.getpid()
+
+_tls = threading.local()
+_events = deque(maxlen=DEFAULT_BUFFER)
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def _truthy(v) -> bool:
+    return str(v or "").strip().lower() in ("1", "true", "yes", "on", "si")
+
+
+def _read_settings():
+    """(enabled, trace_file, buffer) da ambiente o config.ini."""
+    try:
+        cfg = config_manager.load_config()
+        sect = cfg["Debug"] if "Debug" in cfg else {}
+    except Exception:
+        sect = {}
+
+    enabled = _truthy(os.environ.get(ENV_FLAG)) or _truthy(sect.get("trace"))
+    trace_file = os.environ.get(ENV_FILE) or sect.get("trace_file") or os.path.join(
+        os.path.dirname(config_manager.get_config_path()), "pt2025_trace.json"
+    )
+    try:
+        buffer = max(1000, int(sect.get("trace_buffer", DEFAULT_BUFFER)))
+    except Exception:
+        buffer = DEFAULT_BUFFER
+    return enabled, trace_file, buffer
+
+
+ENABLED, TRACE_FILE, _buffer = _read_settings()
+if _buffer != DEFAULT_BUFFER:
+    _events = deque(maxlen=_buffer)
+
+
+def _stack() -> list:
+    st = getattr(_tls, "stack", None)
+    if st is None:
+        st = _tls.stack = []
+    return st
+
+
+# ================== API ==================
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "counters", "t0")
+
+    def __init__(self, name: str, cat: str, args: dict):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.counters = {}
+
+    def __enter__(self):
+        _stack().append(self)
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter_ns()
+        st = _stack()
+        if st and st[-1] is self:
+            st.pop()
+        # i contatori dei figli valgono anche per il padre (tempi inclusivi)
+        if st:
+            parent = st[-1].counters
+            for k, v in self.counters.items():
+                parent[k] = parent.get(k, 0) + v
+        _record(self.name, self.cat, self.t0, t1 - self.t0, self.args, self.counters,
+                error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+def span(name: str, cat: str = "", **args):
+    """Context manager che misura il blocco; args finiscono nel trace."""
+    if not ENABLED:
+        return _NULL
+    return _Span(name, cat, args)
+
+
+def traced(name: str = None, cat: str = ""):
+    """Decoratore: uno span per ogni chiamata. Da disattivato non avvolge nulla."""
+    def deco(func):
+        if not ENABLED:
+            return func
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*a, **kw):
+            with _Span(label, cat, {}):
+                return func(*a, **kw)
+        return wrapper
+    return deco
+
+
+def count(key: str, n=1) -> None:
+    """Somma n al contatore `key` dello span attivo nel thread corrente."""
+    if not ENABLED:
+        return
+    st = _stack()
+    if st:
+        c = st[-1].counters
+        c[key] = c.get(key, 0) + n
+
+
+def mark(name: str, cat: str = "", **args) -> None:
+    """Evento istantaneo (es. 'dashboard pronta') con il tempo dall'avvio."""
+    if not ENABLED:
+        return
+    _events.append(("i", name, cat, time.perf_counter_ns(), 0, threading.get_ident(), args))
+
+
+def watch_connection(conn) -> None:
+    """Conta gli statement eseguiti su una connessione sqlite3 (round trip DB)."""
+    if not ENABLED:
+        return
+    count("db_connect")
+    try:
+        conn.set_trace_callback(lambda _sql: count("db_roundtrips"))
+    except Exception:
+        pass
+
+
+def _record(name, cat, t0, dur, args, counters, error=None):
+    if error:
+        args = dict(args, error=error)
+    if counters:
+        args = dict(args, **counters)
+    _events.append(("X", name, cat, t0, dur, threading.get_ident(), args))
+    with _totals_lock:
+        tot = _totals.get(name)
+        if tot is None:
+            tot = _totals[name] = {"cat": cat, "calls": 0, "total_ns": 0, "max_ns": 0, "counters": {}}
+        tot["calls"] += 1
+        tot["total_ns"] += dur
+        if dur > tot["max_ns"]:
+            tot["max_ns"] = dur
+        for k, v in counters.items():
+            tot["counters"][k] = tot["counters"].get(k, 0) + v
+
+
+# ================== EXPORT ==================
+
+def chrome_trace() -> dict:
+    """Eventi del ring buffer nel formato Trace Event di Chrome."""
+    out = []
+    for ph, name, cat, t0, dur, tid, args in list(_events):
+        ev = {"name": name, "cat": cat or "app", "ph": ph, "pid": _PID, "tid": tid,
+              "ts": (t0 - _EPOCH_NS) / 1000.0}
+        if ph == "X":
+            ev["dur"] = dur / 1000.0
+        else:
+            ev["s"] = "p"
+        if args:
+            ev["args"] = {k: (v if isinstance(v, (int, float, bool)) or v is None else str(v))
+                          for k, v in args.items()}
+        out.append(ev)
+    return {"traceEvents": out, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path: str = None) -> str:
+    path = path or TRACE_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+    return path
+
+
+def summary() -> str:
+    """Tabella per funzione: chiamate, tempo totale/medio/max, contatori."""
+    with _totals_lock:
+        items = sorted(_totals.items(), key=lambda kv: kv[1]["total_ns"], reverse=True)
+        items = [(k, dict(v, counters=dict(v["counters"]))) for k, v in items]
+
+    keys = sorted({k for _, v in items for k in v["counters"]})
+    head = ["funzione", "cat", "chiamate", "totale ms", "medio ms", "max ms"] + keys
+    rows = []
+    for name, v in items:
+        calls = v["calls"]
+        rows.append([
+            name, v["cat"], str(calls),
+            f"{v['total_ns'] / 1e6:.1f}",
+            f"{v['total_ns'] / 1e6 / calls:.2f}",
+            f"{v['max_ns'] / 1e6:.1f}",
+        ] + [str(v["counters"].get(k, "")) for k in keys])
+
+    widths = [max(len(r[i]) for r in [head] + rows) for i in range(len(head))]
+    lines = ["  ".join(c.ljust(w) if i < 2 else c.rjust(w) for i, (c, w) in enumerate(zip(r, widths)))
+             for r in [head] + rows]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+def reset() -> None:
+    _events.clear()
+    with _totals_lock:
+        _totals.clear()
+
+
+def _dump_at_exit():
+    if not _events:
+        return
+    try:
+        path = TRACE_FILE
+        # i processi del pool PDF scrivono un file proprio, senza sovrascrivere quello dell'app
+        import multiprocessing
+        if multiprocessing.parent_process() is not None:
+            base, ext = os.path.splitext(path)
+            path = f"{base}.{_PID}{ext}"
+        path = export_chrome_trace(path)
+        text = summary()
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"[trace] {path}\n{text}")
+    except Exception as e:
+        print(f"[trace] export fallito: {e}")
+
+
+if ENABLED:
+    atexit.register(_dump_at_exit)
@@ -0,0 +1,415 @@
+"""
+Riga di comando PT2025, senza interfaccia grafica (nessun import di tkinter):
+per import notturni, verifiche ed export PDF su server.
+
+    python -m pt2025 ingest D:/collaudi/TDMS --workers 4
+    python -m pt2025 verify --deep
+    python -m pt2025 export --out D:/pdf --job ABC123
+    python -m pt2025 export --out D:/pdf --from 2026-01-01 --to 2026-03-31
+    python -m pt2025 warm --job ABC123
+    python -m pt2025 backfill                      (contract, points, fingerprint)
+    python -m pt2025 backfill fingerprint --full
+    python -m pt2025 relocate --root D:/archivio/TDMS
+    python -m pt2025 search "cavitation ACME"
+    python -m pt2025 backup --keep 14
+    python -m pt2025 backup --if-due 24
+
+Opzioni comuni (prima del sottocomando):
+    --db PERCORSO   database (default: ultimo usato / collaudi.db)
+    --json          avanzamento come righe JSON su stdout, una per evento:
+                    {"cmd": ..., "event": "progress", "done": n, "total": m, ...}
+                    {"cmd": ..., "event": "done", ...riepilogo...}
+
+Codice di uscita: 0 tutto ok, 1 se almeno un file/report è fallito o mancante.
+"""
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import db
+import ingest
+from pdf_batch import EXPORTABLE_STATES, export_pdfs
+
+
+# -------------------- Output --------------------
+class _Reporter:
+    """Stampa l'avanzamento leggibile oppure come righe JSON (--json)."""
+
+    def __init__(self, cmd: str, as_json: bool):
+        self.cmd = cmd
+        self.as_json = as_json
+
+    def progress(self, done: int, total: int, text: str, **fields) -> None:
+        if self.as_json:
+            self._emit({"event": "progress", "done": done, "total": total, **fields})
+        else:
+            print(f"[{done}/{total}] {text}", flush=True)
+
+    def done(self, text: str, **fields) -> None:
+        if self.as_json:
+            self._emit({"event": "done", **fields})
+        else:
+            print(text, flush=True)
+
+    def _emit(self, payload: dict) -> None:
+        print(json.dumps({"cmd": self.cmd, **payload}, ensure_ascii=False, default=str), flush=True)
+
+
+def _workers_arg(ap) -> None:
+    ap.add_argument("--workers", type=int, default=None, help="numero di processi (default: n. core)")
+
+
+def _filter_args(ap) -> None:
+    ap.add_argument("--job", help="solo le acquisizioni della commessa indicata")
+    ap.add_argument("--from", dest="date_from", help="data minima YYYY-MM-DD (inclusa)")
+    ap.add_argument("--to", dest="date_to", help="data massima YYYY-MM-DD (inclusa)")
+
+
+def _run_pool(fn, items, workers):
+    """Esegue fn(*item) su più processi (o inline con un solo worker); genera i risultati."""
+    max_workers = max(1, min(workers or os.cpu_count() or 1, len(items)))
+    if max_workers == 1:
+        for item in items:
+            yield fn(*item)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as ex:
+        futures = [ex.submit(fn, *item) for item in items]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+# -------------------- ingest --------------------
+def cmd_ingest(args, rep: _Reporter) -> int:
+    if not os.path.isdir(args.folder):
+        rep.done(f"Cartella non trovata: {args.folder}", ok=0, failed=0, error="folder not found")
+        return 1
+
+    def _progress(done, total, filepath, err):
+        rep.progress(done, total, f"{'ERRORE: ' + err if err else 'OK'}  {filepath}",
+                     file=filepath, ok=not err, error=err or None)
+
+    res = ingest.ingest_folder(
+        args.folder,
+        created_by=args.user,
+        workers=args.workers,
+        recursive=not args.no_recursive,
+        with_points=True if args.points else None,
+        with_hash=True if args.full_hash else None,
+        progress=_progress,
+    )
+    rep.done(f"Importati: {len(res['ok'])}  Duplicati: {len(res['duplicates'])}  Errori: {len(res['failed'])}",
+             ok=len(res["ok"]), duplicates=len(res["duplicates"]), failed=len(res["failed"]))
+    return 1 if res["failed"] else 0
+
+
+# -------------------- verify --------------------
+def _verify_worker(filepath: str, deep: bool) -> tuple:
+    """(filepath, errore): file mancante o, con deep, TDMS non leggibile."""
+    if not os.path.exists(filepath):
+        return filepath, "missing"
+    if deep:
+        try:
+            from tdms_reader import read_tdms_fields, detect_test_types
+            read_tdms_fields(filepath)
+            detect_test_types(filepath)
+        except Exception as e:
+            return filepath, f"{type(e).__name__}: {e}"
+    return filepath, ""
+
+
+def cmd_verify(args, rep: _Reporter) -> int:
+    paths = db.select_all_filepaths()
+    total = len(paths)
+    bad = []
+    # Senza --deep è solo os.path.exists: inutile lanciare processi
+    workers = args.workers if args.deep else 1
+    items = [(p, args.deep) for p in paths]
+    for done, (filepath, err) in enumerate(_run_pool(_verify_worker, items, workers), start=1):
+        if err:
+            bad.append((filepath, err))
+        rep.progress(done, total, f"{'ERRORE: ' + err if err else 'OK'}  {filepath}",
+                     file=filepath, ok=not err, error=err or None)
+    missing = sum(1 for _, e in bad if e == "missing")
+    rep.done(f"File: {total}  Mancanti: {missing}  Illeggibili: {len(bad) - missing}",
+             files=total, missing=missing, unreadable=len(bad) - missing)
+    return 1 if bad else 0
+
+
+# -------------------- export --------------------
+def cmd_export(args, rep: _Reporter) -> int:
+    stati = None if args.all_states else EXPORTABLE_STATES
+    ids = list(args.ids)
+    if args.job or args.date_from or args.date_to:
+        ids.extend(db.select_ids_by_filter(args.job, args.date_from, args.date_to, stati))
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        rep.done("Nessuna acquisizione da esportare", ok=0, failed=0, skipped=0)
+        return 0
+
+    def _progress(done, total, acq_id, pdf_path, err):
+        rep.progress(done, total, f"id={acq_id} " + (f"ERRORE: {err}" if err else f"-> {pdf_path}"),
+                     id=acq_id, pdf=pdf_path or None, ok=not err, error=err or None)
+
+    res = export_pdfs(
+        ids, args.out,
+        username=args.user,
+        workers=args.workers,
+        progress=_progress,
+        only_exportable=not args.all_states,
+    )
+    rep.done(f"Completati: {len(res['ok'])}  Errori: {len(res['failed'])}  Saltati: {len(res['skipped'])}",
+             ok=len(res["ok"]), failed=len(res["failed"]), skipped=len(res["skipped"]))
+    return 1 if res["failed"] else 0
+
+
+# -------------------- warm --------------------
+def _warm_worker(filepath: str, test_types: tuple) -> tuple:
+    """Gira nel worker: (filepath, contract, {tipo_test: tabelle}, errore)."""
+    if not os.path.exists(filepath):
+        return filepath, None, {}, "missing"
+    try:
+        from tdms_reader import read_contract_and_loop_data
+        import perf_points
+        contract = read_contract_and_loop_data(filepath)
+        perf = {t: perf_points.read_tables(filepath, t) for t in test_types}
+        return filepath, contract, perf, ""
+    except Exception as e:
+        return filepath, None, {}, f"{type(e).__name__}: {e}"
+
+
+def cmd_warm(args, rep: _Reporter) -> int:
+    """
+    Legge i TDMS selezionati (campi contrattuali + tabelle di performance) e
+    aggiorna le colonne contrattuali e perf_points: dashboard, curve e overlay
+    poi non riaprono i file. Come effetto collaterale scalda la cache del disco.
+    """
+    ids = db.select_ids_by_filter(args.job, args.date_from, args.date_to)
+    by_file = {}
+    for r in db.select_acquisizioni_by_ids(ids):
+        acq_id, tipo_test, filepath = r[0], r[9], r[11]
+        if filepath:
+            by_file.setdefault(filepath, []).append((acq_id, tipo_test or "PERFORMANCE"))
+
+    items = [(fp, tuple(dict.fromkeys(t for _, t in acqs))) for fp, acqs in by_file.items()]
+    total = len(items)
+    failed = 0
+    for done, (filepath, contract, perf, err) in enumerate(
+            _run_pool(_warm_worker, items, args.workers), start=1):
+        if not err:
+            try:
+                db.set_contract_fields(filepath, contract)
+                for acq_id, tipo_test in by_file[filepath]:
+                    db.set_perf_points(acq_id, perf[tipo_test])
+            except Exception as e:
+                err = f"{type(e).__name__}: {e}"
+        failed += bool(err)
+        rep.progress(done, total, f"{'ERRORE: ' + err if err else 'OK'}  {filepath}",
+                     file=filepath, ok=not err, error=err or None)
+    rep.done(f"File: {total}  Errori: {failed}", files=total, failed=failed)
+    return 1 if failed else 0
+
+
+# -------------------- backfill --------------------
+BACKFILL_TARGETS = ("contract", "points", "fingerprint")
+
+
+def _backfill_target(value: str) -> str:
+    # type= invece di choices=: con nargs="*" argparse confronta anche la lista vuota
+    if value not in BACKFILL_TARGETS:
+        raise argparse.ArgumentTypeError(f"{value!r} non valido (scegliere tra {', '.join(BACKFILL_TARGETS)})")
+    return value
+
+
+def cmd_backfill(args, rep: _Reporter) -> int:
+    """
+    Completa solo le righe che non hanno ancora i dati (warm invece rilegge
+    tutto il filtro): campi contrattuali, punti di performance, impronte.
+    """
+    missing = 0
+    for target in args.targets or BACKFILL_TARGETS:
+        if target == "contract":
+            import contract_index
+            res = contract_index.backfill(
+                lambda done, total, path, ok: rep.progress(
+                    done, total, f"contract {'OK' if ok else 'FILE MANCANTE'}  {path}",
+                    target=target, file=path, ok=ok))
+        elif target == "points":
+            import perf_points
+            res = perf_points.backfill(
+                lambda done, total, acq_id, ok: rep.progress(
+                    done, total, f"points id={acq_id} {'OK' if ok else 'FILE MANCANTE'}",
+                    target=target, id=acq_id, ok=ok))
+        else:
+            import fingerprint
+            res = fingerprint.backfill(
+                full=args.full,
+                progress=lambda done, total, path, ok: rep.progress(
+                    done, total, f"fingerprint {'OK' if ok else 'FILE MANCANTE'}  {path}",
+                    target=target, file=path, ok=ok))
+        missing += len(res["missing"])
+        rep.progress(len(res["ok"]), len(res["ok"]) + len(res["missing"]),
+                     f"{target}: calcolati {len(res['ok'])}, file mancanti {len(res['missing'])}",
+                     target=target, saved=len(res["ok"]), missing=len(res["missing"]))
+    rep.done(f"File mancanti: {missing}", missing=missing)
+    return 0
+
+
+# -------------------- relocate --------------------
+def cmd_relocate(args, rep: _Reporter) -> int:
+    import relocate
+
+    roots = args.root if args.root is not None else relocate.roots_from_config()
+    if roots and not args.no_scan:
+        def _progress(dirs, listed):
+            if dirs % 100 == 0:
+                rep.progress(dirs, 0, f"cartelle: {dirs}  rilette: {listed}", dirs=dirs, listed=listed)
+
+        stats = relocate.update_index(roots, workers=args.workers, progress=_progress)
+        rep.progress(stats["dirs"], stats["dirs"],
+                     f"indice aggiornato: cartelle {stats['dirs']}, rilette {stats['listed']}", **stats)
+    res = relocate.relink_missing(workers=args.workers)
+    total = len(res["relinked"]) + len(res["conflicts"]) + len(res["not_found"])
+    done = 0
+    for old, new in res["relinked"]:
+        done += 1
+        rep.progress(done, total, f"RICOLLEGATO  {old}  ->  {new}", file=old, new=new, ok=True)
+    for old, new in res["conflicts"]:
+        done += 1
+        rep.progress(done, total, f"CONFLITTO    {old}  ->  {new}  (già importato dal nuovo percorso)",
+                     file=old, new=new, ok=False, error="already imported")
+    for old in res["not_found"]:
+        done += 1
+        rep.progress(done, total, f"NON TROVATO  {old}", file=old, ok=False, error="not found")
+    rep.done(f"File: {res['checked']}  Ricollegati: {len(res['relinked'])}  "
+             f"Conflitti: {len(res['conflicts'])}  Non trovati: {len(res['not_found'])}",
+             files=res["checked"], relinked=len(res["relinked"]), conflicts=len(res["conflicts"]),
+             not_found=len(res["not_found"]))
+    return 1 if (res["not_found"] or res["conflicts"]) else 0
+
+
+# -------------------- search --------------------
+def cmd_search(args, rep: _Reporter) -> int:
+    if args.rebuild:
+        db.rebuild_fts()
+    if not db.fts_available():
+        rep.done("Ricerca full-text non disponibile (SQLite senza FTS5)", found=0, error="fts5 not available")
+        return 1
+    hits = db.search_fulltext(args.text, limit=args.limit)
+    rows = {r[0]: r for r in db.select_acquisizioni_by_ids([h[0] for h in hits])}
+    for done, (acq_id, snippet) in enumerate(hits, start=1):
+        r = rows.get(acq_id)
+        job, n_collaudo = (r[1], r[2]) if r else ("", "")
+        rep.progress(done, len(hits), f"id={acq_id} {job} {n_collaudo}  {snippet}",
+                     id=acq_id, job=job, n_collaudo=n_collaudo, snippet=snippet)
+    rep.done(f"Trovati: {len(hits)}", found=len(hits))
+    return 0
+
+
+# -------------------- backup --------------------
+def cmd_backup(args, rep: _Reporter) -> int:
+    import backup
+
+    state = {"last": -1}
+
+    def _progress(done, total):
+        pct = done * 100 // max(1, total)
+        if pct // 10 != state["last"]:
+            state["last"] = pct // 10
+            rep.progress(done, total, f"pagine {done}/{total}", pages=done)
+
+    kwargs = {"keep": args.keep, "pages": args.pages, "sleep_ms": args.sleep_ms, "progress": _progress}
+    if args.if_due is not None:
+        res = backup.run_if_due(args.if_due, args.dir, **kwargs)
+        if res is None:
+            rep.done("Backup non necessario (copia recente o backup già in corso)", skipped=True)
+            return 0
+    else:
+        res = backup.run_backup(args.dir, **kwargs)
+    if not res["ok"]:
+        rep.done(f"ERRORE: backup non riuscito, {res['error'] or 'quick_check: ' + res['check']}",
+                 ok=False, check=res["check"], error=res["error"] or None)
+        return 1
+    rep.done(f"Copia: {res['path']}  ({res['pages']} pagine, {res['seconds']} s)  Rimosse: {len(res['removed'])}",
+             ok=True, path=res["path"], pages=res["pages"], seconds=res["seconds"], removed=res["removed"])
+    return 0
+
+
+# -------------------- main --------------------
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="pt2025", description="PT2025 da riga di comando (senza GUI)")
+    ap.add_argument("--db", help="percorso del database (default: ultimo usato / collaudi.db)")
+    ap.add_argument("--json", action="store_true", help="avanzamento come righe JSON")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("ingest", help="importa i TDMS nuovi di una cartella")
+    p.add_argument("folder", help="cartella con i file DATA-REC_*.tdms")
+    p.add_argument("--user", default="", help="utente da registrare come created_by")
+    p.add_argument("--no-recursive", action="store_true", help="non scendere nelle sottocartelle")
+    p.add_argument("--points", action="store_true",
+                   help="salva anche i punti di performance (default: [Ingest] perf_points)")
+    p.add_argument("--full-hash", action="store_true",
+                   help="calcola anche l'hash completo dei file (default: [Ingest] full_hash)")
+    _workers_arg(p)
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("verify", help="controlla che i TDMS del DB esistano (e siano leggibili)")
+    p.add_argument("--deep", action="store_true", help="apre anche ogni TDMS")
+    _workers_arg(p)
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("export", help="export PDF per id, commessa o intervallo di date")
+    p.add_argument("ids", nargs="*", type=int, help="id delle acquisizioni da esportare")
+    p.add_argument("--out", required=True, help="cartella di destinazione dei PDF")
+    _filter_args(p)
+    p.add_argument("--all-states", action="store_true",
+                   help="esporta anche i collaudi non Approved/Rejected")
+    p.add_argument("--user", default="", help="nome utente da riportare nel report")
+    _workers_arg(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("warm", help="precarica nel DB campi contrattuali e punti dai TDMS")
+    _filter_args(p)
+    _workers_arg(p)
+    p.set_defaults(func=cmd_warm)
+
+    p = sub.add_parser("backfill", help="completa nel DB i dati mancanti letti dai TDMS")
+    p.add_argument("targets", nargs="*", type=_backfill_target, metavar="COSA",
+                   help=f"uno o più tra {', '.join(BACKFILL_TARGETS)} (default: tutti)")
+    p.add_argument("--full", action="store_true", help="fingerprint: calcola anche l'hash completo")
+    p.set_defaults(func=cmd_backfill)
+
+    p = sub.add_parser("relocate", help="ricollega i TDMS spostati cercandoli nelle cartelle radice")
+    p.add_argument("--root", action="append", default=None,
+                   help="cartella radice (ripetibile; default: [Relocate] roots)")
+    p.add_argument("--no-scan", action="store_true", help="non riscansiona, usa l'indice esistente")
+    _workers_arg(p)
+    p.set_defaults(func=cmd_relocate)
+
+    p = sub.add_parser("search", help="ricerca full-text su note e campi contrattuali")
+    p.add_argument("text", help="parole da cercare (prefissi, tutte presenti)")
+    p.add_argument("--limit", type=int, default=50, help="numero massimo di risultati (default: 50)")
+    p.add_argument("--rebuild", action="store_true", help="ricostruisce prima l'indice")
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser("backup", help="backup a caldo del DB con rotazione delle copie")
+    p.add_argument("--dir", default=None, help="cartella delle copie (default: [Backup] dir / backup accanto al DB)")
+    p.add_argument("--keep", type=int, default=None, help="copie da tenere (default: [Backup] keep / 7)")
+    p.add_argument("--pages", type=int, default=None, help="pagine copiate per passo (default: 256)")
+    p.add_argument("--sleep-ms", type=int, default=None, help="pausa tra i passi in ms (default: 20)")
+    p.add_argument("--if-due", type=float, default=None, metavar="ORE",
+                   help="fa la copia solo se l'ultima ha più di ORE ore")
+    p.set_defaults(func=cmd_backup)
+
+    args = ap.parse_args(argv)
+
+    db.open_db(args.db)
+
+    return args.func(args, _Reporter(args.cmd, args.json))
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Ricollegamento dei TDMS spostati (riorganizzazione delle share).
+
+Le cartelle radice vengono lette una volta, in parallelo (os.scandir su più
+thread: su share di rete il tempo è quasi tutto attesa), e il risultato va
+nell'indice nome file -> percorso del DB (i nomi DATA-REC_... sono univoci).
+Alle scansioni successive le cartelle con mtime invariato non vengono rilette.
+Poi tutti i percorsi mancanti di acquisizioni (e notes) vengono aggiornati
+in un'unica transazione.
+
+    config.ini
+        [Relocate]
+        roots = \\\\server\\collaudi; D:/archivio/TDMS
+
+    python -m pt2025 relocate
+    python -m pt2025 --db D:/dati/collaudi.db relocate --root D:/archivio/TDMS
+    python -m pt2025 relocate --no-scan          (usa l'indice già presente)
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import db
+from ingest import TDMS_PATTERN
+
+DEFAULT_WORKERS = 16
+
+
+def roots_from_config() -> list:
+    """Cartelle radice da [Relocate] roots (separate da ';' o a capo)."""
+    try:
+        from config_manager import load_config
+        raw = load_config().get("Relocate", "roots", fallback="")
+    except Exception:
+        raw = ""
+    return [r.strip() for r in raw.replace("\n", ";").split(";") if r.strip()]
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _under(path: str, roots: list) -> bool:
+    p = _norm(path)
+    return any(p == r or p.startswith(r.rstrip(os.sep) + os.sep) for r in roots)
+
+
+def _visit(path: str, known) -> tuple:
+    """
+    Gira nel thread: (cartella, mtime, sottocartelle, file, sparita).
+    file è None se la cartella non è cambiata dall'ultima scansione
+    (mtime uguale: stessi file e stesse sottocartelle) o non è leggibile.
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return path, None, [], None, True
+    except OSError:
+        return path, None, known[1] if known else [], None, False
+    if known and known[0] == mtime:
+        return path, mtime, known[1], None, False
+    subdirs, files = [], {}
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif TDMS_PATTERN.fullmatch(entry.name):
+                        files[entry.name] = entry.path
+                except OSError:
+                    pass
+    except OSError:
+        return path, None, known[1] if known else [], None, False
+    return path, mtime, sorted(subdirs), files, False
+
+
+def update_index(roots: list, workers: int = None, progress=None) -> dict:
+    """
+    Aggiorna l'indice dei TDMS sotto roots. Le cartelle non raggiungibili
+    mantengono le voci già presenti (una share offline non svuota l'indice).
+    progress(cartelle visitate, cartelle rilette) ogni tanto.
+    Ritorna {"dirs": visitate, "listed": rilette, "files": file trovati nelle rilette}.
+    """
+    known = db.tdms_index_dirs_get()
+    visited, changed, gone = set(), {}, []
+    stats = {"dirs": 0, "listed": 0, "files": 0}
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as ex:
+        pending = set()
+        for root in roots:
+            if root not in visited:
+                visited.add(root)
+                pending.add(ex.submit(_visit, root, known.get(root)))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                path, mtime, subdirs, files, is_gone = fut.result()
+                if is_gone:
+                    gone.append(path)
+                    continue
+                stats["dirs"] += 1
+                if files is not None:
+                    changed[path] = (mtime, subdirs, files)
+                    stats["listed"] += 1
+                    stats["files"] += len(files)
+                for sub in subdirs:
+                    if sub not in visited:
+                        visited.add(sub)
+                        pending.add(ex.submit(_visit, sub, known.get(sub)))
+            if progress:
+                progress(stats["dirs"], stats["listed"])
+
+    norm_roots = [_norm(r) for r in roots]
+    removed = [d for d in known if d in gone or (d not in visited and _under(d, norm_roots))]
+    db.tdms_index_apply(changed, removed)
+    return stats
+
+
+def locate(filepath: str) -> str:
+    """Percorso attuale del TDMS secondo l'indice ("" se non c'è o non esiste più)."""
+    name = os.path.basename(filepath or "")
+    if not name:
+        return ""
+    found = db.tdms_index_lookup([name]).get(name, "")
+    return found if found and os.path.exists(found) else ""
+
+
+def relink_missing(workers: int = None) -> dict:
+    """
+    Controlla (in parallelo) i percorsi di acquisizioni e ricollega in blocco
+    quelli mancanti trovati nell'indice. I file già importati anche dal nuovo
+    percorso non vengono toccati e finiscono in "conflicts".
+    Ritorna {"checked": n, "relinked": [(vecchio, nuovo), ...], "not_found": [vecchio, ...],
+             "conflicts": [(vecchio, nuovo), ...]}.
+    """
+    paths = db.select_all_filepaths()
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as ex:
+        missing = [p for p, ok in zip(paths, ex.map(os.path.exists, paths)) if not ok]
+
+    index = db.tdms_index_lookup(os.path.basename(p) for p in missing)
+    relinked, not_found = [], []
+    for old in missing:
+        new = index.get(os.path.basename(old), "")
+        if new and os.path.exists(new) and _norm(new) != _norm(old):
+            relinked.append((old, new))
+        else:
+            not_found.append(old)
+    conflicts = db.relink_filepaths(relinked)["conflicts"] if relinked else []
+    if conflicts:
+        relinked = [p for p in relinked if p not in set(conflicts)]
+    return {"checked": len(paths), "relinked": relinked, "not_found": not_found, "conflicts": conflicts}
+
+
+def relocate(roots: list = None, workers: int = None, scan: bool = True) -> dict:
+    """Aggiorna l'indice (se scan) e ricollega i file mancanti: riepilogo di relink_missing + "index"."""
+    roots = roots if roots is not None else roots_from_config()
+    stats = update_index(roots, workers=workers) if (scan and roots) else None
+    res = relink_missing(workers=workers)
+    res["index"] = stats
+    return res
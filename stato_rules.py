@@ -0,0 +1,50 @@
+"""
+Regole dei cambi di stato dei collaudi (ruolo + note obbligatorie).
+
+Usate dalla dashboard (cambio su una riga) e da db.update_stato_many
+(cambio su più righe, controllate tutte con un'unica query).
+"""
+from typing import Optional
+
+STATO_VALUES = ["Approved", "Rejected", "Unchecked", "Checked", "Inactive"]
+
+
+def transition_error(ruolo: str, stato_cur: str, nuovo_stato: str,
+                     has_note_coll: bool, has_note_ing: bool) -> Optional[tuple]:
+    """
+    Ritorna None se il passaggio stato_cur -> nuovo_stato è permesso al ruolo,
+    altrimenti (titolo, messaggio) da mostrare all'utente.
+    Il caso stato_cur == nuovo_stato (nessun cambio) va gestito dal chiamante.
+    """
+    if nuovo_stato not in STATO_VALUES:
+        return ("Stato non valido", f"Stato sconosciuto: {nuovo_stato}")
+
+    if nuovo_stato == "Unchecked":
+        return ("Cambio non consentito", "Non è possibile riportare un collaudo allo stato UNCHECKED.")
+
+    if nuovo_stato == "Checked" and stato_cur in ("Approved", "Rejected"):
+        return ("Cambio non consentito", "Non è possibile riportare un collaudo da APPROVED/REJECTED a CHECKED.")
+
+    if ruolo == "Visualizzatore":
+        return ("Permesso negato", "Con il ruolo Visualizzatore non puoi modificare lo stato.")
+
+    if ruolo == "Collaudatore":
+        if not (stato_cur == "Unchecked" and nuovo_stato == "Checked"):
+            return ("Permesso negato", "Come collaudatore puoi solo passare lo stato da UNCHECKED a CHECKED.")
+        if not has_note_coll:
+            return ("Nota mancante", "Per passare lo stato a CHECKED devi prima inserire una nota (pulsante NOTE).")
+
+    elif ruolo == "Ingegneria":
+        if not (stato_cur == "Checked" and nuovo_stato in ("Approved", "Rejected")):
+            return ("Permesso negato", "Con il ruolo Ingegneria puoi cambiare stato solo da CHECKED a APPROVED o REJECTED.")
+        if not has_note_ing:
+            return ("Nota mancante", "Per passare lo stato a APPROVED o REJECTED devi prima inserire una nota di ingegneria (pulsante NOTE).")
+
+    elif ruolo == "Admin":
+        if nuovo_stato in ("Approved", "Rejected") and not has_note_ing:
+            return ("Nota mancante", "Per passare lo stato a APPROVED o REJECTED devi prima inserire una nota di ingegneria (pulsante NOTE).")
+
+    if nuovo_stato == "Inactive" and ruolo != "Admin":
+        return ("Permesso negato", "Solo un Admin può impostare lo stato a INACTIVE.")
+
+    return None
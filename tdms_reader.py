@@ -12,31 +12,115 @@ Espone:
 - read_performance_tables_dynamic(tdms_path, test_index=0) -> dict
     # NOTA: da questa versione, le "rows" contengono valori **RAW** (float o "")
 - read_curve_data(tdms_path, test_index=0) -> (meta: dict, points: list)  # meta-only (points=[])
+- prefetch(tdms_path, test_indexes=(0,)) / TdmsPrefetcher  # letture in cache in background
+
+Le letture "pesanti" (contract, tabelle performance, power calc type) passano
+da una cache LRU limitata, chiave = (percorso, mtime, size): un file modificato
+viene riletto. I risultati sono copie, il chiamante può modificarli.
 """
 
 import os
 import re
 import math
-from collections import defaultdict
+import time
+import inspect
+import threading
+import functools
+from collections import defaultdict, OrderedDict
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
 
-# nptdms
+import perf_trace
+from lazy_import import lazy_import
+
+# nptdms / numpy: importati davvero alla prima lettura, non all'avvio dell'app
 try:
-    from nptdms import TdmsFile
+    _nptdms = lazy_import("nptdms")
     NPTDMS_OK = True
-except Exception:
-    TdmsFile = None
+except ImportError:
+    _nptdms = None
     NPTDMS_OK = False
 
 # numpy (opzionale)
 try:
-    import numpy as np
+    np = lazy_import("numpy")
     NUMPY_OK = True
-except Exception:
+except ImportError:
     NUMPY_OK = False
 
 
+# -------------------- Cache letture --------------------
+CACHE_MAX_ENTRIES = 48
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _file_key(tdms_path: str):
+    """(percorso normalizzato, mtime, size) oppure None se il file non è leggibile."""
+    try:
+        st = os.stat(tdms_path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return os.path.normcase(os.path.abspath(tdms_path)), st.st_mtime_ns, st.st_size
+
+def _copy_tables(perf: dict) -> dict:
+    return {k: {"columns": list(v.get("columns", [])), "rows": list(v.get("rows", []))}
+            for k, v in perf.items()}
+
+def _file_cached(copy=lambda v: v):
+    """
+    Memoizza una lettura TDMS f(tdms_path, ...) per file+argomenti.
+    copy: funzione applicata al valore restituito (la cache tiene l'originale).
+    """
+    def deco(func):
+        sig = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(bound.arguments.items())
+            fkey = _file_key(params[0][1]) if params[0][1] else None
+            if fkey is None or not NPTDMS_OK:
+                return func(*args, **kwargs)
+
+            key = (func.__name__, fkey, params[1:])
+            with _cache_lock:
+                if key in _cache:
+                    _cache.move_to_end(key)
+                    perf_trace.count("cache_hits")
+                    return copy(_cache[key])
+
+            value = func(*args, **kwargs)
+            with _cache_lock:
+                _cache[key] = value
+                _cache.move_to_end(key)
+                while len(_cache) > CACHE_MAX_ENTRIES:
+                    _cache.popitem(last=False)
+            return copy(value)
+
+        return wrapper
+    return deco
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
 # -------------------- Util di base TDMS --------------------
+def _open_tdms(tdms_path: str):
+    """TdmsFile.open in streaming (legge solo i metadati)."""
+    perf_trace.count("tdms_open")
+    return _nptdms.TdmsFile.open(tdms_path)
+
+def _channel_data(ch, start=None, stop=None):
+    """Dati del canale (ch[start:stop], fallback su ch.data); conta i byte letti."""
+    try:
+        data = ch[:] if start is None and stop is None else ch[start:stop]
+    except Exception:
+        data = getattr(ch, "data", [])
+    perf_trace.count("bytes_read", getattr(data, "nbytes", 0))
+    return data
+
 def _first_nonempty(seq):
     if not (hasattr(seq, "__iter__") and not isinstance(seq, (str, bytes, bytearray))):
         seq = [seq]
@@ -110,16 +194,14 @@ def _read_prop_or_channel(tdms, group_name: str, prop_key: str, channel_name: st
         ch = _get_channel_ci(grp, channel_name)
         if not ch:
             return ""
-        try:
-            data = ch[:]
-        except Exception:
-            data = getattr(ch, "data", [])
+        data = _channel_data(ch)
         return _first_nonempty(data) or ""
     except Exception:
         return ""
 
 
 # -------------------- API usate dalla dashboard --------------------
+@perf_trace.traced(cat="tdms")
 def read_tdms_fields(tdms_path: str) -> dict:
     """
     Estrae:
@@ -130,7 +212,7 @@ def read_tdms_fields(tdms_path: str) -> dict:
     if not (tdms_path and os.path.exists(tdms_path) and NPTDMS_OK):
         return out
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return out
     try:
@@ -144,12 +226,13 @@ def read_tdms_fields(tdms_path: str) -> dict:
             pass
 
 
+@perf_trace.traced(cat="tdms")
 def read_scalar_string(tdms_path: str, group_name: str, channel_name: str) -> str:
     """Legge un valore stringa dal canale (prima occorrenza non vuota)."""
     if not (tdms_path and os.path.exists(tdms_path) and NPTDMS_OK):
         return ""
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return ""
     try:
@@ -159,10 +242,7 @@ def read_scalar_string(tdms_path: str, group_name: str, channel_name: str) -> st
         ch = _get_channel_ci(grp, channel_name)
         if not ch:
             return ""
-        try:
-            data = ch[:]
-        except Exception:
-            data = getattr(ch, "data", [])
+        data = _channel_data(ch)
         return _first_nonempty(data) or ""
     except Exception:
         return ""
@@ -182,10 +262,7 @@ def _read_scalar_from_tdms(tdms, group_name: str, channel_name: str) -> str:
         ch = _get_channel_ci(grp, channel_name)
         if not ch:
             return ""
-        try:
-            data = ch[:]
-        except Exception:
-            data = getattr(ch, "data", [])
+        data = _channel_data(ch)
         return _first_nonempty(data) or ""
     except Exception:
         return ""
@@ -207,14 +284,8 @@ def _read_fsg_order(tdms) -> str:
         if not ch_val or not ch_list:
             return ""
 
-        try:
-            vals = ch_val[:]
-        except Exception:
-            vals = getattr(ch_val, "data", [])
-        try:
-            elenco = ch_list[:]
-        except Exception:
-            elenco = getattr(ch_list, "data", [])
+        vals = _channel_data(ch_val)
+        elenco = _channel_data(ch_list)
 
         idx_raw = _first_nonempty(vals)
         if not idx_raw:
@@ -245,6 +316,8 @@ def _read_fsg_order(tdms) -> str:
     except Exception:
         return ""
 
+@perf_trace.traced(cat="tdms")
+@_file_cached(copy=dict)
 def read_contract_and_loop_data(tdms_path: str) -> dict:
     """
     Ritorna un dict con i principali campi per Contractual / Test Param / Pump Type / Test Detail.
@@ -268,7 +341,7 @@ def read_contract_and_loop_data(tdms_path: str) -> dict:
     if not (tdms_path and os.path.exists(tdms_path) and NPTDMS_OK):
         return out
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return out
     try:
@@ -392,10 +465,7 @@ def _mean_channel_fast(ch, chunk_size=2_000_000):
     try:
         n = len(ch)
     except Exception:
-        try:
-            data = ch[:]
-        except Exception:
-            data = getattr(ch, "data", [])
+        data = _channel_data(ch)
         return _mean_all_strict(data)
 
     total = 0.0
@@ -406,13 +476,11 @@ def _mean_channel_fast(ch, chunk_size=2_000_000):
         try:
             part = ch[start:stop]
         except Exception:
-            try:
-                part = ch[:]
-            except Exception:
-                part = getattr(ch, "data", [])
+            part = _channel_data(ch)
             start = n
         else:
             start = stop
+            perf_trace.count("bytes_read", getattr(part, "nbytes", 0))
 
         if NUMPY_OK:
             try:
@@ -494,10 +562,7 @@ def _build_kind_model(groups_by_point: dict):
                 try:
                     mean_val = _mean_channel_fast(ch)
                 except Exception:
-                    try:
-                        data = ch[:]
-                    except Exception:
-                        data = getattr(ch, "data", [])
+                    data = _channel_data(ch)
                     mean_val = _mean_all_strict(data)
                 row_map[col] = ("" if mean_val is None else mean_val)  # RAW float o vuoto
         # se una colonna non è presente per quel point, metto stringa vuota
@@ -505,6 +570,8 @@ def _build_kind_model(groups_by_point: dict):
 
     return columns, rows
 
+@perf_trace.traced(cat="tdms")
+@_file_cached(copy=_copy_tables)
 def read_performance_tables_dynamic(tdms_path: str, test_index: int = 0):
     """
     Ritorna (senza 'units'):
@@ -521,7 +588,7 @@ def read_performance_tables_dynamic(tdms_path: str, test_index: int = 0):
     if not (tdms_path and os.path.exists(tdms_path) and NPTDMS_OK):
         return out
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return out
     try:
@@ -570,6 +637,7 @@ def read_performance_tables_dynamic(tdms_path: str, test_index: int = 0):
 
 
 # -------------------- Curve data — META-ONLY (points deprecati) --------------------
+@perf_trace.traced(cat="tdms")
 def read_curve_data(tdms_path: str, test_index: int = 0) -> tuple[dict, list[tuple[float, float]]]:
     """
     Restituisce:
@@ -594,6 +662,8 @@ def read_curve_data(tdms_path: str, test_index: int = 0) -> tuple[dict, list[tup
 
 
 # -------------------- Power Calc Type (Info_Table) --------------------
+@perf_trace.traced(cat="tdms")
+@_file_cached()
 def read_power_calc_type(tdms_path: str) -> str:
     """
     Legge il tipo di calcolo potenza dal gruppo Info_Table.
@@ -615,7 +685,7 @@ def read_power_calc_type(tdms_path: str) -> str:
         return "—"
     
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return "—"
     
@@ -636,10 +706,7 @@ def read_power_calc_type(tdms_path: str) -> str:
             return "—"
         
         # Leggi il valore dell'indice
-        try:
-            value_data = value_channel[:]
-        except Exception:
-            value_data = getattr(value_channel, "data", [])
+        value_data = _channel_data(value_channel)
         
         index_str = _first_nonempty(value_data)
         if not index_str:
@@ -652,10 +719,7 @@ def read_power_calc_type(tdms_path: str) -> str:
             return "—"
         
         # Leggi l'elenco
-        try:
-            elenco_data = elenco_channel[:]
-        except Exception:
-            elenco_data = getattr(elenco_channel, "data", [])
+        elenco_data = _channel_data(elenco_channel)
         
         # Converti in lista di stringhe
         elenco_str = []
@@ -693,6 +757,7 @@ def read_power_calc_type(tdms_path: str) -> str:
             pass
 
 
+@perf_trace.traced(cat="tdms")
 def read_perfor_table_labels(tdms_path: str) -> list:
     """
     Legge le intestazioni personalizzate dal canale Perfor_Table_Label in Info_Table.
@@ -712,7 +777,7 @@ def read_perfor_table_labels(tdms_path: str) -> list:
         return []
     
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return []
     
@@ -728,10 +793,7 @@ def read_perfor_table_labels(tdms_path: str) -> list:
             return []
         
         # Leggi i dati
-        try:
-            label_data = label_channel[:]
-        except Exception:
-            label_data = getattr(label_channel, "data", [])
+        label_data = _channel_data(label_channel)
         
         # Processa ogni label
         headers = []
@@ -776,6 +838,7 @@ def read_perfor_table_labels(tdms_path: str) -> list:
             pass
 
 
+@perf_trace.traced(cat="tdms")
 def detect_test_types(tdms_path: str) -> list:
     """
     Rileva i tipi di test presenti nel file TDMS analizzando i nomi dei gruppi.
@@ -796,7 +859,7 @@ def detect_test_types(tdms_path: str) -> list:
         return []
     
     try:
-        tdms = TdmsFile.open(tdms_path)
+        tdms = _open_tdms(tdms_path)
     except Exception:
         return []
     
@@ -838,3 +901,66 @@ def detect_test_types(tdms_path: str) -> list:
             tdms.close()
         except Exception:
             pass
+
+
+# -------------------- Prefetch in background --------------------
+@perf_trace.traced(cat="tdms")
+def prefetch(tdms_path: str, test_indexes=(0,), cancelled=None) -> None:
+    """
+    Porta in cache le letture usate da certificato e PDF per tdms_path.
+    cancelled: callable opzionale, se ritorna True si interrompe tra una lettura e l'altra.
+    """
+    steps = [lambda: read_contract_and_loop_data(tdms_path),
+             lambda: read_power_calc_type(tdms_path)]
+    steps += [lambda i=i: read_performance_tables_dynamic(tdms_path, test_index=i)
+              for i in dict.fromkeys(test_indexes)]
+    for step in steps:
+        if cancelled is not None and cancelled():
+            return
+        try:
+            step()
+        except Exception:
+            pass
+
+
+class TdmsPrefetcher:
+    """
+    Prefetch speculativo a bassa priorità: un solo thread daemon, una sola
+    richiesta "corrente". Ogni request() sostituisce la precedente (i file non
+    ancora letti della richiesta vecchia vengono saltati) e parte dopo `delay`
+    secondi, così scorrere la lista con le frecce non avvia letture inutili.
+    """
+
+    def __init__(self, delay: float = 0.25):
+        self.delay = delay
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None
+        self._thread = None
+
+    def request(self, items) -> None:
+        """items: lista di (tdms_path, test_indexes), in ordine di priorità."""
+        with self._cond:
+            self._generation += 1
+            self._pending = [(p, tuple(ti)) for p, ti in items if p]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="tdms-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self) -> None:
+        self.request([])
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                gen, items = self._generation, self._pending
+                self._pending = None
+            # attesa "debounce": se nel frattempo arriva un'altra richiesta si riparte
+            time.sleep(self.delay)
+            for path, test_indexes in items:
+                if self._generation != gen:
+                    break
+                prefetch(path, test_indexes, cancelled=lambda: self._generation != gen)
@@ -0,0 +1,86 @@
+"""
+Backup a caldo (backup.py): copia controllata, nomi unici, rotazione,
+backup solo se dovuto e con backup.lock, copie rovinate scartate.
+
+    python -m pytest -q test_backup.py
+"""
+import os
+import time
+
+import pytest
+
+import backup
+import db
+
+
+@pytest.fixture
+def src_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(backup, "backup_settings", lambda: {
+        "dir": "", "keep": backup.DEFAULT_KEEP, "pages": 4, "sleep_ms": 0, "interval_h": 0.0})
+    db.ensure_full_schema(str(tmp_path / "collaudi.db"))
+    with db.write_transaction() as conn:
+        conn.executemany(
+            "INSERT INTO notes (filepath, note_collaudatore) VALUES (?, ?)",
+            [(f"/t/f{i}.tdms", "x" * 500) for i in range(200)],
+        )
+    return tmp_path
+
+
+def test_backup_is_checked_and_unique(src_db):
+    dest = str(src_db / "bk")
+    first = backup.run_backup(dest)
+    second = backup.run_backup(dest)  # stesso secondo: nome con suffisso
+    assert first["ok"] and second["ok"], (first, second)
+    assert first["path"] != second["path"]
+    assert backup.list_snapshots(dest) == [first["path"], second["path"]]
+    assert backup.quick_check(second["path"]) == "ok"
+    assert not [f for f in os.listdir(dest) if f.endswith(".partial")]
+
+
+def test_rotation_keeps_last_two(src_db):
+    dest = str(src_db / "bk")
+    paths = [backup.run_backup(dest, keep=2)["path"] for _ in range(4)]
+    assert backup.list_snapshots(dest) == paths[-2:]
+
+
+def test_unreachable_dir_is_reported(src_db):
+    blocker = src_db / "file"
+    blocker.write_text("non una cartella")
+    res = backup.run_backup(str(blocker / "bk"))
+    assert not res["ok"] and res["error"] and res["path"] == ""
+
+
+def test_damaged_copy_is_discarded(src_db, monkeypatch):
+    dest = str(src_db / "bk")
+
+    def _damage(path):
+        with open(path, "r+b") as f:  # intestazione rovinata: non è più un DB SQLite
+            f.write(b"\0" * 100)
+        return real_check(path)
+
+    real_check = backup.quick_check
+    monkeypatch.setattr(backup, "quick_check", _damage)
+    res = backup.run_backup(dest)
+    assert not res["ok"] and res["path"] == ""
+    assert res["error"] or res["check"] != "ok"
+    assert os.listdir(dest) == []
+
+
+def test_run_if_due_and_lock(src_db):
+    dest = str(src_db / "bk")
+    assert backup.run_if_due(0, dest) is None  # disattivato
+    assert backup.is_due(24, dest)
+
+    lock = os.path.join(dest, "backup.lock")
+    os.makedirs(dest)
+    open(lock, "w").close()  # un'altra postazione sta facendo il backup
+    assert backup.run_if_due(24, dest) is None
+    assert backup.list_snapshots(dest) == []
+
+    old = time.time() - backup.LOCK_STALE_S - 60  # lock lasciato da un backup interrotto
+    os.utime(lock, (old, old))
+    res = backup.run_if_due(24, dest)
+    assert res and res["ok"]
+    assert not os.path.exists(lock)
+    assert not backup.is_due(24, dest)
+    assert backup.run_if_due(24, dest) is None  # copia recente
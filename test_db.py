@@ -0,0 +1,96 @@
+"""
+Funzioni del livello DB senza interfaccia.
+
+    python -m pytest -q test_db.py
+"""
+import pytest
+
+import db
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("12,5", 12.5),
+    ("1.234,5", 1234.5),
+    ("1,234.5", 1234.5),
+    ("1 234,5", 1234.5),
+    ("1\u00a0234,5", 1234.5),
+    ("1'234.5", 1234.5),
+    ("1.234.567", 1234567.0),
+    ("1,234,567", 1234567.0),
+    ("-0,5", -0.5),
+    (" 150 ", 150.0),
+    ("3.5e2", 350.0),
+    (7, 7.0),
+    (2.5, 2.5),
+])
+def test_to_real_parses_decimal_and_thousands_separators(raw, expected):
+    assert db._to_real(raw) == expected
+
+
+@pytest.mark.parametrize("raw", [None, "", "  ", "abc", "12 m3/h", True])
+def test_to_real_rejects_non_numbers(raw):
+    assert db._to_real(raw) is None
+
+
+# ------------------------- DB temporaneo -------------------------
+
+@pytest.fixture
+def tmp_db(tmp_path):
+    path = str(tmp_path / "collaudi.db")
+    db.ensure_full_schema(path)
+    yield path
+
+
+def _acq(filepath: str, **kw) -> int:
+    rec = dict(job="J1", n_collaudo="", matricola="M1", tipo_pompa="PT", data_iso="", stato="CREATO",
+               filepath=filepath, filename=filepath.rsplit("/", 1)[-1], data_file="20260101",
+               ora_file="120000", progressivo=1, tipo_test="PERFORMANCE")
+    rec.update(kw)
+    return db.insert_acquisizione(rec)
+
+
+def _perf(scale: float) -> dict:
+    rows = [(q, 50.0 - q * scale, 0.5 + q / 100.0, 10.0 + q * scale) for q in (10.0, 20.0, 30.0, 40.0, 50.0)]
+    return {"Converted": {"columns": ["FLOW", "TDH", "EFF", "POWER"], "rows": rows}}
+
+
+def test_overlay_cache_follows_perf_points(tmp_db):
+    import curve_data
+
+    acq = _acq("/t/a.tdms")
+    db.set_perf_points(acq, _perf(0.1))
+    first = curve_data.compute_overlay_series([acq])[0]["tdh_trend"]
+    assert curve_data.compute_overlay_series([acq])[0]["tdh_trend"] == first  # dalla cache
+
+    db.set_perf_points(acq, _perf(0.5))
+    second = curve_data.compute_overlay_series([acq])[0]["tdh_trend"]
+    assert second != first
+
+    db.relink_filepaths([("/t/a.tdms", "/u/a.tdms")])
+    assert not any(k[0] == acq for k in curve_data._overlay_cache)
+    assert curve_data.compute_overlay_series([acq])[0]["tdh_trend"] == second
+
+
+def test_fulltext_finds_impeller_material_after_migration(tmp_db, monkeypatch):
+    old_cols = tuple(c for c in db.FTS_COLUMNS if c != "impeller_material")
+    with monkeypatch.context() as m:  # indice come lo creava la versione precedente
+        m.setattr(db, "FTS_COLUMNS", old_cols)
+        m.setattr(db, "_FTS_WEIGHTS", db._FTS_WEIGHTS[1:])
+        with db.connect() as conn:
+            conn.execute("DROP TABLE IF EXISTS acq_fts")
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+                if "fts" in name:
+                    conn.execute(f"DROP TRIGGER {name}")
+            conn.commit()
+        db._ensure_fts_index()
+        if not db.fts_available():
+            pytest.skip("SQLite senza FTS5")
+        acq = _acq("/t/duplex.tdms")
+        db.set_contract_fields("/t/duplex.tdms", {"Impeller Material": "Duplex 1.4462"})
+        assert db.search_fulltext("duplex") == []
+
+    db.init()  # migrazione: indice rifatto con impeller_material
+    assert [r[0] for r in db.search_fulltext("duplex")] == [acq]
+    db.set_contract_fields("/t/duplex.tdms", {"Impeller Material": "CA6NM"})
+    assert db.search_fulltext("duplex") == []
+    assert [r[0] for r in db.search_fulltext("ca6nm")] == [acq]
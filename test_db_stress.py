@@ -0,0 +1,16 @@
+"""
+Prova di carico breve (db_stress.run): con write_transaction (BEGIN IMMEDIATE)
+due scrittori concorrenti non devono mai vedere "database is locked".
+
+    python -m pytest -q test_db_stress.py
+"""
+import db_stress
+
+
+def test_immediate_mode_has_no_lock_errors(tmp_path):
+    res = db_stress.run(str(tmp_path / "stress.db"), writers=2, seconds=1)
+    assert res["mode"] == "immediate"
+    assert res["errors"] == 0
+    assert res["ops"] > 0 and res["ops_s"] > 0
+    for key in ("latency_ms", "lock_wait_ms"):
+        assert set(res[key]) == {"p50", "p95", "p99", "max"}
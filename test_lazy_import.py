@@ -0,0 +1,53 @@
+"""
+Avvio leggero: `import login, dashboard` in un processo pulito deve stare nel
+budget di tempo e non caricare nessuno dei sottosistemi pesanti
+(lazy_import.HEAVY_MODULES), che arrivano solo al primo uso.
+
+    python -m pytest -q test_lazy_import.py
+"""
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from lazy_import import HEAVY_MODULES, lazy_import
+
+STARTUP_BUDGET_S = 1.0
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_PROBE = (
+    "import sys, time, json\n"
+    "t = time.perf_counter()\n"
+    "import login, dashboard\n"
+    "dt = time.perf_counter() - t\n"
+    f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+    "print(json.dumps({'seconds': dt, 'heavy': heavy}))\n"
+)
+
+
+def _startup_profile() -> dict:
+    # processo pulito: nessun modulo già in cache
+    out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True, cwd=HERE)
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_startup_within_budget_without_heavy_modules():
+    prof = _startup_profile()
+    assert prof["heavy"] == [], f"moduli pesanti caricati all'avvio: {prof['heavy']}"
+    assert prof["seconds"] <= STARTUP_BUDGET_S, f"import login + dashboard: {prof['seconds']:.3f}s"
+
+
+def test_lazy_import_defers_and_reports_missing():
+    mod = lazy_import("json")  # già importato: ritorna il modulo vero
+    assert mod is json
+
+    sys.modules.pop("tabnanny", None)
+    deferred = lazy_import("tabnanny")
+    assert "tabnanny" not in sys.modules
+    assert callable(deferred.check)  # primo attributo: import vero
+    assert "tabnanny" in sys.modules
+    with pytest.raises(ImportError):
+        lazy_import("modulo_che_non_esiste_pt2025")
@@ -0,0 +1,100 @@
+"""
+Regole dei cambi di stato: transition_error per ogni ruolo e coppia di stati,
+e update_stato_many (note mancanti, id sconosciuti, dry run, expected).
+
+    python -m pytest -q test_stato_rules.py
+"""
+import itertools
+
+import pytest
+
+import db
+from stato_rules import STATO_VALUES, transition_error
+
+RUOLI = ("Admin", "Ingegneria", "Collaudatore", "Visualizzatore")
+FINALI = ("Approved", "Rejected")
+
+
+def _needed_note(ruolo: str, cur: str, new: str):
+    """Nota richiesta ("coll" / "ing" / None) se il passaggio è ammesso, False se non lo è mai."""
+    if new == "Unchecked" or (new == "Checked" and cur in FINALI):
+        return False
+    if ruolo == "Collaudatore":
+        return "coll" if (cur, new) == ("Unchecked", "Checked") else False
+    if ruolo == "Ingegneria":
+        return "ing" if cur == "Checked" and new in FINALI else False
+    if ruolo == "Admin":
+        return "ing" if new in FINALI else None
+    return False
+
+
+@pytest.mark.parametrize("ruolo, cur, new", [
+    (r, c, n) for r in RUOLI for c, n in itertools.permutations(STATO_VALUES, 2)
+])
+def test_transition_error_matrix(ruolo, cur, new):
+    needed = _needed_note(ruolo, cur, new)
+    for has_coll, has_ing in itertools.product((False, True), repeat=2):
+        err = transition_error(ruolo, cur, new, has_coll, has_ing)
+        if needed is False:
+            assert err is not None and err[0] in ("Permesso negato", "Cambio non consentito")
+        elif (needed == "coll" and not has_coll) or (needed == "ing" and not has_ing):
+            assert err is not None and err[0] == "Nota mancante"
+        else:
+            assert err is None
+
+
+def test_transition_error_unknown_state():
+    assert transition_error("Admin", "Checked", "Boh", True, True)[0] == "Stato non valido"
+
+
+# ------------------------- update_stato_many -------------------------
+
+@pytest.fixture
+def rows(tmp_path):
+    """Tre acquisizioni Checked: la prima e la seconda con nota di ingegneria, la terza senza."""
+    db.ensure_full_schema(str(tmp_path / "collaudi.db"))
+    ids = []
+    for i in range(3):
+        path = f"/t/f{i}.tdms"
+        ids.append(db.insert_acquisizione(dict(
+            job="J1", n_collaudo="", matricola=f"M{i}", tipo_pompa="PT", data_iso="", stato="Checked",
+            filepath=path, filename=path[3:], data_file="20260101", ora_file="120000",
+            progressivo=i, tipo_test="PERFORMANCE")))
+        if i < 2:
+            db.note_ingegneria_set(path, "ok")
+    return ids
+
+
+def _stati(ids):
+    with db.connect() as conn:
+        return {i: conn.execute("SELECT stato FROM acquisizioni WHERE id = ?", (i,)).fetchone()[0] for i in ids}
+
+
+def test_missing_note_and_unknown_id(rows):
+    res = db.update_stato_many(rows + [99999], "Approved", "2026-10-19", "ing", "Ingegneria")
+    assert res["updated"] == rows[:2]
+    assert [(r[0], r[1]) for r in res["rejected"]] == [(rows[2], "Nota mancante"), (99999, "Non trovato")]
+    assert _stati(rows) == {rows[0]: "Approved", rows[1]: "Approved", rows[2]: "Checked"}
+
+
+def test_dry_run_writes_nothing(rows):
+    check = db.update_stato_many(rows, "Approved", "2026-10-19", "ing", "Ingegneria", dry_run=True)
+    assert check["updated"] == rows[:2]
+    assert check["stati"] == {i: "Checked" for i in rows}
+    assert _stati(rows) == {i: "Checked" for i in rows}
+
+
+def test_unchanged_rows(rows):
+    res = db.update_stato_many(rows, "Checked", None, "admin", "Admin")
+    assert res["unchanged"] == rows and not res["updated"] and not res["rejected"]
+
+
+def test_expected_mismatch_is_skipped(rows):
+    check = db.update_stato_many(rows[:2], "Approved", "2026-10-19", "ing", "Ingegneria", dry_run=True)
+    # un'altra postazione cambia la prima riga dopo il controllo
+    db.update_stato_many([rows[0]], "Rejected", "2026-10-19", "ing2", "Ingegneria")
+    res = db.update_stato_many(check["updated"], "Approved", "2026-10-19", "ing", "Ingegneria",
+                               expected={i: check["stati"][i] for i in check["updated"]})
+    assert res["updated"] == [rows[1]]
+    assert [(r[0], r[1]) for r in res["rejected"]] == [(rows[0], "Stato cambiato")]
+    assert _stati(rows[:2]) == {rows[0]: "Rejected", rows[1]: "Approved"}
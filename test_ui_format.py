@@ -0,0 +1,100 @@
+"""
+fmt_column / fmt_table / fmt_seq devono dare esattamente (byte per byte) lo
+stesso testo di fmt_if_number cella per cella, anche sui pareggi decimali
+a 4 cifre di valori grandi, dove la strada veloce '%.3f' sbaglierebbe.
+
+    python -m pytest -q test_ui_format.py
+"""
+import random
+
+import pytest
+
+from ui_format import DASH, fmt_column, fmt_if_number, fmt_seq, fmt_table
+
+SEED = 20261019
+N = 200000
+
+
+def _ties(rnd: random.Random, mag: float, n: int) -> list:
+    """Pareggi decimali a 4 cifre (…5 in quarta) fino a |mag|, e i loro vicini di 1 ulp."""
+    out = []
+    for _ in range(n):
+        v = float(f"{rnd.uniform(-mag, mag):.3f}") + rnd.choice((0.0005, -0.0005))
+        v = float(f"{v:.4f}")
+        out.append(v)
+        out.append(v * (1.0 + rnd.choice((-1, 1)) * 2.2e-16))
+    return out
+
+
+def _corpus(rnd: random.Random) -> list:
+    vals = []
+    for _ in range(N):
+        k = rnd.random()
+        if k < 0.30:
+            v = rnd.uniform(-1e4, 1e4)
+        elif k < 0.45:
+            v = round(rnd.uniform(-100, 100), rnd.randint(0, 6))
+        elif k < 0.55:
+            v = rnd.randint(-20000, 20000) / 16.0                 # pareggi binari
+        elif k < 0.60:
+            v = rnd.randint(-10 ** 6, 10 ** 6) / 10000.0          # pareggi decimali
+        elif k < 0.65:
+            v = rnd.choice([0.0, -0.0, float("inf"), float("-inf"), float("nan"), 1e20, 1e15, 9.99e14,
+                            -1e-7, 5e-4, -5e-4, 1e30, 123456789012.0625, 0.0005, 2.675, 1.0005,
+                            8517677.2865])
+        elif k < 0.72:
+            v = rnd.randint(-10 ** 30, 10 ** 30) if rnd.random() < 0.1 else rnd.randint(-10 ** 6, 10 ** 6)
+        elif k < 0.80:
+            v = str(rnd.choice([rnd.uniform(-1e3, 1e3), rnd.randint(0, 99), ""]))
+        elif k < 0.85:
+            v = rnd.choice(["", " ", DASH, "abc", "1,25", " 3.14159 ", "1e3", "NaN", "-0.0005",
+                            "8517677.2865", "OK", None, True, False])
+        else:
+            v = rnd.uniform(-1, 1) * 10 ** rnd.randint(-12, 22)
+        vals.append(v)
+    for mag in (1e5, 1e6, 1e7, 1e8, 1e9, 1e10, 1e11, 1e12):
+        vals.extend(_ties(rnd, mag, 5000))
+    rnd.shuffle(vals)
+    return vals
+
+
+def _assert_same(values, dash=DASH):
+    got = fmt_column(values, dash=dash)
+    ref = [fmt_if_number(v, dash=dash) for v in values]
+    bad = [(v, r, g) for v, r, g in zip(values, ref, got) if r != g]
+    assert not bad, f"{len(bad)} differenze, prime: {bad[:5]}"
+    assert len(got) == len(ref)
+
+
+def test_random_corpus_identical():
+    _assert_same(_corpus(random.Random(SEED)))
+
+
+def test_large_magnitude_ties():
+    assert fmt_column([8517677.2865]) == [fmt_if_number(8517677.2865)] == ["8517677.287"]
+    rnd = random.Random(SEED + 1)
+    for mag in (1e6, 1e7, 1e8, 1e10, 1e12, 1e13):
+        _assert_same(_ties(rnd, mag, 20000))
+
+
+def test_custom_dash_and_table():
+    rows = [[None, "", 1.0005, "x"], [DASH, 2, "-", 3.14159]]
+    assert fmt_table(rows, dash="-") == [[fmt_if_number(v, dash="-") for v in r] for r in rows]
+    assert fmt_seq(5) == [fmt_if_number(5)]
+    assert fmt_seq(None) == [DASH]
+
+
+@pytest.mark.parametrize("dtype", ["float64", "float32", "int32", "int64", "uint16"])
+def test_numpy_arrays(dtype):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(SEED)
+    if dtype.startswith(("int", "uint")):
+        info = np.iinfo(dtype)
+        arr = rng.integers(max(info.min, -10 ** 9), min(info.max, 10 ** 9), 50000, dtype=dtype)
+    else:
+        arr = np.concatenate([
+            rng.uniform(-1e4, 1e4, 40000),
+            rng.integers(-10 ** 6, 10 ** 6, 5000) / 10000.0,
+            np.array(_ties(random.Random(SEED + 2), 1e8, 2500)),
+        ]).astype(dtype)
+    assert fmt_column(arr) == [fmt_if_number(v) for v in arr]
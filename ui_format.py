@@ -1,7 +1,11 @@
 import re
+import math
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from functools import lru_cache
 from typing import Iterable, List, Union
 
+from unit_converter import get_unit_label
+
 DASH = "—"  # segnaposto UI per valori non disponibili
 
 # ---------------------------
@@ -28,10 +32,69 @@ def fmt_if_number(value, dash: str = DASH) -> str:
 
 def fmt_seq(seq, dash: str = DASH) -> List[str]:
     try:
-        return [fmt_if_number(v, dash=dash) for v in seq]
+        return fmt_column(seq, dash=dash)
     except Exception:
         return [fmt_if_number(seq, dash=dash)]
 
+# ---------------------------
+# Formattazione in blocco (colonne / tabelle)
+# ---------------------------
+# Stesso risultato di fmt_if_number, cella per cella, ma senza passare da
+# Decimal per i float "normali": '%.3f' arrotonda il valore binario esatto,
+# Decimal(str(x)) la sua repr più corta, e le due cose coincidono finché
+# l'ulp del float è sotto il mezzo millesimo (|x| < _FAST_MAX) e x non è un
+# pareggio decimale a 4 cifre (es. 2.0625, dove serve ROUND_HALF_UP).
+# I candidati pareggio (x*2000 ~ intero) e tutto ciò che non è float/int
+# passano dalla strada normale; le stringhe da una cache, perché nelle
+# tabelle i valori si ripetono molto.
+# La finestra dei candidati è _TIE_EPS fino a _TIE_ULP_MIN; oltre cresce con
+# l'ulp: x dista dal decimale scritto fino a ulp/2, cioè 1000 ulp su x*2000
+# (più l'arrotondamento del prodotto), e un pareggio esatto in decimale
+# (es. 8517677.2865) non cade più vicino a un intero di 1e-6.
+_FAST_MAX = 1e12
+_TIE_EPS = 1e-6
+_TIE_ULP_MIN = 1e6
+
+@lru_cache(maxsize=65536)
+def _fmt_str(s: str, dash: str) -> str:
+    return fmt_if_number(s, dash=dash)
+
+def fmt_column(values, dash: str = DASH) -> List[str]:
+    """
+    Formatta un'intera colonna (lista, tupla, array numpy, ...).
+    Output identico a [fmt_if_number(v, dash) for v in values].
+    """
+    kind = getattr(getattr(values, "dtype", None), "kind", None)
+    if kind in ("i", "u") or (kind == "f" and values.dtype.itemsize == 8):
+        # float64 / interi: tolist() dà float/int Python con la stessa str()
+        values = values.tolist()
+    out = []
+    append = out.append
+    for v in values:
+        t = type(v)
+        if t is float:
+            if -_FAST_MAX < v < _FAST_MAX:
+                frac = (v * 2000.0) % 1.0
+                eps = _TIE_EPS if -_TIE_ULP_MIN < v < _TIE_ULP_MIN else 4000.0 * math.ulp(v)
+                if eps < frac < 1.0 - eps:
+                    s = "%.3f" % v
+                    append(s.rstrip("0").rstrip(".") if s[-1] == "0" else s)
+                    continue
+            append(fmt_if_number(v, dash=dash))
+        elif t is int:
+            append(str(v))
+        elif t is str:
+            append(_fmt_str(v, dash))
+        elif v is None:
+            append(dash)
+        else:
+            append(fmt_if_number(v, dash=dash))
+    return out
+
+def fmt_table(rows, dash: str = DASH) -> List[List[str]]:
+    """Formatta una tabella (sequenza di righe) con fmt_column riga per riga."""
+    return [fmt_column(r, dash=dash) for r in rows]
+
 # ---------------------------
 # Pulizia intestazioni generica
 # ---------------------------
@@ -52,38 +115,22 @@ def _key_for_match(text: str) -> str:
     return _normalize_key(s)
 
 # ---------------------------
-# Unità per Calculated / Converted (Metric e US)
+# Unità per Calculated / Converted: grandezza per intestazione,
+# il simbolo (Metric, US, ...) arriva dal registro di unit_converter
 # ---------------------------
-_UNIT_MAP = {
+_HEADER_KINDS = {
     "calculated": {
-        "Metric": {
-            "FLOW": "m3/h",
-            "KIN SUCT.": "m",
-            "KIN DISCH.": "m",
-            "TDH": "m",
-            "POWER": "kW",
-        },
-        "US": {
-            "FLOW": "GPM",
-            "KIN SUCT.": "ft",
-            "KIN DISCH.": "ft",
-            "TDH": "ft",
-            "POWER": "HP",
-        },
+        "FLOW": "flow",
+        "KIN SUCT.": "head",
+        "KIN DISCH.": "head",
+        "TDH": "head",
+        "POWER": "power",
     },
     "converted": {
-        "Metric": {
-            "FLOW": "m3/h",
-            "TDH": "m",
-            "POWER": "kW",
-            "EFF": "%",
-        },
-        "US": {
-            "FLOW": "GPM",
-            "TDH": "ft",
-            "POWER": "HP",
-            "EFF": "%",
-        },
+        "FLOW": "flow",
+        "TDH": "head",
+        "POWER": "power",
+        "EFF": "percent",
     },
 }
 
@@ -91,13 +138,12 @@ def add_units_to_header(header: str, table_kind: str, unit_system: str = "Metric
     if header is None:
         return ""
     kind = (table_kind or "").strip().lower()
-    if kind not in _UNIT_MAP:
+    if kind not in _HEADER_KINDS:
         return str(header).strip()
     
-    # Cerca nell'unit_system specificato
-    unit_map_for_system = _UNIT_MAP[kind].get(unit_system, {})
-    key = _key_for_match(header)
-    unit = unit_map_for_system.get(key)
+    # Grandezza dell'intestazione -> simbolo nel sistema richiesto
+    quantity = _HEADER_KINDS[kind].get(_key_for_match(header))
+    unit = get_unit_label(quantity, unit_system) if quantity else ""
     return f"{str(header).strip()} {unit}" if unit else str(header).strip()
 
 def add_units_to_headers(headers: Union[Iterable[str], str], table_kind: str, unit_system: str = "Metric") -> Union[List[str], str]:
@@ -6,6 +6,17 @@ I dati TDMS sono sempre in Metric (sorgente unica).
 Questo modulo converte al volo per visualizzazione UI e PDF.
 """
 
+from functools import lru_cache
+
+from lazy_import import lazy_import
+
+# numpy (opzionale): usato per convertire le colonne in blocco, caricato al primo uso
+try:
+    np = lazy_import("numpy")
+    NUMPY_OK = True
+except ImportError:
+    NUMPY_OK = False
+
 # ================== FATTORI DI CONVERSIONE ==================
 
 # Flow (portata)
@@ -39,54 +50,141 @@ SG_TO_SG = 1.0  # adimensionale (stessa in entrambi i sistemi)
 MM_TO_IN = 0.0393701  # millimetri â†’ inches
 
 
-# ================== DIZIONARIO UNITÃ€ PER ETICHETTE ==================
-
-UNITS = {
-    "Metric": {
-        "flow": "m³/h",
-        "head": "m",
-        "power": "kW",
-        "pressure": "m",
-        "temp": "°C",
-        "visc": "cP",
-        "sg": "",  # adimensionale
-        "diameter": "mm",
-        "suction_discharge": "Inch",  # rimane inch in entrambi (giÃ  in pollici nel TDMS)
-        "npsh": "m",
-        "speed": "rpm",  # rimane rpm in entrambi
-    },
-    "US": {
-        "flow": "GPM",
-        "head": "ft",
-        "power": "HP",
-        "pressure": "ft",
-        "temp": "°F",
-        "visc": "cP",
-        "sg": "",
-        "diameter": "in",
-        "suction_discharge": "Inch",
-        "npsh": "ft",
-        "speed": "rpm",
-    }
-}
+# Pressione (unità aggiuntive, rispetto a metri colonna d'acqua)
+M_TO_BAR = 0.0980665
+M_TO_PSI = 1.42233
+
+# Portata in litri al secondo
+M3H_TO_LS = 1 / 3.6
+
+
+# ================== REGISTRO UNITÀ ==================
+
+class UnitRegistry:
+    """
+    Registro delle unità di misura.
+
+    - grandezze (kind): 'flow', 'head', 'power', ... ognuna con un'unità base (Metric)
+    - unità: simbolo + trasformazione affine rispetto alla base
+              valore_unita = valore_base * scale + offset   (offset solo per °C/°F)
+    - sistemi: nome -> unità scelta per ogni grandezza (le grandezze non indicate
+               restano nell'unità base)
+
+    Le conversioni tra sistemi e le etichette sono memorizzate in cache: il registro
+    va popolato all'avvio (sotto) e poi usato in sola lettura.
+    """
+
+    def __init__(self):
+        self._base = {}      # kind -> simbolo unità base
+        self._units = {}     # (kind, simbolo) -> (scale, offset)
+        self._systems = {}   # sistema -> {kind: simbolo}
+        self._titles = {}    # sistema -> titolo esteso (report)
+
+    def add_kind(self, kind: str, base_symbol: str) -> None:
+        self._base[kind] = base_symbol
+        self._units[(kind, base_symbol)] = (1.0, 0.0)
+        self._clear_caches()
+
+    def add_unit(self, kind: str, symbol: str, scale: float, offset: float = 0.0) -> None:
+        self._units[(kind, symbol)] = (float(scale), float(offset))
+        self._clear_caches()
+
+    def add_system(self, name: str, title: str = "", **units) -> None:
+        """add_system("US", "U.S. Customary", flow="GPM", head="ft", ...)"""
+        for kind, symbol in units.items():
+            if (kind, symbol) not in self._units:
+                raise KeyError(f"Unità non registrata: {kind} [{symbol}]")
+        self._systems[name] = dict(units)
+        self._titles[name] = title or name
+        self._clear_caches()
+
+    def systems(self) -> tuple:
+        return tuple(self._systems)
+
+    def title(self, system: str) -> str:
+        return self._titles.get(system, system)
+
+    def _clear_caches(self):
+        self.label.cache_clear()
+        self.affine.cache_clear()
+
+    @lru_cache(maxsize=None)
+    def label(self, kind: str, system: str) -> str:
+        """Simbolo dell'unità di `kind` nel sistema (stringa vuota se grandezza sconosciuta)."""
+        if kind not in self._base:
+            return ""
+        return self._systems.get(system, {}).get(kind, self._base[kind])
+
+    @lru_cache(maxsize=None)
+    def affine(self, kind: str, from_system: str, to_system: str) -> tuple:
+        """(scale, offset) per convertire `kind` da from_system a to_system."""
+        if kind not in self._base or from_system == to_system:
+            return 1.0, 0.0
+        sa, oa = self._units[(kind, self.label(kind, from_system))]
+        sb, ob = self._units[(kind, self.label(kind, to_system))]
+        scale = sb / sa
+        return scale, ob - oa * scale
+
+
+REGISTRY = UnitRegistry()
+
+REGISTRY.add_kind("flow", "m³/h")
+REGISTRY.add_unit("flow", "GPM", M3H_TO_GPM)
+REGISTRY.add_unit("flow", "l/s", M3H_TO_LS)
+REGISTRY.add_kind("head", "m")
+REGISTRY.add_unit("head", "ft", M_TO_FT)
+REGISTRY.add_kind("npsh", "m")
+REGISTRY.add_unit("npsh", "ft", M_TO_FT)
+REGISTRY.add_kind("power", "kW")
+REGISTRY.add_unit("power", "HP", KW_TO_HP)
+REGISTRY.add_kind("pressure", "m")
+REGISTRY.add_unit("pressure", "ft", M_TO_FT_PRESSURE)
+REGISTRY.add_unit("pressure", "bar", M_TO_BAR)
+REGISTRY.add_unit("pressure", "psi", M_TO_PSI)
+REGISTRY.add_kind("temp", "°C")
+REGISTRY.add_unit("temp", "°F", 9 / 5, 32.0)
+REGISTRY.add_kind("visc", "cP")
+REGISTRY.add_kind("sg", "")  # adimensionale
+REGISTRY.add_kind("diameter", "mm")
+REGISTRY.add_unit("diameter", "in", MM_TO_IN)
+REGISTRY.add_kind("suction_discharge", "Inch")  # già in pollici nel TDMS, uguale in tutti i sistemi
+REGISTRY.add_kind("speed", "rpm")
+REGISTRY.add_kind("percent", "%")
+
+REGISTRY.add_system("Metric", "SI (Metric)")
+REGISTRY.add_system(
+    "US", "U.S. Customary",
+    flow="GPM", head="ft", npsh="ft", power="HP", pressure="ft", temp="°F", diameter="in",
+)
+REGISTRY.add_system("SI-bar", "SI (bar, l/s)", flow="l/s", pressure="bar")
+
+
+def system_names() -> tuple:
+    """Sistemi di unità disponibili (per combobox e validazione DB)."""
+    return REGISTRY.systems()
+
+
+def system_title(system: str) -> str:
+    """Titolo esteso del sistema (es. 'U.S. Customary'), usato nell'header dei report."""
+    return REGISTRY.title(system)
 
 
 # ================== FUNZIONI DI CONVERSIONE ==================
 
 def convert_value(value, param_type: str, from_system: str, to_system: str):
     """
-    Converte un valore da un sistema di unitÃ  all'altro.
+    Converte un valore da un sistema di unità all'altro.
     
     Args:
         value: valore da convertire (numero o stringa)
         param_type: tipo di parametro ('flow', 'head', 'power', 'temp', ecc.)
-        from_system: sistema sorgente ('Metric' o 'US')
-        to_system: sistema destinazione ('Metric' o 'US')
+        from_system: sistema sorgente (vedi system_names())
+        to_system: sistema destinazione
     
     Returns:
         Valore convertito (stesso tipo dell'input)
     """
-    # Se stessa unitÃ , nessuna conversione
+    # Se stessa unità, nessuna conversione
     if from_system == to_system:
         return value
     
@@ -96,46 +194,8 @@ def convert_value(value, param_type: str, from_system: str, to_system: str):
     except (ValueError, TypeError):
         return value
     
-    # Conversioni Metric â†’ US
-    if from_system == "Metric" and to_system == "US":
-        if param_type == "flow":
-            result = v * M3H_TO_GPM
-        elif param_type == "head":
-            result = v * M_TO_FT
-        elif param_type == "power":
-            result = v * KW_TO_HP
-        elif param_type == "pressure":
-            result = v * M_TO_FT_PRESSURE
-        elif param_type == "npsh":
-            result = v * M_TO_FT
-        elif param_type == "temp":
-            result = celsius_to_fahrenheit(v)
-        elif param_type == "diameter":
-            result = v * MM_TO_IN
-        else:
-            # Parametri che non cambiano (sg, visc, speed, suction/discharge)
-            result = v
-    
-    # Conversioni US â†’ Metric
-    elif from_system == "US" and to_system == "Metric":
-        if param_type == "flow":
-            result = v / M3H_TO_GPM
-        elif param_type == "head":
-            result = v / M_TO_FT
-        elif param_type == "power":
-            result = v / KW_TO_HP
-        elif param_type == "pressure":
-            result = v / M_TO_FT_PRESSURE
-        elif param_type == "npsh":
-            result = v / M_TO_FT
-        elif param_type == "temp":
-            result = fahrenheit_to_celsius(v)
-        elif param_type == "diameter":
-            result = v / MM_TO_IN
-        else:
-            result = v
-    else:
-        result = v
+    scale, offset = REGISTRY.affine(param_type, from_system, to_system)
+    result = v * scale + offset
     
     # Ritorna nello stesso tipo dell'input
     if isinstance(value, int):
@@ -148,16 +208,16 @@ def convert_value(value, param_type: str, from_system: str, to_system: str):
 
 def get_unit_label(param_type: str, system: str) -> str:
     """
-    Ritorna l'etichetta dell'unitÃ  di misura per un parametro.
+    Ritorna l'etichetta dell'unità di misura per un parametro.
     
     Args:
         param_type: tipo di parametro ('flow', 'head', ecc.)
-        system: sistema di unitÃ  ('Metric' o 'US')
+        system: sistema di unità (vedi system_names())
     
     Returns:
-        Stringa con l'unitÃ  (es. 'm³/h', 'GPM', 'ft', ecc.)
+        Stringa con l'unità (es. 'm³/h', 'GPM', 'ft', ecc.)
     """
-    return UNITS.get(system, {}).get(param_type, "")
+    return REGISTRY.label(param_type, system)
 
 
 def format_with_unit(value, param_type: str, system: str, decimals: int = 2) -> str:
@@ -186,6 +246,144 @@ def format_with_unit(value, param_type: str, system: str, decimals: int = 2) ->
 
 # ================== HELPER PER TABELLE PERFORMANCE ==================
 
+# Mappa nomi colonne -> tipo parametro (case-insensitive, partial match, vince la prima chiave trovata)
+_PERF_COLUMN_MAP = {
+    # Flow
+    "flow": "flow",
+    "capacity": "flow",
+    "q": "flow",
+    # Head / Pressure
+    "tdh": "head",
+    "head": "head",
+    "kin suct": "head",  # kinematic suction head
+    "kin disch": "head",  # kinematic discharge head
+    "suction press": "pressure",
+    "discharge press": "pressure",
+    "suction pressure": "pressure",
+    "discharge pressure": "pressure",
+    "atmpress": "pressure",
+    # Power
+    "power": "power",
+    "abs_power": "power",
+    "absorbed power": "power",
+    # Efficiency
+    "eff": None,  # percentuale, non converte
+    "efficiency": None,
+    # NPSH
+    "npsh": "npsh",
+    "knpsh": "npsh",
+    # Temperature
+    "temp": "temp",
+    "temperature": "temp",
+    "watertemp": "temp",
+    # Speed
+    "speed": "speed",
+    "rpm": "speed",
+    # Altri che non cambiano
+    "visc": "visc",
+    "viscosity": "visc",
+    "sg": "sg",
+    "specific gravity": "sg",
+}
+
+
+def _column_param_type(col: str):
+    """Tipo parametro di una colonna secondo _PERF_COLUMN_MAP (None se non convertibile)."""
+    col_lower = col.lower()
+    for key, ptype in _PERF_COLUMN_MAP.items():
+        if key in col_lower:
+            return ptype
+    return None
+
+
+class ConversionPlan:
+    """
+    Piano di conversione compilato per una lista di colonne:
+    per ogni colonna (scale, offset) e le nuove etichette con l'unità di arrivo.
+    Si ottiene da compile_conversion_plan (in cache per tupla di intestazioni).
+    """
+    __slots__ = ("columns", "scale", "offset", "active")
+
+    def __init__(self, columns, scale, offset, active):
+        self.columns = columns    # tuple: intestazioni convertite
+        self.scale = scale        # tuple di float, una per colonna
+        self.offset = offset      # tuple di float, una per colonna
+        self.active = active      # tuple di bool: colonna con tipo parametro (passa da convert)
+
+    def apply(self, rows: list) -> list:
+        """Converte le righe (lista di tuple/liste); ritorna lista di liste."""
+        if not rows:
+            return []
+        width = len(rows[0])
+        if width == 0 or any(len(r) != width for r in rows):
+            # righe vuote o di lunghezza diversa: cella per cella (stesso risultato)
+            return [[self._cell(j, v) for j, v in enumerate(r)] for r in rows]
+
+        out_cols = []
+        for j, col in enumerate(zip(*rows)):
+            if j >= len(self.scale) or not self.active[j]:
+                out_cols.append(col)
+                continue
+            scale, offset = self.scale[j], self.offset[j]
+            if set(map(type, col)) == _FLOAT_ONLY:
+                # caso tipico TDMS: colonna tutta float -> un'unica operazione vettoriale
+                if NUMPY_OK:
+                    out_cols.append((np.asarray(col, dtype=float) * scale + offset).tolist())
+                else:
+                    out_cols.append([v * scale + offset for v in col])
+            else:
+                out_cols.append([_convert_cell(v, scale, offset) for v in col])
+
+        return list(map(list, zip(*out_cols)))
+
+    def _cell(self, j: int, value):
+        if j >= len(self.scale) or not self.active[j]:
+            return value
+        return _convert_cell(value, self.scale[j], self.offset[j])
+
+
+_FLOAT_ONLY = {float}
+
+
+def _convert_cell(value, scale: float, offset: float):
+    """Singola cella non-float: stesse regole di tipo di convert_value."""
+    try:
+        v = float(value)
+    except (ValueError, TypeError):
+        return value
+    result = v * scale + offset
+    if isinstance(value, int):
+        return int(round(result))
+    elif isinstance(value, str):
+        return str(result)
+    return result
+
+
+@lru_cache(maxsize=256)
+def _compile_plan(columns: tuple, from_system: str, to_system: str) -> ConversionPlan:
+    new_columns, scale, offset, active = [], [], [], []
+    for col in columns:
+        param_type = _column_param_type(col)
+        if param_type:
+            # Sostituisci l'unità nell'etichetta
+            old_unit = get_unit_label(param_type, from_system)
+            new_unit = get_unit_label(param_type, to_system)
+            new_col = col.replace(old_unit, new_unit) if old_unit and new_unit else col
+            s, o = REGISTRY.affine(param_type, from_system, to_system)
+        else:
+            new_col, s, o = col, 1.0, 0.0
+        new_columns.append(new_col)
+        scale.append(s)
+        offset.append(o)
+        active.append(bool(param_type))
+    return ConversionPlan(tuple(new_columns), tuple(scale), tuple(offset), tuple(active))
+
+
+def compile_conversion_plan(columns, from_system: str, to_system: str) -> ConversionPlan:
+    """Ritorna il piano di conversione (in cache) per queste intestazioni di colonna."""
+    return _compile_plan(tuple(columns), from_system, to_system)
+
+
 def convert_performance_table(columns: list, rows: list, from_system: str, to_system: str) -> tuple:
     """
     Converte un'intera tabella di performance (Calculated o Converted).
@@ -197,99 +395,14 @@ def convert_performance_table(columns: list, rows: list, from_system: str, to_sy
         to_system: sistema destinazione
     
     Returns:
-        (columns_converted, rows_converted) con nuove etichette unitÃ  e valori convertiti
+        (columns_converted, rows_converted) con nuove etichette unità e valori convertiti
     """
     if from_system == to_system:
         return columns, rows
-    
-    # Mappa nomi colonne â†’ tipo parametro (case-insensitive, partial match)
-    column_map = {
-        # Flow
-        "flow": "flow",
-        "capacity": "flow",
-        "q": "flow",
-        # Head / Pressure
-        "tdh": "head",
-        "head": "head",
-        "kin suct": "head",  # kinematic suction head
-        "kin disch": "head",  # kinematic discharge head
-        "suction press": "pressure",
-        "discharge press": "pressure",
-        "suction pressure": "pressure",
-        "discharge pressure": "pressure",
-        "atmpress": "pressure",
-        # Power
-        "power": "power",
-        "abs_power": "power",
-        "absorbed power": "power",
-        # Efficiency
-        "eff": None,  # percentuale, non converte
-        "efficiency": None,
-        # NPSH
-        "npsh": "npsh",
-        "knpsh": "npsh",
-        # Temperature
-        "temp": "temp",
-        "temperature": "temp",
-        "watertemp": "temp",
-        # Speed
-        "speed": "speed",
-        "rpm": "speed",
-        # Altri che non cambiano
-        "visc": "visc",
-        "viscosity": "visc",
-        "sg": "sg",
-        "specific gravity": "sg",
-    }
-    
-    # Converti header colonne (aggiorna unitÃ  nelle etichette)
-    new_columns = []
-    for col in columns:
-        # Cerca corrispondenza nel mapping (case-insensitive)
-        param_type = None
-        col_lower = col.lower()
-        for key, ptype in column_map.items():
-            if key in col_lower:
-                param_type = ptype
-                break
-        
-        if param_type:
-            # Sostituisci l'unitÃ  nell'etichetta
-            old_unit = get_unit_label(param_type, from_system)
-            new_unit = get_unit_label(param_type, to_system)
-            if old_unit and new_unit:
-                new_col = col.replace(old_unit, new_unit)
-            else:
-                new_col = col
-        else:
-            new_col = col
-        
-        new_columns.append(new_col)
-    
-    # Converti valori nelle righe
-    new_rows = []
-    for row in rows:
-        new_row = []
-        for i, val in enumerate(row):
-            col_name = columns[i] if i < len(columns) else ""
-            col_name_lower = col_name.lower()
-            
-            # Determina tipo parametro dalla colonna (case-insensitive)
-            param_type = None
-            for key, ptype in column_map.items():
-                if key in col_name_lower:
-                    param_type = ptype
-                    break
-            
-            if param_type:
-                converted = convert_value(val, param_type, from_system, to_system)
-                new_row.append(converted)
-            else:
-                new_row.append(val)
-        
-        new_rows.append(new_row)
-    
-    return new_columns, new_rows
+
+    # Il mapping colonne -> (scale, offset) si calcola una volta per intestazioni
+    plan = compile_conversion_plan(columns, from_system, to_system)
+    return list(plan.columns), plan.apply(rows)
 
 
 def convert_contractual_data(data: dict, from_system: str, to_system: str) -> dict: